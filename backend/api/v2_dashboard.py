@@ -77,8 +77,7 @@ async def get_dashboard_v2(
     }, {"_id": 0}).to_list(1000)
     
     # CRITICAL: Convert odoo_id to string and enrich with proper account/owner data
-    from services.field_mapper import get_field_mapper
-    mapper = get_field_mapper()
+    from services.field_mapper import mapped_record
     
     for opp in opportunities:
         # Convert odoo_id to string
@@ -108,9 +107,8 @@ async def get_dashboard_v2(
                 })
                 
                 if raw_opp:
-                    raw_data = raw_opp.get("data", {})
-                    # Use mapper to extract account properly
-                    canonical = mapper.map_opportunity(raw_data)
+                    # Account fields as mapped at sync time
+                    canonical = mapped_record("opportunity", raw_opp)
                     opp["account_id"] = canonical.get("account_id")
                     opp["account_name"] = canonical.get("account_name")
                     opp["account_linked"] = canonical.get("account_linked", False) and canonical.get("account_id") is not None
@@ -37,6 +37,15 @@ class SourceReference(BaseModel):
     source_model: Optional[str] = None  # e.g., "res.partner", "crm.lead"
     last_synced_at: Optional[datetime] = None
     sync_hash: Optional[str] = None  # For change detection
+    
+    @staticmethod
+    def make_key(source: str, source_id: Any) -> str:
+        """Flattened, indexable source key, e.g. "odoo:123" """
+        return f"{source}:{source_id}"
+    
+    @property
+    def key(self) -> str:
+        return self.make_key(self.source, self.source_id)
 
 
 class BaseEntity(AuditMixin):
@@ -44,6 +53,8 @@ class BaseEntity(AuditMixin):
     
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     sources: List[SourceReference] = Field(default_factory=list, alias="_sources")
+    # Flattened copy of sources for point lookups (maintained on write)
+    source_keys: List[str] = Field(default_factory=list, alias="_source_keys")
     
     def add_source(self, source: str, source_id: str, source_model: Optional[str] = None):
         """Add or update a source reference"""
@@ -68,8 +79,14 @@ class BaseEntity(AuditMixin):
     
     def to_mongo_dict(self) -> Dict[str, Any]:
         """Convert to MongoDB-safe dictionary (excludes _id)"""
+        self.source_keys = [s.key for s in self.sources]
+        
         data = self.model_dump(by_alias=True)
         data.pop("_id", None)
+        
+        # Omitted when empty so the sparse unique index skips source-less entities
+        if not data["_source_keys"]:
+            data.pop("_source_keys")
         return data
 
 
@@ -4,7 +4,7 @@ Enterprise-grade configuration management with BYOK support
 """
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import Optional
+from typing import Dict, Optional
 from functools import lru_cache
 
 
@@ -20,9 +20,25 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = Field(default="HS256", description="JWT algorithm")
     JWT_EXPIRATION_HOURS: int = Field(default=24, description="Token expiration in hours")
     
+    # Environment ("development" enables debug response headers)
+    ENVIRONMENT: str = Field(default="production", description="Deployment environment")
+    
+    # Query budgets (Mongo commands per request before a warning is logged, 0 = off)
+    DB_QUERY_BUDGET: int = Field(default=50, description="Default Mongo commands allowed per request")
+    DB_QUERY_BUDGETS: Dict[str, int] = Field(default_factory=dict, description="Per-route budgets keyed by route template")
+    
+    # Global search (server-side time limit per query)
+    SEARCH_TIMEOUT_MS: int = Field(default=250, description="Search index query time limit in milliseconds")
+    
+    # Reporting snapshots (seconds a computed report is reused, 0 = always recompute)
+    TARGET_REPORT_CACHE_SECONDS: int = Field(default=60, description="Target progress report snapshot lifetime")
+    
     # CORS
     CORS_ORIGINS: str = Field(default="*", description="CORS allowed origins")
     
+    # API call logging
+    API_LOG_TTL_DAYS: int = Field(default=14, description="Days to keep api_call_logs (0 = forever)")
+    
     # Redis (for background jobs)
     REDIS_URL: Optional[str] = Field(default=None, description="Redis connection URL")
 
@@ -31,23 +47,50 @@ class Settings(BaseSettings):
     CLICKHOUSE_DATABASE: str = Field(default="salesintel", description="ClickHouse database name")
     CLICKHOUSE_USER: Optional[str] = Field(default=None, description="ClickHouse username")
     CLICKHOUSE_PASSWORD: Optional[str] = Field(default=None, description="ClickHouse password")
+    CLICKHOUSE_MAX_CONNECTIONS: int = Field(default=8, description="Pooled HTTP connections per ClickHouse client")
+    CLICKHOUSE_TIMEOUT_SECONDS: float = Field(default=10.0, description="ClickHouse HTTP request timeout")
+    CLICKHOUSE_FLUSH_ROWS: int = Field(default=5000, description="Buffered rows per table that trigger an insert")
+    CLICKHOUSE_FLUSH_INTERVAL_SECONDS: float = Field(default=1.0, description="Maximum time rows wait in the insert buffer")
+    CLICKHOUSE_MAX_BUFFERED_ROWS: int = Field(default=100000, description="Buffered rows after which inserts wait (backpressure)")
+    CLICKHOUSE_GZIP_LEVEL: int = Field(default=3, description="gzip level for ClickHouse insert bodies")
+    ANALYTICS_BACKEND: str = Field(default="auto", description="Dashboard analytics backend: auto, clickhouse or mongo")
+    ANALYTICS_CLICKHOUSE_MIN_RECORDS: int = Field(default=50000, description="Serving records from which auto uses ClickHouse")
+    CDC_ENABLED: bool = Field(default=True, description="Stream Mongo changes into ClickHouse (needs a replica set)")
+    CDC_BATCH_SIZE: int = Field(default=1000, description="Change events per ClickHouse write")
+    CDC_FLUSH_INTERVAL_SECONDS: float = Field(default=1.0, description="Maximum time a change waits before being written")
     
     # AI Configuration - BYOK (Bring Your Own Key)
     EMERGENT_LLM_KEY: Optional[str] = Field(default=None, description="Emergent LLM API key")
     OPENAI_API_KEY: Optional[str] = Field(default=None, description="OpenAI API key (BYOK)")
     AI_MODEL: str = Field(default="gpt-4o", description="Default AI model")
+    AI_MAPPING_CACHE_SIZE: int = Field(default=256, description="AI mapping suggestion sets kept in memory")
+    AI_MAPPING_CACHE_DAYS: int = Field(default=30, description="Days AI mapping suggestions are kept in Mongo")
     
     # Odoo Integration
     ODOO_URL: Optional[str] = Field(default=None, description="Odoo instance URL")
     ODOO_DATABASE: Optional[str] = Field(default=None, description="Odoo database name")
     ODOO_USERNAME: Optional[str] = Field(default=None, description="Odoo username")
     ODOO_API_KEY: Optional[str] = Field(default=None, description="Odoo API key")
+    ODOO_MAX_CONCURRENCY: int = Field(default=4, description="Concurrent Odoo RPC calls (and pooled connections) per login")
+    ODOO_TIMEOUT_SECONDS: float = Field(default=30.0, description="Odoo RPC request timeout")
+    ODOO_EXPORT_CHUNK_SIZE: int = Field(default=500, description="Records per ID range in parallel Odoo exports")
+    WEBHOOK_BATCH_WINDOW_SECONDS: float = Field(default=2.0, description="Window over which Odoo webhook record IDs are coalesced")
+    WEBHOOK_BATCH_MAX_IDS: int = Field(default=1000, description="Pending webhook IDs that trigger an early flush")
+    WEBHOOK_BATCH_MAX_ATTEMPTS: int = Field(default=5, description="Times a webhook record is retried before it is counted as failed")
+    WEBHOOK_RETRY_DELAY_SECONDS: float = Field(default=5.0, description="First retry delay after a failed webhook batch (doubles per failure)")
     
     # Microsoft 365 SSO
     MS365_CLIENT_ID: Optional[str] = Field(default=None, description="Azure AD Client ID")
     MS365_CLIENT_SECRET: Optional[str] = Field(default=None, description="Azure AD Client Secret")
     MS365_TENANT_ID: Optional[str] = Field(default=None, description="Azure AD Tenant ID")
     MS365_REDIRECT_URI: Optional[str] = Field(default=None, description="OAuth redirect URI")
+    MS365_SYNC_INTERVAL_MINUTES: int = Field(default=5, description="Mailbox/calendar delta sync interval")
+    MS365_SYNC_CONCURRENCY: int = Field(default=4, description="Users delta-synced at the same time")
+    MS365_DELTA_PAGE_SIZE: int = Field(default=100, description="Items per Graph delta page")
+    MS365_MAIL_SYNC_DAYS: int = Field(default=30, description="Inbox history read by a full mail sync")
+    MS365_CALENDAR_PAST_DAYS: int = Field(default=30, description="Calendar window start (days back)")
+    MS365_CALENDAR_FUTURE_DAYS: int = Field(default=180, description="Calendar window end (days ahead)")
+    MS365_CALENDAR_WINDOW_ROLL_DAYS: int = Field(default=7, description="Days after which the calendar window is re-based")
     
     class Config:
         env_file = ".env"
@@ -4,8 +4,11 @@ MongoDB connection and Data Lake zone management
 """
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from typing import Optional
+import asyncio
 import logging
 
+from core.db_monitor import db_command_listener
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,6 +17,7 @@ class Database:
     
     client: Optional[AsyncIOMotorClient] = None
     db: Optional[AsyncIOMotorDatabase] = None
+    _rederive_task: Optional[asyncio.Task] = None
     
     # Data Lake Zone Collections
     RAW_ZONE = "data_lake_raw"           # Bronze - Raw data as-is
@@ -24,7 +28,8 @@ class Database:
     async def connect(cls, mongo_url: str, db_name: str):
         """Initialize MongoDB connection"""
         try:
-            cls.client = AsyncIOMotorClient(mongo_url)
+            # Command listener attributes every query to the current request
+            cls.client = AsyncIOMotorClient(mongo_url, event_listeners=[db_command_listener])
             cls.db = cls.client[db_name]
             
             # Verify connection
@@ -66,6 +71,10 @@ class Database:
         await cls.db[cls.CANONICAL_ZONE].create_index([("canonical_id", 1)], unique=True)
         await cls.db[cls.CANONICAL_ZONE].create_index([("source_refs.source", 1), ("source_refs.source_id", 1)])
         
+        # Per-type canonical collections - unique flattened source keys (backfilled first)
+        from data_lake.canonical_zone import CanonicalZoneHandler
+        await CanonicalZoneHandler(cls.db).ensure_indexes()
+        
         # Serving Zone indexes - unique on entity_type + serving_id
         await cls.db[cls.SERVING_ZONE].create_index([("entity_type", 1)])
         await cls.db[cls.SERVING_ZONE].create_index(
@@ -75,6 +84,56 @@ class Database:
         )
         await cls.db[cls.SERVING_ZONE].create_index([("last_aggregated", -1)])
         
+        # Record visibility keys (salesperson/team/manager) - backfilled, then indexed
+        from services.rbac.record_access import ensure_access_index
+        await ensure_access_index(cls.db)
+        
+        # Precomputed mapped forms - stale ones (older MAPPER_VERSION) re-derived in the background
+        from services.field_mapper import rederive_mapped_fields
+        cls._rederive_task = asyncio.create_task(rederive_mapped_fields(cls.db))
+        
+        # Materialized per-account rollups (built on first read, refreshed after syncs)
+        from data_lake.account_rollup import AccountRollupManager
+        await AccountRollupManager(cls.db).ensure_indexes()
+        
+        # Global search index (built on first search, refreshed by syncs)
+        from services.search.index import SearchIndexer
+        await SearchIndexer(cls.db).ensure_indexes()
+        
+        # Cached AI field-mapping suggestions (TTL)
+        from services.ai_mapping.cache import SuggestionCache
+        await SuggestionCache(cls.db).ensure_indexes()
+        
+        # Personal mail/calendar cache and MS365 delta links
+        from services.ms365.delta_sync import MailboxDeltaSync
+        await MailboxDeltaSync(cls.db).ensure_indexes()
+        
+        # Per-source raw collections - idempotent upserts, batch/time-range streaming for replay
+        from data_lake.raw_zone import RawZoneHandler
+        for collection_name in set(RawZoneHandler.COLLECTION_MAP.values()):
+            await cls.db[collection_name].create_index(
+                [("_source", 1), ("_source_id", 1), ("_content_hash", 1)],
+                unique=True,
+                partialFilterExpression={"_content_hash": {"$exists": True}},
+                name="source_sourceid_contenthash"
+            )
+            await cls.db[collection_name].create_index([("_sync_batch_id", 1), ("_ingested_at", 1)])
+            await cls.db[collection_name].create_index([("_ingested_at", 1)])
+        
+        # Every batch each raw payload was seen in (batch replay)
+        members = cls.db[RawZoneHandler.MEMBERS_COLLECTION]
+        await members.create_index(
+            [("batch_id", 1), ("collection", 1), ("source_id", 1), ("content_hash", 1)],
+            unique=True,
+            name="batch_member"
+        )
+        await members.create_index([("batch_id", 1), ("collection", 1), ("seen_at", 1)])
+        await members.create_index([("collection", 1), ("source_id", 1), ("content_hash", 1)])
+        
+        # Retention policies, run reports and the compacted archive (TTL tier)
+        from data_lake.retention import RetentionManager
+        await RetentionManager(cls.db).ensure_indexes()
+        
         logger.info("Data Lake indexes initialized")
     
     @classmethod
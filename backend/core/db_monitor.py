@@ -0,0 +1,171 @@
+"""
+Database Command Monitoring
+Attributes every MongoDB command to the request that issued it
+"""
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import monitoring
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Commands that are driver housekeeping rather than application queries
+IGNORED_COMMANDS = {
+    "isMaster", "ismaster", "hello", "ping", "buildInfo", "buildinfo",
+    "saslStart", "saslContinue", "getnonce", "authenticate", "endSessions",
+}
+
+# Minimum seconds between budget warnings for the same route
+BUDGET_WARNING_INTERVAL = 60
+
+
+class RequestDBStats:
+    """Mongo commands issued while serving one request"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.time_ms = 0.0
+        self.by_operation: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, collection: str, operation: str, duration_ms: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.time_ms += duration_ms
+            entry = self.by_operation.setdefault((collection, operation), [0, 0.0])
+            entry[0] += 1
+            entry[1] += duration_ms
+    
+    def top_operations(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """The (collection, operation) pairs with the most calls"""
+        ranked = sorted(self.by_operation.items(), key=lambda item: item[1][0], reverse=True)
+        return [
+            {"collection": collection, "operation": operation, "calls": calls, "time_ms": round(ms, 1)}
+            for (collection, operation), (calls, ms) in ranked[:limit]
+        ]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "time_ms": round(self.time_ms, 1)}
+
+
+# Stats of the request currently being served (None outside requests).
+# Motor copies the context into its executor threads, so the listener sees it.
+current_request_db_stats: ContextVar[Optional[RequestDBStats]] = ContextVar(
+    "current_request_db_stats", default=None
+)
+
+
+class DBCommandListener(monitoring.CommandListener):
+    """
+    PyMongo command listener.
+    
+    Records count and duration per collection and operation, both process-wide
+    and for the current request (via current_request_db_stats).
+    """
+    
+    def __init__(self):
+        self._pending: Dict[Tuple[Any, int], Tuple[str, Optional[RequestDBStats]]] = {}
+        self._totals: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        if not isinstance(collection, str):
+            collection = "<db>"
+        
+        self._pending[(event.connection_id, event.request_id)] = (
+            collection,
+            current_request_db_stats.get()
+        )
+    
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event)
+    
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event)
+    
+    def _finish(self, event) -> None:
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        
+        collection, request_stats = pending
+        duration_ms = event.duration_micros / 1000
+        
+        with self._lock:
+            entry = self._totals.setdefault((collection, event.command_name), [0, 0.0])
+            entry[0] += 1
+            entry[1] += duration_ms
+        
+        if request_stats is not None:
+            request_stats.record(collection, event.command_name, duration_ms)
+    
+    def get_totals(self) -> List[Dict[str, Any]]:
+        """Process-wide command count and time per collection and operation"""
+        with self._lock:
+            items = list(self._totals.items())
+        return [
+            {"collection": collection, "operation": operation, "calls": calls, "time_ms": round(ms, 1)}
+            for (collection, operation), (calls, ms) in sorted(items)
+        ]
+    
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP mongodb_commands_total MongoDB commands by collection and operation",
+            "# TYPE mongodb_commands_total counter",
+        ]
+        totals = self.get_totals()
+        for entry in totals:
+            lines.append(
+                f'mongodb_commands_total{{collection="{entry["collection"]}",operation="{entry["operation"]}"}} {entry["calls"]}'
+            )
+        lines += [
+            "# HELP mongodb_command_seconds_total Time spent in MongoDB commands by collection and operation",
+            "# TYPE mongodb_command_seconds_total counter",
+        ]
+        for entry in totals:
+            lines.append(
+                f'mongodb_command_seconds_total{{collection="{entry["collection"]}",operation="{entry["operation"]}"}} {entry["time_ms"] / 1000:.6f}'
+            )
+        return "\n".join(lines) + "\n"
+
+
+class QueryBudget:
+    """Warns when a route issues more Mongo commands than its budget"""
+    
+    def __init__(self, default_budget: int, route_budgets: Optional[Dict[str, int]] = None):
+        self.default_budget = default_budget
+        self.route_budgets = route_budgets or {}
+        self._last_warning: Dict[str, float] = {}
+    
+    def budget_for(self, route: str) -> int:
+        return self.route_budgets.get(route, self.default_budget)
+    
+    def check(self, method: str, route: str, stats: RequestDBStats) -> bool:
+        """Returns False (and logs, rate-limited per route) when over budget"""
+        budget = self.budget_for(route)
+        if not budget or stats.calls <= budget:
+            return True
+        
+        key = f"{method} {route}"
+        now = time.monotonic()
+        last_warning = self._last_warning.get(key)
+        if last_warning is None or now - last_warning >= BUDGET_WARNING_INTERVAL:
+            self._last_warning[key] = now
+            logger.warning(
+                f"Query budget exceeded: {key} issued {stats.calls} Mongo commands "
+                f"(budget {budget}, {stats.time_ms:.1f}ms). Top: {stats.top_operations()}"
+            )
+        return False
+
+
+# Registered on the Motor client in Database.connect
+db_command_listener = DBCommandListener()
@@ -128,6 +128,11 @@ class INormalizer(ABC):
     async def resolve_references(self, entity: BaseEntity) -> BaseEntity:
         """Resolve foreign key references to canonical IDs"""
         pass
+    
+    @abstractmethod
+    async def resolve_references_batch(self, entities: List[BaseEntity]) -> List[BaseEntity]:
+        """Resolve foreign key references for a chunk of entities, in order"""
+        pass
 
 
 class ILoader(ABC):
@@ -152,8 +157,8 @@ class ILoader(ABC):
         pass
     
     @abstractmethod
-    async def bulk_load_raw(self, records: List[RawRecord]) -> int:
-        """Bulk load to raw zone, return count loaded"""
+    async def bulk_load_raw(self, records: List[RawRecord]) -> Dict[str, Any]:
+        """Bulk load to raw zone, return inserted/changed/duplicate/failed counts"""
         pass
 
 
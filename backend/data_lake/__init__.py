@@ -7,6 +7,8 @@ from .manager import DataLakeManager
 from .raw_zone import RawZoneHandler
 from .canonical_zone import CanonicalZoneHandler
 from .serving_zone import ServingZoneHandler
+from .retention import RetentionManager, RetentionPolicy
+from .account_rollup import AccountRollupManager
 from .models import (
     # Canonical Models
     CanonicalContact,
@@ -26,6 +28,9 @@ __all__ = [
     "RawZoneHandler",
     "CanonicalZoneHandler",
     "ServingZoneHandler",
+    "RetentionManager",
+    "RetentionPolicy",
+    "AccountRollupManager",
     # Models
     "CanonicalContact",
     "CanonicalAccount",
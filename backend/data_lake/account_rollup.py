@@ -0,0 +1,676 @@
+"""
+Account Rollups for Sales Intelligence Platform
+Materialized per-account view over the Serving Zone: pipeline and won value,
+opportunity counts, invoice totals, last activity and the related entity IDs.
+
+/accounts/real and the Account 360 view read one rollup document instead of
+scanning opportunities and running case-insensitive $regex lookups per request.
+Rollups are rebuilt after full syncs; webhooks recompute only the accounts
+their records touch.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+import asyncio
+import logging
+import re
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+ROLLUP_COLLECTION = "account_rollup"
+
+# Entity types read from data_lake_serving when building rollups
+ROLLUP_SOURCES = ("account", "opportunity", "invoice", "activity", "contact")
+
+# Related documents returned per entity type by the Account 360 view
+RELATED_LIMIT = 100
+
+_FIELDS = {
+    "opportunity": ["id", "partner_id", "partner_name", "expected_revenue", "stage_name", "write_date"],
+    "invoice": ["id", "partner_id", "partner_name", "customer_name", "invoice_date",
+                "amount_total", "amount_residual", "amount_due"],
+    "activity": ["id", "res_model", "res_id", "date_deadline", "due_date", "write_date", "create_date"],
+    "contact": ["id", "account_id"],
+}
+
+_INDUSTRY_KEYWORDS = (
+    ("Technology", ["tech", "software", "data", "cyber", "cloud", "digital", "systems", "solutions"]),
+    ("Financial Services", ["bank", "finance", "capital", "invest", "financial"]),
+    ("Healthcare", ["health", "medical", "pharma", "bio", "care"]),
+    ("Retail", ["retail", "shop", "store", "commerce", "mart"]),
+    ("Enterprise", ["global", "corp", "enterprise", "inc", "llc", "ltd"]),
+    ("Cybersecurity", ["security", "secure", "protect"]),
+    ("Consulting", ["consult", "advisory", "service"]),
+    ("Manufacturing", ["manufact", "industrial", "engineering"]),
+)
+
+
+def clean_value(val: Any, default: Any = "") -> Any:
+    """Odoo returns False for empty fields"""
+    if val is False or val is None:
+        return default
+    return val
+
+
+def infer_industry(name: str) -> str:
+    """Industry guess from common company naming conventions"""
+    name_lower = name.lower()
+    for industry, keywords in _INDUSTRY_KEYWORDS:
+        if any(kw in name_lower for kw in keywords):
+            return industry
+    return ""
+
+
+def name_key(name: Any) -> str:
+    """Normalized name used to match partners to accounts"""
+    name = clean_value(name, "")
+    return name.strip().lower() if isinstance(name, str) else ""
+
+
+def synthetic_account_id(key: str) -> str:
+    """ID of an account known only from opportunity partner names"""
+    return f"opp_{key[:20].replace(' ', '_')}"
+
+
+def _ref_id(value: Any) -> Optional[str]:
+    """Odoo many2one as an ID string ([id, name], id or False)"""
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    value = clean_value(value, None)
+    return str(value) if value not in (None, "") else None
+
+
+def _partner_keys(data: Dict[str, Any], *name_fields: str) -> List[str]:
+    """
+    Normalized partner names of a record. Odoo displays contacts as
+    "Company, Person", so the company part is matched as well.
+    """
+    keys = []
+    for field in name_fields:
+        key = name_key(data.get(field))
+        if key and key not in keys:
+            keys.append(key)
+        if key and ", " in key:
+            company = key.split(", ", 1)[0].strip()
+            if company and company not in keys:
+                keys.append(company)
+    return keys
+
+
+def _id_values(ids: Iterable[str]) -> List[Any]:
+    """Odoo IDs as stored: numeric IDs may be ints or strings"""
+    values: List[Any] = []
+    for value in ids:
+        values.append(value)
+        if value.isdigit():
+            values.append(int(value))
+    return values
+
+
+def _names_pattern(names: Iterable[str], company_prefix: bool = False) -> Dict[str, Any]:
+    """
+    Case-insensitive match for values whose name_key() is one of names
+    (with company_prefix, also "Company, Person" values of those companies)
+    """
+    alternatives = "|".join(re.escape(name) for name in sorted(names))
+    tail = r"\s*(?:$|,)" if company_prefix else r"\s*$"
+    return {"$regex": rf"^\s*(?:{alternatives}){tail}", "$options": "i"}
+
+
+def _partner_refs(entity_type: str, data: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """Partner IDs and normalized names a serving record is rolled up under"""
+    if entity_type == "account":
+        ids = [str(data["id"])] if data.get("id") not in (None, "") else []
+        key = name_key(data.get("name"))
+        return ids, [key] if key else []
+    if entity_type == "opportunity":
+        return [r for r in [_ref_id(data.get("partner_id"))] if r], _partner_keys(data, "partner_name")
+    if entity_type == "invoice":
+        return [r for r in [_ref_id(data.get("partner_id"))] if r], _partner_keys(data, "partner_name", "customer_name")
+    if entity_type == "activity":
+        ref = _ref_id(data.get("res_id")) if data.get("res_model") == "res.partner" else None
+        return [ref] if ref else [], []
+    if entity_type == "contact":
+        ref = _ref_id(data.get("account_id"))
+        return [ref] if ref else [], []
+    return [], []
+
+
+def _related_scopes(ids: Set[str], names: Set[str], display_names: Set[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Serving filters for the records compute_rollups() could relate to
+    accounts with these IDs and names (a superset - matching stays in Python)
+    """
+    id_values = _id_values(ids)
+    opportunity = [{"data.partner_id": {"$in": id_values}}]
+    invoice = [{"data.partner_id": {"$in": id_values}}]
+    contact = [{"data.account_id": {"$in": id_values}}]
+    if names:
+        opportunity.append({"data.partner_name": _names_pattern(names, company_prefix=True)})
+        invoice.append({"data.partner_name": _names_pattern(names, company_prefix=True)})
+        invoice.append({"data.customer_name": _names_pattern(names, company_prefix=True)})
+    if any(display_names):
+        # [id, name] parents whose name contains the account name
+        contained = "|".join(re.escape(name) for name in sorted(display_names) if name)
+        contact.append({"data.account_id": {"$regex": contained, "$options": "i"}})
+    
+    return {
+        "opportunity": {"$or": opportunity},
+        "invoice": {"$or": invoice},
+        "activity": {"data.res_model": "res.partner", "data.res_id": {"$in": id_values}},
+        "contact": {"$or": contact},
+    }
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _date_str(value: Any) -> str:
+    value = clean_value(value, "")
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+class _AccountEntry:
+    """Rollup being built for one account (or opportunity-only partner name)"""
+    
+    def __init__(self, rollup_id: str, key: str, position: int, doc: Optional[Dict[str, Any]] = None):
+        self.rollup_id = rollup_id
+        self.key = key
+        self.position = position
+        self.doc = doc
+        self.lookup_keys = [rollup_id]
+        self.display_name = ""
+        self.related: Dict[str, List[Tuple[Any, Any]]] = {
+            "opportunity": [], "invoice": [], "activity": [], "contact": []
+        }
+        self.invoiced_total = 0.0
+        self.outstanding_total = 0.0
+        self.last_activity_at = ""
+
+
+def compute_rollups(docs: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Build rollup documents from active serving documents grouped by entity type.
+    
+    - Pipeline/won values and counts are keyed by normalized partner name,
+      exactly as /accounts/real has always computed them
+    - Related opportunities and invoices match by partner ID or normalized
+      partner name; activities by res.partner res_id; contacts by parent ID
+      (falling back to the parent name when none match by ID)
+    - Partner names with opportunities but no account get a synthetic
+      "opp_<name>" rollup
+    """
+    # ---- Opportunity metrics by partner name ----
+    metrics: Dict[str, Dict[str, float]] = {}
+    partner_display: Dict[str, str] = {}
+    for doc in docs.get("opportunity", []):
+        opp = doc.get("data") or {}
+        key = name_key(opp.get("partner_name"))
+        if not key:
+            continue
+        partner_display.setdefault(key, clean_value(opp.get("partner_name"), "").strip())
+        entry = metrics.setdefault(key, {"pipeline_value": 0, "won_value": 0, "active_count": 0, "total_count": 0})
+        
+        value = _float(opp.get("expected_revenue"))
+        stage = clean_value(opp.get("stage_name"), "").lower()
+        entry["total_count"] += 1
+        if "won" in stage:
+            entry["won_value"] += value
+        elif "lost" not in stage:
+            entry["pipeline_value"] += value
+            entry["active_count"] += 1
+    
+    # ---- Accounts ----
+    entries: List[_AccountEntry] = []
+    by_id: Dict[str, _AccountEntry] = {}
+    by_name: Dict[str, List[_AccountEntry]] = {}
+    
+    for doc in docs.get("account", []):
+        acc = doc.get("data") or {}
+        name = clean_value(acc.get("name"), "")
+        if not isinstance(name, str) or not name.strip():
+            continue
+        
+        account_id = str(acc.get("id", doc.get("serving_id", "")))
+        if account_id in by_id:
+            # Same Odoo partner written under another serving_id
+            if doc.get("serving_id"):
+                by_id[account_id].lookup_keys.append(str(doc["serving_id"]))
+            continue
+        
+        entry = _AccountEntry(account_id, name.strip().lower(), len(entries), doc)
+        entry.display_name = name
+        if doc.get("serving_id") and str(doc["serving_id"]) != account_id:
+            entry.lookup_keys.append(str(doc["serving_id"]))
+        # IDs handed out while the account was known only from opportunities
+        entry.lookup_keys.append(synthetic_account_id(entry.key))
+        entries.append(entry)
+        by_id[account_id] = entry
+        by_name.setdefault(entry.key, []).append(entry)
+    
+    # Partner names with opportunities but no account record
+    for key in metrics:
+        if key not in by_name:
+            rollup_id = synthetic_account_id(key)
+            while rollup_id in by_id:
+                rollup_id += "_"
+            entry = _AccountEntry(rollup_id, key, len(entries))
+            entry.display_name = partner_display.get(key) or key.title()
+            entries.append(entry)
+            by_id[rollup_id] = entry
+            by_name[key] = [entry]
+    
+    def matches(data: Dict[str, Any], id_field: str, *name_fields: str) -> List[_AccountEntry]:
+        found: Dict[int, _AccountEntry] = {}
+        ref = _ref_id(data.get(id_field))
+        if ref in by_id:
+            found[id(by_id[ref])] = by_id[ref]
+        for key in _partner_keys(data, *name_fields):
+            for entry in by_name.get(key, []):
+                found[id(entry)] = entry
+        return list(found.values())
+    
+    # ---- Related entities ----
+    for doc in docs.get("opportunity", []):
+        opp = doc.get("data") or {}
+        for entry in matches(opp, "partner_id", "partner_name"):
+            entry.related["opportunity"].append((-_float(opp.get("expected_revenue")), doc["_id"]))
+    
+    for doc in docs.get("invoice", []):
+        inv = doc.get("data") or {}
+        for entry in matches(inv, "partner_id", "partner_name", "customer_name"):
+            entry.related["invoice"].append((_date_str(inv.get("invoice_date")), doc["_id"]))
+            entry.invoiced_total += _float(inv.get("amount_total"))
+            entry.outstanding_total += _float(inv.get("amount_residual", inv.get("amount_due")))
+    
+    for doc in docs.get("activity", []):
+        act = doc.get("data") or {}
+        if act.get("res_model") != "res.partner":
+            continue
+        entry = by_id.get(_ref_id(act.get("res_id")))
+        if entry is not None:
+            entry.related["activity"].append((_date_str(act.get("date_deadline") or act.get("due_date")), doc["_id"]))
+            touched = _date_str(act.get("write_date") or act.get("create_date"))
+            entry.last_activity_at = max(entry.last_activity_at, touched)
+    
+    # Contacts by parent ID; [id, name] parents can also match by name
+    by_parent_id: Dict[str, List[Any]] = {}
+    named: List[Tuple[str, str, Any]] = []
+    for doc in docs.get("contact", []):
+        parent = (doc.get("data") or {}).get("account_id")
+        if not parent:
+            continue
+        if isinstance(parent, list):
+            by_parent_id.setdefault(str(parent[0]), []).append(doc["_id"])
+            if len(parent) > 1:
+                named.append((str(parent[0]), str(parent[1] or "").lower(), doc["_id"]))
+        elif isinstance(parent, (int, str)):
+            by_parent_id.setdefault(str(parent), []).append(doc["_id"])
+    
+    for entry in entries:
+        entry.related["contact"] = _match_contacts(entry, by_parent_id, named)
+    
+    # ---- Documents ----
+    built = []
+    for entry in entries:
+        acc = (entry.doc or {}).get("data") or {}
+        entry_metrics = metrics.get(entry.key, {"pipeline_value": 0, "won_value": 0, "active_count": 0, "total_count": 0})
+        
+        if entry.doc is not None:
+            row = {
+                "id": entry.rollup_id,
+                "name": entry.display_name,
+                "email": clean_value(acc.get("email"), ""),
+                "phone": clean_value(acc.get("phone"), ""),
+                "website": clean_value(acc.get("website"), ""),
+                "city": clean_value(acc.get("address_city") or acc.get("city"), ""),
+                "country": clean_value(acc.get("address_country") or acc.get("country"), ""),
+                "industry": clean_value(acc.get("industry") or acc.get("industry_id"), "") or infer_industry(entry.display_name),
+                "source": "odoo",
+                "last_synced": entry.doc.get("last_aggregated"),
+            }
+        else:
+            row = {
+                "id": entry.rollup_id,
+                "name": entry.key.title(),
+                "email": "",
+                "phone": "",
+                "website": "",
+                "city": "",
+                "country": "",
+                "industry": infer_industry(entry.key.title()),
+                "source": "odoo_opportunity",
+                "last_synced": None,
+            }
+        row.update({
+            "pipeline_value": entry_metrics["pipeline_value"],
+            "won_value": entry_metrics["won_value"],
+            "active_opportunities": entry_metrics["active_count"],
+            "total_opportunities": entry_metrics["total_count"],
+            "last_activity": entry.last_activity_at or None,
+        })
+        
+        built.append({
+            "rollup_id": entry.rollup_id,
+            "lookup_keys": entry.lookup_keys,
+            "name_key": entry.key,
+            "position": entry.position,
+            "kind": "account" if entry.doc is not None else "opportunity_derived",
+            "display_name": entry.display_name,
+            "account": acc if entry.doc is not None else None,
+            "last_synced": (entry.doc or {}).get("last_aggregated"),
+            "row": row,
+            "invoiced_total": entry.invoiced_total,
+            "outstanding_total": entry.outstanding_total,
+            "last_activity_at": entry.last_activity_at or None,
+            "related": {
+                entity_type: [ref for _, ref in _ordered(entity_type, refs)]
+                for entity_type, refs in entry.related.items()
+            },
+            "related_counts": {entity_type: len(refs) for entity_type, refs in entry.related.items()},
+        })
+    
+    return built
+
+
+def _ordered(entity_type: str, refs: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    """Order related refs the way the 360 view lists them"""
+    if entity_type == "invoice":
+        return sorted(refs, key=lambda r: r[0], reverse=True)
+    if entity_type in ("opportunity", "activity"):
+        return sorted(refs, key=lambda r: r[0])
+    return refs
+
+
+def _match_contacts(entry: _AccountEntry, by_parent_id: Dict[str, List[Any]], named: List[Tuple[str, str, Any]]) -> List[Tuple[Any, Any]]:
+    """
+    Contacts whose parent is this account: by parent ID, or by the name in an
+    [id, name] parent when the account name is part of it. If nothing matches,
+    the parent name may also be part of the account name.
+    """
+    account_name = entry.display_name.lower()
+    matched = {ref: None for ref in by_parent_id.get(entry.rollup_id, [])}
+    
+    if account_name:
+        for _, parent_name, ref in named:
+            if parent_name and account_name in parent_name:
+                matched[ref] = None
+        
+        if not matched:
+            for _, parent_name, ref in named:
+                if parent_name and (account_name in parent_name or parent_name in account_name):
+                    matched[ref] = None
+    
+    return [(None, ref) for ref in matched]
+
+
+class AccountRollupManager:
+    """
+    Maintains the account_rollup collection.
+    
+    refresh() is called after syncs; concurrent calls in a process are
+    coalesced into one rebuild that starts after the latest request.
+    Webhooks pass the records they changed and only those accounts'
+    rollups are recomputed.
+    """
+    
+    _lock: Optional[asyncio.Lock] = None
+    _requested = 0
+    _covered = 0
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db[ROLLUP_COLLECTION]
+    
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index("rollup_id", unique=True)
+        await self.collection.create_index("lookup_keys")
+        await self.collection.create_index("position")
+        await self.collection.create_index("built_at")
+        await self.collection.create_index("name_key")
+        for entity_type in ROLLUP_SOURCES[1:]:
+            await self.collection.create_index(f"related.{entity_type}")
+        
+        # Partner references matched by incremental rebuilds
+        serving = self.db.data_lake_serving
+        for field in ("partner_id", "res_id", "account_id"):
+            await serving.create_index([("entity_type", 1), (f"data.{field}", 1)])
+    
+    async def refresh(self, changed: Optional[Dict[str, List[str]]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild rollups unless a rebuild started after this call already
+        covers it. With changed (entity type -> serving IDs) only the
+        rollups those records touch are recomputed.
+        """
+        cls = AccountRollupManager
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        
+        if changed is not None:
+            async with cls._lock:
+                return await self.rebuild_affected(changed)
+        
+        cls._requested += 1
+        ticket = cls._requested
+        async with cls._lock:
+            if cls._covered >= ticket:
+                return None
+            covering = cls._requested
+            report = await self.rebuild()
+            cls._covered = covering
+            return report
+    
+    async def rebuild(self) -> Dict[str, Any]:
+        """Recompute every rollup from the Serving Zone"""
+        started = time.monotonic()
+        built_at = datetime.now(timezone.utc)
+        
+        docs = {entity_type: await self._load(entity_type) for entity_type in ROLLUP_SOURCES}
+        rollups = compute_rollups(docs)
+        
+        ops = [
+            ReplaceOne({"rollup_id": rollup["rollup_id"]}, {**rollup, "built_at": built_at}, upsert=True)
+            for rollup in rollups
+        ]
+        for start in range(0, len(ops), 500):
+            await self.collection.bulk_write(ops[start:start + 500], ordered=False)
+        
+        # Rollups not rewritten by this (or a later) build no longer exist
+        removed = await self.collection.delete_many({"built_at": {"$lt": built_at}})
+        
+        report = {
+            "rollups": len(rollups),
+            "removed": removed.deleted_count,
+            "source_documents": {entity_type: len(entity_docs) for entity_type, entity_docs in docs.items()},
+            "duration_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+        logger.info(f"Account rollups rebuilt: {report}")
+        return report
+    
+    async def rebuild_affected(self, changed: Dict[str, List[str]]) -> Dict[str, Any]:
+        """
+        Recompute the rollups of the partners that changed serving records
+        (entity type -> serving IDs) belong to, or belonged to before.
+        
+        Accounts are loaded first by partner ID and normalized name; related
+        records are then loaded by those accounts' IDs and names only, so
+        every rewritten rollup sees the same records a full rebuild would.
+        The parent-name-in-account-name fallback for contacts only sees
+        contacts loaded that way; full syncs still rebuild everything.
+        """
+        started = time.monotonic()
+        built_at = datetime.now(timezone.utc)
+        serving = self.db.data_lake_serving
+        
+        # Changed records (deactivated ones included) seed the partners to recompute
+        ids: Set[str] = set()
+        names: Set[str] = set()
+        changed_refs: Dict[str, List[Any]] = {}
+        for entity_type, serving_ids in changed.items():
+            if entity_type not in ROLLUP_SOURCES or not serving_ids:
+                continue
+            cursor = serving.find(
+                {"entity_type": entity_type, "serving_id": {"$in": [str(i) for i in serving_ids]}},
+                self._projection(entity_type)
+            )
+            async for doc in cursor:
+                changed_refs.setdefault(entity_type, []).append(doc["_id"])
+                doc_ids, doc_names = _partner_refs(entity_type, doc.get("data") or {})
+                ids.update(doc_ids)
+                names.update(doc_names)
+        
+        # Rollups of those partners, or still referencing the records (moved or deactivated)
+        clauses: List[Dict[str, Any]] = [{f"related.{t}": {"$in": refs}} for t, refs in changed_refs.items()]
+        if ids:
+            clauses.append({"lookup_keys": {"$in": sorted(ids)}})
+        if names:
+            clauses.append({"name_key": {"$in": sorted(names)}})
+        affected = await self.collection.find(
+            {"$or": clauses}, {"_id": 0, "rollup_id": 1, "lookup_keys": 1, "name_key": 1}
+        ).to_list(None) if clauses else []
+        for rollup in affected:
+            ids.update(rollup["lookup_keys"])
+            names.add(rollup["name_key"])
+        
+        docs: Dict[str, List[Dict[str, Any]]] = {entity_type: [] for entity_type in ROLLUP_SOURCES}
+        if ids or names:
+            account_scope = [{"serving_id": {"$in": sorted(ids)}}, {"data.id": {"$in": _id_values(ids)}}]
+            if names:
+                account_scope.append({"data.name": _names_pattern(names)})
+            docs["account"] = await self._load("account", {"$or": account_scope})
+            
+            # Related records match on every loaded account's IDs and name
+            display_names = set(names)
+            for doc in docs["account"]:
+                acc = doc.get("data") or {}
+                ids.add(str(acc.get("id", doc.get("serving_id", ""))))
+                if doc.get("serving_id"):
+                    ids.add(str(doc["serving_id"]))
+                if name_key(acc.get("name")):
+                    names.add(name_key(acc.get("name")))
+                    display_names.add(clean_value(acc.get("name"), "").lower())
+            
+            for entity_type, scope in _related_scopes(ids, names, display_names).items():
+                docs[entity_type] = await self._load(entity_type, scope)
+        
+        # Synthetic rollups are only complete for names whose accounts were looked up
+        rollups = [r for r in compute_rollups(docs) if r["kind"] == "account" or r["name_key"] in names]
+        
+        # Keep list positions; new rollups go to the end
+        written = [r["rollup_id"] for r in rollups]
+        positions = {
+            r["rollup_id"]: r.get("position")
+            for r in await self.collection.find(
+                {"rollup_id": {"$in": written}}, {"_id": 0, "rollup_id": 1, "position": 1}
+            ).to_list(None)
+        }
+        last = await self.collection.find({}, {"_id": 0, "position": 1}).sort("position", -1).limit(1).to_list(1)
+        next_position = (last[0].get("position", -1) + 1) if last else 0
+        
+        ops = []
+        for rollup in rollups:
+            position = positions.get(rollup["rollup_id"])
+            if position is None:
+                position, next_position = next_position, next_position + 1
+            ops.append(ReplaceOne(
+                {"rollup_id": rollup["rollup_id"]},
+                {**rollup, "position": position, "built_at": built_at},
+                upsert=True
+            ))
+        for start in range(0, len(ops), 500):
+            await self.collection.bulk_write(ops[start:start + 500], ordered=False)
+        
+        # Affected rollups not rewritten no longer exist (e.g. synthetic ones whose account appeared)
+        stale = [r["rollup_id"] for r in affected if r["rollup_id"] not in set(written)]
+        removed = await self.collection.delete_many({"rollup_id": {"$in": stale}}) if stale else None
+        
+        report = {
+            "rollups": len(rollups),
+            "removed": removed.deleted_count if removed else 0,
+            "source_documents": {entity_type: len(entity_docs) for entity_type, entity_docs in docs.items()},
+            "duration_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+        logger.info(f"Account rollups updated: {report}")
+        return report
+    
+    @staticmethod
+    def _projection(entity_type: str) -> Dict[str, int]:
+        projection = {"_id": 1, "serving_id": 1, "last_aggregated": 1}
+        if entity_type == "account":
+            projection["data"] = 1
+        else:
+            projection.update({f"data.{field}": 1 for field in _FIELDS[entity_type]})
+        return projection
+    
+    async def _load(self, entity_type: str, scope: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return await self.db.data_lake_serving.find(
+            {"entity_type": entity_type, "is_active": {"$ne": False}, **(scope or {})},
+            self._projection(entity_type)
+        ).to_list(None)
+    
+    async def _ensure_built(self) -> bool:
+        """Build on first use; returns True if a build ran"""
+        if await self.collection.find_one({}, {"_id": 1}):
+            return False
+        await self.refresh()
+        return True
+    
+    async def list_rows(self) -> List[Dict[str, Any]]:
+        """The /accounts/real rows, in account order"""
+        rows = await self.collection.find({}, {"_id": 0, "row": 1}).sort("position", 1).to_list(None)
+        if not rows and await self._ensure_built():
+            rows = await self.collection.find({}, {"_id": 0, "row": 1}).sort("position", 1).to_list(None)
+        return [r["row"] for r in rows]
+    
+    async def get(self, account_id: str) -> Optional[Dict[str, Any]]:
+        """Rollup by account ID, serving ID or synthetic opp_ ID"""
+        rollup = await self.collection.find_one({"lookup_keys": account_id}, {"_id": 0})
+        if rollup is None and await self._ensure_built():
+            rollup = await self.collection.find_one({"lookup_keys": account_id}, {"_id": 0})
+        return rollup
+    
+    async def get_related(
+        self,
+        rollup: Optional[Dict[str, Any]],
+        limit: int = RELATED_LIMIT
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Related serving documents of a rollup, grouped by entity type (one query)"""
+        related = (rollup or {}).get("related") or {}
+        refs: List[Any] = []
+        for entity_refs in related.values():
+            refs.extend(entity_refs[:limit])
+        
+        grouped: Dict[str, List[Dict[str, Any]]] = {entity_type: [] for entity_type in related}
+        if not refs:
+            return grouped
+        
+        by_ref = {
+            doc["_id"]: doc
+            for doc in await self.db.data_lake_serving.find({"_id": {"$in": refs}}).to_list(None)
+        }
+        for entity_type, entity_refs in related.items():
+            grouped[entity_type] = [by_ref[ref] for ref in entity_refs[:limit] if ref in by_ref]
+        return grouped
+
+
+async def refresh_account_rollups(
+    db: AsyncIOMotorDatabase,
+    changed: Optional[Dict[str, List[str]]] = None
+) -> None:
+    """
+    Post-sync hook: rebuild rollups (only those touched by changed, when
+    given), never failing the sync itself
+    """
+    try:
+        await AccountRollupManager(db).refresh(changed)
+    except Exception as e:
+        logger.error(f"Account rollup refresh failed: {e}")
@@ -11,7 +11,7 @@ import logging
 import hashlib
 import json
 
-from core.base import BaseEntity
+from core.base import BaseEntity, SourceReference
 from core.enums import DataZone, EntityType, IntegrationSource, VisibilityScope, UserRole
 from .models import (
     CanonicalContact,
@@ -47,6 +47,10 @@ class CanonicalZoneHandler:
         EntityType.USER: ("canonical_users", CanonicalUser),
     }
     
+    # One-off data migrations, recorded by _id once they have completed
+    MIGRATIONS_COLLECTION = "data_lake_migrations"
+    SOURCE_KEYS_MIGRATION = "canonical_source_keys"
+    
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
     
@@ -56,6 +60,97 @@ class CanonicalZoneHandler:
             raise ValueError(f"Unknown entity type: {entity_type}")
         return self.COLLECTION_MAP[entity_type]
     
+    async def ensure_indexes(self) -> None:
+        """
+        Create the unique source-key index on every canonical collection.
+        
+        Existing documents are backfilled first (once - completion is recorded
+        in data_lake_migrations). If legacy duplicates prevent the unique
+        index, a warning is logged and lookups still use the (non-unique)
+        index until the duplicates are merged.
+        """
+        if not await self.db[self.MIGRATIONS_COLLECTION].find_one({"_id": self.SOURCE_KEYS_MIGRATION}):
+            await self.migrate_source_keys()
+        
+        for collection_name, _ in self.COLLECTION_MAP.values():
+            collection = self.db[collection_name]
+            try:
+                await collection.create_index(
+                    [("_source_keys", 1)],
+                    unique=True,
+                    sparse=True,
+                    name="source_keys_unique"
+                )
+            except Exception as e:
+                logger.warning(
+                    f"Unique source key index not created on {collection_name} "
+                    f"(duplicate source references?): {e}"
+                )
+                await collection.create_index([("_source_keys", 1)], name="source_keys")
+    
+    async def migrate_source_keys(self, batch_size: int = 1000) -> Dict[str, Dict[str, int]]:
+        """
+        Backfill _source_keys on documents written before it existed.
+        Idempotent - only documents with sources but no keys are touched.
+        Records completion so startup skips the (unindexed) scan afterwards.
+        
+        Returns:
+            Per-collection counts of migrated documents and duplicate keys
+        """
+        from pymongo import UpdateOne
+        
+        report = {}
+        
+        for collection_name, _ in self.COLLECTION_MAP.values():
+            collection = self.db[collection_name]
+            cursor = collection.find(
+                {"_source_keys": {"$exists": False}, "_sources.0": {"$exists": True}},
+                {"_id": 1, "_sources": 1}
+            )
+            
+            migrated = 0
+            ops = []
+            async for doc in cursor:
+                keys = [
+                    SourceReference.make_key(src["source"], src["source_id"])
+                    for src in doc.get("_sources", [])
+                ]
+                ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"_source_keys": keys}}))
+                
+                if len(ops) >= batch_size:
+                    await collection.bulk_write(ops, ordered=False)
+                    migrated += len(ops)
+                    ops = []
+            
+            if ops:
+                await collection.bulk_write(ops, ordered=False)
+                migrated += len(ops)
+            
+            # Keys claimed by more than one entity need a manual merge
+            duplicates = []
+            if migrated:
+                duplicates = await collection.aggregate([
+                    {"$unwind": "$_source_keys"},
+                    {"$group": {"_id": "$_source_keys", "count": {"$sum": 1}}},
+                    {"$match": {"count": {"$gt": 1}}},
+                    {"$count": "duplicates"}
+                ]).to_list(length=1)
+            
+            report[collection_name] = {
+                "migrated": migrated,
+                "duplicate_keys": duplicates[0]["duplicates"] if duplicates else 0
+            }
+            
+            if migrated:
+                logger.info(f"Backfilled source keys on {migrated} {collection_name} documents")
+        
+        await self.db[self.MIGRATIONS_COLLECTION].update_one(
+            {"_id": self.SOURCE_KEYS_MIGRATION},
+            {"$set": {"completed_at": datetime.now(timezone.utc), "report": report}},
+            upsert=True
+        )
+        return report
+    
     async def upsert(
         self,
         entity: BaseEntity,
@@ -81,12 +176,7 @@ class CanonicalZoneHandler:
         
         # Check for existing entity by source reference
         existing = await collection.find_one({
-            "_sources": {
-                "$elemMatch": {
-                    "source": source.value,
-                    "source_id": source_id
-                }
-            }
+            "_source_keys": SourceReference.make_key(source.value, source_id)
         })
         
         # Add/update source reference
@@ -106,7 +196,7 @@ class CanonicalZoneHandler:
             for src in existing_sources:
                 if not any(s.source == src["source"] and s.source_id == src["source_id"] 
                           for s in entity.sources):
-                    entity.sources.append(src)
+                    entity.sources.append(SourceReference(**src))
             
             await collection.update_one(
                 {"id": entity.id},
@@ -149,12 +239,7 @@ class CanonicalZoneHandler:
         collection = self.db[collection_name]
         
         return await collection.find_one({
-            "_sources": {
-                "$elemMatch": {
-                    "source": source.value,
-                    "source_id": source_id
-                }
-            }
+            "_source_keys": SourceReference.make_key(source.value, source_id)
         }, {"_id": 0})
     
     async def find(
@@ -349,12 +434,21 @@ class CanonicalZoneHandler:
                       for s in primary_sources):
                 primary_sources.append(src)
         
+        # Release the secondary's source keys first - they are unique
+        await collection.update_one(
+            {"id": secondary_id},
+            {"$unset": {"_source_keys": ""}}
+        )
+        
         # Update primary with merged sources
         await collection.update_one(
             {"id": primary_id},
             {
                 "$set": {
                     "_sources": primary_sources,
+                    "_source_keys": [
+                        SourceReference.make_key(s["source"], s["source_id"]) for s in primary_sources
+                    ],
                     "updated_at": datetime.now(timezone.utc),
                     "updated_by": user_id
                 },
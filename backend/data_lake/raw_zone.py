@@ -1,11 +1,16 @@
 """
 Raw Zone Handler for Sales Intelligence Platform
-Manages immutable, timestamped copies of source data.
+Manages timestamped, content-addressed copies of source data.
 """
 
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+import asyncio
+import hashlib
+import json
 import logging
 
 from core.base import RawRecord, AuditEntry
@@ -15,15 +20,24 @@ from core.enums import DataZone, EntityType, IntegrationSource
 logger = logging.getLogger(__name__)
 
 
+def content_hash(raw_data: Dict[str, Any]) -> str:
+    """Stable hash of a raw payload, used to skip unchanged versions"""
+    serialized = json.dumps(raw_data, sort_keys=True, default=str)
+    return hashlib.md5(serialized.encode()).hexdigest()
+
+
 class RawZoneHandler:
     """
     Handles all operations for the Raw Zone of the Data Lake.
     
     Principles:
-    - Data is immutable (append-only)
+    - One document per distinct payload, upserted on a content hash;
+      payloads are never modified, re-ingesting one only refreshes its
+      last-seen time
     - Every record is timestamped
     - Original data is preserved exactly as received
-    - Records are replayable via batch_id
+    - Records are replayable via batch_id: every batch a payload was seen
+      in is recorded in raw_batch_members
     """
     
     # Collection name mappings
@@ -49,6 +63,9 @@ class RawZoneHandler:
         # Default naming pattern
         return f"raw_{source.value}_{entity_type.value}s"
     
+    # Batch membership: one document per (batch, raw payload) sighting
+    MEMBERS_COLLECTION = "raw_batch_members"
+    
     async def store(
         self,
         source: IntegrationSource,
@@ -61,6 +78,10 @@ class RawZoneHandler:
         """
         Store a raw record in the appropriate collection.
         
+        Upserts on the payload's content hash, so storing an unchanged
+        payload again returns the existing record's ID and only records
+        the sighting in this batch.
+        
         Args:
             source: Source system (odoo, ms365, etc.)
             entity_type: Type of entity (contact, account, etc.)
@@ -86,37 +107,72 @@ class RawZoneHandler:
         if metadata:
             doc["_metadata"] = metadata
         
-        result = await collection.insert_one(doc)
+        # Upsert on content hash so an unchanged payload is not stored twice
+        filter_doc, update = self._upsert_op(doc, batch_id)
+        stored = await collection.find_one_and_update(
+            filter_doc,
+            update,
+            upsert=True,
+            projection={"_id": 0, "_raw_id": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        
+        member_filter, member_update = self._member_op(collection_name, batch_id, filter_doc)
+        await self.db[self.MEMBERS_COLLECTION].update_one(member_filter, member_update, upsert=True)
         
-        logger.debug(f"Stored raw record: {collection_name}/{record.raw_id}")
-        return record.raw_id
+        logger.debug(f"Stored raw record: {collection_name}/{stored['_raw_id']}")
+        return stored["_raw_id"]
     
     async def bulk_store(
         self,
         source: IntegrationSource,
         entity_type: EntityType,
         records: List[Dict[str, Any]],
-        batch_id: str
-    ) -> int:
+        batch_id: str,
+        max_retries: int = 3,
+        retry_delay: float = 0.5
+    ) -> Dict[str, Any]:
         """
-        Bulk store multiple raw records.
+        Bulk store multiple raw records with idempotent upserts.
+        
+        Records are keyed on source, source_id and content hash and written
+        with one unordered bulk_write. Re-storing an unchanged payload (e.g.
+        a replayed batch) only refreshes its last-seen time. Each stored
+        payload's sighting in this batch is then recorded in
+        raw_batch_members. Failed writes are retried with backoff;
+        concurrent inserts of the same payload are counted as duplicates.
         
         Args:
             source: Source system
             entity_type: Type of entity
             records: List of dicts with 'source_id' and 'data' keys
             batch_id: Sync batch ID
+            max_retries: Retries for writes that failed
+            retry_delay: Base backoff in seconds (doubled per retry)
             
         Returns:
-            Number of records stored
+            Counts for the chunk: inserted (new source_id), changed (new
+            version of a known source_id), duplicate (unchanged payload),
+            failed, plus failed_source_ids
         """
+        stats: Dict[str, Any] = {
+            "inserted": 0,
+            "changed": 0,
+            "duplicate": 0,
+            "failed": 0,
+            "failed_source_ids": [],
+        }
         if not records:
-            return 0
+            return stats
         
         collection_name = self._get_collection_name(source, entity_type)
         collection = self.db[collection_name]
         
-        docs = []
+        # Build one upsert per distinct (source_id, hash) in the chunk
+        ops = []
+        filters = []
+        keys = []
+        seen = set()
         for rec in records:
             record = RawRecord(
                 source=source.value,
@@ -124,13 +180,133 @@ class RawZoneHandler:
                 raw_data=rec["data"],
                 sync_batch_id=batch_id
             )
-            docs.append(record.to_mongo_dict())
+            doc = record.to_mongo_dict()
+            filter_doc, update = self._upsert_op(doc, batch_id)
+            
+            key = (filter_doc["_source_id"], filter_doc["_content_hash"])
+            if key in seen:
+                stats["duplicate"] += 1
+                continue
+            seen.add(key)
+            
+            ops.append(UpdateOne(filter_doc, update, upsert=True))
+            filters.append(filter_doc)
+            keys.append(key)
+        
+        # Versions already stored, to tell new records from changed ones
+        known: Dict[str, set] = {}
+        cursor = collection.find(
+            {"_source": source.value, "_source_id": {"$in": list({sid for sid, _ in keys})}},
+            {"_id": 0, "_source_id": 1, "_content_hash": 1}
+        )
+        async for doc in cursor:
+            known.setdefault(doc["_source_id"], set()).add(doc.get("_content_hash"))
         
-        result = await collection.insert_many(docs)
-        count = len(result.inserted_ids)
+        raced, failed = await self._bulk_write_with_retry(collection, ops, max_retries, retry_delay)
         
-        logger.info(f"Bulk stored {count} raw records to {collection_name}")
-        return count
+        # Sightings of every payload now stored (a payload stored by a
+        # concurrent writer still belongs to this batch)
+        stored = [i for i in range(len(ops)) if i not in failed]
+        member_ops = [
+            UpdateOne(*self._member_op(collection_name, batch_id, filters[i]), upsert=True)
+            for i in stored
+        ]
+        _, member_failed = await self._bulk_write_with_retry(
+            self.db[self.MEMBERS_COLLECTION], member_ops, max_retries, retry_delay
+        )
+        failed.update(stored[i] for i in member_failed)
+        
+        for index in sorted(failed):
+            stats["failed"] += 1
+            stats["failed_source_ids"].append(keys[index][0])
+        
+        failed_ids = set(stats["failed_source_ids"])
+        for index, (source_id, content_hash) in enumerate(keys):
+            if source_id in failed_ids:
+                continue
+            if index in raced or content_hash in known.get(source_id, ()):
+                stats["duplicate"] += 1
+            elif source_id in known:
+                stats["changed"] += 1
+            else:
+                stats["inserted"] += 1
+        
+        logger.info(
+            f"Bulk stored raw records to {collection_name}: {stats['inserted']} inserted, "
+            f"{stats['changed']} changed, {stats['duplicate']} duplicate, {stats['failed']} failed"
+        )
+        return stats
+    
+    async def _bulk_write_with_retry(
+        self,
+        collection,
+        ops: List[UpdateOne],
+        max_retries: int,
+        retry_delay: float
+    ) -> tuple:
+        """
+        Unordered bulk_write, retrying failed operations with backoff.
+        
+        Returns the indexes (into ops) of operations that hit a duplicate
+        key - another writer upserted the same key first - and of those
+        still failing after the last retry.
+        """
+        pending = list(range(len(ops)))
+        raced = set()
+        attempt = 0
+        
+        while pending:
+            failed = []
+            try:
+                await collection.bulk_write([ops[i] for i in pending], ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    index = pending[error["index"]]
+                    if error.get("code") == 11000:
+                        raced.add(index)
+                    else:
+                        failed.append(index)
+            except PyMongoError as e:
+                logger.warning(f"Bulk write to {collection.name} failed: {e}")
+                failed = pending
+            
+            if failed and attempt < max_retries:
+                await asyncio.sleep(retry_delay * (2 ** attempt))
+                attempt += 1
+                pending = failed
+                continue
+            
+            return raced, set(failed)
+        
+        return raced, set()
+    
+    def _upsert_op(self, doc: Dict[str, Any], batch_id: str) -> tuple:
+        """
+        Build the idempotent upsert for a raw document.
+        Keyed on source, source_id and a hash of the payload; the document
+        keeps the batch it was first stored in as _sync_batch_id.
+        """
+        filter_doc = {
+            "_source": doc.pop("_source"),
+            "_source_id": doc.pop("_source_id"),
+            "_content_hash": content_hash(doc["_raw_data"]),
+        }
+        update = {
+            "$setOnInsert": doc,
+            "$set": {"_last_seen_at": datetime.now(timezone.utc)},
+        }
+        return filter_doc, update
+    
+    def _member_op(self, collection_name: str, batch_id: str, filter_doc: Dict[str, Any]) -> tuple:
+        """Upsert recording that the raw payload behind filter_doc was seen in batch_id"""
+        member = {
+            "batch_id": batch_id,
+            "collection": collection_name,
+            "source_id": filter_doc["_source_id"],
+            "content_hash": filter_doc["_content_hash"],
+        }
+        update = {"$setOnInsert": {"source": filter_doc["_source"], "seen_at": datetime.now(timezone.utc)}}
+        return member, update
     
     async def get_by_batch(
         self,
@@ -139,15 +315,110 @@ class RawZoneHandler:
         batch_id: str
     ) -> List[Dict[str, Any]]:
         """Get all raw records from a specific sync batch (for replay)"""
+        return [
+            doc
+            async for chunk in self.iter_records(source, entity_type, batch_id=batch_id)
+            for doc in chunk
+        ]
+    
+    async def iter_records(
+        self,
+        source: IntegrationSource,
+        entity_type: EntityType,
+        batch_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        chunk_size: int = 500
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream raw records chunk by chunk (for replay).
+        
+        Unlike get_by_batch, the result set is never materialized in full.
+        A batch yields every payload seen in it - including unchanged ones
+        first stored by an earlier batch - in the order they were stored;
+        otherwise records come in ingestion order.
+        
+        Args:
+            source: Source system
+            entity_type: Type of entity
+            batch_id: Restrict to a single sync batch
+            since: Restrict to records ingested at or after this time
+            until: Restrict to records ingested before this time
+            chunk_size: Number of records per yielded chunk
+        """
         collection_name = self._get_collection_name(source, entity_type)
         collection = self.db[collection_name]
         
+        query: Dict[str, Any] = {}
+        if since or until:
+            query["_ingested_at"] = {}
+            if since:
+                query["_ingested_at"]["$gte"] = since
+            if until:
+                query["_ingested_at"]["$lt"] = until
+        
+        if batch_id:
+            members = self.db[self.MEMBERS_COLLECTION].find(
+                {"batch_id": batch_id, "collection": collection_name},
+                {"_id": 0, "source_id": 1, "content_hash": 1}
+            ).sort("seen_at", 1).batch_size(chunk_size)
+            
+            found = False
+            chunk_keys: List[tuple] = []
+            async for member in members:
+                found = True
+                chunk_keys.append((member["source_id"], member["content_hash"]))
+                if len(chunk_keys) >= chunk_size:
+                    docs = await self._fetch_members(collection, source, chunk_keys, query)
+                    if docs:
+                        yield docs
+                    chunk_keys = []
+            if chunk_keys:
+                docs = await self._fetch_members(collection, source, chunk_keys, query)
+                if docs:
+                    yield docs
+            if found:
+                return
+            
+            # Batches stored before membership was recorded
+            query["_sync_batch_id"] = batch_id
+        
         cursor = collection.find(
-            {"_sync_batch_id": batch_id},
+            query,
             {"_id": 0}
-        ).sort("_ingested_at", 1)
+        ).sort("_ingested_at", 1).batch_size(chunk_size)
         
-        return await cursor.to_list(length=None)
+        chunk: List[Dict[str, Any]] = []
+        async for doc in cursor:
+            chunk.append(doc)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        
+        if chunk:
+            yield chunk
+    
+    async def _fetch_members(
+        self,
+        collection,
+        source: IntegrationSource,
+        keys: List[tuple],
+        query: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Raw documents for (source_id, content_hash) keys, in key order"""
+        cursor = collection.find(
+            {
+                **query,
+                "_source": source.value,
+                "_source_id": {"$in": list({sid for sid, _ in keys})},
+                "_content_hash": {"$in": list({h for _, h in keys})},
+            },
+            {"_id": 0}
+        )
+        by_key = {}
+        async for doc in cursor:
+            by_key[(doc["_source_id"], doc["_content_hash"])] = doc
+        return [by_key[key] for key in keys if key in by_key]
     
     async def get_by_source_id(
         self,
@@ -0,0 +1,445 @@
+"""
+Raw Zone Retention for Sales Intelligence Platform
+Prunes and compacts superseded raw versions so the raw zone stops growing without bound.
+
+Tiers:
+- Hot: the latest version of every record (never touched)
+- Warm: superseded versions younger than the policy's keep_days
+- Cold: older superseded versions, collapsed into one compressed delta
+  document per record in the archive collection (optionally TTL-expired)
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import Field
+from bson import Binary, encode as bson_encode, json_util
+import logging
+import uuid
+import zlib
+
+from core.base import BaseModel
+from core.enums import IntegrationSource
+from .raw_zone import RawZoneHandler
+
+
+logger = logging.getLogger(__name__)
+
+
+POLICY_COLLECTION = "data_lake_retention_policies"
+RUN_COLLECTION = "data_lake_retention_runs"
+ARCHIVE_COLLECTION = "data_lake_raw_archive"
+
+# Extended JSON keeps datetimes (and other BSON types) in version metadata
+ARCHIVE_CODEC = "zlib+extjson-delta/2"
+# Plain JSON with datetimes stringified; still readable
+LEGACY_ARCHIVE_CODECS = {"zlib+json-delta/1"}
+WILDCARD = "*"
+
+
+class RetentionPolicy(BaseModel):
+    """Retention settings for one source/entity combination ("*" matches any)"""
+    
+    source: str = WILDCARD
+    entity_type: str = WILDCARD
+    keep_days: int = Field(default=30, ge=0)  # Superseded versions kept as-is this long
+    compact: bool = True  # Archive older versions instead of deleting them
+    archive_ttl_days: Optional[int] = Field(default=None, ge=1)  # Expire archives (None = keep)
+    enabled: bool = True
+    
+    def specificity(self) -> int:
+        return (self.source != WILDCARD) * 2 + (self.entity_type != WILDCARD)
+
+
+# Keep the latest plus 30 days of versions, compact the rest
+DEFAULT_POLICY = RetentionPolicy()
+
+
+def compress_versions(versions: List[Dict[str, Any]], payload_field: str) -> Dict[str, Any]:
+    """
+    Collapse a list of raw versions (oldest first) into a compressed delta blob.
+    
+    The first payload is stored in full, every later one as a top-level
+    delta (set/unset) against its predecessor. Version metadata (ids,
+    timestamps, batch ids) is kept per version.
+    """
+    base = None
+    previous: Dict[str, Any] = {}
+    deltas = []
+    meta = []
+    
+    for version in versions:
+        payload = version.get(payload_field) or {}
+        meta.append({k: v for k, v in version.items() if k not in ("_id", payload_field)})
+        
+        if base is None:
+            base = payload
+        else:
+            deltas.append({
+                "set": {k: v for k, v in payload.items() if previous.get(k, object()) != v},
+                "unset": [k for k in previous if k not in payload],
+            })
+        previous = payload
+    
+    blob = json_util.dumps({"base": base, "deltas": deltas, "meta": meta})
+    return {
+        "codec": ARCHIVE_CODEC,
+        "payload": Binary(zlib.compress(blob.encode(), 9)),
+    }
+
+
+def expand_versions(archive: Dict[str, Any], payload_field: str = "raw_data") -> List[Dict[str, Any]]:
+    """Rebuild the archived versions (oldest first) from an archive document"""
+    if archive.get("codec") != ARCHIVE_CODEC and archive.get("codec") not in LEGACY_ARCHIVE_CODECS:
+        raise ValueError(f"Unsupported archive codec: {archive.get('codec')}")
+    
+    data = json_util.loads(zlib.decompress(archive["payload"]))
+    payload = dict(data["base"] or {})
+    versions = [{**data["meta"][0], payload_field: dict(payload)}]
+    
+    for delta, meta in zip(data["deltas"], data["meta"][1:]):
+        for key in delta["unset"]:
+            payload.pop(key, None)
+        payload.update(delta["set"])
+        versions.append({**meta, payload_field: dict(payload)})
+    
+    return versions
+
+
+class RetentionManager:
+    """
+    Applies retention policies to the versioned raw collections.
+    
+    Covers the per-source raw_* collections written by RawZoneHandler
+    (versions per _source_id, newest by last-seen time) and odoo_raw_data
+    (versions per entity_type/odoo_id, newest flagged is_latest).
+    """
+    
+    def __init__(self, db: AsyncIOMotorDatabase, delete_batch_size: int = 500):
+        self.db = db
+        self.delete_batch_size = delete_batch_size
+    
+    async def ensure_indexes(self) -> None:
+        """Indexes for policy lookup, archive reads and archive expiry"""
+        await self.db[POLICY_COLLECTION].create_index(
+            [("source", 1), ("entity_type", 1)],
+            unique=True,
+            name="source_entitytype"
+        )
+        await self.db[RUN_COLLECTION].create_index([("started_at", -1)])
+        await self.db[ARCHIVE_COLLECTION].create_index([("collection", 1), ("key", 1)])
+        # Per-document expiry: only archives of policies with archive_ttl_days get expires_at
+        await self.db[ARCHIVE_COLLECTION].create_index(
+            "expires_at",
+            expireAfterSeconds=0,
+            name="expires_at_ttl"
+        )
+        await self.db["odoo_raw_data"].create_index(
+            [("is_latest", 1), ("superseded_at", 1)],
+            name="latest_superseded"
+        )
+    
+    # ===================== POLICIES =====================
+    
+    async def get_policies(self) -> List[RetentionPolicy]:
+        """All stored policies (the built-in default applies when none match)"""
+        docs = await self.db[POLICY_COLLECTION].find({}, {"_id": 0}).to_list(length=None)
+        return [RetentionPolicy(**doc) for doc in docs]
+    
+    async def set_policy(self, policy: RetentionPolicy, updated_by: Optional[str] = None) -> RetentionPolicy:
+        """Create or replace the policy for a source/entity combination"""
+        await self.db[POLICY_COLLECTION].update_one(
+            {"source": policy.source, "entity_type": policy.entity_type},
+            {"$set": {
+                **policy.model_dump(),
+                "updated_at": datetime.now(timezone.utc),
+                "updated_by": updated_by,
+            }},
+            upsert=True
+        )
+        return policy
+    
+    async def delete_policy(self, source: str, entity_type: str) -> bool:
+        result = await self.db[POLICY_COLLECTION].delete_one(
+            {"source": source, "entity_type": entity_type}
+        )
+        return result.deleted_count > 0
+    
+    @staticmethod
+    def resolve_policy(
+        policies: List[RetentionPolicy],
+        source: str,
+        entity_types: List[str]
+    ) -> RetentionPolicy:
+        """Most specific policy matching the source and any of the entity types"""
+        matches = [
+            p for p in policies
+            if p.source in (source, WILDCARD)
+            and (p.entity_type == WILDCARD or p.entity_type in entity_types)
+        ]
+        if not matches:
+            return DEFAULT_POLICY
+        return max(matches, key=lambda p: p.specificity())
+    
+    # ===================== RUN =====================
+    
+    async def run(self, dry_run: bool = False, triggered_by: str = "scheduled") -> Dict[str, Any]:
+        """
+        Apply retention to every versioned raw collection.
+        
+        Returns the run report (also stored in the runs collection unless
+        dry_run): per collection, the versions expired and the logical
+        BSON bytes reclaimed (deleted bytes minus archive bytes).
+        """
+        started_at = datetime.now(timezone.utc)
+        policies = await self.get_policies()
+        targets: List[Dict[str, Any]] = []
+        
+        for collection_name, source, entity_types in self._raw_zone_targets():
+            policy = self.resolve_policy(policies, source, entity_types)
+            targets.append(await self._apply(
+                collection_name,
+                policy,
+                dry_run,
+                stages=self._raw_zone_stages(),
+                key_fields=("_source", "_source_id"),
+                payload_field="_raw_data",
+                time_field="_last_seen_at",
+                skip_latest=True,
+                extra={"source": source}
+            ))
+        
+        entity_types = await self.db["odoo_raw_data"].distinct("entity_type")
+        for entity_type in entity_types:
+            policy = self.resolve_policy(policies, IntegrationSource.ODOO.value, [entity_type])
+            targets.append(await self._apply(
+                "odoo_raw_data",
+                policy,
+                dry_run,
+                stages=self._odoo_raw_stages(entity_type),
+                key_fields=("entity_type", "odoo_id"),
+                payload_field="raw_data",
+                time_field="superseded_at",
+                skip_latest=False,
+                extra={"source": IntegrationSource.ODOO.value, "entity_type": entity_type}
+            ))
+        
+        report = {
+            "id": str(uuid.uuid4()),
+            "started_at": started_at,
+            "completed_at": datetime.now(timezone.utc),
+            "dry_run": dry_run,
+            "triggered_by": triggered_by,
+            "targets": targets,
+            "totals": {
+                field: sum(t[field] for t in targets)
+                for field in ("versions_expired", "versions_archived", "archives_written", "bytes_deleted", "bytes_archived", "bytes_reclaimed")
+            },
+        }
+        
+        if not dry_run:
+            await self.db[RUN_COLLECTION].insert_one(dict(report))
+        
+        logger.info(
+            f"Raw zone retention {'(dry run) ' if dry_run else ''}expired "
+            f"{report['totals']['versions_expired']} versions, "
+            f"reclaimed {report['totals']['bytes_reclaimed']} bytes"
+        )
+        return report
+    
+    async def get_runs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return await self.db[RUN_COLLECTION].find(
+            {},
+            {"_id": 0}
+        ).sort("started_at", -1).limit(limit).to_list(length=None)
+    
+    async def get_reclaimed_totals(self) -> Dict[str, int]:
+        """Bytes and versions reclaimed across all completed (non dry-run) runs"""
+        pipeline = [
+            {"$group": {
+                "_id": None,
+                "runs": {"$sum": 1},
+                "versions_expired": {"$sum": "$totals.versions_expired"},
+                "bytes_reclaimed": {"$sum": "$totals.bytes_reclaimed"},
+            }},
+        ]
+        result = await self.db[RUN_COLLECTION].aggregate(pipeline).to_list(1)
+        if not result:
+            return {"runs": 0, "versions_expired": 0, "bytes_reclaimed": 0}
+        result[0].pop("_id")
+        return result[0]
+    
+    async def get_storage_stats(self) -> List[Dict[str, Any]]:
+        """On-disk size of the raw zone collections (collStats)"""
+        names = {name for name, _, _ in self._raw_zone_targets()}
+        names.update({"odoo_raw_data", "data_lake_raw", ARCHIVE_COLLECTION})
+        
+        stats = []
+        for name in sorted(names):
+            try:
+                coll_stats = await self.db.command("collStats", name)
+            except Exception as e:
+                logger.debug(f"collStats failed for {name}: {e}")
+                continue
+            stats.append({
+                "collection": name,
+                "count": coll_stats.get("count", 0),
+                "size_bytes": coll_stats.get("size", 0),
+                "storage_bytes": coll_stats.get("storageSize", 0),
+                "index_bytes": coll_stats.get("totalIndexSize", 0),
+            })
+        return stats
+    
+    # ===================== INTERNALS =====================
+    
+    @staticmethod
+    def _raw_zone_targets() -> List[Tuple[str, str, List[str]]]:
+        """(collection, source, entity types) for every per-source raw collection"""
+        targets: Dict[str, Tuple[str, List[str]]] = {}
+        for (source, entity_type), name in RawZoneHandler.COLLECTION_MAP.items():
+            targets.setdefault(name, (source.value, []))[1].append(entity_type.value)
+        return [(name, source, types) for name, (source, types) in targets.items()]
+    
+    @staticmethod
+    def _raw_zone_stages() -> List[Dict[str, Any]]:
+        """Superseded versions per _source_id; newest by last-seen (falls back to ingestion) time"""
+        return [
+            {"$project": {
+                "_source": 1,
+                "_source_id": 1,
+                "_t": {"$ifNull": ["$_last_seen_at", "$_ingested_at"]},
+            }},
+            {"$sort": {"_source": 1, "_source_id": 1, "_t": -1}},
+            {"$group": {
+                "_id": {"_source": "$_source", "_source_id": "$_source_id"},
+                "versions": {"$push": {"id": "$_id", "t": "$_t"}},
+            }},
+            # Only keys with superseded versions; versions[0] is the hot tier
+            {"$match": {"versions.1": {"$exists": True}}},
+        ]
+    
+    @staticmethod
+    def _odoo_raw_stages(entity_type: str) -> List[Dict[str, Any]]:
+        """Superseded (is_latest false) versions per odoo_id"""
+        return [
+            {"$match": {"entity_type": entity_type, "is_latest": False}},
+            {"$project": {
+                "entity_type": 1,
+                "odoo_id": 1,
+                # Versions superseded before superseded_at was recorded fall back to fetched_at
+                "_t": {"$ifNull": ["$superseded_at", "$fetched_at"]},
+            }},
+            {"$sort": {"odoo_id": 1, "_t": -1}},
+            {"$group": {
+                "_id": {"entity_type": "$entity_type", "odoo_id": "$odoo_id"},
+                "versions": {"$push": {"id": "$_id", "t": "$_t"}},
+            }},
+        ]
+    
+    async def _apply(
+        self,
+        collection_name: str,
+        policy: RetentionPolicy,
+        dry_run: bool,
+        stages: List[Dict[str, Any]],
+        key_fields: Tuple[str, ...],
+        payload_field: str,
+        time_field: str,
+        skip_latest: bool,
+        extra: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Expire the versions of one collection that fall outside the policy.
+        
+        The stages yield one group per record key with its versions, newest
+        first. With skip_latest the first version is the current one and is
+        never expired.
+        """
+        stats: Dict[str, Any] = {
+            "collection": collection_name,
+            **extra,
+            "policy": policy.model_dump(),
+            "keys_scanned": 0,
+            "versions_expired": 0,
+            "versions_archived": 0,
+            "archives_written": 0,
+            "bytes_deleted": 0,
+            "bytes_archived": 0,
+            "bytes_reclaimed": 0,
+        }
+        if not policy.enabled:
+            return stats
+        
+        now = datetime.now(timezone.utc)
+        cutoff = (now - timedelta(days=policy.keep_days)).replace(tzinfo=None)
+        collection = self.db[collection_name]
+        pending_ids: List[Any] = []
+        # Batch memberships of expired raw zone versions go with them
+        pending_members: List[Tuple[str, str]] = []
+        
+        cursor = collection.aggregate(stages, allowDiskUse=True)
+        async for group in cursor:
+            stats["keys_scanned"] += 1
+            versions = group["versions"][1:] if skip_latest else group["versions"]
+            expired = [v["id"] for v in versions if v["t"] is not None and _naive(v["t"]) < cutoff]
+            if not expired:
+                continue
+            
+            docs = await collection.find({"_id": {"$in": expired}}).to_list(length=None)
+            docs.sort(key=lambda d: _naive(d.get(time_field) or d.get("_ingested_at") or d.get("fetched_at") or now))
+            
+            stats["versions_expired"] += len(docs)
+            stats["bytes_deleted"] += sum(len(bson_encode(doc)) for doc in docs)
+            
+            if policy.compact:
+                archive = {
+                    "id": str(uuid.uuid4()),
+                    "collection": collection_name,
+                    "key": {field: group["_id"].get(field) for field in key_fields},
+                    "payload_field": payload_field,
+                    "version_count": len(docs),
+                    "compacted_at": now,
+                    **compress_versions(docs, payload_field),
+                }
+                if policy.archive_ttl_days:
+                    archive["expires_at"] = now + timedelta(days=policy.archive_ttl_days)
+                
+                stats["versions_archived"] += len(docs)
+                stats["archives_written"] += 1
+                stats["bytes_archived"] += len(bson_encode(archive))
+                
+                if not dry_run:
+                    # Archive first, so a failure between the two writes never loses data
+                    await self.db[ARCHIVE_COLLECTION].insert_one(archive)
+            
+            pending_ids.extend(doc["_id"] for doc in docs)
+            pending_members.extend((doc["_source_id"], doc["_content_hash"]) for doc in docs if doc.get("_content_hash"))
+            if len(pending_ids) >= self.delete_batch_size:
+                await self._delete(collection, pending_ids, dry_run)
+                await self._delete_members(collection_name, pending_members, dry_run)
+                pending_ids, pending_members = [], []
+        
+        await self._delete(collection, pending_ids, dry_run)
+        await self._delete_members(collection_name, pending_members, dry_run)
+        
+        stats["bytes_reclaimed"] = stats["bytes_deleted"] - stats["bytes_archived"]
+        return stats
+    
+    @staticmethod
+    async def _delete(collection, ids: List[Any], dry_run: bool) -> None:
+        if ids and not dry_run:
+            await collection.delete_many({"_id": {"$in": ids}})
+    
+    async def _delete_members(self, collection_name: str, keys: List[Tuple[str, str]], dry_run: bool) -> None:
+        if keys and not dry_run:
+            await self.db[RawZoneHandler.MEMBERS_COLLECTION].delete_many({
+                "collection": collection_name,
+                "$or": [{"source_id": source_id, "content_hash": content_hash} for source_id, content_hash in keys],
+            })
+
+
+def _naive(value: datetime) -> datetime:
+    """Mongo returns naive UTC datetimes; compare everything naive"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
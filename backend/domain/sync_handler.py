@@ -139,7 +139,7 @@ class OdooSyncHandler:
                     "odoo_id": odoo_employee_id,
                     "is_latest": True
                 },
-                {"$set": {"is_latest": False}}
+                {"$set": {"is_latest": False, "superseded_at": datetime.now(timezone.utc)}}
             )
             
             # Store new version
@@ -200,7 +200,7 @@ class OdooSyncHandler:
             # Mark old as not latest
             await self.db.odoo_raw_data.update_many(
                 {"entity_type": "opportunity", "odoo_id": odoo_id, "is_latest": True},
-                {"$set": {"is_latest": False}}
+                {"$set": {"is_latest": False, "superseded_at": datetime.now(timezone.utc)}}
             )
             
             # Store new
@@ -263,7 +263,7 @@ class OdooSyncHandler:
             # Mark old as not latest
             await self.db.odoo_raw_data.update_many(
                 {"entity_type": "activity", "odoo_id": activity_id, "is_latest": True},
-                {"$set": {"is_latest": False}}
+                {"$set": {"is_latest": False, "superseded_at": datetime.now(timezone.utc)}}
             )
             
             # Store new
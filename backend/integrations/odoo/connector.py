@@ -1,16 +1,16 @@
 """
 Odoo Connector
-Handles connection and data fetching from Odoo ERP via JSON-RPC/XML-RPC
+Handles connection and data fetching from Odoo ERP via JSON-RPC
 """
 
-import xmlrpc.client
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, AsyncIterator
-import asyncio
 import logging
 
 from sync_engine.base_components import BaseConnector
+from core.config import settings
 from core.enums import IntegrationSource
+from .transport import OdooTransport
 
 
 logger = logging.getLogger(__name__)
@@ -20,7 +20,7 @@ class OdooConnector(BaseConnector):
     """
     Connector for Odoo ERP systems.
     Supports Odoo v17, v18, and v19.
-    Uses XML-RPC for compatibility.
+    Uses JSON-RPC over the shared async OdooTransport.
     """
     
     # Odoo model mappings
@@ -42,8 +42,7 @@ class OdooConnector(BaseConnector):
         self.api_key = config.get("api_key")
         
         self._uid = None
-        self._common = None
-        self._models = None
+        self._transport: Optional[OdooTransport] = None
         self._version_info = None
     
     @property
@@ -51,42 +50,15 @@ class OdooConnector(BaseConnector):
         return IntegrationSource.ODOO.value
     
     async def connect(self) -> bool:
-        """Establish connection to Odoo"""
+        """Establish connection to Odoo (shared pooled transport, cached login)"""
         try:
-            # Run XML-RPC calls in thread pool (they're blocking)
-            loop = asyncio.get_event_loop()
-            
-            # Connect to common endpoint
-            self._common = xmlrpc.client.ServerProxy(
-                f"{self.url}/xmlrpc/2/common",
-                allow_none=True
-            )
+            self._transport = OdooTransport.get(self.url, self.database, self.username, self.api_key)
             
             # Get version info
-            self._version_info = await loop.run_in_executor(
-                None, self._common.version
-            )
+            self._version_info = await self._transport.version()
             
             # Authenticate
-            self._uid = await loop.run_in_executor(
-                None,
-                lambda: self._common.authenticate(
-                    self.database,
-                    self.username,
-                    self.api_key,
-                    {}
-                )
-            )
-            
-            if not self._uid:
-                logger.error("Odoo authentication failed")
-                return False
-            
-            # Connect to models endpoint
-            self._models = xmlrpc.client.ServerProxy(
-                f"{self.url}/xmlrpc/2/object",
-                allow_none=True
-            )
+            self._uid = await self._transport.authenticate()
             
             self._connected = True
             logger.info(f"Connected to Odoo {self._version_info.get('server_version', 'unknown')}")
@@ -98,10 +70,9 @@ class OdooConnector(BaseConnector):
             return False
     
     async def disconnect(self) -> None:
-        """Close Odoo connection"""
+        """Release the Odoo connection (the pooled transport stays open)"""
         self._uid = None
-        self._common = None
-        self._models = None
+        self._transport = None
         self._connected = False
     
     async def test_connection(self) -> Dict[str, Any]:
@@ -156,13 +127,8 @@ class OdooConnector(BaseConnector):
         fields = self._get_fields_for_model(model, entity_type)
         
         # Get total count
-        loop = asyncio.get_event_loop()
-        total = await loop.run_in_executor(
-            None,
-            lambda: self._models.execute_kw(
-                self.database, self._uid, self.api_key,
-                model, 'search_count', [domain]
-            )
+        total = await self._transport.execute_kw(
+            model, 'search_count', [domain]
         )
         
         logger.info(f"Fetching {total} {entity_type} records from Odoo")
@@ -170,19 +136,15 @@ class OdooConnector(BaseConnector):
         # Fetch in batches
         offset = 0
         while offset < total:
-            records = await loop.run_in_executor(
-                None,
-                lambda o=offset: self._models.execute_kw(
-                    self.database, self._uid, self.api_key,
-                    model, 'search_read',
-                    [domain],
-                    {
-                        'fields': fields,
-                        'limit': batch_size,
-                        'offset': o,
-                        'order': 'write_date asc'
-                    }
-                )
+            records = await self._transport.execute_kw(
+                model, 'search_read',
+                [domain],
+                {
+                    'fields': fields,
+                    'limit': batch_size,
+                    'offset': offset,
+                    'order': 'write_date asc'
+                }
             )
             
             for record in records:
@@ -205,15 +167,10 @@ class OdooConnector(BaseConnector):
         
         fields = self._get_fields_for_model(model, entity_type)
         
-        loop = asyncio.get_event_loop()
-        records = await loop.run_in_executor(
-            None,
-            lambda: self._models.execute_kw(
-                self.database, self._uid, self.api_key,
-                model, 'read',
-                [[int(record_id)]],
-                {'fields': fields}
-            )
+        records = await self._transport.execute_kw(
+            model, 'read',
+            [[int(record_id)]],
+            {'fields': fields}
         )
         
         return records[0] if records else None
@@ -233,13 +190,8 @@ class OdooConnector(BaseConnector):
         
         domain = self._build_domain(entity_type, since)
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None,
-            lambda: self._models.execute_kw(
-                self.database, self._uid, self.api_key,
-                model, 'search_count', [domain]
-            )
+        return await self._transport.execute_kw(
+            model, 'search_count', [domain]
         )
     
     async def get_available_fields(self, model: str) -> Dict[str, Any]:
@@ -247,15 +199,10 @@ class OdooConnector(BaseConnector):
         if not self._connected:
             raise RuntimeError("Not connected to Odoo")
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None,
-            lambda: self._models.execute_kw(
-                self.database, self._uid, self.api_key,
-                model, 'fields_get',
-                [],
-                {'attributes': ['string', 'type', 'required', 'relation']}
-            )
+        return await self._transport.execute_kw(
+            model, 'fields_get',
+            [],
+            {'attributes': ['string', 'type', 'required', 'relation']}
         )
     
     def _build_domain(
@@ -354,17 +301,11 @@ class OdooConnector(BaseConnector):
         fields = self._get_fields_for_model(model, 'department')
         domain = [('active', '=', True)]
         
-        loop = asyncio.get_event_loop()
-        
         try:
-            records = await loop.run_in_executor(
-                None,
-                lambda: self._models.execute_kw(
-                    self.database, self._uid, self.api_key,
-                    model, 'search_read',
-                    [domain],
-                    {'fields': fields}
-                )
+            records = await self._transport.execute_kw(
+                model, 'search_read',
+                [domain],
+                {'fields': fields}
             )
             
             departments = []
@@ -405,17 +346,11 @@ class OdooConnector(BaseConnector):
         fields = self._get_fields_for_model(model, 'employee')
         domain = [('active', '=', True)]
         
-        loop = asyncio.get_event_loop()
-        
         try:
-            records = await loop.run_in_executor(
-                None,
-                lambda: self._models.execute_kw(
-                    self.database, self._uid, self.api_key,
-                    model, 'search_read',
-                    [domain],
-                    {'fields': fields}
-                )
+            records = await self._transport.execute_kw(
+                model, 'search_read',
+                [domain],
+                {'fields': fields}
             )
             
             users = []
@@ -449,16 +384,10 @@ class OdooConnector(BaseConnector):
         fields = ['id', 'name', 'login', 'email', 'partner_id', 'active', 'company_id']
         domain = [('active', '=', True)]
         
-        loop = asyncio.get_event_loop()
-        
-        records = await loop.run_in_executor(
-            None,
-            lambda: self._models.execute_kw(
-                self.database, self._uid, self.api_key,
-                model, 'search_read',
-                [domain],
-                {'fields': fields}
-            )
+        records = await self._transport.execute_kw(
+            model, 'search_read',
+            [domain],
+            {'fields': fields}
         )
         
         users = []
@@ -490,47 +419,18 @@ class OdooConnector(BaseConnector):
         if not self._connected:
             raise RuntimeError("Cannot connect to Odoo")
         
-        model = 'res.partner'
-        fields = self._get_fields_for_model(model, 'account')
-        domain = [('is_company', '=', True), ('active', '=', True)]
-        
-        loop = asyncio.get_event_loop()
+        model, domain, fields = self._export_spec('account')
         
         try:
-            records = await loop.run_in_executor(
-                None,
-                lambda: self._models.execute_kw(
-                    self.database, self._uid, self.api_key,
-                    model, 'search_read',
-                    [domain],
-                    {'fields': fields}
-                )
+            records = await self._transport.execute_kw(
+                model, 'search_read',
+                [domain],
+                {'fields': fields}
             )
             
             accounts = []
             for rec in records:
-                accounts.append({
-                    'id': rec.get('id'),
-                    'name': rec.get('name'),
-                    'email': rec.get('email'),
-                    'phone': rec.get('phone'),
-                    'mobile': rec.get('mobile'),
-                    'website': rec.get('website'),
-                    'street': rec.get('street'),
-                    'city': rec.get('city'),
-                    'state_name': rec.get('state_id')[1] if rec.get('state_id') else None,
-                    'country_name': rec.get('country_id')[1] if rec.get('country_id') else None,
-                    'zip': rec.get('zip'),
-                    'industry': rec.get('industry_id')[1] if rec.get('industry_id') else None,
-                    'salesperson_id': rec.get('user_id')[0] if rec.get('user_id') else None,
-                    'salesperson_name': rec.get('user_id')[1] if rec.get('user_id') else None,
-                    'team_id': rec.get('team_id')[0] if rec.get('team_id') else None,
-                    'team_name': rec.get('team_id')[1] if rec.get('team_id') else None,
-                    'comment': rec.get('comment'),
-                    'active': rec.get('active', True),
-                    'create_date': rec.get('create_date'),
-                    'write_date': rec.get('write_date'),
-                })
+                accounts.append(self._map_account(rec))
             
             logger.info(f"Fetched {len(accounts)} accounts from Odoo")
             return accounts
@@ -547,50 +447,18 @@ class OdooConnector(BaseConnector):
         if not self._connected:
             raise RuntimeError("Cannot connect to Odoo")
         
-        model = 'crm.lead'
-        fields = self._get_fields_for_model(model, 'opportunity')
-        domain = [('active', '=', True)]
-        
-        loop = asyncio.get_event_loop()
+        model, domain, fields = self._export_spec('opportunity')
         
         try:
-            records = await loop.run_in_executor(
-                None,
-                lambda: self._models.execute_kw(
-                    self.database, self._uid, self.api_key,
-                    model, 'search_read',
-                    [domain],
-                    {'fields': fields}
-                )
+            records = await self._transport.execute_kw(
+                model, 'search_read',
+                [domain],
+                {'fields': fields}
             )
             
             opportunities = []
             for rec in records:
-                opportunities.append({
-                    'id': rec.get('id'),
-                    'name': rec.get('name'),
-                    'email_from': rec.get('email_from'),
-                    'phone': rec.get('phone'),
-                    'contact_name': rec.get('contact_name'),
-                    'partner_id': rec.get('partner_id')[0] if rec.get('partner_id') else None,
-                    'partner_name': rec.get('partner_id')[1] if rec.get('partner_id') else None,
-                    'expected_revenue': rec.get('expected_revenue', 0),
-                    'probability': rec.get('probability', 0),
-                    'stage_id': rec.get('stage_id')[0] if rec.get('stage_id') else None,
-                    'stage_name': rec.get('stage_id')[1] if rec.get('stage_id') else 'New',
-                    'type': rec.get('type'),
-                    'priority': rec.get('priority'),
-                    'date_deadline': rec.get('date_deadline'),
-                    'date_closed': rec.get('date_closed'),
-                    'salesperson_id': rec.get('user_id')[0] if rec.get('user_id') else None,
-                    'salesperson_name': rec.get('user_id')[1] if rec.get('user_id') else None,
-                    'team_id': rec.get('team_id')[0] if rec.get('team_id') else None,
-                    'team_name': rec.get('team_id')[1] if rec.get('team_id') else None,
-                    'description': rec.get('description'),
-                    'active': rec.get('active', True),
-                    'create_date': rec.get('create_date'),
-                    'write_date': rec.get('write_date'),
-                })
+                opportunities.append(self._map_opportunity(rec))
             
             logger.info(f"Fetched {len(opportunities)} opportunities from Odoo")
             return opportunities
@@ -607,43 +475,18 @@ class OdooConnector(BaseConnector):
         if not self._connected:
             raise RuntimeError("Cannot connect to Odoo")
         
-        model = 'account.move'
-        fields = ['id', 'name', 'partner_id', 'invoice_date', 'invoice_date_due', 
-                  'amount_total', 'amount_residual', 'state', 'payment_state',
-                  'move_type', 'currency_id', 'create_date', 'write_date']
-        domain = [('move_type', 'in', ['out_invoice', 'out_refund'])]  # Customer invoices only
-        
-        loop = asyncio.get_event_loop()
+        model, domain, fields = self._export_spec('invoice')
         
         try:
-            records = await loop.run_in_executor(
-                None,
-                lambda: self._models.execute_kw(
-                    self.database, self._uid, self.api_key,
-                    model, 'search_read',
-                    [domain],
-                    {'fields': fields}
-                )
+            records = await self._transport.execute_kw(
+                model, 'search_read',
+                [domain],
+                {'fields': fields}
             )
             
             invoices = []
             for rec in records:
-                invoices.append({
-                    'id': rec.get('id'),
-                    'name': rec.get('name'),
-                    'partner_id': rec.get('partner_id')[0] if rec.get('partner_id') else None,
-                    'partner_name': rec.get('partner_id')[1] if rec.get('partner_id') else None,
-                    'invoice_date': rec.get('invoice_date'),
-                    'due_date': rec.get('invoice_date_due'),
-                    'amount_total': rec.get('amount_total', 0),
-                    'amount_due': rec.get('amount_residual', 0),
-                    'state': rec.get('state'),
-                    'payment_state': rec.get('payment_state'),
-                    'move_type': rec.get('move_type'),
-                    'currency': rec.get('currency_id')[1] if rec.get('currency_id') else 'USD',
-                    'create_date': rec.get('create_date'),
-                    'write_date': rec.get('write_date'),
-                })
+                invoices.append(self._map_invoice(rec))
             
             logger.info(f"Fetched {len(invoices)} invoices from Odoo")
             return invoices
@@ -670,17 +513,11 @@ class OdooConnector(BaseConnector):
                   'create_date', 'write_date']
         domain = []  # Fetch all activities
         
-        loop = asyncio.get_event_loop()
-        
         try:
-            records = await loop.run_in_executor(
-                None,
-                lambda: self._models.execute_kw(
-                    self.database, self._uid, self.api_key,
-                    model, 'search_read',
-                    [domain],
-                    {'fields': fields, 'limit': 1000}
-                )
+            records = await self._transport.execute_kw(
+                model, 'search_read',
+                [domain],
+                {'fields': fields, 'limit': 1000}
             )
             
             activities = []
@@ -745,17 +582,11 @@ class OdooConnector(BaseConnector):
         if res_ids and len(res_ids) > 0:
             domain.append(('res_id', 'in', res_ids))
         
-        loop = asyncio.get_event_loop()
-        
         try:
-            records = await loop.run_in_executor(
-                None,
-                lambda: self._models.execute_kw(
-                    self.database, self._uid, self.api_key,
-                    model, 'search_read',
-                    [domain],
-                    {'fields': fields, 'limit': 5000, 'order': 'date desc'}
-                )
+            records = await self._transport.execute_kw(
+                model, 'search_read',
+                [domain],
+                {'fields': fields, 'limit': 5000, 'order': 'date desc'}
             )
             
             messages = []
@@ -804,46 +635,18 @@ class OdooConnector(BaseConnector):
         if not self._connected:
             raise RuntimeError("Cannot connect to Odoo")
         
-        model = 'res.partner'
-        # Note: 'title' field removed for Odoo 19.0 compatibility (field renamed/deprecated)
-        fields = ['id', 'name', 'email', 'phone', 'mobile', 'function',
-                  'parent_id', 'street', 'city', 'country_id', 'is_company',
-                  'user_id', 'create_date', 'write_date']
-        # Only fetch individual contacts (not companies)
-        domain = [('is_company', '=', False), ('parent_id', '!=', False)]
-        
-        loop = asyncio.get_event_loop()
+        model, domain, fields = self._export_spec('contact')
         
         try:
-            records = await loop.run_in_executor(
-                None,
-                lambda: self._models.execute_kw(
-                    self.database, self._uid, self.api_key,
-                    model, 'search_read',
-                    [domain],
-                    {'fields': fields, 'limit': 2000}
-                )
+            records = await self._transport.execute_kw(
+                model, 'search_read',
+                [domain],
+                {'fields': fields, 'limit': 2000}
             )
             
             contacts = []
             for rec in records:
-                contacts.append({
-                    'id': rec.get('id'),
-                    'name': rec.get('name'),
-                    'email': rec.get('email') if rec.get('email') != False else None,
-                    'phone': rec.get('phone') if rec.get('phone') != False else None,
-                    'mobile': rec.get('mobile') if rec.get('mobile') != False else None,
-                    'job_title': rec.get('function') if rec.get('function') != False else None,
-                    'account_id': rec.get('parent_id')[0] if rec.get('parent_id') else None,
-                    'account_name': rec.get('parent_id')[1] if rec.get('parent_id') else None,
-                    'street': rec.get('street') if rec.get('street') != False else None,
-                    'city': rec.get('city') if rec.get('city') != False else None,
-                    'country': rec.get('country_id')[1] if rec.get('country_id') else None,
-                    'salesperson_id': rec.get('user_id')[0] if rec.get('user_id') else None,
-                    'salesperson_name': rec.get('user_id')[1] if rec.get('user_id') else None,
-                    'create_date': rec.get('create_date'),
-                    'write_date': rec.get('write_date'),
-                })
+                contacts.append(self._map_contact(rec))
             
             logger.info(f"Fetched {len(contacts)} contacts from Odoo")
             return contacts
@@ -852,3 +655,205 @@ class OdooConnector(BaseConnector):
             logger.error(f"Failed to fetch contacts from Odoo: {e}")
             # Return empty list instead of raising - contacts are optional
             return []
+    
+    # ===================== PARALLEL EXPORT =====================
+    
+    def _export_spec(self, entity_type: str) -> tuple:
+        """(model, domain, fields) used for a full pull of an entity type"""
+        if entity_type == 'account':
+            model = 'res.partner'
+            return model, [('is_company', '=', True), ('active', '=', True)], self._get_fields_for_model(model, 'account')
+        if entity_type == 'opportunity':
+            model = 'crm.lead'
+            return model, [('active', '=', True)], self._get_fields_for_model(model, 'opportunity')
+        if entity_type == 'invoice':
+            fields = ['id', 'name', 'partner_id', 'invoice_date', 'invoice_date_due', 
+                      'amount_total', 'amount_residual', 'state', 'payment_state',
+                      'move_type', 'currency_id', 'create_date', 'write_date']
+            # Customer invoices only
+            return 'account.move', [('move_type', 'in', ['out_invoice', 'out_refund'])], fields
+        if entity_type == 'contact':
+            # Note: 'title' field removed for Odoo 19.0 compatibility (field renamed/deprecated)
+            fields = ['id', 'name', 'email', 'phone', 'mobile', 'function',
+                      'parent_id', 'street', 'city', 'country_id', 'is_company',
+                      'user_id', 'create_date', 'write_date']
+            # Only individual contacts (not companies)
+            return 'res.partner', [('is_company', '=', False), ('parent_id', '!=', False)], fields
+        raise ValueError(f"No export defined for {entity_type}")
+    
+    async def export_entity(
+        self,
+        entity_type: str,
+        chunk_size: Optional[int] = None,
+        parallelism: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Full export of an entity type as mapped chunks (account, opportunity,
+        invoice, contact). The ID space is split into ranges fetched
+        concurrently, so chunks arrive in no particular order - consume with
+        OdooReconciler.reconcile_stream.
+        """
+        if not self._connected:
+            await self.connect()
+        
+        if not self._connected:
+            raise RuntimeError("Cannot connect to Odoo")
+        
+        model, domain, fields = self._export_spec(entity_type)
+        to_record = getattr(self, f"_map_{entity_type}")
+        
+        total = 0
+        async for records in self._transport.export(
+            model, domain, fields,
+            chunk_size=chunk_size or settings.ODOO_EXPORT_CHUNK_SIZE,
+            parallelism=parallelism
+        ):
+            total += len(records)
+            yield [to_record(rec) for rec in records]
+        
+        logger.info(f"Exported {total} {entity_type} records from Odoo")
+    
+    # Models pushed by Odoo webhooks and the entity types each one feeds
+    WEBHOOK_ENTITIES = {
+        'res.partner': ('account', 'contact'),
+        'crm.lead': ('opportunity',),
+        'account.move': ('invoice',),
+    }
+    
+    async def read_changes(self, model: str, ids: List[int]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Current state of specific records (e.g. a webhook batch) in a single
+        search_read, mapped and split per entity type using the export
+        domains. IDs missing from an entity type's list were deleted,
+        archived or no longer belong to it.
+        """
+        if not self._connected:
+            await self.connect()
+        
+        if not self._connected:
+            raise RuntimeError("Cannot connect to Odoo")
+        
+        specs = {entity_type: self._export_spec(entity_type) for entity_type in self.WEBHOOK_ENTITIES[model]}
+        fields = sorted({field for _, domain, spec_fields in specs.values()
+                         for field in spec_fields + [leaf[0] for leaf in domain]})
+        
+        # search_read (not read) so IDs deleted in the meantime are just absent
+        records = await self._transport.search_read(model, [('id', 'in', list(ids))], fields)
+        
+        return {
+            entity_type: [
+                getattr(self, f"_map_{entity_type}")(rec)
+                for rec in records if _matches_domain(rec, domain)
+            ]
+            for entity_type, (_, domain, _) in specs.items()
+        }
+    
+    # ===================== RECORD MAPPING =====================
+    
+    @staticmethod
+    def _map_account(rec: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'id': rec.get('id'),
+            'name': rec.get('name'),
+            'email': rec.get('email'),
+            'phone': rec.get('phone'),
+            'mobile': rec.get('mobile'),
+            'website': rec.get('website'),
+            'street': rec.get('street'),
+            'city': rec.get('city'),
+            'state_name': rec.get('state_id')[1] if rec.get('state_id') else None,
+            'country_name': rec.get('country_id')[1] if rec.get('country_id') else None,
+            'zip': rec.get('zip'),
+            'industry': rec.get('industry_id')[1] if rec.get('industry_id') else None,
+            'salesperson_id': rec.get('user_id')[0] if rec.get('user_id') else None,
+            'salesperson_name': rec.get('user_id')[1] if rec.get('user_id') else None,
+            'team_id': rec.get('team_id')[0] if rec.get('team_id') else None,
+            'team_name': rec.get('team_id')[1] if rec.get('team_id') else None,
+            'comment': rec.get('comment'),
+            'active': rec.get('active', True),
+            'create_date': rec.get('create_date'),
+            'write_date': rec.get('write_date'),
+        }
+    
+    @staticmethod
+    def _map_opportunity(rec: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'id': rec.get('id'),
+            'name': rec.get('name'),
+            'email_from': rec.get('email_from'),
+            'phone': rec.get('phone'),
+            'contact_name': rec.get('contact_name'),
+            'partner_id': rec.get('partner_id')[0] if rec.get('partner_id') else None,
+            'partner_name': rec.get('partner_id')[1] if rec.get('partner_id') else None,
+            'expected_revenue': rec.get('expected_revenue', 0),
+            'probability': rec.get('probability', 0),
+            'stage_id': rec.get('stage_id')[0] if rec.get('stage_id') else None,
+            'stage_name': rec.get('stage_id')[1] if rec.get('stage_id') else 'New',
+            'type': rec.get('type'),
+            'priority': rec.get('priority'),
+            'date_deadline': rec.get('date_deadline'),
+            'date_closed': rec.get('date_closed'),
+            'salesperson_id': rec.get('user_id')[0] if rec.get('user_id') else None,
+            'salesperson_name': rec.get('user_id')[1] if rec.get('user_id') else None,
+            'team_id': rec.get('team_id')[0] if rec.get('team_id') else None,
+            'team_name': rec.get('team_id')[1] if rec.get('team_id') else None,
+            'description': rec.get('description'),
+            'active': rec.get('active', True),
+            'create_date': rec.get('create_date'),
+            'write_date': rec.get('write_date'),
+        }
+    
+    @staticmethod
+    def _map_invoice(rec: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'id': rec.get('id'),
+            'name': rec.get('name'),
+            'partner_id': rec.get('partner_id')[0] if rec.get('partner_id') else None,
+            'partner_name': rec.get('partner_id')[1] if rec.get('partner_id') else None,
+            'invoice_date': rec.get('invoice_date'),
+            'due_date': rec.get('invoice_date_due'),
+            'amount_total': rec.get('amount_total', 0),
+            'amount_due': rec.get('amount_residual', 0),
+            'state': rec.get('state'),
+            'payment_state': rec.get('payment_state'),
+            'move_type': rec.get('move_type'),
+            'currency': rec.get('currency_id')[1] if rec.get('currency_id') else 'USD',
+            'create_date': rec.get('create_date'),
+            'write_date': rec.get('write_date'),
+        }
+    
+    @staticmethod
+    def _map_contact(rec: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'id': rec.get('id'),
+            'name': rec.get('name'),
+            'email': rec.get('email') if rec.get('email') != False else None,
+            'phone': rec.get('phone') if rec.get('phone') != False else None,
+            'mobile': rec.get('mobile') if rec.get('mobile') != False else None,
+            'job_title': rec.get('function') if rec.get('function') != False else None,
+            'account_id': rec.get('parent_id')[0] if rec.get('parent_id') else None,
+            'account_name': rec.get('parent_id')[1] if rec.get('parent_id') else None,
+            'street': rec.get('street') if rec.get('street') != False else None,
+            'city': rec.get('city') if rec.get('city') != False else None,
+            'country': rec.get('country_id')[1] if rec.get('country_id') else None,
+            'salesperson_id': rec.get('user_id')[0] if rec.get('user_id') else None,
+            'salesperson_name': rec.get('user_id')[1] if rec.get('user_id') else None,
+            'create_date': rec.get('create_date'),
+            'write_date': rec.get('write_date'),
+        }
+
+
+def _matches_domain(record: Dict[str, Any], domain: List[tuple]) -> bool:
+    """Evaluate a simple AND-ed domain (=, !=, in) against a search_read record"""
+    for field, operator, value in domain:
+        actual = record.get(field)
+        # many2one values come back as [id, name]
+        if isinstance(actual, list) and value is not False:
+            actual = actual[0] if actual else False
+        if operator == '=' and actual != value:
+            return False
+        if operator == '!=' and actual == value:
+            return False
+        if operator == 'in' and actual not in value:
+            return False
+    return True
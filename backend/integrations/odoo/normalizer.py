@@ -3,11 +3,12 @@ Odoo Data Normalizer
 Handles deduplication and reference resolution for Odoo data
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, List, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
 import logging
 
 from sync_engine.base_components import BaseNormalizer
+from sync_engine.reference_resolver import ReferenceResolver, ReferenceFields
 from core.base import BaseEntity
 from core.enums import IntegrationSource, EntityType
 from data_lake.models import (
@@ -30,9 +31,26 @@ class OdooNormalizer(BaseNormalizer):
     - Reference resolution (partner_id -> account_id, etc.)
     """
     
+    # Foreign keys holding Odoo IDs until resolved
+    REFERENCE_FIELDS: ReferenceFields = {
+        CanonicalContact: [
+            ("account_id", "canonical_accounts"),
+            ("owner_id", "canonical_users"),
+        ],
+        CanonicalOpportunity: [
+            ("account_id", "canonical_accounts"),
+            ("owner_id", "canonical_users"),
+        ],
+        CanonicalActivity: [
+            ("account_id", "canonical_accounts"),
+            ("opportunity_id", "canonical_opportunities"),
+            ("owner_id", "canonical_users"),
+        ],
+    }
+    
     def __init__(self, db: AsyncIOMotorDatabase):
         super().__init__(db)
-        self._odoo_to_canonical_cache: Dict[str, str] = {}
+        self._resolver = ReferenceResolver(db, IntegrationSource.ODOO)
     
     async def normalize(self, entity: BaseEntity) -> BaseEntity:
         """Apply Odoo-specific normalization"""
@@ -73,12 +91,7 @@ class OdooNormalizer(BaseNormalizer):
         
         # Look for existing by Odoo ID
         existing = await self.db[collection_name].find_one({
-            "_sources": {
-                "$elemMatch": {
-                    "source": IntegrationSource.ODOO.value,
-                    "source_id": odoo_source.source_id
-                }
-            }
+            "_source_keys": odoo_source.key
         })
         
         if existing:
@@ -113,6 +126,16 @@ class OdooNormalizer(BaseNormalizer):
         
         return entity
     
+    async def resolve_references_batch(self, entities: List[BaseEntity]) -> List[BaseEntity]:
+        """
+        Resolve references for a chunk of entities.
+        All Odoo foreign keys are fetched with one $in query per target collection.
+        """
+        refs = self._resolver.collect(entities, self.REFERENCE_FIELDS, lambda v: v.isdigit())
+        await self._resolver.prefetch(refs)
+        
+        return [await self.resolve_references(entity) for entity in entities]
+    
     async def _resolve_contact_refs(self, contact: CanonicalContact) -> CanonicalContact:
         """Resolve contact references"""
         # Resolve account_id (parent company in Odoo)
@@ -195,30 +218,9 @@ class OdooNormalizer(BaseNormalizer):
     ) -> Optional[str]:
         """
         Resolve an Odoo ID to a canonical ID.
-        Uses caching for performance.
+        Served from the batch resolver's memo when the chunk was prefetched.
         """
-        cache_key = f"{collection}:{odoo_id}"
-        
-        # Check cache
-        if cache_key in self._odoo_to_canonical_cache:
-            return self._odoo_to_canonical_cache[cache_key]
-        
-        # Query database
-        doc = await self.db[collection].find_one({
-            "_sources": {
-                "$elemMatch": {
-                    "source": IntegrationSource.ODOO.value,
-                    "source_id": odoo_id
-                }
-            }
-        }, {"id": 1})
-        
-        if doc:
-            canonical_id = doc["id"]
-            self._odoo_to_canonical_cache[cache_key] = canonical_id
-            return canonical_id
-        
-        return None
+        return await self._resolver.resolve(collection, odoo_id)
     
     def _get_collection_name(self, entity: BaseEntity) -> Optional[str]:
         """Get MongoDB collection name for entity type"""
@@ -263,4 +265,4 @@ class OdooNormalizer(BaseNormalizer):
     
     def clear_cache(self):
         """Clear the reference resolution cache"""
-        self._odoo_to_canonical_cache.clear()
+        self._resolver.clear()
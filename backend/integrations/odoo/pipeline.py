@@ -9,6 +9,7 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 import logging
 
 from sync_engine.pipeline import SyncPipeline
+from sync_engine.replay import ReplayEngine
 from sync_engine.base_components import BaseLoader, BaseSyncLogger
 from core.interfaces import ISyncPipeline
 from core.base import SyncBatch, RawRecord
@@ -152,70 +153,24 @@ class OdooSyncPipeline(ISyncPipeline):
         
         return results
     
-    async def replay(self, batch_id: str) -> SyncBatch:
-        """Replay a previous sync batch"""
-        # Get batch info
-        batch_doc = await self.db["sync_batches"].find_one({"id": batch_id})
-        if not batch_doc:
+    async def replay(
+        self,
+        batch_id: str,
+        dry_run: bool = False,
+        diff: bool = False
+    ) -> SyncBatch:
+        """Replay a previous sync batch from the raw zone"""
+        entity_type = await ReplayEngine.find_batch_entity_type(self.db, batch_id)
+        if not entity_type:
             raise ValueError(f"Batch not found: {batch_id}")
         
-        entity_type = batch_doc["entity_type"]
-        
-        # Get raw records from batch
-        raw_records = await self._data_lake.raw.get_by_batch(
-            IntegrationSource.ODOO,
-            EntityType(entity_type),
-            batch_id
-        )
-        
-        # Create new replay batch
-        replay_batch = SyncBatch(
-            source=self.source_name,
+        pipeline = self._get_pipeline(entity_type)
+        return await pipeline.replay(
+            batch_id,
             entity_type=entity_type,
-            metadata={"replay_of": batch_id, "mode": "replay"}
+            dry_run=dry_run,
+            diff=diff
         )
-        
-        await self._sync_logger.log_sync_start(replay_batch)
-        
-        pipeline = self._get_pipeline(entity_type)
-        
-        # Reprocess each record
-        for raw_doc in raw_records:
-            try:
-                raw_record = RawRecord(
-                    source=raw_doc["_source"],
-                    source_id=raw_doc["_source_id"],
-                    raw_data=raw_doc["_raw_data"],
-                    sync_batch_id=replay_batch.id
-                )
-                
-                # Map to canonical
-                entity = pipeline._mapper.map_to_canonical(raw_record)
-                
-                # Normalize
-                entity = await self._normalizer.normalize(entity)
-                await self._normalizer.deduplicate(entity)
-                entity = await self._normalizer.resolve_references(entity)
-                
-                # Load to canonical (skip raw since already exists)
-                await self._loader.load_canonical(entity)
-                await self._loader.load_serving(entity)
-                
-                replay_batch.records_processed += 1
-                replay_batch.records_updated += 1
-                
-            except Exception as e:
-                replay_batch.records_processed += 1
-                replay_batch.records_failed += 1
-                replay_batch.errors.append({
-                    "source_id": raw_doc.get("_source_id"),
-                    "error": str(e)
-                })
-        
-        replay_batch.status = "completed" if replay_batch.records_failed == 0 else "partial"
-        await self._sync_logger.log_sync_complete(replay_batch)
-        
-        return replay_batch
     
     async def sync_single(
         self,
@@ -0,0 +1,341 @@
+"""
+Odoo Transport
+Native-async JSON-RPC client shared by both Odoo connectors: one pooled
+keep-alive HTTP client per Odoo login, cached uid, bounded concurrency and
+adaptive pacing around execute_kw
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+import httpx
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OdooRPCError(Exception):
+    """Raised when Odoo returns a JSON-RPC error"""
+    
+    def __init__(self, message: str, debug: str = ""):
+        super().__init__(message)
+        self.debug = debug
+
+
+# Responses that mean "slow down" (with or without Retry-After)
+THROTTLE_STATUSES = {429, 503}
+RETRY_STATUSES = {429, 502, 503, 504}
+MAX_ATTEMPTS = 3
+
+
+def id_ranges(ids: List[int], chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Split record IDs into inclusive (first, last) ranges of at most
+    chunk_size IDs each, so every range is one keyset-bounded query.
+    """
+    ids = sorted(ids)
+    return [(ids[i], ids[min(i + chunk_size, len(ids)) - 1]) for i in range(0, len(ids), chunk_size)]
+
+
+def normalize_url(url: str) -> str:
+    """
+    Base URL of an Odoo instance.
+    Handles: https://example.odoo.com/odoo -> https://example.odoo.com
+    """
+    url = (url or "").rstrip('/')
+    for suffix in ['/odoo', '/web', '/jsonrpc', '/xmlrpc/2', '/xmlrpc']:
+        if url.lower().endswith(suffix):
+            url = url[:-len(suffix)]
+    return url
+
+
+class AdaptivePacer:
+    """
+    Minimum spacing between requests that grows when Odoo throttles us
+    (multiplicative increase, honouring Retry-After) and shrinks again
+    while calls succeed.
+    """
+    
+    def __init__(self, max_interval: float = 10.0):
+        self.interval = 0.0
+        self.max_interval = max_interval
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def wait(self) -> None:
+        if self.interval <= 0:
+            return
+        async with self._lock:
+            delay = self._next_slot - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_slot = time.monotonic() + self.interval
+    
+    def throttled(self, retry_after: Optional[float] = None) -> float:
+        self.interval = min(self.max_interval, max(self.interval * 2, 0.25, retry_after or 0))
+        return self.interval
+    
+    def succeeded(self) -> None:
+        if self.interval > 0:
+            self.interval = self.interval * 0.8 if self.interval > 0.05 else 0.0
+
+
+class OdooTransport:
+    """
+    Long-lived JSON-RPC session for one (url, database, username, api_key).
+    
+    Instances are shared through OdooTransport.get(), so connectors opened
+    per webhook or per sync reuse the same TLS connections and uid instead
+    of re-authenticating. At most ODOO_MAX_CONCURRENCY execute_kw calls run
+    at once; throttling responses slow every caller down via AdaptivePacer.
+    """
+    
+    _instances: Dict[Tuple[str, str, str, str], "OdooTransport"] = {}
+    
+    def __init__(
+        self,
+        url: str,
+        database: str,
+        username: str,
+        api_key: str,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.url = normalize_url(url)
+        self.database = database
+        self.username = username
+        self.api_key = api_key
+        self.endpoint = f"{self.url}/jsonrpc"
+        self.uid: Optional[int] = None
+        self.version_info: Optional[Dict[str, Any]] = None
+        self.pacer = AdaptivePacer()
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "authentications": 0}
+        
+        self.max_concurrency = max_concurrency = max_concurrency or settings.ODOO_MAX_CONCURRENCY
+        self._client = httpx.AsyncClient(
+            timeout=timeout or settings.ODOO_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            transport=transport,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._auth_lock = asyncio.Lock()
+        self._request_id = 0
+        self._loop = _running_loop()
+    
+    @classmethod
+    def get(cls, url: str, database: str, username: str, api_key: str) -> "OdooTransport":
+        """Shared transport for these credentials (created on first use)"""
+        key = (normalize_url(url), database, username, api_key)
+        transport = cls._instances.get(key)
+        # httpx clients are bound to the event loop they were created on
+        if transport is None or transport._client.is_closed or transport._loop is not _running_loop():
+            transport = cls(url, database, username, api_key)
+            cls._instances[key] = transport
+        return transport
+    
+    @classmethod
+    async def close_all(cls) -> None:
+        instances, cls._instances = list(cls._instances.values()), {}
+        for transport in instances:
+            await transport.close()
+    
+    async def close(self) -> None:
+        await self._client.aclose()
+    
+    def _forget(self) -> None:
+        """Drop from the shared registry (e.g. after failed authentication)"""
+        for key, transport in list(self._instances.items()):
+            if transport is self:
+                del self._instances[key]
+    
+    # ===================== JSON-RPC =====================
+    
+    async def _call(self, service: str, method: str, args: List[Any]) -> Any:
+        """One JSON-RPC call, retried with backoff on throttling and transient errors"""
+        self._request_id += 1
+        payload = {
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": {"service": service, "method": method, "args": args},
+            "id": self._request_id,
+        }
+        
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await self.pacer.wait()
+            try:
+                response = await self._client.post(self.endpoint, json=payload)
+            except (httpx.ConnectError, httpx.ReadTimeout, httpx.RemoteProtocolError) as e:
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+                logger.warning(f"Odoo request failed ({e.__class__.__name__}), retrying")
+                continue
+            
+            if response.status_code in RETRY_STATUSES and attempt < MAX_ATTEMPTS:
+                self.stats["retries"] += 1
+                if response.status_code in THROTTLE_STATUSES:
+                    self.stats["throttled"] += 1
+                    interval = self.pacer.throttled(_retry_after(response))
+                    logger.warning(f"Odoo throttled ({response.status_code}), pacing requests {interval:.2f}s apart")
+                await asyncio.sleep(max(self.pacer.interval, 0.5 * 2 ** (attempt - 1)))
+                continue
+            
+            response.raise_for_status()
+            self.pacer.succeeded()
+            result = response.json()
+            
+            if result.get("error"):
+                error_data = result["error"]
+                error_detail = error_data.get("data") or {}
+                message = error_detail.get("message") or error_data.get("message", "Unknown error")
+                raise OdooRPCError(message, error_detail.get("debug", ""))
+            return result.get("result")
+    
+    async def version(self) -> Dict[str, Any]:
+        """Server version info (cached)"""
+        if self.version_info is None:
+            self.version_info = await self._call("common", "version", []) or {}
+        return self.version_info
+    
+    async def authenticate(self, force: bool = False) -> int:
+        """
+        uid for the API key, authenticated once and cached. A failed login
+        removes the transport from the shared registry.
+        """
+        if self.uid and not force:
+            return self.uid
+        
+        async with self._auth_lock:
+            if self.uid and not force:
+                return self.uid
+            
+            try:
+                self.stats["authentications"] += 1
+                uid = await self._call("common", "authenticate", [self.database, self.username, self.api_key, {}])
+            except httpx.HTTPStatusError as e:
+                self._forget()
+                raise Exception(f"HTTP error {e.response.status_code}: Check if URL is correct")
+            except httpx.ConnectError:
+                self._forget()
+                raise Exception("Cannot connect to Odoo server. Check the URL.")
+            except OdooRPCError as e:
+                self._forget()
+                raise Exception(f"Authentication failed: {e}")
+            
+            if not uid:
+                # UID is False means invalid credentials
+                self._forget()
+                raise Exception("Invalid credentials - please check username and API key")
+            
+            self.uid = uid
+            logger.info(f"Odoo authentication successful at {self.endpoint}. UID: {uid}")
+            return uid
+    
+    async def execute_kw(
+        self,
+        model: str,
+        method: str,
+        args: Optional[List[Any]] = None,
+        kwargs: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """Execute a method on an Odoo model"""
+        uid = await self.authenticate()
+        async with self._semaphore:
+            self.stats["calls"] += 1
+            try:
+                return await self._call(
+                    "object", "execute_kw",
+                    [self.database, uid, self.api_key, model, method, args or [], kwargs or {}]
+                )
+            except OdooRPCError as e:
+                if "AccessDenied" in e.debug:
+                    self.uid = None  # Key revoked or rotated - log in again on the next call
+                logger.error(f"Odoo API error on {model}.{method}: {e}, Debug: {e.debug[:500] if e.debug else 'N/A'}")
+                raise OdooRPCError(f"Odoo API error: {e}", e.debug)
+    
+    # ===================== READ API =====================
+    
+    async def search_read(
+        self,
+        model: str,
+        domain: Optional[List] = None,
+        fields: Optional[List[str]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        order: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        kwargs: Dict[str, Any] = {"offset": offset}
+        if limit is not None:
+            kwargs["limit"] = limit
+        if fields:
+            kwargs["fields"] = fields
+        if order:
+            kwargs["order"] = order
+        return await self.execute_kw(model, "search_read", [domain or []], kwargs)
+    
+    async def search_count(self, model: str, domain: Optional[List] = None) -> int:
+        return await self.execute_kw(model, "search_count", [domain or []])
+    
+    async def read(self, model: str, ids: List[int], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        kwargs = {"fields": fields} if fields else {}
+        return await self.execute_kw(model, "read", [ids], kwargs)
+    
+    async def fields_get(self, model: str, attributes: Optional[List[str]] = None) -> Dict[str, Any]:
+        kwargs = {"attributes": attributes} if attributes else {}
+        return await self.execute_kw(model, "fields_get", [], kwargs)
+    
+    async def export(
+        self,
+        model: str,
+        domain: Optional[List] = None,
+        fields: Optional[List[str]] = None,
+        chunk_size: int = 500,
+        parallelism: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Full export of a large model. The matching IDs are fetched once with
+        search, split into ID ranges and each range is read with its own
+        search_read - keyset bounds instead of deep offsets. Up to
+        `parallelism` ranges are in flight at once; chunks are yielded as
+        they complete, in no particular order.
+        """
+        domain = list(domain or [])
+        ids = await self.execute_kw(model, "search", [domain], {"order": "id asc"})
+        ranges = id_ranges(ids or [], chunk_size)
+        parallelism = max(1, parallelism or self.max_concurrency)
+        
+        async def fetch(lo: int, hi: int) -> List[Dict[str, Any]]:
+            return await self.search_read(model, domain + [("id", ">=", lo), ("id", "<=", hi)], fields)
+        
+        pending = set()
+        try:
+            while ranges or pending:
+                while ranges and len(pending) < parallelism:
+                    pending.add(asyncio.ensure_future(fetch(*ranges.pop(0))))
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    records = task.result()
+                    if records:
+                        yield records
+        finally:
+            # Consumer stopped early or a range failed - don't leave reads running
+            for task in pending:
+                task.cancel()
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
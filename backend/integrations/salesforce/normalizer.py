@@ -12,11 +12,12 @@ This is critical for data quality and preventing duplicate records
 when the same entity exists in multiple source systems.
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
 import logging
 
 from sync_engine.base_components import BaseNormalizer
+from sync_engine.reference_resolver import ReferenceResolver, ReferenceFields
 from core.base import BaseEntity
 from core.enums import IntegrationSource, EntityType
 from data_lake.models import (
@@ -41,10 +42,27 @@ class SalesforceNormalizer(BaseNormalizer):
     - Cross-system deduplication (same contact in SF and Odoo)
     """
     
+    # Foreign keys holding Salesforce IDs until resolved
+    REFERENCE_FIELDS: ReferenceFields = {
+        CanonicalContact: [
+            ("account_id", "canonical_accounts"),
+            ("owner_id", "canonical_users"),
+        ],
+        CanonicalOpportunity: [
+            ("account_id", "canonical_accounts"),
+            ("contact_id", "canonical_contacts"),
+            ("owner_id", "canonical_users"),
+        ],
+        CanonicalActivity: [
+            ("account_id", "canonical_accounts"),
+            ("owner_id", "canonical_users"),
+        ],
+    }
+    
     def __init__(self, db: AsyncIOMotorDatabase):
         super().__init__(db)
-        # Cache for Salesforce ID → Canonical ID mapping
-        self._sf_to_canonical_cache: Dict[str, str] = {}
+        # Batched, memoized Salesforce ID → Canonical ID resolution
+        self._resolver = ReferenceResolver(db, IntegrationSource.SALESFORCE)
     
     async def normalize(self, entity: BaseEntity) -> BaseEntity:
         """
@@ -95,12 +113,7 @@ class SalesforceNormalizer(BaseNormalizer):
         
         # Check if already exists by Salesforce ID
         existing = await self.db[collection_name].find_one({
-            "_sources": {
-                "$elemMatch": {
-                    "source": IntegrationSource.SALESFORCE.value,
-                    "source_id": sf_source.source_id
-                }
-            }
+            "_source_keys": sf_source.key
         })
         
         if existing:
@@ -133,6 +146,18 @@ class SalesforceNormalizer(BaseNormalizer):
         
         return entity
     
+    async def resolve_references_batch(self, entities: List[BaseEntity]) -> List[BaseEntity]:
+        """
+        Resolve references for a chunk of entities.
+        
+        Every Salesforce foreign key in the chunk is collected first and
+        resolved with one $in query per target collection.
+        """
+        refs = self._resolver.collect(entities, self.REFERENCE_FIELDS, self._is_salesforce_id)
+        await self._resolver.prefetch(refs)
+        
+        return [await self.resolve_references(entity) for entity in entities]
+    
     async def _resolve_contact_refs(self, contact: CanonicalContact) -> CanonicalContact:
         """Resolve contact foreign keys"""
         
@@ -219,30 +244,9 @@ class SalesforceNormalizer(BaseNormalizer):
     ) -> Optional[str]:
         """
         Resolve a Salesforce ID to canonical ID.
-        Uses cache for performance.
+        Uses the batch resolver's memo for performance.
         """
-        cache_key = f"{collection}:{salesforce_id}"
-        
-        # Check cache first
-        if cache_key in self._sf_to_canonical_cache:
-            return self._sf_to_canonical_cache[cache_key]
-        
-        # Query database
-        doc = await self.db[collection].find_one({
-            "_sources": {
-                "$elemMatch": {
-                    "source": IntegrationSource.SALESFORCE.value,
-                    "source_id": salesforce_id
-                }
-            }
-        }, {"id": 1})
-        
-        if doc:
-            canonical_id = doc["id"]
-            self._sf_to_canonical_cache[cache_key] = canonical_id
-            return canonical_id
-        
-        return None
+        return await self._resolver.resolve(collection, salesforce_id)
     
     async def _find_cross_system_duplicate(
         self,
@@ -354,4 +358,4 @@ class SalesforceNormalizer(BaseNormalizer):
     
     def clear_cache(self):
         """Clear the reference resolution cache"""
-        self._sf_to_canonical_cache.clear()
+        self._resolver.clear()
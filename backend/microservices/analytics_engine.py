@@ -0,0 +1,412 @@
+"""
+Analytics engine for dashboard aggregates.
+Opportunities, activities and invoices are mirrored from data_lake_serving
+into typed ClickHouse fact tables; pipeline, revenue and activity queries
+run there for large tenants and against Mongo otherwise.
+"""
+from typing import Any, Dict, List, Optional, Set
+from datetime import date, datetime, timedelta, timezone
+import asyncio
+import logging
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from core.config import settings
+from services.field_mapper import mapped_record
+from services.rbac.record_access import is_indexed, record_access_keys
+
+from .clickhouse_client import ClickHouseClient
+from .data_lake_service import DataLakeService
+
+logger = logging.getLogger(__name__)
+
+FACT_TABLES = {
+    "opportunity": "opportunity_facts",
+    "activity": "activity_facts",
+    "invoice": "invoice_facts",
+}
+
+# ClickHouse function giving the first day of each reporting period
+PERIODS = {
+    "day": "toDate",
+    "week": "toMonday",
+    "month": "toStartOfMonth",
+    "quarter": "toStartOfQuarter",
+    "year": "toStartOfYear",
+}
+
+# Invoices in these states are not revenue
+NON_REVENUE_STATES = ("draft", "cancel")
+
+# Activity states still to be done
+OPEN_ACTIVITY_STATES = ("planned", "today", "overdue")
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Mirror overlap: serving writes are stamped before they commit, so a record
+# can land below the highest updated_at already mirrored. Re-sending the
+# overlap is harmless (ReplacingMergeTree keeps the latest row).
+MIRROR_SAFETY_MARGIN = timedelta(minutes=5)
+
+
+def _date(value: Any) -> Optional[str]:
+    """YYYY-MM-DD of an Odoo date or datetime value (False/None/garbage -> None)"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str) and len(value) >= 10:
+        try:
+            return date.fromisoformat(value[:10]).isoformat()
+        except ValueError:
+            return None
+    return None
+
+
+def _int(value: Any) -> int:
+    """ID of a many2one value ([id, name] or a plain id); 0 when unassigned"""
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _str(value: Any) -> str:
+    return value if isinstance(value, str) else ""
+
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def changed_at(doc: Dict[str, Any]) -> datetime:
+    """Last write to a serving document (soft deletes only set deleted_at)"""
+    stamps = [
+        _utc(doc[field]) for field in ("updated_at", "deleted_at", "last_aggregated", "created_at")
+        if isinstance(doc.get(field), datetime)
+    ]
+    return max(stamps, default=EPOCH)
+
+
+def fact_row(entity_type: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Typed fact row of a data_lake_serving document"""
+    data = doc.get("data") or {}
+    row = {
+        "id": str(doc.get("serving_id") or data.get("id")),
+        "is_active": 0 if doc.get("is_active") is False else 1,
+        "updated_at": changed_at(doc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+    }
+
+    if entity_type == "opportunity":
+        opp = mapped_record("opportunity", doc)
+        row.update({
+            "stage": opp.get("stage") or "lead",
+            "stage_name": _str(opp.get("stage_name")),
+            "value": _float(opp.get("value")),
+            "probability": _float(opp.get("probability")),
+            "salesperson_id": _int(data.get("salesperson_id")),
+            "salesperson_name": _str(opp.get("salesperson_name")),
+            "close_date": _date(opp.get("close_date")),
+            "access_keys": doc["access_keys"] if is_indexed(doc) else record_access_keys("opportunity", data),
+        })
+    elif entity_type == "activity":
+        row.update({
+            "activity_type": _str(data.get("activity_type")) or "task",
+            "state": _str(data.get("state")),
+            "user_id": _int(data.get("user_id")),
+            "user_name": _str(data.get("user_name")),
+            "due_date": _date(data.get("due_date") or data.get("date_deadline")),
+        })
+    elif entity_type == "invoice":
+        inv = mapped_record("invoice", doc)
+        row.update({
+            "move_type": _str(data.get("move_type")),
+            "state": _str(data.get("state")),
+            "payment_status": _str(inv.get("payment_status")),
+            "total_amount": _float(inv.get("total_amount")),
+            "amount_due": _float(inv.get("amount_due")),
+            "invoice_date": _date(inv.get("invoice_date")),
+        })
+    else:
+        raise ValueError(f"No analytics facts for {entity_type}")
+    return row
+
+
+def period_start(day: date, period: str) -> date:
+    """First day of the reporting period containing day (matches PERIODS)"""
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    if period == "quarter":
+        return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+    if period == "year":
+        return date(day.year, 1, 1)
+    raise ValueError(f"Unknown period {period}")
+
+
+def _pipeline_row(stage: str, count: int, value: float, weighted_value: float) -> Dict[str, Any]:
+    return {"stage": stage, "count": count, "value": round(value, 2), "weighted_value": round(weighted_value, 2)}
+
+
+def _revenue_row(period: str, invoices: int, revenue: float, collected: float) -> Dict[str, Any]:
+    return {"period": period, "invoices": invoices, "revenue": round(revenue, 2), "collected": round(collected, 2)}
+
+
+def _activity_row(user_id: int, user_name: str, activities: int, open_: int, overdue: int) -> Dict[str, Any]:
+    return {"user_id": user_id, "user_name": user_name, "activities": activities, "open": open_, "overdue": overdue}
+
+
+class ClickHouseAnalytics:
+    """
+    Dashboard aggregates over the ClickHouse fact tables.
+
+    Tables are ReplacingMergeTree keyed by record ID, so re-mirroring a
+    record is an upsert; queries read with FINAL to see the latest row.
+    """
+
+    backend = "clickhouse"
+
+    def __init__(self, client: ClickHouseClient):
+        self.client = client
+
+    async def mirror(self, db: AsyncIOMotorDatabase, batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Copy serving records changed since the last mirror into the fact
+        tables (everything on the first run); returns rows sent per entity.
+        """
+        sent = {}
+        for entity_type, table in FACT_TABLES.items():
+            rows = await self.client.query_json(f"SELECT count() AS n, max(updated_at) AS watermark FROM {table}")
+            query: Dict[str, Any] = {"entity_type": entity_type}
+            if rows and int(rows[0]["n"]):
+                watermark = datetime.strptime(rows[0]["watermark"], "%Y-%m-%d %H:%M:%S.%f") - MIRROR_SAFETY_MARGIN
+                query["$or"] = [{"updated_at": {"$gte": watermark}}, {"deleted_at": {"$gte": watermark}}]
+
+            sent[entity_type] = 0
+            acks: List[asyncio.Future] = []
+            async for doc in db.data_lake_serving.find(query, {"_id": 0}).batch_size(batch_size):
+                acks.append(await self.client.buffer.insert(table, fact_row(entity_type, doc)))
+                if len(acks) >= batch_size:
+                    await asyncio.gather(*acks)
+                    sent[entity_type] += len(acks)
+                    acks = []
+            await asyncio.gather(*acks)
+            sent[entity_type] += len(acks)
+        logger.info("Mirrored serving records into ClickHouse: %s", sent)
+        return sent
+
+    async def pipeline_by_stage(self, access_keys: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        where, params = "is_active", {}
+        if access_keys is not None:
+            where += " AND hasAny(access_keys, {keys:Array(String)})"
+            params["keys"] = access_keys
+        rows = await self.client.query_json(
+            f"""
+            SELECT stage, count() AS count, sum(value) AS value,
+                   sum(value * probability / 100) AS weighted_value
+            FROM opportunity_facts FINAL
+            WHERE {where}
+            GROUP BY stage
+            ORDER BY value DESC, stage
+            """,
+            params,
+        )
+        return [_pipeline_row(r["stage"], int(r["count"]), r["value"], r["weighted_value"]) for r in rows]
+
+    async def revenue_by_period(
+        self,
+        period: str = "month",
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        where = ["is_active", "invoice_date IS NOT NULL", "state NOT IN {excluded:Array(String)}"]
+        params: Dict[str, Any] = {"excluded": list(NON_REVENUE_STATES)}
+        if start:
+            where.append("invoice_date >= {start:Date}")
+            params["start"] = start
+        if end:
+            where.append("invoice_date <= {end:Date}")
+            params["end"] = end
+        rows = await self.client.query_json(
+            f"""
+            SELECT {PERIODS[period]}(assumeNotNull(invoice_date)) AS period, count() AS invoices,
+                   sum(if(move_type = 'out_refund', -total_amount, total_amount)) AS revenue,
+                   sum(if(move_type = 'out_refund', amount_due - total_amount, total_amount - amount_due)) AS collected
+            FROM invoice_facts FINAL
+            WHERE {" AND ".join(where)}
+            GROUP BY period
+            ORDER BY period
+            """,
+            params,
+        )
+        return [_revenue_row(r["period"], int(r["invoices"]), r["revenue"], r["collected"]) for r in rows]
+
+    async def activity_by_rep(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        where = ["is_active"]
+        params: Dict[str, Any] = {"open": list(OPEN_ACTIVITY_STATES)}
+        if start:
+            where.append("due_date >= {start:Date}")
+            params["start"] = start
+        if end:
+            where.append("due_date <= {end:Date}")
+            params["end"] = end
+        rows = await self.client.query_json(
+            f"""
+            SELECT user_id, any(user_name) AS user_name, count() AS activities,
+                   countIf(has({{open:Array(String)}}, state)) AS open,
+                   countIf(state = 'overdue') AS overdue
+            FROM activity_facts FINAL
+            WHERE {" AND ".join(where)}
+            GROUP BY user_id
+            ORDER BY activities DESC, user_id
+            """,
+            params,
+        )
+        return [
+            _activity_row(int(r["user_id"]), r["user_name"], int(r["activities"]), int(r["open"]), int(r["overdue"]))
+            for r in rows
+        ]
+
+
+class MongoAnalytics:
+    """
+    The same aggregates computed from data_lake_serving, for tenants
+    without (or too small to need) ClickHouse. Records are reduced through
+    fact_row() so both backends agree on every definition.
+    """
+
+    backend = "mongo"
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    async def _facts(self, entity_type: str, extra: Optional[Dict[str, Any]] = None):
+        query = {"entity_type": entity_type, "is_active": {"$ne": False}, **(extra or {})}
+        async for doc in self.db.data_lake_serving.find(query, {"_id": 0}):
+            yield fact_row(entity_type, doc)
+
+    async def pipeline_by_stage(self, access_keys: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        allowed: Optional[Set[str]] = set(access_keys) if access_keys is not None else None
+        extra = None
+        if access_keys is not None:
+            # Stale access keys are re-derived by fact_row() and checked below
+            extra = {"access_keys": {"$in": access_keys}}
+
+        totals: Dict[str, List[float]] = {}
+        async for row in self._facts("opportunity", extra):
+            if allowed is not None and not allowed.intersection(row["access_keys"]):
+                continue
+            stage = totals.setdefault(row["stage"], [0, 0.0, 0.0])
+            stage[0] += 1
+            stage[1] += row["value"]
+            stage[2] += row["value"] * row["probability"] / 100
+        rows = [_pipeline_row(name, int(t[0]), t[1], t[2]) for name, t in totals.items()]
+        return sorted(rows, key=lambda r: (-r["value"], r["stage"]))
+
+    async def revenue_by_period(
+        self,
+        period: str = "month",
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        totals: Dict[str, List[float]] = {}
+        async for row in self._facts("invoice"):
+            if not row["invoice_date"] or row["state"] in NON_REVENUE_STATES:
+                continue
+            day = date.fromisoformat(row["invoice_date"])
+            if (start and day < start) or (end and day > end):
+                continue
+            sign = -1 if row["move_type"] == "out_refund" else 1
+            bucket = totals.setdefault(period_start(day, period).isoformat(), [0, 0.0, 0.0])
+            bucket[0] += 1
+            bucket[1] += sign * row["total_amount"]
+            bucket[2] += sign * (row["total_amount"] - row["amount_due"])
+        return [_revenue_row(key, int(t[0]), t[1], t[2]) for key, t in sorted(totals.items())]
+
+    async def activity_by_rep(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        reps: Dict[int, Dict[str, Any]] = {}
+        async for row in self._facts("activity"):
+            if start or end:
+                if not row["due_date"]:
+                    continue
+                day = date.fromisoformat(row["due_date"])
+                if (start and day < start) or (end and day > end):
+                    continue
+            rep = reps.setdefault(row["user_id"], _activity_row(row["user_id"], row["user_name"], 0, 0, 0))
+            rep["activities"] += 1
+            rep["open"] += row["state"] in OPEN_ACTIVITY_STATES
+            rep["overdue"] += row["state"] == "overdue"
+        return sorted(reps.values(), key=lambda r: (-r["activities"], r["user_id"]))
+
+
+class AnalyticsEngine:
+    """
+    Picks the analytics backend per request.
+
+    ClickHouse serves the queries when ANALYTICS_BACKEND is "clickhouse",
+    or "auto" with the data lake service up and at least
+    ANALYTICS_CLICKHOUSE_MIN_RECORDS serving records; a failing ClickHouse
+    query falls back to Mongo.
+    """
+
+    QUERIES = ("pipeline_by_stage", "revenue_by_period", "activity_by_rep")
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.mongo = MongoAnalytics(db)
+
+    async def clickhouse(self) -> Optional[ClickHouseAnalytics]:
+        backend = settings.ANALYTICS_BACKEND
+        service = DataLakeService.instance()
+        if backend == "mongo" or service is None:
+            return None
+        if backend == "auto":
+            records = await self.db.data_lake_serving.estimated_document_count()
+            if records < settings.ANALYTICS_CLICKHOUSE_MIN_RECORDS:
+                return None
+        return ClickHouseAnalytics(service.client)
+
+    async def query(self, name: str, **kwargs: Any) -> Dict[str, Any]:
+        if name not in self.QUERIES:
+            raise ValueError(f"Unknown analytics query {name}")
+
+        engine = await self.clickhouse()
+        if engine is not None:
+            try:
+                return {"backend": engine.backend, "rows": await getattr(engine, name)(**kwargs)}
+            except (httpx.HTTPError, KeyError, ValueError) as exc:
+                logger.warning("ClickHouse %s failed, using Mongo: %s", name, exc)
+        return {"backend": self.mongo.backend, "rows": await getattr(self.mongo, name)(**kwargs)}
+
+
+async def mirror_serving_records(db: AsyncIOMotorDatabase) -> Optional[Dict[str, int]]:
+    """Mirror changed serving records when the data lake service is up (never raises)"""
+    service = DataLakeService.instance()
+    if service is None:
+        return None
+    try:
+        return await ClickHouseAnalytics(service.client).mirror(db)
+    except Exception as exc:
+        logger.warning("Analytics mirror failed: %s", exc)
+        return None
@@ -0,0 +1,267 @@
+"""
+Change-data-capture from the Mongo serving zone into ClickHouse.
+Tails change streams on data_lake_serving, opportunity_view and events and
+writes each batch of changes to ClickHouse before checkpointing its resume
+token, so a restart continues from the last written change.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime, timezone
+import asyncio
+import logging
+import time
+
+from bson import json_util
+from pymongo.errors import OperationFailure
+
+from core.config import settings
+
+from .analytics_engine import FACT_TABLES, ClickHouseAnalytics, fact_row
+from .clickhouse_client import ClickHouseClient
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ("data_lake_serving", "opportunity_view", "events")
+CHECKPOINTS_COLLECTION = "cdc_checkpoints"
+CHANGES_TABLE = "cdc_documents"
+
+WRITE_OPERATIONS = {"insert", "update", "replace"}
+
+# The saved resume token can no longer be used (oplog rolled past it, etc.)
+RESUME_LOST_CODES = {260, 280, 286}
+
+# Change streams need a replica set (or sharded cluster)
+NOT_SUPPORTED_CODES = {40573}
+
+MAX_RETRY_DELAY = 60.0
+
+
+def change_version(change: Dict[str, Any]) -> int:
+    """Cluster time of a change as a UInt64 - identical when a change is replayed"""
+    ts = change["clusterTime"]
+    return (ts.time << 32) | ts.inc
+
+
+def change_time(change: Dict[str, Any]) -> datetime:
+    wall_time = change.get("wallTime")
+    if isinstance(wall_time, datetime):
+        return wall_time if wall_time.tzinfo else wall_time.replace(tzinfo=timezone.utc)
+    return datetime.fromtimestamp(change["clusterTime"].time, timezone.utc)
+
+
+def _entity_type(source: str, doc: Optional[Dict[str, Any]]) -> str:
+    if source == "opportunity_view":
+        return "opportunity"
+    if not doc:
+        return ""
+    value = doc.get("entity_type") if source == "data_lake_serving" else doc.get("aggregate_type")
+    return value if isinstance(value, str) else ""
+
+
+def change_rows(source: str, changes: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    ClickHouse rows per table for a batch of change events: every document
+    change goes to cdc_documents, serving opportunities, activities and
+    invoices also to their analytics fact tables.
+    """
+    rows: Dict[str, List[Dict[str, Any]]] = {}
+    for change in changes:
+        operation = change["operationType"]
+        doc = change.get("fullDocument")
+        if operation not in WRITE_OPERATIONS and operation != "delete":
+            continue
+        if operation in WRITE_OPERATIONS and doc is None:
+            # Deleted before the lookup; its delete event follows
+            continue
+
+        rows.setdefault(CHANGES_TABLE, []).append({
+            "source": source,
+            "doc_id": str(change["documentKey"]["_id"]),
+            "entity_type": _entity_type(source, doc),
+            "operation": operation,
+            "payload": json_util.dumps(doc) if doc else "",
+            "is_deleted": 1 if operation == "delete" else 0,
+            "version": change_version(change),
+            "changed_at": change_time(change).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+        })
+
+        entity_type = doc.get("entity_type") if doc else None
+        if source == "data_lake_serving" and entity_type in FACT_TABLES:
+            rows.setdefault(FACT_TABLES[entity_type], []).append(fact_row(entity_type, doc))
+    return rows
+
+
+class CDCStreamer:
+    """
+    One change stream per source collection, written to ClickHouse in batches.
+
+    - Changes are collected up to batch_size or flush_interval seconds and
+      written; only then is the batch's last resume token saved in
+      cdc_checkpoints, so a crash replays at most the unsaved batch
+    - Replayed rows carry the same version (the change's cluster time), and
+      the ReplacingMergeTree tables keep one row per key and version, which
+      makes the replay harmless (exactly-once as seen through FINAL)
+    - lag_seconds is the age of the newest change when its batch landed
+      (0 while a stream is idle)
+    """
+
+    RETRY_DELAY = 1.0
+
+    def __init__(self, batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        self.batch_size = batch_size or settings.CDC_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.CDC_FLUSH_INTERVAL_SECONDS
+        self.db = None
+        self.client: Optional[ClickHouseClient] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def is_running(self) -> bool:
+        return any(not task.done() for task in self._tasks.values())
+
+    async def start(self, db, client: ClickHouseClient, sources: Iterable[str] = SOURCES) -> None:
+        if self.is_running:
+            return
+        self.db, self.client = db, client
+        for source in sources:
+            self._stats[source] = {
+                "state": "starting",
+                "changes": 0,
+                "rows_written": 0,
+                "batches": 0,
+                "restarts": 0,
+                "resyncs": 0,
+                "lag_seconds": None,
+                "last_batch_ms": None,
+                "checkpoint_at": None,
+                "last_error": None,
+            }
+            self._tasks[source] = asyncio.create_task(self._run(source))
+        logger.info("CDC streaming %s into ClickHouse", ", ".join(self._tasks))
+
+    async def stop(self) -> None:
+        """Stop tailing; changes after the last checkpoint are replayed on the next start"""
+        tasks, self._tasks = list(self._tasks.values()), {}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for stats in self._stats.values():
+            if stats["state"] == "streaming":
+                stats["state"] = "stopped"
+
+    async def _run(self, source: str) -> None:
+        stats = self._stats[source]
+        delay = self.RETRY_DELAY
+        while True:
+            batches = stats["batches"]
+            try:
+                await self._tail(source)
+                continue
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as exc:
+                if exc.code in NOT_SUPPORTED_CODES:
+                    stats["state"] = "unsupported"
+                    logger.warning("CDC disabled for %s: change streams need a replica set", source)
+                    return
+                if exc.code in RESUME_LOST_CODES:
+                    logger.error("CDC resume token for %s is no longer usable, restarting from now: %s", source, exc)
+                    stats["resyncs"] += 1
+                    await self.db[CHECKPOINTS_COLLECTION].delete_one({"_id": source})
+                    await self._resync(source)
+                    continue
+                self._record_error(source, exc)
+            except Exception as exc:
+                self._record_error(source, exc)
+
+            if stats["batches"] > batches:
+                delay = self.RETRY_DELAY
+            stats["restarts"] += 1
+            stats["state"] = "retrying"
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    def _record_error(self, source: str, exc: Exception) -> None:
+        self._stats[source]["last_error"] = f"{type(exc).__name__}: {exc}"
+        logger.warning("CDC stream for %s failed, resuming from checkpoint: %s", source, exc)
+
+    async def _resync(self, source: str) -> None:
+        """Close the gap a lost resume token leaves in the serving fact tables"""
+        if source == "data_lake_serving":
+            try:
+                await ClickHouseAnalytics(self.client).mirror(self.db)
+            except Exception as exc:
+                logger.warning("CDC resync of serving facts failed: %s", exc)
+
+    async def _tail(self, source: str) -> None:
+        stats = self._stats[source]
+        checkpoint = await self.db[CHECKPOINTS_COLLECTION].find_one({"_id": source})
+
+        async with self.db[source].watch(
+            full_document="updateLookup",
+            resume_after=checkpoint.get("resume_token") if checkpoint else None,
+            batch_size=self.batch_size,
+            max_await_time_ms=int(self.flush_interval * 1000),
+        ) as stream:
+            stats["state"] = "streaming"
+            batch: List[Dict[str, Any]] = []
+            deadline = time.monotonic() + self.flush_interval
+
+            while stream.alive:
+                change = await stream.try_next()
+                if change is not None and change["operationType"] == "invalidate":
+                    # Collection dropped or renamed: its old token can't be resumed
+                    await self._write(source, batch)
+                    await self.db[CHECKPOINTS_COLLECTION].delete_one({"_id": source})
+                    return
+                if change is not None:
+                    batch.append(change)
+                    if len(batch) < self.batch_size and time.monotonic() < deadline:
+                        continue
+                elif not batch:
+                    stats["lag_seconds"] = 0.0
+                    deadline = time.monotonic() + self.flush_interval
+                    continue
+
+                await self._write(source, batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    async def _write(self, source: str, batch: List[Dict[str, Any]]) -> None:
+        """Write a batch to ClickHouse, then checkpoint its last resume token"""
+        if not batch:
+            return
+        stats = self._stats[source]
+        started = time.monotonic()
+
+        written = 0
+        for table, rows in change_rows(source, batch).items():
+            await self.client.insert_json_each_row(table, rows)
+            written += len(rows)
+
+        last = batch[-1]
+        now = datetime.now(timezone.utc)
+        await self.db[CHECKPOINTS_COLLECTION].update_one(
+            {"_id": source},
+            {"$set": {"resume_token": last["_id"], "version": change_version(last), "updated_at": now}},
+            upsert=True,
+        )
+
+        stats["changes"] += len(batch)
+        stats["rows_written"] += written
+        stats["batches"] += 1
+        stats["last_batch_ms"] = round((time.monotonic() - started) * 1000, 1)
+        stats["lag_seconds"] = round(max((now - change_time(last)).total_seconds(), 0.0), 3)
+        stats["checkpoint_at"] = now.isoformat()
+        stats["last_error"] = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.is_running,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "sources": {source: dict(stats) for source, stats in self._stats.items()},
+        }
+
+
+# Global CDC streamer instance
+cdc_streamer = CDCStreamer()
@@ -1,18 +1,53 @@
 """
 ClickHouse client for the data lake microservice.
-Uses HTTP interface via requests.
+Async HTTP interface over a pooled keep-alive session, with a per-table
+insert buffer that ships gzip-compressed JSONEachRow batches.
 """
-from typing import Any, Dict, Iterable, List, Optional
-import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import gzip
 import json
+import logging
+import time
+
+import httpx
 
-import requests
+from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+RETRY_STATUSES = {502, 503, 504}
+MAX_ATTEMPTS = 3
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def format_param(value: Any) -> str:
+    """Value of a {name:Type} query parameter in ClickHouse's text format"""
+    if isinstance(value, (list, tuple, set)):
+        return "[" + ",".join(
+            "'" + _escape(str(item)).replace("'", "\\'") + "'" if isinstance(item, str) else format_param(item)
+            for item in value
+        ) + "]"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if hasattr(value, "isoformat"):
+        return value.isoformat(sep=" ") if hasattr(value, "hour") else value.isoformat()
+    return _escape(str(value))
+
 
 class ClickHouseClient:
-    """Simple ClickHouse HTTP client for query and DDL execution."""
+    """
+    Async ClickHouse HTTP client for queries, DDL and inserts.
+
+    One instance per server/database is shared through ClickHouseClient.get(),
+    so requests reuse pooled connections. Rows written through `buffer` are
+    batched per table (see InsertBuffer).
+    """
+
+    _instances: Dict[Tuple[str, str, Optional[str]], "ClickHouseClient"] = {}
 
     def __init__(
         self,
@@ -20,91 +55,272 @@ class ClickHouseClient:
         database: str,
         user: Optional[str] = None,
         password: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        timeout: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
     ):
         self.base_url = base_url.rstrip("/")
         self.database = database
         self.user = user
         self.password = password
+        max_connections = max_connections or settings.CLICKHOUSE_MAX_CONNECTIONS
+        self._client = httpx.AsyncClient(
+            timeout=timeout or settings.CLICKHOUSE_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            auth=(user, password or "") if user else None,
+            transport=transport,
+        )
+        self.buffer = InsertBuffer(self)
+
+    @classmethod
+    def get(
+        cls,
+        base_url: str,
+        database: str,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+    ) -> "ClickHouseClient":
+        """Shared client for this server, database and user (created on first use)"""
+        key = (base_url.rstrip("/"), database, user)
+        client = cls._instances.get(key)
+        if client is None or client._client.is_closed:
+            client = cls(base_url, database, user=user, password=password)
+            cls._instances[key] = client
+        return client
+
+    @classmethod
+    async def close_all(cls) -> None:
+        instances, cls._instances = list(cls._instances.values()), {}
+        for client in instances:
+            await client.close()
+
+    async def close(self) -> None:
+        """Flush buffered rows, then release pooled connections"""
+        await self.buffer.stop()
+        await self._client.aclose()
 
-    def _request(self, sql: str) -> str:
+    async def _request(
+        self,
+        sql: str,
+        data: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        query_params: Optional[Dict[str, Any]] = None,
+    ) -> str:
         params = {"database": self.database, "query": sql}
-        auth = (self.user, self.password) if self.user else None
-        response = requests.post(self.base_url, params=params, timeout=10, auth=auth)
-        response.raise_for_status()
-        return response.text
+        # Bound server-side as {name:Type}, never interpolated into the SQL
+        for name, value in (query_params or {}).items():
+            params[f"param_{name}"] = format_param(value)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                response = await self._client.post(self.base_url, params=params, content=data, headers=headers)
+            except (httpx.ConnectError, httpx.ReadTimeout, httpx.RemoteProtocolError):
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                await asyncio.sleep(0.2 * 2 ** (attempt - 1))
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < MAX_ATTEMPTS:
+                await asyncio.sleep(0.2 * 2 ** (attempt - 1))
+                continue
+            response.raise_for_status()
+            return response.text
 
-    def execute(self, sql: str) -> None:
+    async def execute(self, sql: str) -> None:
         """Execute DDL/DML statements."""
-        self._request(sql)
+        await self._request(sql)
 
-    def query_json(self, sql: str) -> List[Dict[str, Any]]:
-        """Query ClickHouse and return JSON rows."""
+    async def query_json(self, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Query ClickHouse and return JSON rows; params fill {name:Type} placeholders."""
         query = f"{sql} FORMAT JSON"
-        response = self._request(query)
+        response = await self._request(query, query_params=params)
         data = json.loads(response)
         return data.get("data", [])
 
-    def ping(self) -> bool:
+    async def ping(self) -> bool:
         try:
-            self._request("SELECT 1")
+            await self._request("SELECT 1")
             return True
         except Exception as exc:
             logger.warning("ClickHouse ping failed: %s", exc)
             return False
 
-    def insert_json_each_row(self, table: str, rows: Iterable[Dict[str, Any]]) -> None:
-        payload = "\n".join(json.dumps(row) for row in rows)
+    async def insert_json_each_row(self, table: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """Insert rows right away as one gzip-compressed JSONEachRow batch; returns bytes sent"""
+        payload = "\n".join(json.dumps(row, default=str) for row in rows)
         if not payload:
-            return
-        sql = f"INSERT INTO {table} FORMAT JSONEachRow"
-        params = {"database": self.database, "query": sql}
-        auth = (self.user, self.password) if self.user else None
-        response = requests.post(
-            self.base_url,
-            params=params,
-            data=payload,
-            timeout=10,
-            auth=auth,
-        )
-        response.raise_for_status()
-
-    def ensure_tables(self) -> None:
-        """Ensure core data lake tables exist."""
-        self.execute(
-            """
-            CREATE TABLE IF NOT EXISTS raw_events (
-                source String,
-                entity_type String,
-                source_id String,
-                payload JSON,
-                ingested_at DateTime
-            )
-            ENGINE = MergeTree
-            ORDER BY (entity_type, source_id, ingested_at)
-            """
-        )
-        self.execute(
-            """
-            CREATE TABLE IF NOT EXISTS canonical_records (
-                canonical_id String,
-                entity_type String,
-                payload JSON,
-                quality_score Float64,
-                validated_at DateTime
-            )
-            ENGINE = MergeTree
-            ORDER BY (entity_type, canonical_id, validated_at)
-            """
-        )
-        self.execute(
-            """
-            CREATE TABLE IF NOT EXISTS serving_views (
-                view_id String,
-                entity_type String,
-                payload JSON,
-                refreshed_at DateTime
-            )
-            ENGINE = MergeTree
-            ORDER BY (entity_type, view_id, refreshed_at)
-            """
+            return 0
+        body = gzip.compress(payload.encode(), compresslevel=settings.CLICKHOUSE_GZIP_LEVEL)
+        await self._request(
+            f"INSERT INTO {table} FORMAT JSONEachRow",
+            data=body,
+            headers={"Content-Encoding": "gzip", "Content-Type": "application/x-ndjson"},
         )
+        return len(body)
+
+
+class InsertBuffer:
+    """
+    Rows accumulated per table and shipped as one compressed insert.
+
+    - insert() returns a future acknowledging the row once its batch is
+      written (or failed); callers may await it or move on
+    - A table flushes when it holds flush_rows rows, and every
+      flush_interval seconds otherwise
+    - When max_buffered rows are waiting (ClickHouse slower than the
+      ingest rate), insert() blocks until a flush frees room instead of
+      growing memory without bound
+    """
+
+    def __init__(
+        self,
+        client: ClickHouseClient,
+        flush_rows: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_buffered: Optional[int] = None,
+    ):
+        self.client = client
+        self.flush_rows = flush_rows or settings.CLICKHOUSE_FLUSH_ROWS
+        self.flush_interval = flush_interval or settings.CLICKHOUSE_FLUSH_INTERVAL_SECONDS
+        self.max_buffered = max_buffered or settings.CLICKHOUSE_MAX_BUFFERED_ROWS
+        self._tables: Dict[str, List[Tuple[Dict[str, Any], asyncio.Future]]] = {}
+        self._buffered = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._room: Optional[asyncio.Condition] = None
+        self._closing = False
+        self._stats = {
+            "rows_buffered": 0,
+            "rows_written": 0,
+            "rows_failed": 0,
+            "flushes": 0,
+            "bytes_sent": 0,
+            "backpressure_waits": 0,
+            "backpressure_ms": 0.0,
+            "last_flush_ms": None,
+            "last_error": None,
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _ensure_started(self) -> None:
+        if not self.is_running:
+            self._wakeup = asyncio.Event()
+            self._room = asyncio.Condition()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def insert(self, table: str, row: Dict[str, Any]) -> asyncio.Future:
+        """Buffer one row; the returned future resolves when it is written"""
+        self._ensure_started()
+
+        if self._buffered >= self.max_buffered:
+            started = time.monotonic()
+            self._stats["backpressure_waits"] += 1
+            self._wakeup.set()
+            async with self._room:
+                await self._room.wait_for(lambda: self._buffered < self.max_buffered)
+            self._stats["backpressure_ms"] += round((time.monotonic() - started) * 1000, 1)
+
+        future = asyncio.get_running_loop().create_future()
+        rows = self._tables.setdefault(table, [])
+        rows.append((row, future))
+        self._buffered += 1
+        self._stats["rows_buffered"] += 1
+
+        if len(rows) >= self.flush_rows:
+            self._wakeup.set()
+        return future
+
+    async def insert_many(self, table: str, rows: Iterable[Dict[str, Any]]) -> List[asyncio.Future]:
+        return [await self.insert(table, row) for row in rows]
+
+    async def flush(self, force: bool = True) -> int:
+        """Ship buffered tables (only full ones unless force); returns rows written"""
+        written = 0
+        for table in list(self._tables):
+            batch = self._tables.get(table) or []
+            if not batch or (not force and len(batch) < self.flush_rows):
+                continue
+            self._tables[table] = batch[self.flush_rows:]
+            batch = batch[:self.flush_rows]
+            written += await self._ship(table, batch)
+        return written
+
+    async def _ship(self, table: str, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> int:
+        started = time.monotonic()
+        try:
+            sent = await self.client.insert_json_each_row(table, [row for row, _ in batch])
+        except Exception as exc:
+            self._stats["rows_failed"] += len(batch)
+            self._stats["last_error"] = f"{type(exc).__name__}: {exc}"
+            logger.warning("ClickHouse insert of %d rows into %s failed: %s", len(batch), table, exc)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+                    # Fire-and-forget callers never retrieve it
+                    future.exception()
+            return 0
+        finally:
+            await self._release(len(batch))
+
+        self._stats["rows_written"] += len(batch)
+        self._stats["bytes_sent"] += sent
+        self._stats["flushes"] += 1
+        self._stats["last_flush_ms"] = round((time.monotonic() - started) * 1000, 1)
+        for _, future in batch:
+            if not future.done():
+                future.set_result(True)
+        return len(batch)
+
+    async def _release(self, count: int) -> None:
+        self._buffered -= count
+        if self._room is not None:
+            async with self._room:
+                self._room.notify_all()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                timed_out = False
+            except asyncio.TimeoutError:
+                timed_out = True
+            self._wakeup.clear()
+
+            try:
+                # Full tables on wakeup, everything when the interval is up
+                force = timed_out or self._buffered >= self.max_buffered
+                while self._buffered and await self.flush(force=force):
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error("ClickHouse buffer flush failed: %s", exc)
+
+            if self._closing:
+                return
+
+    async def stop(self) -> None:
+        """Stop the flush task and write whatever is still buffered"""
+        if self._task:
+            # Let an in-progress insert finish rather than cancel it mid-request
+            self._closing = True
+            self._wakeup.set()
+            try:
+                await self._task
+            finally:
+                self._task = None
+                self._closing = False
+        while self._buffered:
+            await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "buffered": self._buffered,
+            "tables": {table: len(rows) for table, rows in self._tables.items() if rows},
+            "flush_rows": self.flush_rows,
+            "flush_interval": self.flush_interval,
+            "max_buffered": self.max_buffered,
+            "running": self.is_running,
+        }
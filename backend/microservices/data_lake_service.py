@@ -4,83 +4,130 @@ Handles raw, canonical, and serving layer operations.
 """
 from typing import Any, Dict, Optional
 from datetime import datetime, timezone
+import asyncio
 import logging
 
+from core.config import settings
+
 from .clickhouse_client import ClickHouseClient
+from .migrations import apply_migrations
 
 logger = logging.getLogger(__name__)
 
 
 class DataLakeService:
-    """Encapsulates data lake operations against ClickHouse."""
+    """
+    Encapsulates data lake operations against ClickHouse.
+
+    Writes go through the client's insert buffer and return a future that
+    resolves once the row is stored. One instance serves the process: start()
+    applies schema migrations once (from lifespan) and instance() returns it.
+    """
+
+    _instance: Optional["DataLakeService"] = None
+    _starting: Optional[asyncio.Lock] = None
 
     def __init__(self, client: ClickHouseClient):
         self.client = client
-        self.client.ensure_tables()
 
-    def health(self) -> Dict[str, Any]:
-        return {"clickhouse": "connected" if self.client.ping() else "unavailable"}
+    @classmethod
+    def instance(cls) -> Optional["DataLakeService"]:
+        return cls._instance
+
+    @classmethod
+    async def start(cls) -> Optional["DataLakeService"]:
+        """Connect and migrate once; None when ClickHouse is not configured or unreachable"""
+        if cls._instance is not None:
+            return cls._instance
+        if not settings.CLICKHOUSE_URL:
+            return None
+
+        if cls._starting is None:
+            cls._starting = asyncio.Lock()
+        async with cls._starting:
+            if cls._instance is None:
+                client = ClickHouseClient.get(
+                    settings.CLICKHOUSE_URL,
+                    settings.CLICKHOUSE_DATABASE,
+                    user=settings.CLICKHOUSE_USER,
+                    password=settings.CLICKHOUSE_PASSWORD,
+                )
+                try:
+                    applied = await apply_migrations(client)
+                except Exception as exc:
+                    logger.warning("ClickHouse data lake unavailable: %s", exc)
+                    return None
+                logger.info("ClickHouse data lake ready (migrations applied: %s)", applied or "none")
+                cls._instance = cls(client)
+        return cls._instance
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Flush buffered rows and release the client"""
+        service, cls._instance = cls._instance, None
+        if service is not None:
+            await service.client.close()
+
+    async def health(self) -> Dict[str, Any]:
+        return {
+            "clickhouse": "connected" if await self.client.ping() else "unavailable",
+            "insert_buffer": self.client.buffer.get_stats(),
+        }
 
-    def ingest_raw(
+    async def ingest_raw(
         self,
         source: str,
         entity_type: str,
         source_id: str,
         payload: Dict[str, Any],
         ingested_at: Optional[datetime] = None,
-    ) -> None:
+    ) -> asyncio.Future:
         timestamp = ingested_at or datetime.now(timezone.utc)
-        self.client.insert_json_each_row(
+        return await self.client.buffer.insert(
             "raw_events",
-            [
-                {
-                    "source": source,
-                    "entity_type": entity_type,
-                    "source_id": source_id,
-                    "payload": payload,
-                    "ingested_at": timestamp.isoformat(),
-                }
-            ],
+            {
+                "source": source,
+                "entity_type": entity_type,
+                "source_id": source_id,
+                "payload": payload,
+                "ingested_at": timestamp.isoformat(),
+            },
         )
 
-    def upsert_canonical(
+    async def upsert_canonical(
         self,
         canonical_id: str,
         entity_type: str,
         payload: Dict[str, Any],
         quality_score: float = 1.0,
         validated_at: Optional[datetime] = None,
-    ) -> None:
+    ) -> asyncio.Future:
         timestamp = validated_at or datetime.now(timezone.utc)
-        self.client.insert_json_each_row(
+        return await self.client.buffer.insert(
             "canonical_records",
-            [
-                {
-                    "canonical_id": canonical_id,
-                    "entity_type": entity_type,
-                    "payload": payload,
-                    "quality_score": quality_score,
-                    "validated_at": timestamp.isoformat(),
-                }
-            ],
+            {
+                "canonical_id": canonical_id,
+                "entity_type": entity_type,
+                "payload": payload,
+                "quality_score": quality_score,
+                "validated_at": timestamp.isoformat(),
+            },
         )
 
-    def publish_serving_view(
+    async def publish_serving_view(
         self,
         view_id: str,
         entity_type: str,
         payload: Dict[str, Any],
         refreshed_at: Optional[datetime] = None,
-    ) -> None:
+    ) -> asyncio.Future:
         timestamp = refreshed_at or datetime.now(timezone.utc)
-        self.client.insert_json_each_row(
+        return await self.client.buffer.insert(
             "serving_views",
-            [
-                {
-                    "view_id": view_id,
-                    "entity_type": entity_type,
-                    "payload": payload,
-                    "refreshed_at": timestamp.isoformat(),
-                }
-            ],
+            {
+                "view_id": view_id,
+                "entity_type": entity_type,
+                "payload": payload,
+                "refreshed_at": timestamp.isoformat(),
+            },
         )
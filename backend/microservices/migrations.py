@@ -0,0 +1,170 @@
+"""
+Versioned ClickHouse schema migrations for the data lake microservice.
+Applied once at startup; each applied version is recorded in
+schema_migrations so later starts only run what is new.
+"""
+from typing import List, Set, Tuple
+from datetime import datetime, timezone
+import logging
+
+from .clickhouse_client import ClickHouseClient
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+# (version, name, statements) in ascending version order. Statements must be
+# idempotent (IF NOT EXISTS): two processes starting together may both run a
+# version before either records it.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (
+        1,
+        "core_data_lake_tables",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS raw_events (
+                source String,
+                entity_type String,
+                source_id String,
+                payload JSON,
+                ingested_at DateTime
+            )
+            ENGINE = MergeTree
+            ORDER BY (entity_type, source_id, ingested_at)
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS canonical_records (
+                canonical_id String,
+                entity_type String,
+                payload JSON,
+                quality_score Float64,
+                validated_at DateTime
+            )
+            ENGINE = MergeTree
+            ORDER BY (entity_type, canonical_id, validated_at)
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS serving_views (
+                view_id String,
+                entity_type String,
+                payload JSON,
+                refreshed_at DateTime
+            )
+            ENGINE = MergeTree
+            ORDER BY (entity_type, view_id, refreshed_at)
+            """,
+        ],
+    ),
+    (
+        2,
+        "analytics_fact_tables",
+        [
+            # Latest version per record wins (queries read with FINAL)
+            """
+            CREATE TABLE IF NOT EXISTS opportunity_facts (
+                id String,
+                stage LowCardinality(String),
+                stage_name String,
+                value Float64,
+                probability Float64,
+                salesperson_id Int64,
+                salesperson_name String,
+                close_date Nullable(Date),
+                access_keys Array(String),
+                is_active UInt8,
+                updated_at DateTime64(3, 'UTC')
+            )
+            ENGINE = ReplacingMergeTree(updated_at)
+            ORDER BY id
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS activity_facts (
+                id String,
+                activity_type LowCardinality(String),
+                state LowCardinality(String),
+                user_id Int64,
+                user_name String,
+                due_date Nullable(Date),
+                is_active UInt8,
+                updated_at DateTime64(3, 'UTC')
+            )
+            ENGINE = ReplacingMergeTree(updated_at)
+            ORDER BY id
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS invoice_facts (
+                id String,
+                move_type LowCardinality(String),
+                state LowCardinality(String),
+                payment_status LowCardinality(String),
+                total_amount Float64,
+                amount_due Float64,
+                invoice_date Nullable(Date),
+                is_active UInt8,
+                updated_at DateTime64(3, 'UTC')
+            )
+            ENGINE = ReplacingMergeTree(updated_at)
+            ORDER BY id
+            """,
+        ],
+    ),
+    (
+        3,
+        "cdc_documents",
+        [
+            # version is the change's cluster time, so replayed changes collapse
+            """
+            CREATE TABLE IF NOT EXISTS cdc_documents (
+                source LowCardinality(String),
+                doc_id String,
+                entity_type LowCardinality(String),
+                operation LowCardinality(String),
+                payload String,
+                is_deleted UInt8,
+                version UInt64,
+                changed_at DateTime64(3, 'UTC')
+            )
+            ENGINE = ReplacingMergeTree(version)
+            ORDER BY (source, doc_id)
+            """,
+        ],
+    ),
+]
+
+
+async def applied_versions(client: ClickHouseClient) -> Set[int]:
+    await client.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            version UInt32,
+            name String,
+            applied_at DateTime
+        )
+        ENGINE = ReplacingMergeTree
+        ORDER BY version
+        """
+    )
+    rows = await client.query_json(f"SELECT DISTINCT version FROM {MIGRATIONS_TABLE}")
+    return {int(row["version"]) for row in rows}
+
+
+async def apply_migrations(client: ClickHouseClient) -> List[int]:
+    """Run migrations not yet recorded, in order; returns the versions applied"""
+    done = await applied_versions(client)
+    applied = []
+    for version, name, statements in MIGRATIONS:
+        if version in done:
+            continue
+        logger.info("Applying ClickHouse migration %d (%s)", version, name)
+        for statement in statements:
+            await client.execute(statement)
+        await client.insert_json_each_row(
+            MIGRATIONS_TABLE,
+            [{
+                "version": version,
+                "name": name,
+                "applied_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            }],
+        )
+        applied.append(version)
+    return applied
@@ -17,15 +17,24 @@ class StreamingService:
     def __init__(self, data_lake: DataLakeService):
         self.data_lake = data_lake
 
-    def ingest_event(self, source: str, entity_type: str, payload: Dict[str, Any]) -> str:
+    async def ingest_event(
+        self,
+        source: str,
+        entity_type: str,
+        payload: Dict[str, Any],
+        wait: bool = False,
+    ) -> str:
+        """Buffer an event for ClickHouse; with wait, return only once it is stored"""
         source_id = payload.get("id") or payload.get("source_id") or str(uuid.uuid4())
         ingested_at = datetime.now(timezone.utc)
-        self.data_lake.ingest_raw(
+        ack = await self.data_lake.ingest_raw(
             source=source,
             entity_type=entity_type,
             source_id=source_id,
             payload=payload,
             ingested_at=ingested_at,
         )
-        logger.info("Ingested raw event %s/%s", entity_type, source_id)
+        if wait:
+            await ack
+        logger.debug("Ingested raw event %s/%s", entity_type, source_id)
         return source_id
@@ -12,9 +12,14 @@ import time
 import uuid
 
 from services.logging.system_logger import system_logger
+from services.logging.metrics import request_metrics
+from core.config import settings
+from core.db_monitor import QueryBudget, RequestDBStats, current_request_db_stats
 
 logger = logging.getLogger(__name__)
 
+query_budget = QueryBudget(settings.DB_QUERY_BUDGET, settings.DB_QUERY_BUDGETS)
+
 
 async def error_handler_middleware(request: Request, call_next):
     """
@@ -27,10 +32,21 @@ async def error_handler_middleware(request: Request, call_next):
     
     start_time = time.time()
     
+    # Collect the Mongo commands issued by this request
+    db_stats = RequestDBStats()
+    db_stats_token = current_request_db_stats.set(db_stats)
+    
     try:
         response = await call_next(request)
         duration_ms = (time.time() - start_time) * 1000
         
+        _check_db_usage(request, db_stats)
+        _record_metrics(request, response.status_code, duration_ms)
+        
+        if settings.ENVIRONMENT == "development":
+            response.headers['X-DB-Calls'] = str(db_stats.calls)
+            response.headers['X-DB-Time'] = f"{db_stats.time_ms:.1f}ms"
+        
         # Log API call (non-blocking)
         try:
             user_id = getattr(request.state, 'user_id', None)
@@ -54,6 +70,9 @@ async def error_handler_middleware(request: Request, call_next):
     except Exception as exc:
         duration_ms = (time.time() - start_time) * 1000
         
+        _check_db_usage(request, db_stats)
+        _record_metrics(request, status.HTTP_500_INTERNAL_SERVER_ERROR, duration_ms)
+        
         # Get user ID if available
         user_id = getattr(request.state, 'user_id', None)
         
@@ -89,11 +108,40 @@ async def error_handler_middleware(request: Request, call_next):
             content={
                 "detail": "Internal server error",
                 "error_id": session_id,
-                "message": str(exc),
                 "session_id": session_id
             },
             headers={'X-Session-ID': session_id}
         )
+    
+    finally:
+        current_request_db_stats.reset(db_stats_token)
+
+
+def _check_db_usage(request: Request, db_stats: RequestDBStats):
+    """Expose the request's Mongo usage to metrics and enforce the query budget"""
+    request.state.db_stats = db_stats.to_dict()
+    
+    route = request.scope.get("route")
+    if route is not None:
+        query_budget.check(request.method, route.path, db_stats)
+
+
+def _record_metrics(request: Request, status_code: int, duration_ms: float):
+    """Feed the in-process latency histograms, keyed by route template"""
+    try:
+        route = request.scope.get("route")
+        db_stats = getattr(request.state, "db_stats", None) or {}
+        
+        request_metrics.observe_request(
+            method=request.method,
+            route=getattr(route, "path", None),
+            status_code=status_code,
+            duration_ms=duration_ms,
+            db_calls=db_stats.get("calls", 0),
+            db_time_ms=db_stats.get("time_ms", 0.0)
+        )
+    except Exception as metrics_error:
+        logger.warning(f"Failed to record request metrics: {metrics_error}")
 
 
 def http_exception_handler(request: Request, exc: StarletteHTTPException):
@@ -19,7 +19,7 @@ from models.rbac import (
     DepartmentCreateRequest
 )
 from services.rbac.service import RBACService
-from services.auth.jwt_handler import get_current_user_from_token, hash_password
+from services.auth.jwt_handler import get_current_user_from_token, hash_password_async
 from core.database import Database
 
 logger = logging.getLogger(__name__)
@@ -370,7 +370,7 @@ async def create_user(
         "id": str(__import__("uuid").uuid4()),
         "email": request.email,
         "name": request.name,
-        "password_hash": hash_password(request.password) if request.password else "",
+        "password_hash": await hash_password_async(request.password) if request.password else "",
         "role_id": request.role_id,
         "department_id": request.department_id,
         "is_super_admin": request.is_super_admin,
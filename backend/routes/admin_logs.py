@@ -11,6 +11,8 @@ from core.database import Database
 from models.base import UserRole
 from services.auth.jwt_handler import require_role
 from services.logging.system_logger import system_logger
+from services.logging.log_shipper import log_shipper
+from services.logging.metrics import request_metrics
 
 router = APIRouter(prefix="/admin/logs", tags=["Admin Logs"])
 logger = logging.getLogger(__name__)
@@ -190,17 +192,17 @@ async def get_api_call_logs(
         {"_id": 0}
     ).sort("timestamp", -1).limit(limit).to_list(limit)
     
-    # Stats
-    total = await db.api_call_logs.count_documents(query)
-    avg_duration = await db.api_call_logs.aggregate([
+    # Count and average latency of the filtered logs in one pass (the count
+    # alone would read the same documents)
+    stats = await db.api_call_logs.aggregate([
         {"$match": query},
-        {"$group": {"_id": None, "avg": {"$avg": "$duration_ms"}}}
+        {"$group": {"_id": None, "total": {"$sum": 1}, "avg": {"$avg": "$duration_ms"}}}
     ]).to_list(1)
     
     return {
         "logs": logs,
-        "total": total,
-        "average_duration_ms": avg_duration[0]["avg"] if avg_duration else 0,
+        "total": stats[0]["total"] if stats else 0,
+        "average_duration_ms": (stats[0]["avg"] or 0) if stats else 0,
         "showing": len(logs)
     }
 
@@ -224,12 +226,8 @@ async def get_log_stats(
         "resolved": False
     })
     
-    # API call stats
-    total_api_calls = await db.api_call_logs.count_documents({"timestamp": {"$gte": since}})
-    failed_api_calls = await db.api_call_logs.count_documents({
-        "timestamp": {"$gte": since},
-        "is_error": True
-    })
+    # API call stats (in-process per-minute counters)
+    api_calls = request_metrics.totals_since(since)
     
     # Session stats
     unique_sessions = len(await db.api_call_logs.distinct("session_id", {"timestamp": {"$gte": since}}))
@@ -242,18 +240,39 @@ async def get_log_stats(
             "unresolved": unresolved_errors,
             "resolved": total_errors - unresolved_errors
         },
-        "api_calls": {
-            "total": total_api_calls,
-            "failed": failed_api_calls,
-            "success": total_api_calls - failed_api_calls,
-            "success_rate": ((total_api_calls - failed_api_calls) / total_api_calls * 100) if total_api_calls > 0 else 100
-        },
+        "api_calls": api_calls,
         "sessions": {
             "unique": unique_sessions
         }
     }
 
 
+@router.get("/latency")
+async def get_route_latency(
+    route: Optional[str] = None,
+    token_data: dict = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """
+    Get per-route latency percentiles.
+    p50/p95/p99, status and DB-call counts per route template since process start.
+    """
+    return {
+        "since": request_metrics.started_at.isoformat(),
+        "routes": request_metrics.route_summary(route)
+    }
+
+
+@router.get("/shipper")
+async def get_log_shipper_stats(
+    token_data: dict = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """
+    Get API call log shipper stats.
+    Buffered, written and dropped counts for the background log writer.
+    """
+    return log_shipper.get_stats()
+
+
 def calculate_session_duration(logs: List) -> Optional[float]:
     """Calculate session duration from logs"""
     if not logs:
@@ -15,9 +15,10 @@ from models.base import (
     UserCreate, UserLogin, UserResponse, TokenResponse, UserRole
 )
 from services.auth.jwt_handler import (
-    hash_password, verify_password, create_access_token,
+    verify_password_async, create_access_token,
     get_current_user_from_token, require_role
 )
+from services.auth.password_hasher import HasherBusyError
 from core.database import Database
 
 logger = logging.getLogger(__name__)
@@ -53,7 +54,23 @@ async def login(credentials: UserLogin):
             detail="Invalid credentials"
         )
     
-    if not verify_password(credentials.password, user["password_hash"]):
+    # SSO-only users have no local password
+    if not user.get("password_hash"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid credentials"
+        )
+    
+    try:
+        valid, new_hash = await verify_password_async(credentials.password, user["password_hash"])
+    except HasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, please retry",
+            headers={"Retry-After": "1"}
+        )
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -65,6 +82,14 @@ async def login(credentials: UserLogin):
             detail="Account is disabled"
         )
     
+    # Transparently upgrade legacy (sha256_crypt) hashes to the current scheme
+    if new_hash:
+        await db.users.update_one(
+            {"id": user["id"]},
+            {"$set": {"password_hash": new_hash, "updated_at": datetime.now(timezone.utc)}}
+        )
+        logger.info(f"Upgraded password hash scheme for user {user['id']}")
+    
     # Get role name - lookup from role_id if needed
     user_role = user.get("role")
     role_name = None
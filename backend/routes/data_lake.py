@@ -12,6 +12,7 @@ from services.data_lake.manager import DataLakeManager
 from services.auth.jwt_handler import get_current_user_from_token, require_role
 from middleware.rbac import require_permission, require_approved
 from core.database import Database
+from data_lake.retention import RetentionManager, RetentionPolicy, DEFAULT_POLICY
 
 router = APIRouter(prefix="/data-lake", tags=["Data Lake"])
 
@@ -98,3 +99,64 @@ async def get_serving_by_entity(
         "count": len(records),
         "data": [r.get("data", {}) for r in records]
     }
+
+
+# ===================== RETENTION =====================
+
+@router.get("/retention")
+async def get_retention_overview(
+    token_data: dict = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """Retention policies, storage per raw collection and storage reclaimed so far"""
+    retention = RetentionManager(Database.get_db())
+    return {
+        "default_policy": DEFAULT_POLICY.model_dump(),
+        "policies": [p.model_dump() for p in await retention.get_policies()],
+        "storage": await retention.get_storage_stats(),
+        "reclaimed": await retention.get_reclaimed_totals(),
+        "last_runs": await retention.get_runs(limit=5),
+    }
+
+
+@router.put("/retention/policies")
+async def set_retention_policy(
+    policy: RetentionPolicy,
+    token_data: dict = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """Create or replace the retention policy for a source/entity ("*" matches any)"""
+    retention = RetentionManager(Database.get_db())
+    await retention.set_policy(policy, updated_by=token_data.get("id"))
+    return {"success": True, "policy": policy.model_dump()}
+
+
+@router.delete("/retention/policies/{source}/{entity_type}")
+async def delete_retention_policy(
+    source: str,
+    entity_type: str,
+    token_data: dict = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """Remove a retention policy (the next most specific one applies)"""
+    retention = RetentionManager(Database.get_db())
+    if not await retention.delete_policy(source, entity_type):
+        raise HTTPException(status_code=404, detail="Retention policy not found")
+    return {"success": True}
+
+
+@router.post("/retention/run")
+async def run_retention(
+    dry_run: bool = True,
+    token_data: dict = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """Apply retention now (dry run by default: reports what would be reclaimed)"""
+    retention = RetentionManager(Database.get_db())
+    return await retention.run(dry_run=dry_run, triggered_by=token_data.get("id", "manual"))
+
+
+@router.get("/retention/runs")
+async def get_retention_runs(
+    limit: int = Query(default=20, le=100),
+    token_data: dict = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """Past retention runs with versions expired and bytes reclaimed per collection"""
+    retention = RetentionManager(Database.get_db())
+    return {"runs": await retention.get_runs(limit=limit)}
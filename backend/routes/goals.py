@@ -10,6 +10,7 @@ import uuid
 
 from core.database import Database
 from services.auth.jwt_handler import get_current_user_from_token
+from services.reporting.goal_progress import MANUAL_SOURCE, GoalProgressEngine
 
 router = APIRouter(prefix="/goals", tags=["Goals"])
 
@@ -143,6 +144,7 @@ async def create_goal(
     
     await db.goals.insert_one(goal_doc)
     del goal_doc["_id"]
+    await GoalProgressEngine(db).recount()
     
     return {"message": "Goal created successfully", "goal": goal_doc}
 
@@ -165,9 +167,18 @@ async def update_goal(
     if not update_data:
         raise HTTPException(status_code=400, detail="No updates provided")
     
+    # The edit form always resends current_value; only a changed value
+    # takes the goal off automatic progress tracking
+    if "current_value" in update_data:
+        if update_data["current_value"] == existing.get("current_value"):
+            del update_data["current_value"]
+        else:
+            update_data["progress_source"] = MANUAL_SOURCE
+    
     update_data["updated_at"] = datetime.now(timezone.utc)
     
     await db.goals.update_one({"id": goal_id}, {"$set": update_data})
+    await GoalProgressEngine(db).recount()
     
     return {"message": "Goal updated successfully"}
 
@@ -188,6 +199,7 @@ async def delete_goal(
         {"id": goal_id},
         {"$set": {"is_active": False, "deleted_at": datetime.now(timezone.utc)}}
     )
+    await GoalProgressEngine(db).recount()
     
     return {"message": "Goal deleted successfully"}
 
@@ -209,9 +221,11 @@ async def update_goal_progress(
         {"id": goal_id},
         {"$set": {
             "current_value": current_value,
+            "progress_source": MANUAL_SOURCE,
             "updated_at": datetime.now(timezone.utc)
         }}
     )
+    await GoalProgressEngine(db).recount()
     
 
 
@@ -303,6 +317,8 @@ async def assign_goal_to_team(
         await db.goals.insert_one(team_goal)
         created_goals.append(team_goal["id"])
     
+    await GoalProgressEngine(db).recount()
+    
     return {
         "message": f"Goal assigned to {len(team_member_ids)} team members",
         "created_goal_ids": created_goals
@@ -327,83 +343,8 @@ async def get_goals_summary(
 ):
     """
     Get summary statistics for all goals.
-    If no goals exist, auto-populate current_value from actual opportunity data.
+    Served from counters precomputed on goal writes and after each sync,
+    when revenue goals are updated from the synced opportunity data.
     """
     db = Database.get_db()
-    
-    goals = await db.goals.find({"is_active": {"$ne": False}}, {"_id": 0}).to_list(500)
-    
-    # If there are revenue goals with 0 current value, try to update from opportunities
-    for goal in goals:
-        if goal.get("goal_type") == "revenue" and goal.get("current_value", 0) == 0:
-            # Calculate actual won revenue from opportunities
-            opp_docs = await db.data_lake_serving.find({
-                "entity_type": "opportunity",
-                "$or": [
-                    {"is_active": True},
-                    {"is_active": {"$exists": False}}
-                ]
-            }).to_list(1000)
-            
-            won_revenue = 0
-            pipeline_value = 0
-            for doc in opp_docs:
-                opp = doc.get("data", {})
-                value = float(opp.get("expected_revenue", 0) or 0)
-                stage = (opp.get("stage_name") or "").lower()
-                
-                if "won" in stage:
-                    won_revenue += value
-                elif "lost" not in stage:
-                    pipeline_value += value
-            
-            # Update goal's current_value with actual data
-            if won_revenue > 0 or pipeline_value > 0:
-                # For revenue goals, use won revenue
-                new_value = won_revenue if won_revenue > 0 else pipeline_value * 0.3  # Estimate 30% close rate
-                await db.goals.update_one(
-                    {"id": goal["id"]},
-                    {"$set": {"current_value": new_value}}
-                )
-                goal["current_value"] = new_value
-    
-    total = len(goals)
-    if total == 0:
-        return {
-            "total_goals": 0,
-            "overall_progress": 0,
-            "achieved": 0,
-            "on_track": 0,
-            "at_risk": 0,
-            "behind": 0,
-        }
-    
-    achieved = 0
-    on_track = 0
-    at_risk = 0
-    behind = 0
-    total_progress = 0
-    
-    for goal in goals:
-        target = goal.get("target_value", 0)
-        current = goal.get("current_value", 0)
-        pct = (current / target * 100) if target > 0 else 0
-        total_progress += pct
-        
-        if pct >= 100:
-            achieved += 1
-        elif pct >= 70:
-            on_track += 1
-        elif pct >= 40:
-            at_risk += 1
-        else:
-            behind += 1
-    
-    return {
-        "total_goals": total,
-        "overall_progress": round(total_progress / total, 1) if total > 0 else 0,
-        "achieved": achieved,
-        "on_track": on_track,
-        "at_risk": at_risk,
-        "behind": behind,
-    }
+    return await GoalProgressEngine(db).summary()
@@ -60,7 +60,9 @@ class FieldMappingRequest(BaseModel):
 
 
 class AutoMapRequest(BaseModel):
-    entity_type: EntityType
+    entity_type: Optional[EntityType] = None
+    # Several entity types in one call (mapped with one batched AI prompt)
+    entity_types: Optional[List[EntityType]] = None
 
 
 class SyncRequest(BaseModel):
@@ -517,6 +519,8 @@ async def save_field_mappings(
         "entity_type": request.entity_type.value,
         "mappings": [m.model_dump() for m in request.mappings],
         "is_active": True,
+        # Compiled mapping plans are cached per version
+        "version": (existing.get("version") or 0) + 1 if existing else 1,
         "updated_at": now,
         "updated_by": token_data["id"]
     }
@@ -540,9 +544,18 @@ async def auto_map_fields(
     request: AutoMapRequest,
     token_data: dict = Depends(require_role([UserRole.SUPER_ADMIN, UserRole.ADMIN]))
 ):
-    """Use AI to automatically map fields"""
+    """
+    Use AI to automatically map fields. Suggestions are cached per source
+    schema, so repeating an auto-map does not call the LLM again.
+    """
     db = Database.get_db()
     
+    entity_types = list(dict.fromkeys(
+        ([request.entity_type] if request.entity_type else []) + (request.entity_types or [])
+    ))
+    if not entity_types:
+        raise HTTPException(status_code=400, detail="entity_type or entity_types is required")
+    
     # Get integration config
     intg = await db.integrations.find_one({"integration_type": integration_type.value})
     if not intg or not intg.get("config"):
@@ -551,49 +564,58 @@ async def auto_map_fields(
     config = intg["config"]
     
     # Get source fields based on integration type
-    source_fields = {}
+    sources = {entity_type: {} for entity_type in entity_types}
     
     if integration_type == IntegrationType.ODOO:
+        # Map entity type to Odoo model
+        model_map = {
+            EntityType.ACCOUNT: "res.partner",
+            EntityType.OPPORTUNITY: "crm.lead",
+            EntityType.CONTACT: "res.partner",
+            EntityType.ORDER: "sale.order",
+            EntityType.INVOICE: "account.move"
+        }
+        
+        for entity_type in entity_types:
+            if entity_type not in model_map:
+                raise HTTPException(status_code=400, detail=f"Unsupported entity type: {entity_type}")
+        
         try:
-            # Map entity type to Odoo model
-            model_map = {
-                EntityType.ACCOUNT: "res.partner",
-                EntityType.OPPORTUNITY: "crm.lead",
-                EntityType.CONTACT: "res.partner",
-                EntityType.ORDER: "sale.order",
-                EntityType.INVOICE: "account.move"
-            }
-            
-            model = model_map.get(request.entity_type)
-            if not model:
-                raise HTTPException(status_code=400, detail=f"Unsupported entity type: {request.entity_type}")
-            
             async with OdooConnector(
                 url=config["url"],
                 database=config["database"],
                 username=config["username"],
                 api_key=config["api_key"]
             ) as connector:
-                source_fields = await connector.fields_get(model)
+                # One fields_get per model (accounts and contacts share res.partner)
+                model_fields = {}
+                for entity_type in entity_types:
+                    model = model_map[entity_type]
+                    if model not in model_fields:
+                        model_fields[model] = await connector.fields_get(model)
+                    sources[entity_type] = model_fields[model]
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to get Odoo fields: {e}")
     
     # Use AI mapper
     api_key = settings.EMERGENT_LLM_KEY or settings.OPENAI_API_KEY
-    mapper = AIFieldMapper(api_key=api_key, model=settings.AI_MODEL)
+    mapper = AIFieldMapper(api_key=api_key, model=settings.AI_MODEL, db=db)
     
-    mappings = await mapper.auto_map_fields(
-        source_fields=source_fields,
-        entity_type=request.entity_type,
-        integration_type=integration_type
-    )
+    results = await mapper.auto_map_many(sources, integration_type)
     
-    return {
-        "entity_type": request.entity_type.value,
-        "suggested_mappings": [m.model_dump() for m in mappings],
-        "source_field_count": len(source_fields),
-        "mapped_count": len(mappings)
-    }
+    responses = [
+        {
+            "entity_type": entity_type.value,
+            "suggested_mappings": [m.model_dump() for m in results[entity_type]],
+            "source_field_count": len(sources[entity_type]),
+            "mapped_count": len(results[entity_type])
+        }
+        for entity_type in entity_types
+    ]
+    
+    if request.entity_types is None:
+        return responses[0]
+    return {"results": responses}
 
 
 # ===================== SYNC ROUTES =====================
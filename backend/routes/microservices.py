@@ -1,31 +1,43 @@
 """
 Microservices architecture endpoints.
 """
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 
 from core.config import settings
-from microservices.clickhouse_client import ClickHouseClient
+from core.database import Database
+from middleware.rbac import require_approved
+from microservices.analytics_engine import PERIODS, AnalyticsEngine, mirror_serving_records
+from microservices.cdc_streamer import cdc_streamer
 from microservices.data_lake_service import DataLakeService
 from microservices.streaming_service import StreamingService
+from routes.admin import require_super_admin
+from services.rbac.record_access import AccessContext
 
 router = APIRouter(prefix="/microservices", tags=["Microservices"])
 
 
-def get_clickhouse_client() -> ClickHouseClient:
-    if not settings.CLICKHOUSE_URL:
-        raise HTTPException(status_code=503, detail="ClickHouse is not configured")
-    return ClickHouseClient(
-        settings.CLICKHOUSE_URL,
-        settings.CLICKHOUSE_DATABASE,
-        user=settings.CLICKHOUSE_USER,
-        password=settings.CLICKHOUSE_PASSWORD,
-    )
+async def get_data_lake_service() -> DataLakeService:
+    """The process-wide data lake service (started in lifespan)"""
+    service = DataLakeService.instance()
+    if service is None:
+        if not settings.CLICKHOUSE_URL:
+            raise HTTPException(status_code=503, detail="ClickHouse is not configured")
+        # ClickHouse was unreachable at startup: retry the one-time setup
+        service = await DataLakeService.start()
+        if service is None:
+            raise HTTPException(status_code=503, detail="ClickHouse is unavailable")
+    return service
 
 
-def get_data_lake_service(
-    client: ClickHouseClient = Depends(get_clickhouse_client),
-) -> DataLakeService:
-    return DataLakeService(client)
+async def require_company_analytics(token_data: dict = Depends(require_approved())) -> dict:
+    """Company-wide aggregates: super admins and roles with data scope "all" only"""
+    user = token_data["user"]
+    if not (user.is_super_admin or user.data_scope == "all"):
+        raise HTTPException(status_code=403, detail="Company-wide analytics require a role with full data scope")
+    return token_data
 
 
 def get_streaming_service(
@@ -35,18 +47,59 @@ def get_streaming_service(
 
 
 @router.get("/health")
-def microservices_health(
+async def microservices_health(
     data_lake: DataLakeService = Depends(get_data_lake_service),
 ):
-    return {"services": {"data_lake": data_lake.health()}}
+    return {"services": {"data_lake": await data_lake.health(), "cdc": cdc_streamer.get_stats()}}
 
 
 @router.post("/ingest/{source}/{entity_type}")
-def ingest_event(
+async def ingest_event(
     source: str,
     entity_type: str,
     payload: dict,
+    wait: bool = False,
     streaming: StreamingService = Depends(get_streaming_service),
 ):
-    source_id = streaming.ingest_event(source, entity_type, payload)
-    return {"status": "accepted", "source_id": source_id}
+    """Buffer an event for ClickHouse; wait=true returns only after it is written"""
+    source_id = await streaming.ingest_event(source, entity_type, payload, wait=wait)
+    return {"status": "stored" if wait else "accepted", "source_id": source_id}
+
+
+@router.get("/analytics/pipeline-by-stage")
+async def pipeline_by_stage(token_data: dict = Depends(require_approved())):
+    """Open and closed pipeline per stage over the opportunities this user may see"""
+    db = Database.get_db()
+    access = await AccessContext.load(db, token_data["id"], token_data.get("email", "").lower())
+    access_keys = await access.visible_keys(db, ("opportunity",))
+    return await AnalyticsEngine(db).query("pipeline_by_stage", access_keys=access_keys)
+
+
+@router.get("/analytics/revenue-by-period")
+async def revenue_by_period(
+    period: str = Query("month"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    token_data: dict = Depends(require_company_analytics),
+):
+    """Invoiced revenue (refunds netted) and collected amount per period"""
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {', '.join(PERIODS)}")
+    return await AnalyticsEngine(Database.get_db()).query("revenue_by_period", period=period, start=start, end=end)
+
+
+@router.get("/analytics/activity-by-rep")
+async def activity_by_rep(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    token_data: dict = Depends(require_company_analytics),
+):
+    """Activities per assigned user, optionally by due date"""
+    return await AnalyticsEngine(Database.get_db()).query("activity_by_rep", start=start, end=end)
+
+
+@router.post("/analytics/mirror")
+async def mirror_analytics(token_data: dict = Depends(require_super_admin)):
+    """Copy serving records changed since the last mirror into ClickHouse"""
+    await get_data_lake_service()
+    return {"mirrored": await mirror_serving_records(Database.get_db())}
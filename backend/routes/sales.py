@@ -7,13 +7,19 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Dict, Optional, Any
 from pydantic import BaseModel, Field
 from datetime import datetime, timezone, timedelta
+import asyncio
+import time
 import uuid
 import os
 import logging
 
 from core.database import Database
+from data_lake.account_rollup import AccountRollupManager, clean_value
 from services.auth.jwt_handler import get_current_user_from_token
+from services.field_mapper import MAPPER_VERSION, mapped_record
 from middleware.rbac import require_approved
+from services.rbac.record_access import AccessContext, is_indexed
+from services.search.index import CRM_KEY, SearchIndexer, refresh_crm_entry
 from core.config import settings
 
 router = APIRouter(tags=["Sales"])
@@ -170,6 +176,7 @@ async def create_opportunity(
     }
     
     await db.opportunities.insert_one(opportunity)
+    await refresh_crm_entry(db, "opportunity", opp_id)
     
     # Return without _id
     opportunity.pop("_id", None)
@@ -182,7 +189,6 @@ async def get_opportunities(
     token_data: dict = Depends(require_approved())
 ):
     """Get opportunities from data_lake_serving with proper field mapping"""
-    from services.field_mapper import get_field_mapper
     
     db = Database.get_db()
     user_id = token_data["id"]
@@ -208,18 +214,16 @@ async def get_opportunities(
     # Get accessible opportunity IDs from access matrix
     accessible_opp_ids = access_matrix.get("accessible_opportunities", []) if access_matrix else []
     
-    # Fetch from data_lake_serving
+    # Fetch from data_lake_serving - the mapped form (incl. stage) is precomputed at sync time.
+    # Documents from an older mapper version are mapped per record until re-derived.
     opportunities = []
-    opp_docs = await db.data_lake_serving.find(active_entity_filter("opportunity")).to_list(1000)
-    
-    # Get field mapper
-    mapper = get_field_mapper()
+    opp_filter = None
+    if stage:
+        opp_filter = {"$or": [{"mapped.stage": stage}, {"mapped_version": {"$ne": MAPPER_VERSION}}]}
+    opp_docs = await db.data_lake_serving.find(active_entity_filter("opportunity", opp_filter)).to_list(1000)
     
     for doc in opp_docs:
-        opp_data = doc.get("data", {})
-        
-        # Use universal mapper for proper field extraction
-        canonical_opp = mapper.map_opportunity(opp_data)
+        canonical_opp = mapped_record("opportunity", doc)
         
         # Access control: Check if user can see this opportunity
         if not is_super_admin:
@@ -235,28 +239,10 @@ async def get_opportunities(
             if opp_odoo_id not in accessible_opp_ids and opp_odoo_id_int not in accessible_opp_ids:
                 continue  # User can't access this opportunity
         
-        # Map stage to internal format (keep existing logic)
-        stage_name_lower = canonical_opp.get("stage_name", "").lower()
-        if "won" in stage_name_lower:
-            mapped_stage = "closed_won"
-        elif "lost" in stage_name_lower:
-            mapped_stage = "closed_lost"
-        elif "negot" in stage_name_lower:
-            mapped_stage = "negotiation"
-        elif "propos" in stage_name_lower:
-            mapped_stage = "proposal"
-        elif "discov" in stage_name_lower:
-            mapped_stage = "discovery"
-        elif "qualif" in stage_name_lower:
-            mapped_stage = "qualification"
-        else:
-            mapped_stage = "lead"
-        
-        canonical_opp["stage"] = mapped_stage
         canonical_opp["last_synced"] = doc.get("last_aggregated")
         
         # Stage filter
-        if stage and mapped_stage != stage:
+        if stage and canonical_opp["stage"] != stage:
             continue
         
         opportunities.append(canonical_opp)
@@ -382,6 +368,7 @@ async def update_opportunity(
     update_data["updated_at"] = datetime.now(timezone.utc)
     
     await db.opportunities.update_one({"id": opp_id}, {"$set": update_data})
+    await refresh_crm_entry(db, "opportunity", opp_id)
     
     updated = await db.opportunities.find_one({"id": opp_id}, {"_id": 0})
     return updated
@@ -495,6 +482,7 @@ async def update_opportunity_stage(
             "updated_at": datetime.now(timezone.utc)
         }}
     )
+    await refresh_crm_entry(db, "opportunity", opp_id)
     
     return {"message": "Stage updated", "stage": new_stage, "probability": new_probability}
 
@@ -990,44 +978,56 @@ async def create_commission_template(
 @router.get("/search")
 async def global_search(
     q: str = Query(..., min_length=2),
+    types: Optional[str] = Query(None, description="Comma-separated entity types to search"),
+    limit: int = Query(20, ge=1, le=50),
     token_data: dict = Depends(require_approved())
 ):
-    """Global search across accounts, opportunities, activities"""
+    """
+    Global search across accounts, opportunities, contacts and activities.
+    Covers Odoo-synced and CRM records via the search index, ranked by match quality.
+    """
     db = Database.get_db()
+    started = time.monotonic()
     user_id = token_data["id"]
     user_role = token_data.get("role", "")
+    indexer = SearchIndexer(db)
+    
+    # Odoo records: dashboard visibility. CRM records: account managers see their own.
+    access = await AccessContext.load(db, user_id, token_data.get("email", "").lower())
+    access_keys = None
+    if not access.is_super_admin:
+        known_names = await indexer.known_salesperson_names() if access.subordinate_salesperson_names else []
+        access_keys = access.access_keys(known_names) | {f"user:{user_id}"}
+        if user_role != "account_manager":
+            access_keys.add(CRM_KEY)
+    
+    entity_types = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    entries, timed_out = await indexer.search(
+        q,
+        access_keys,
+        entity_types=entity_types,
+        limit=limit,
+        timeout_ms=settings.SEARCH_TIMEOUT_MS
+    )
     
-    results = []
-    search_regex = {"$regex": q, "$options": "i"}
-    
-    # Search accounts
-    account_query = {"$or": [{"name": search_regex}, {"industry": search_regex}]}
-    if user_role == "account_manager":
-        account_query["assigned_am_id"] = user_id
-    
-    accounts = await db.accounts.find(account_query, {"_id": 0, "id": 1, "name": 1}).limit(10).to_list(10)
-    for acc in accounts:
-        results.append({"type": "account", "id": acc["id"], "name": acc["name"]})
-    
-    # Search opportunities
-    opp_query = {"name": search_regex}
-    if user_role == "account_manager":
-        opp_query["owner_id"] = user_id
-    
-    opportunities = await db.opportunities.find(opp_query, {"_id": 0, "id": 1, "name": 1}).limit(10).to_list(10)
-    for opp in opportunities:
-        results.append({"type": "opportunity", "id": opp["id"], "name": opp["name"]})
-    
-    # Search activities
-    activity_query = {"title": search_regex}
-    if user_role == "account_manager":
-        activity_query["$or"] = [{"created_by_id": user_id}, {"assigned_to_id": user_id}]
-    
-    activities = await db.activities.find(activity_query, {"_id": 0, "id": 1, "title": 1}).limit(10).to_list(10)
-    for act in activities:
-        results.append({"type": "activity", "id": act["id"], "name": act["title"]})
+    results = [
+        {
+            "type": entry["entity_type"],
+            "id": entry["entity_id"],
+            "name": entry["title"],
+            "subtitle": entry["subtitle"],
+            "source": entry["source"],
+            "score": entry["score"],
+        }
+        for entry in entries
+    ]
     
-    return {"results": results, "query": q}
+    return {
+        "results": results,
+        "query": q,
+        "timed_out": timed_out,
+        "took_ms": round((time.monotonic() - started) * 1000, 1),
+    }
 
 # ===================== ACTIVITIES =====================
 
@@ -1207,6 +1207,7 @@ async def create_activity(
     }
     
     await db.activities.insert_one(activity)
+    await refresh_crm_entry(db, "activity", activity_id)
 
 
 
@@ -1277,6 +1278,7 @@ async def update_activity_status(
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Activity not found")
+    await refresh_crm_entry(db, "activity", activity_id)
     
     return {"message": "Status updated", "status": status}
 
@@ -1331,6 +1333,7 @@ async def create_account(
     }
     
     await db.accounts.insert_one(account)
+    await refresh_crm_entry(db, "account", account_id)
     account.pop("_id", None)
     return account
 
@@ -1497,151 +1500,53 @@ async def get_real_dashboard(
     db = Database.get_db()
     user_id = token_data["id"]
     user_email = token_data.get("email", "").lower()
-    user_role = token_data.get("role", "")
     
-    # Get full user details including Odoo enrichment
-    user_doc = await db.users.find_one({"id": user_id})
-    is_super_admin = user_doc.get("is_super_admin", False) if user_doc else False
-    
-    # Get Odoo identifiers for filtering
-    odoo_salesperson_name = (user_doc.get("odoo_salesperson_name") or "").lower() if user_doc else ""
-    odoo_user_id = user_doc.get("odoo_user_id") if user_doc else None
-    odoo_employee_id = user_doc.get("odoo_employee_id") if user_doc else None
-    odoo_team_id = user_doc.get("odoo_team_id") if user_doc else None
-    
-    # Build list of subordinate employee IDs (people this user manages)
-    subordinate_user_ids = set()
-    subordinate_employee_ids = set()
-    subordinate_salesperson_names = set()
-    subordinate_emails = set()  # ADD: Track subordinate emails
-    
-    if odoo_employee_id:
-        # Find all users where manager_odoo_id matches current user's employee_id
-        subordinates = await db.users.find(
-            {"manager_odoo_id": odoo_employee_id},
-            {"odoo_user_id": 1, "odoo_employee_id": 1, "odoo_salesperson_name": 1, "email": 1}
-        ).to_list(100)
-        
-        for sub in subordinates:
-            if sub.get("odoo_user_id"):
-                subordinate_user_ids.add(sub["odoo_user_id"])
-            if sub.get("odoo_employee_id"):
-                subordinate_employee_ids.add(sub["odoo_employee_id"])
-            if sub.get("odoo_salesperson_name"):
-                subordinate_salesperson_names.add(sub["odoo_salesperson_name"].lower())
-            if sub.get("email"):
-                subordinate_salesperson_names.add(sub["email"].lower())
-                subordinate_emails.add(sub["email"].lower())  # ADD: Store email separately
-        
-        logger.info(f"User {user_email} (emp_id={odoo_employee_id}) manages {len(subordinates)} subordinates: user_ids={subordinate_user_ids}, emails={subordinate_emails}")
+    # Odoo identifiers of the user and their direct reports
+    access = await AccessContext.load(db, user_id, user_email)
     
-    def user_has_access_to_record(record_data):
-        """
-        Check if current user has access to a record based on Odoo assignment.
-        
-        Access granted if:
-        1. User is super admin
-        2. User is the assigned salesperson (by ID, name, or email)
-        3. User is on the same team
-        4. User is the MANAGER of the assigned salesperson (hierarchy visibility)
-        
-        CRITICAL: Uses strict matching to prevent cross-user data leaks.
-        """
-        if is_super_admin:
-            return True
-        
-        salesperson_name = (record_data.get("salesperson_name") or "").lower().strip()
-        salesperson_id = record_data.get("salesperson_id")
-        record_team_id = record_data.get("team_id")
-        
-        # STRICT matching by salesperson ID (most reliable)
-        if odoo_user_id and salesperson_id:
-            try:
-                if int(odoo_user_id) == int(salesperson_id):
-                    return True
-            except (ValueError, TypeError):
-                pass
-        
-        # STRICT matching by salesperson name (exact, case-insensitive)
-        if odoo_salesperson_name and salesperson_name and odoo_salesperson_name == salesperson_name:
-            return True
-        
-        # STRICT matching by team
-        if odoo_team_id and record_team_id:
-            try:
-                if int(odoo_team_id) == int(record_team_id):
-                    return True
-            except (ValueError, TypeError):
-                pass
-        
-        # Fallback: Check if user's email is the salesperson's email
-        record_email = (record_data.get("salesperson_email") or salesperson_name or "").lower().strip()
-        if user_email and record_email and user_email == record_email:
-            return True
-        
-        # CRITICAL FIX: MANAGER HIERARCHY - Check if current user manages the salesperson
-        # This allows managers to see their subordinates' opportunities
-        if salesperson_id:
-            # Check if this salesperson_id belongs to any of our subordinates
-            if salesperson_id in subordinate_user_ids:
-                logger.debug(f"Manager access granted: {user_email} manages salesperson_id={salesperson_id}")
-                return True
-        
-        # Also check by salesperson name if ID match didn't work
-        if salesperson_name:
-            # Check if salesperson name matches any subordinate
-            if salesperson_name in subordinate_salesperson_names:
-                logger.debug(f"Manager access granted: {user_email} manages {salesperson_name}")
-                return True
-            
-            # Check if salesperson email matches any subordinate
-            if any(salesperson_name in sub_name for sub_name in subordinate_salesperson_names):
-                logger.debug(f"Manager access granted: {user_email} manages user with name containing {salesperson_name}")
-                return True
-        
-        return False
+    # Visibility rules as one indexed filter on access_keys (None for super admins).
+    # Documents whose keys predate ACCESS_KEYS_VERSION are re-checked per record.
+    access_filter = await access.mongo_filter(db)
     
     # ---- OPPORTUNITIES FROM DATA LAKE ----
     opportunities_data = []
-    opp_docs = await db.data_lake_serving.find(active_entity_filter("opportunity")).to_list(1000)
+    opp_docs = await db.data_lake_serving.find(active_entity_filter("opportunity", access_filter)).to_list(1000)
     
     for doc in opp_docs:
-        opp = doc.get("data", {})
-        
         # Odoo-based access control
-        if not user_has_access_to_record(opp):
+        if access_filter and not is_indexed(doc) and not access.can_access(doc.get("data", {})):
             continue
         
+        opp = mapped_record("opportunity", doc)
         opportunities_data.append({
-            "id": opp.get("id"),
-            "name": opp.get("name", ""),
-            "account_name": opp.get("partner_name", ""),
-            "value": float(opp.get("expected_revenue", 0) or 0),
-            "probability": float(opp.get("probability", 0) or 0),
-            "stage": opp.get("stage_name", "New"),
-            "salesperson": opp.get("salesperson_name", ""),
+            "id": opp["id"],
+            "name": opp["name"],
+            "account_name": opp["account_name"],
+            "value": opp["value"],
+            "probability": opp["probability"],
+            "stage": opp["stage_name"],
+            "salesperson": opp["salesperson_name"],
             "source": "odoo",
             "last_synced": doc.get("last_aggregated"),
         })
     
     # ---- ACCOUNTS FROM DATA LAKE ----
     accounts_data = []
-    acc_docs = await db.data_lake_serving.find(active_entity_filter("account")).to_list(1000)
+    acc_docs = await db.data_lake_serving.find(active_entity_filter("account", access_filter)).to_list(1000)
     
     for doc in acc_docs:
-        acc = doc.get("data", {})
-        
         # Filter accounts by salesperson assignment (if set)
-        if not is_super_admin and acc.get("salesperson_name"):
-            if not user_has_access_to_record(acc):
+        if access_filter and not is_indexed(doc) and doc.get("data", {}).get("salesperson_name"):
+            if not access.can_access(doc["data"]):
                 continue
         
+        acc = mapped_record("account", doc)
         accounts_data.append({
-            "id": acc.get("id"),
-            "name": acc.get("name", ""),
-            "email": acc.get("email", ""),
-            "phone": acc.get("phone", ""),
-            "city": acc.get("city", ""),
+            "id": acc["id"],
+            "name": acc["name"],
+            "email": acc["email"],
+            "phone": acc["phone"],
+            "city": acc["city"],
             "source": "odoo",
             "last_synced": doc.get("last_aggregated"),
         })
@@ -1651,16 +1556,16 @@ async def get_real_dashboard(
     inv_docs = await db.data_lake_serving.find(active_entity_filter("invoice")).to_list(1000)
     
     for doc in inv_docs:
-        inv = doc.get("data", {})
+        inv = mapped_record("invoice", doc)
         invoices_data.append({
-            "id": inv.get("id"),
-            "invoice_number": inv.get("invoice_number", inv.get("name", "")),
-            "customer_name": inv.get("customer_name", inv.get("partner_name", "")),
-            "total_amount": float(inv.get("total_amount", inv.get("amount_total", 0)) or 0),
-            "amount_due": float(inv.get("amount_due", inv.get("amount_residual", 0)) or 0),
-            "payment_status": inv.get("payment_status", inv.get("payment_state", "pending")),
-            "invoice_date": inv.get("invoice_date"),
-            "due_date": inv.get("due_date"),
+            "id": inv["id"],
+            "invoice_number": inv["invoice_number"],
+            "customer_name": inv["customer_name"],
+            "total_amount": inv["total_amount"],
+            "amount_due": inv["amount_due"],
+            "payment_status": inv["payment_status"],
+            "invoice_date": inv["invoice_date"],
+            "due_date": inv["due_date"],
             "source": "odoo",
             "last_synced": doc.get("last_aggregated"),
         })
@@ -1705,36 +1610,9 @@ async def get_receivables(
     inv_docs = await db.data_lake_serving.find(active_entity_filter("invoice")).to_list(1000)
     
     for doc in inv_docs:
-        inv = doc.get("data", {})
-        
-        # Extract salesperson info (Odoo format: [id, "Name"] or just id)
-        salesperson_id = inv.get("invoice_user_id") or inv.get("user_id")
-        salesperson_name = ""
-        if isinstance(salesperson_id, list) and len(salesperson_id) > 1:
-            salesperson_name = salesperson_id[1]
-        elif isinstance(salesperson_id, str):
-            salesperson_name = salesperson_id
-        
-        # Extract partner/account info
-        partner_id = inv.get("partner_id")
-        partner_name = inv.get("customer_name") or inv.get("partner_name", "")
-        if isinstance(partner_id, list) and len(partner_id) > 1:
-            partner_name = partner_id[1]
-        
+        # Salesperson/partner many2one values are resolved at sync time
         invoices.append({
-            "id": inv.get("id"),
-            "invoice_number": inv.get("invoice_number", inv.get("name", "")),
-            "customer_name": partner_name,
-            "account_id": partner_id[0] if isinstance(partner_id, list) else partner_id,
-            "salesperson": salesperson_name,
-            "total_amount": float(inv.get("total_amount", inv.get("amount_total", 0)) or 0),
-            "amount_due": float(inv.get("amount_due", inv.get("amount_residual", 0)) or 0),
-            "amount_paid": float(inv.get("amount_paid", 0) or 0),
-            "payment_status": inv.get("payment_status", inv.get("payment_state", "pending")),
-            "invoice_date": inv.get("invoice_date"),
-            "due_date": inv.get("due_date"),
-            "currency": inv.get("currency", "USD"),
-            "source": "odoo",
+            **mapped_record("invoice", doc),
             "last_synced": doc.get("last_aggregated"),
         })
     
@@ -1772,24 +1650,24 @@ async def get_real_opportunities(
     opp_docs = await db.data_lake_serving.find(active_entity_filter("opportunity")).to_list(1000)
     
     for doc in opp_docs:
-        opp = doc.get("data", {})
+        opp = mapped_record("opportunity", doc)
         
         # Team-based filtering for non-admin users
         if not is_super_admin and user_role == "account_manager":
-            salesperson = opp.get("salesperson_name", "")
+            salesperson = opp["salesperson_name"]
             if salesperson and user_email not in salesperson:
                 continue
         
         opportunities.append({
-            "id": opp.get("id"),
-            "name": opp.get("name", ""),
-            "account_name": opp.get("partner_name", ""),
-            "value": float(opp.get("expected_revenue", 0) or 0),
-            "probability": float(opp.get("probability", 0) or 0),
-            "stage": opp.get("stage_name", "New"),
-            "salesperson": opp.get("salesperson_name", ""),
-            "expected_close_date": opp.get("date_deadline"),
-            "description": opp.get("description") if opp.get("description") != False else None,
+            "id": opp["id"],
+            "name": opp["name"],
+            "account_name": opp["account_name"],
+            "value": opp["value"],
+            "probability": opp["probability"],
+            "stage": opp["stage_name"],
+            "salesperson": opp["salesperson_name"],
+            "expected_close_date": opp["close_date"] or None,
+            "description": opp["description"] or None,
             "source": "odoo",
             "last_synced": doc.get("last_aggregated"),
         })
@@ -1807,135 +1685,11 @@ async def get_real_accounts(
     """
     Get accounts from data_lake_serving (real Odoo data).
     Shows synced customer/partner data from ERP.
-    Aggregates pipeline and won revenue from related opportunities.
+    Pipeline and won revenue come from the account_rollup collection,
+    rebuilt from related opportunities after each sync.
     """
     db = Database.get_db()
-    
-    # Helper to handle Odoo's False values
-    def clean_value(val, default=""):
-        if val is False or val is None:
-            return default
-        return val
-    
-    # Helper to infer industry from company name
-    def infer_industry(name: str) -> str:
-        name_lower = name.lower()
-        
-        # Industry patterns based on common naming conventions
-        if any(kw in name_lower for kw in ["tech", "software", "data", "cyber", "cloud", "digital", "systems", "solutions"]):
-            return "Technology"
-        elif any(kw in name_lower for kw in ["bank", "finance", "capital", "invest", "financial"]):
-            return "Financial Services"
-        elif any(kw in name_lower for kw in ["health", "medical", "pharma", "bio", "care"]):
-            return "Healthcare"
-        elif any(kw in name_lower for kw in ["retail", "shop", "store", "commerce", "mart"]):
-            return "Retail"
-        elif any(kw in name_lower for kw in ["global", "corp", "enterprise", "inc", "llc", "ltd"]):
-            return "Enterprise"
-        elif any(kw in name_lower for kw in ["security", "secure", "protect"]):
-            return "Cybersecurity"
-        elif any(kw in name_lower for kw in ["consult", "advisory", "service"]):
-            return "Consulting"
-        elif any(kw in name_lower for kw in ["manufact", "industrial", "engineering"]):
-            return "Manufacturing"
-        
-        return ""
-    
-    # First, get all opportunities to calculate account-level metrics
-    opp_docs = await db.data_lake_serving.find(active_entity_filter("opportunity")).to_list(1000)
-    
-    # Build a map of partner_name -> metrics
-    account_metrics = {}
-    for doc in opp_docs:
-        opp = doc.get("data", {})
-        partner_name = clean_value(opp.get("partner_name"), "").strip().lower()
-        if not partner_name:
-            continue
-        
-        if partner_name not in account_metrics:
-            account_metrics[partner_name] = {
-                "pipeline_value": 0,
-                "won_value": 0,
-                "active_count": 0,
-                "total_count": 0
-            }
-        
-        value = float(opp.get("expected_revenue", 0) or 0)
-        stage = clean_value(opp.get("stage_name"), "").lower()
-        
-        account_metrics[partner_name]["total_count"] += 1
-        
-        if "won" in stage:
-            account_metrics[partner_name]["won_value"] += value
-        elif "lost" not in stage:
-            account_metrics[partner_name]["pipeline_value"] += value
-            account_metrics[partner_name]["active_count"] += 1
-    
-    # Get accounts
-    accounts = []
-    acc_docs = await db.data_lake_serving.find(active_entity_filter("account")).to_list(1000)
-    
-    for doc in acc_docs:
-        acc = doc.get("data", {})
-        name = clean_value(acc.get("name"), "")
-        
-        # Skip accounts with empty names (invalid data)
-        if not name.strip():
-            continue
-        
-        # Get metrics for this account
-        name_key = name.strip().lower()
-        metrics = account_metrics.get(name_key, {
-            "pipeline_value": 0,
-            "won_value": 0,
-            "active_count": 0,
-            "total_count": 0
-        })
-        
-        accounts.append({
-            "id": str(acc.get("id", doc.get("serving_id", ""))),
-            "name": name,
-            "email": clean_value(acc.get("email"), ""),
-            "phone": clean_value(acc.get("phone"), ""),
-            "website": clean_value(acc.get("website"), ""),
-            "city": clean_value(acc.get("address_city") or acc.get("city"), ""),
-            "country": clean_value(acc.get("address_country") or acc.get("country"), ""),
-            "industry": clean_value(acc.get("industry") or acc.get("industry_id"), "") or infer_industry(name),
-            # Aggregated metrics
-            "pipeline_value": metrics["pipeline_value"],
-            "won_value": metrics["won_value"],
-            "active_opportunities": metrics["active_count"],
-            "total_opportunities": metrics["total_count"],
-            # Source info
-            "source": "odoo",
-            "last_synced": doc.get("last_aggregated"),
-        })
-    
-    # Also get unique account names from opportunities that don't have account records
-    existing_names = {a["name"].strip().lower() for a in accounts}
-    
-    for partner_name, metrics in account_metrics.items():
-        if partner_name not in existing_names and partner_name:
-            # Create a synthetic account from opportunity data
-            display_name = partner_name.title()
-            accounts.append({
-                "id": f"opp_{partner_name[:20].replace(' ', '_')}",
-                "name": display_name,
-                "email": "",
-                "phone": "",
-                "website": "",
-                "city": "",
-                "country": "",
-                "industry": infer_industry(display_name),
-                # Aggregated metrics
-                "pipeline_value": metrics["pipeline_value"],
-                "won_value": metrics["won_value"],
-                "active_opportunities": metrics["active_count"],
-                "total_opportunities": metrics["total_count"],
-                # Source info
-                "source": "odoo_opportunity",
-                "last_synced": None,
-            })
+    accounts = await AccountRollupManager(db).list_rows()
     
     return {
         "source": "data_lake_serving",
@@ -1957,36 +1711,14 @@ async def get_account_360_view(
     Aggregates opportunities, invoices, activities, and contacts from data_lake_serving.
     """
     db = Database.get_db()
+    rollups = AccountRollupManager(db)
     
-    # Find the account - try both data lake and legacy accounts
+    # Find the account - rollup by Odoo ID, serving ID or synthetic opp_ ID, then legacy accounts
     account = None
+    rollup = await rollups.get(account_id)
     
-    # Handle synthetic IDs (from opportunity-derived accounts like "opp_techcorp_industri")
-    account_name = None
-    if account_id.startswith("opp_"):
-        # Extract name from synthetic ID: opp_techcorp_industri -> techcorp industri
-        name_part = account_id[4:].replace("_", " ")
-        account_name = name_part.title()
-    
-    # First check data_lake_serving by ID
-    acc_doc = await db.data_lake_serving.find_one({
-        "entity_type": "account",
-        "$or": [
-            {"data.id": account_id},
-            {"data.id": int(account_id) if account_id.isdigit() else account_id},
-            {"serving_id": account_id}
-        ]
-    })
-    
-    # If not found and we have a name, try searching by name
-    if not acc_doc and account_name:
-        acc_doc = await db.data_lake_serving.find_one({
-            "entity_type": "account",
-            "data.name": {"$regex": account_name, "$options": "i"}
-        })
-    
-    if acc_doc:
-        acc_data = acc_doc.get("data", {})
+    if rollup and rollup.get("kind") == "account":
+        acc_data = rollup.get("account") or {}
         account = {
             "id": str(acc_data.get("id", account_id)),
             "name": acc_data.get("name", ""),
@@ -2008,7 +1740,27 @@ async def get_account_360_view(
             "total_invoiced": float(acc_data.get("total_invoiced", 0) or 0),
             "total_due": float(acc_data.get("total_due", 0) or 0),
             "source": "odoo",
-            "last_synced": acc_doc.get("last_aggregated"),
+            "last_synced": rollup.get("last_synced"),
+        }
+    elif rollup:
+        # Account known only from opportunity partner names
+        account = {
+            "id": account_id,
+            "name": rollup.get("display_name", ""),
+            "email": "",
+            "phone": "",
+            "mobile": "",
+            "website": "",
+            "street": "",
+            "city": "",
+            "state": "",
+            "country": "",
+            "zip": "",
+            "industry": "",
+            "company_type": "",
+            "is_company": True,
+            "source": "opportunity_derived",
+            "last_synced": rollup.get("last_synced"),
         }
     else:
         # Fallback to legacy accounts collection
@@ -2016,87 +1768,32 @@ async def get_account_360_view(
         if legacy_acc:
             account = {**legacy_acc, "source": "crm"}
     
-    # If still not found, try to create account from opportunity partner data
-    if not account and account_name:
-        # Find opportunities with this partner name to derive account info
-        opp_doc = await db.data_lake_serving.find_one({
-            "entity_type": "opportunity",
-            "data.partner_name": {"$regex": account_name, "$options": "i"}
-        })
-        
-        if opp_doc:
-            opp_data = opp_doc.get("data", {})
-            account = {
-                "id": account_id,
-                "name": opp_data.get("partner_name", account_name),
-                "email": "",
-                "phone": "",
-                "mobile": "",
-                "website": "",
-                "street": "",
-                "city": "",
-                "state": "",
-                "country": "",
-                "zip": "",
-                "industry": "",
-                "company_type": "",
-                "is_company": True,
-                "source": "opportunity_derived",
-                "last_synced": opp_doc.get("last_aggregated"),
-            }
-    
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     
-    # Get related opportunities from data_lake_serving (only active records)
-    opportunities = []
-    
-    # Build search patterns - use name if available, fallback to ID
-    account_search_name = account.get("name", "")
-    opp_query = {
-        "entity_type": "opportunity",
-        "$and": [
-            # Only show active (non-deleted) records
-            {"$or": [{"is_active": True}, {"is_active": {"$exists": False}}]},
-            # Match by partner ID or name
-            {"$or": [
-                {"data.partner_id": account_id},
-            ]}
-        ]
-    }
-    
-    # Add numeric ID search if applicable
-    if account_id.isdigit():
-        opp_query["$and"][1]["$or"].append({"data.partner_id": int(account_id)})
-    
-    # Add name-based search
-    if account_search_name:
-        opp_query["$and"][1]["$or"].append({"data.partner_name": {"$regex": account_search_name, "$options": "i"}})
-    
-    # Also search by account_name if we derived it from the synthetic ID
-    if account_name and account_name != account_search_name:
-        opp_query["$and"][1]["$or"].append({"data.partner_name": {"$regex": account_name, "$options": "i"}})
-    
-    opp_docs = await db.data_lake_serving.find(opp_query).to_list(100)
+    # Related Odoo records in one read, legacy CRM records alongside
+    related, legacy_opps, activity_docs = await asyncio.gather(
+        rollups.get_related(rollup),
+        db.opportunities.find({"account_id": account_id}, {"_id": 0}).to_list(100),
+        db.activities.find({"account_id": account_id}, {"_id": 0}).to_list(50),
+    )
     
-    for doc in opp_docs:
-        opp = doc.get("data", {})
+    # Get related opportunities (rollups only reference active records)
+    opportunities = []
+    for doc in related.get("opportunity", []):
+        opp = mapped_record("opportunity", doc)
         opportunities.append({
-            "id": str(opp.get("id", "")),
-            "name": opp.get("name", ""),
-            "value": float(opp.get("expected_revenue", 0) or 0),
-            "probability": float(opp.get("probability", 0) or 0),
-            "stage": opp.get("stage_name", "New"),
-            "salesperson": opp.get("salesperson_name", ""),
-            "expected_close_date": opp.get("date_deadline"),
-            "created_date": opp.get("create_date"),
+            "id": str(opp["id"] or ""),
+            "name": opp["name"],
+            "value": opp["value"],
+            "probability": opp["probability"],
+            "stage": opp["stage_name"],
+            "salesperson": opp["salesperson_name"],
+            "expected_close_date": opp["close_date"] or None,
+            "created_date": opp["created_date"] or None,
         })
     
     # Also check legacy opportunities
-    legacy_opps = await db.opportunities.find(
-        {"account_id": account_id}, 
-        {"_id": 0}
-    ).to_list(100)
     for opp in legacy_opps:
         if not any(o["id"] == opp.get("id") for o in opportunities):
             opportunities.append({
@@ -2110,19 +1807,9 @@ async def get_account_360_view(
                 "created_date": opp.get("created_at"),
             })
     
-    # Get related invoices from data_lake_serving
+    # Get related invoices
     invoices = []
-    inv_docs = await db.data_lake_serving.find({
-        "entity_type": "invoice",
-        "$or": [
-            {"data.partner_id": account_id},
-            {"data.partner_id": int(account_id) if account_id.isdigit() else None},
-            {"data.partner_name": {"$regex": account.get("name", "NOMATCH"), "$options": "i"}},
-            {"data.customer_name": {"$regex": account.get("name", "NOMATCH"), "$options": "i"}}
-        ]
-    }).to_list(100)
-    
-    for doc in inv_docs:
+    for doc in related.get("invoice", []):
         inv = doc.get("data", {})
         invoices.append({
             "id": str(inv.get("id", "")),
@@ -2134,11 +1821,10 @@ async def get_account_360_view(
             "due_date": inv.get("invoice_date_due", inv.get("due_date")),
         })
     
-    # Get related activities from BOTH local DB and Odoo (data_lake_serving)
+    # Get related activities from BOTH local DB and Odoo
     activities = []
     
-    # 1. Get local activities
-    activity_docs = await db.activities.find({"account_id": account_id}, {"_id": 0}).to_list(50)
+    # 1. Local activities
     for act in activity_docs:
         activities.append({
             "id": act.get("id", ""),
@@ -2150,17 +1836,8 @@ async def get_account_360_view(
             "source": "crm"
         })
     
-    # 2. Get Odoo activities from data_lake_serving
-    odoo_activity_docs = await db.data_lake_serving.find(
-        active_entity_filter("activity", {
-            "$or": [
-                {"data.res_id": int(account_id) if account_id.isdigit() else None},
-                {"data.res_model": "res.partner"}
-            ]
-        })
-    ).to_list(100)
-    
-    for doc in odoo_activity_docs:
+    # 2. Odoo activities on this partner
+    for doc in related.get("activity", []):
         act = doc.get("data", {})
         activities.append({
             "id": str(act.get("id", "")),
@@ -2195,74 +1872,17 @@ async def get_account_360_view(
             except:
                 pass
     
-    # Get related contacts from data_lake_serving
-    # Contacts have entity_type: "contact" with account_id field
+    # Get related contacts
     contacts = []
-    
-    # Helper to clean Odoo False values
-    def clean_val(val, default=""):
-        if val is False or val is None:
-            return default
-        return val
-    
-    # Query contacts - handle different account_id formats:
-    # - account_id: false (unlinked)
-    # - account_id: [12, "VM"] (array with ID and name)
-    # - account_id: 12 (just ID)
-    contact_docs = await db.data_lake_serving.find({
-        "entity_type": "contact"
-    }).to_list(100)
-    
-    for doc in contact_docs:
+    for doc in related.get("contact", []):
         contact = doc.get("data", {})
-        contact_account_id = contact.get("account_id")
-        
-        # Check if contact belongs to this account
-        contact_matches = False
-        
-        if contact_account_id:
-            # Handle array format [id, name]
-            if isinstance(contact_account_id, list) and len(contact_account_id) >= 1:
-                contact_acc_id = str(contact_account_id[0])
-                contact_acc_name = contact_account_id[1] if len(contact_account_id) > 1 else ""
-                
-                # Match by ID or by name
-                if contact_acc_id == account_id:
-                    contact_matches = True
-                elif account.get("name") and contact_acc_name and account.get("name", "").lower() in contact_acc_name.lower():
-                    contact_matches = True
-            
-            # Handle simple ID format
-            elif isinstance(contact_account_id, (int, str)):
-                if str(contact_account_id) == account_id:
-                    contact_matches = True
-        
-        if contact_matches:
-            contacts.append({
-                "id": str(contact.get("id", doc.get("serving_id", ""))),
-                "name": clean_val(contact.get("name"), "Unknown"),
-                "email": clean_val(contact.get("email"), ""),
-                "phone": clean_val(contact.get("phone") or contact.get("mobile"), ""),
-                "job_title": clean_val(contact.get("title") or contact.get("function"), ""),
-            })
-    
-    # Also check for contacts that match by account name (for opportunities-derived accounts)
-    if len(contacts) == 0 and account.get("name"):
-        account_name_lower = account.get("name", "").lower()
-        for doc in contact_docs:
-            contact = doc.get("data", {})
-            contact_account_id = contact.get("account_id")
-            
-            if isinstance(contact_account_id, list) and len(contact_account_id) > 1:
-                contact_acc_name = str(contact_account_id[1]).lower()
-                if account_name_lower in contact_acc_name or contact_acc_name in account_name_lower:
-                    contacts.append({
-                        "id": str(contact.get("id", doc.get("serving_id", ""))),
-                        "name": clean_val(contact.get("name"), "Unknown"),
-                        "email": clean_val(contact.get("email"), ""),
-                        "phone": clean_val(contact.get("phone") or contact.get("mobile"), ""),
-                        "job_title": clean_val(contact.get("title") or contact.get("function"), ""),
-                    })
+        contacts.append({
+            "id": str(contact.get("id", doc.get("serving_id", ""))),
+            "name": clean_value(contact.get("name"), "Unknown"),
+            "email": clean_value(contact.get("email"), ""),
+            "phone": clean_value(contact.get("phone") or contact.get("mobile"), ""),
+            "job_title": clean_value(contact.get("title") or contact.get("function"), ""),
+        })
     
     # Calculate summary metrics
     total_pipeline = sum(o["value"] for o in opportunities if o["stage"] not in ["Won", "Lost", "Closed Won", "Closed Lost"])
@@ -13,6 +13,7 @@ import hashlib
 from models.base import EntityType, IntegrationType, SyncStatus
 from services.sync.service import SyncService
 from services.data_lake.manager import DataLakeManager
+from services.sync.webhook_queue import webhook_queue
 from core.database import Database
 from core.config import settings
 
@@ -90,6 +91,16 @@ async def odoo_webhook(
             message=f"Model {payload.model} not configured for sync"
         )
     
+    # Partners, leads and invoices are coalesced into micro-batches:
+    # one Odoo read per model, bulk upserts and batched soft-deletes
+    if payload.model in webhook_queue.models:
+        queued = webhook_queue.enqueue(payload.model, payload.action, payload.record_ids)
+        return WebhookResponse(
+            status="accepted",
+            message=f"Queued {queued} {payload.model} records ({payload.action})",
+            processed=len(payload.record_ids)
+        )
+    
     # Handle delete action
     if payload.action == "unlink":
         # Mark records as deleted in our system
@@ -206,6 +217,20 @@ async def process_webhook_update(
                 except Exception as e:
                     logger.error(f"Failed to process webhook record {record.get('id')}: {e}")
         
+        # Recompute only the rollups of the partners these records touch
+        if entity_type in (
+            EntityType.ACCOUNT, EntityType.OPPORTUNITY, EntityType.INVOICE, EntityType.ACTIVITY, EntityType.CONTACT
+        ):
+            from data_lake.account_rollup import refresh_account_rollups
+            await refresh_account_rollups(db, {entity_type.value: [str(r.get("id")) for r in records]})
+        
+        # Re-index just the changed records for global search
+        try:
+            from services.search.index import SearchIndexer
+            await SearchIndexer(db).index_serving(entity_type.value, [str(r.get("id")) for r in records])
+        except Exception as e:
+            logger.error(f"Search indexing failed for webhook records: {e}")
+        
         # Update last sync time
         await db.integrations.update_one(
             {"integration_type": "odoo"},
@@ -234,6 +259,7 @@ async def webhook_status():
         "odoo_configured": odoo_configured,
         "webhook_url": webhook_url,
         "supported_models": ["res.partner", "crm.lead", "sale.order", "account.move"],
+        "queue": webhook_queue.get_stats(),
         "setup_instructions": {
             "step1": "Go to Odoo Settings > Technical > Automation > Automated Actions",
             "step2": "Create an action for each model you want to sync",
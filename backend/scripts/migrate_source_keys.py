@@ -0,0 +1,45 @@
+"""
+Backfill Canonical Source Keys
+Adds the flattened _source_keys field to existing canonical_* documents
+and creates the unique index. Startup runs the backfill only until it has
+completed once; run this script to re-check after restoring older data.
+"""
+import asyncio
+import logging
+from motor.motor_asyncio import AsyncIOMotorClient
+import sys
+import os
+
+sys.path.append('/app/backend')
+
+from data_lake.canonical_zone import CanonicalZoneHandler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def migrate_source_keys():
+    """Backfill source keys, report duplicates, create indexes"""
+    client = AsyncIOMotorClient(os.getenv('MONGO_URL', 'mongodb://localhost:27017'))
+    db = client[os.getenv('DB_NAME', 'test_database')]
+
+    handler = CanonicalZoneHandler(db)
+
+    print("=" * 80)
+    print("SOURCE KEY MIGRATION")
+    print("=" * 80)
+
+    report = await handler.migrate_source_keys()
+    for collection_name, stats in report.items():
+        print(f"  • {collection_name}: {stats['migrated']} migrated, {stats['duplicate_keys']} duplicate keys")
+        if stats["duplicate_keys"]:
+            print("    ⚠️  Merge duplicates before the unique index can be created")
+
+    await handler.ensure_indexes()
+    print("\n✅ Indexes ensured")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_source_keys())
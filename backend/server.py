@@ -4,6 +4,7 @@ Enterprise-grade FastAPI application with modular architecture
 """
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 import logging
 import os
@@ -35,6 +36,19 @@ async def lifespan(app: FastAPI):
         await rbac.initialize()
         logger.info("RBAC system initialized")
         
+        # Start buffered API call logging
+        from services.logging.log_shipper import log_shipper
+        await log_shipper.start(ttl_days=settings.API_LOG_TTL_DAYS)
+        
+        # ClickHouse data lake: connect and apply schema migrations once
+        from microservices.data_lake_service import DataLakeService
+        data_lake = await DataLakeService.start()
+        
+        # Change-data-capture from the serving zone into ClickHouse
+        if data_lake is not None and settings.CDC_ENABLED:
+            from microservices.cdc_streamer import cdc_streamer
+            await cdc_streamer.start(Database.get_db(), data_lake.client)
+        
         # Seed demo data if needed
         await seed_demo_data()
         
@@ -61,6 +75,45 @@ async def lifespan(app: FastAPI):
         await stop_background_sync()
     except Exception:
         pass
+    
+    # Release the password hasher threads
+    try:
+        from services.auth.jwt_handler import password_hasher
+        password_hasher.shutdown()
+    except Exception:
+        pass
+    
+    # Write buffered API call logs
+    try:
+        from services.logging.log_shipper import log_shipper
+        await log_shipper.stop()
+    except Exception:
+        pass
+    
+    # Apply webhook changes still waiting in the batch window
+    try:
+        from services.sync.webhook_queue import webhook_queue
+        await webhook_queue.stop()
+    except Exception:
+        pass
+    
+    # Stop CDC, flush buffered ClickHouse inserts and close pooled connections
+    try:
+        from microservices.cdc_streamer import cdc_streamer
+        from microservices.data_lake_service import DataLakeService
+        from microservices.clickhouse_client import ClickHouseClient
+        await cdc_streamer.stop()
+        await DataLakeService.stop()
+        await ClickHouseClient.close_all()
+    except Exception:
+        pass
+    
+    # Close pooled Odoo connections
+    try:
+        from integrations.odoo.transport import OdooTransport
+        await OdooTransport.close_all()
+    except Exception:
+        pass
         
     await Database.disconnect()
 
@@ -82,6 +135,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Error capture and API call logging (logs are shipped in the background)
+from middleware.error_handler import error_handler_middleware
+app.middleware("http")(error_handler_middleware)
+
 # Create API router with /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -94,6 +151,20 @@ async def health_check():
     return {"status": "healthy", "service": "sales-intelligence-platform"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-route latency histograms, status and DB-call counters"""
+    from services.logging.metrics import request_metrics
+    from core.db_monitor import db_command_listener
+    from services.auth.jwt_handler import password_hasher
+    return PlainTextResponse(
+        request_metrics.render_prometheus()
+        + db_command_listener.render_prometheus()
+        + password_hasher.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
 @api_router.get("/health")
 async def api_health_check():
     """API health check with database status"""
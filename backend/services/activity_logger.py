@@ -6,6 +6,7 @@ import uuid
 from datetime import datetime, timezone
 from typing import Optional
 from core.database import Database
+from services.search.index import refresh_crm_entry
 
 
 class ActivityLogger:
@@ -75,6 +76,8 @@ class ActivityLogger:
         
         await db.activities.insert_one(activity)
         
+        await refresh_crm_entry(db, "activity", activity["id"])
+        
         # Remove MongoDB _id before returning
         activity.pop("_id", None)
         
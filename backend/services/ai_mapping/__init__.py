@@ -1,2 +1,3 @@
 # AI Mapping service module
 from .mapper import AIFieldMapper, get_canonical_schema
+from .cache import SuggestionCache
@@ -0,0 +1,154 @@
+"""
+AI Mapping Suggestion Cache
+Persistent cache of AI field-mapping suggestions keyed by source schema,
+entity type and target schema version, with an in-process LRU front and
+one in-flight LLM call per key
+"""
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from collections import OrderedDict
+from datetime import datetime, timezone
+import asyncio
+import hashlib
+import json
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SUGGESTIONS_COLLECTION = "ai_mapping_suggestions"
+
+
+def schema_version(target_schema: Dict[str, Any]) -> str:
+    """Fingerprint of a canonical schema - changes whenever the schema does"""
+    return hashlib.sha1(json.dumps(target_schema, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def suggestion_key(
+    source_fields: Dict[str, Any],
+    entity_type: str,
+    target_schema: Dict[str, Any],
+    model: str
+) -> str:
+    """
+    Cache key for a mapping request: the source field set (names, types
+    and labels), entity type, target schema version and LLM model.
+    """
+    fields = sorted(
+        (name, info.get("type"), info.get("string")) if isinstance(info, dict) else (name, str(info), None)
+        for name, info in source_fields.items()
+    )
+    payload = json.dumps([entity_type, schema_version(target_schema), model, fields], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SuggestionCache:
+    """
+    Mapping suggestions stored in ai_mapping_suggestions.
+    
+    - An LRU of recent keys (shared across requests) answers repeat
+      auto-maps without a database round trip
+    - get_many() resolves a set of keys: LRU, then one Mongo query, then a
+      single call to the supplied loader for everything still missing
+    - Keys being loaded are registered as in-flight, so concurrent requests
+      for the same schema wait for the same LLM call
+    """
+    
+    _lru: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+    _in_flight: Dict[str, asyncio.Future] = {}
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db[SUGGESTIONS_COLLECTION]
+    
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index([("key", 1)], unique=True)
+        await self.collection.create_index(
+            [("created_at", 1)],
+            expireAfterSeconds=settings.AI_MAPPING_CACHE_DAYS * 86400
+        )
+    
+    @classmethod
+    def _remember(cls, key: str, mappings: List[Dict[str, Any]]) -> None:
+        cls._lru[key] = mappings
+        cls._lru.move_to_end(key)
+        while len(cls._lru) > settings.AI_MAPPING_CACHE_SIZE:
+            cls._lru.popitem(last=False)
+    
+    @classmethod
+    def clear(cls) -> None:
+        cls._lru.clear()
+    
+    async def get_many(
+        self,
+        keys: Iterable[str],
+        loader: Callable[[List[str]], Awaitable[Dict[str, Optional[List[Dict[str, Any]]]]]],
+        meta: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Dict[str, Optional[List[Dict[str, Any]]]]:
+        """
+        Suggestions for each key. `loader` receives the keys found nowhere
+        and returns {key: mappings or None}; None results are not cached.
+        `meta` adds descriptive fields (entity type, integration) to stored docs.
+        """
+        results: Dict[str, Optional[List[Dict[str, Any]]]] = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                results[key] = self._lru[key]
+            else:
+                missing.append(key)
+        
+        if missing:
+            async for doc in self.collection.find({"key": {"$in": missing}}, {"_id": 0, "key": 1, "mappings": 1}):
+                results[doc["key"]] = doc["mappings"]
+                self._remember(doc["key"], doc["mappings"])
+            missing = [key for key in missing if key not in results]
+        
+        # Someone else is already asking the LLM for these
+        waiting = {key: self._in_flight[key] for key in missing if key in self._in_flight}
+        to_load = [key for key in missing if key not in waiting]
+        
+        if to_load:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in to_load}
+            self._in_flight.update(futures)
+            try:
+                loaded = await loader(to_load)
+            except asyncio.CancelledError:
+                # Waiters fall back rather than hang on a cancelled request
+                for future in futures.values():
+                    future.set_result(None)
+                raise
+            except Exception as e:
+                loaded = {}
+                logger.warning(f"AI mapping suggestion load failed: {e}")
+            finally:
+                for key in to_load:
+                    self._in_flight.pop(key, None)
+            
+            for key in to_load:
+                results[key] = loaded.get(key)
+                futures[key].set_result(results[key])
+            
+            now = datetime.now(timezone.utc)
+            for key in to_load:
+                mappings = results[key]
+                if not mappings:
+                    continue
+                self._remember(key, mappings)
+                try:
+                    await self.collection.update_one(
+                        {"key": key},
+                        {"$set": {**(meta or {}).get(key, {}), "key": key, "mappings": mappings, "created_at": now}},
+                        upsert=True
+                    )
+                except Exception as e:
+                    logger.warning(f"Could not store AI mapping suggestions: {e}")
+        
+        for key, future in waiting.items():
+            results[key] = await future
+        
+        return results
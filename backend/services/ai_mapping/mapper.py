@@ -2,11 +2,17 @@
 AI Field Mapping Service
 Uses LLM to intelligently map source fields to target schema
 """
+import json
 import logging
+import re
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
 
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
 from models.base import FieldMapping, EntityType, IntegrationType
+from .cache import SuggestionCache, suggestion_key
 
 logger = logging.getLogger(__name__)
 
@@ -99,29 +105,33 @@ class AIFieldMapper:
     """
     AI-powered field mapping service.
     Supports BYOK (Bring Your Own Key) configuration.
+    
+    With a database, suggestions are cached per source schema (see
+    SuggestionCache), so repeat auto-maps skip the LLM entirely.
     """
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o"):
+    SYSTEM_MESSAGE = """You are a data integration expert specializing in field mapping.
+                    Your task is to map source fields to a standard canonical schema.
+                    Provide accurate, confident mappings based on field names, types, and descriptions.
+                    Return mappings as JSON."""
+    
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o", db: Optional[AsyncIOMotorDatabase] = None):
         self.api_key = api_key
         self.model = model
-        self._chat = None
+        self.cache = SuggestionCache(db) if db is not None else None
     
     async def _get_chat(self):
-        """Initialize LLM chat client lazily"""
-        if not self._chat and self.api_key:
-            try:
-                from emergentintegrations.llm.chat import LlmChat
-                self._chat = LlmChat(
-                    api_key=self.api_key,
-                    session_id=f"field-mapper-{datetime.now().timestamp()}",
-                    system_message="""You are a data integration expert specializing in field mapping.
-                    Your task is to map source fields to a standard canonical schema.
-                    Provide accurate, confident mappings based on field names, types, and descriptions.
-                    Return mappings as JSON array."""
-                ).with_model("openai", self.model)
-            except ImportError:
-                logger.warning("emergentintegrations not available")
-        return self._chat
+        """
+        LLM chat for one prompt. A fresh session per prompt: a shared
+        session would carry earlier prompts along as conversation history.
+        """
+        if not self.api_key or _llm_chat_class() is None:
+            return None
+        return _llm_chat_class()(
+            api_key=self.api_key,
+            session_id=f"field-mapper-{datetime.now().timestamp()}",
+            system_message=self.SYSTEM_MESSAGE
+        ).with_model("openai", self.model)
     
     async def auto_map_fields(
         self,
@@ -133,19 +143,106 @@ class AIFieldMapper:
         Automatically map source fields to canonical schema using AI.
         Falls back to rule-based mapping if AI unavailable.
         """
-        target_schema = CANONICAL_SCHEMAS.get(entity_type, {})
+        results = await self.auto_map_many({entity_type: source_fields}, integration_type)
+        return results[entity_type]
+    
+    async def auto_map_many(
+        self,
+        sources: Dict[EntityType, Dict[str, Any]],
+        integration_type: IntegrationType
+    ) -> Dict[EntityType, List[FieldMapping]]:
+        """
+        Map several entity types at once. Cached suggestions are reused;
+        entity types not seen before share one batched prompt. Entity types
+        without AI suggestions fall back to rule-based mapping.
+        """
+        keys = {
+            entity_type: suggestion_key(fields, entity_type.value, CANONICAL_SCHEMAS.get(entity_type, {}), self.model)
+            for entity_type, fields in sources.items()
+        }
+        suggestions: Dict[str, Optional[List[Dict[str, Any]]]] = {}
         
         # Try AI mapping first
         if self.api_key:
+            async def load(missing: List[str]) -> Dict[str, Optional[List[Dict[str, Any]]]]:
+                batch = {entity_type: sources[entity_type] for entity_type, key in keys.items() if key in missing}
+                mapped = await self._ai_map_batch(batch)
+                return {keys[entity_type]: [m.model_dump() for m in mappings] or None for entity_type, mappings in mapped.items()}
+            
+            meta = {
+                key: {"entity_type": entity_type.value, "integration_type": integration_type.value, "model": self.model}
+                for entity_type, key in keys.items()
+            }
             try:
-                ai_mappings = await self._ai_map_fields(source_fields, target_schema, entity_type)
-                if ai_mappings:
-                    return ai_mappings
+                if self.cache:
+                    suggestions = await self.cache.get_many(keys.values(), load, meta)
+                else:
+                    suggestions = await load(list(keys.values()))
             except Exception as e:
                 logger.warning(f"AI mapping failed, using rule-based: {e}")
         
-        # Fallback to rule-based mapping
-        return self._rule_based_mapping(source_fields, target_schema, integration_type)
+        results = {}
+        for entity_type, fields in sources.items():
+            cached = suggestions.get(keys[entity_type])
+            if cached:
+                results[entity_type] = [FieldMapping(**m) for m in cached]
+            else:
+                # Fallback to rule-based mapping
+                target_schema = CANONICAL_SCHEMAS.get(entity_type, {})
+                results[entity_type] = self._rule_based_mapping(fields, target_schema, integration_type)
+        return results
+    
+    async def _ai_map_batch(self, sources: Dict[EntityType, Dict[str, Any]]) -> Dict[EntityType, List[FieldMapping]]:
+        """One LLM prompt for all given entity types"""
+        if len(sources) == 1:
+            (entity_type, source_fields), = sources.items()
+            target_schema = CANONICAL_SCHEMAS.get(entity_type, {})
+            return {entity_type: await self._ai_map_fields(source_fields, target_schema, entity_type)}
+        
+        chat = await self._get_chat()
+        if not chat:
+            return {}
+        
+        from emergentintegrations.llm.chat import UserMessage
+        
+        sections = "\n\n".join(
+            f"""=== {entity_type.value} ===
+SOURCE FIELDS:
+{self._format_source_fields(source_fields)}
+
+TARGET SCHEMA:
+{self._format_target_schema(CANONICAL_SCHEMAS.get(entity_type, {}))}"""
+            for entity_type, source_fields in sources.items()
+        )
+        prompt = f"""Map the source fields of each entity type below to its target canonical schema.
+
+{sections}
+
+Return one JSON object keyed by entity type ({", ".join(e.value for e in sources)}). Each value is an array of mappings with:
+- source_field: the original field name
+- target_field: the matching canonical field name
+- confidence: 0.0-1.0 confidence score
+- transform: optional transformation (e.g., "uppercase", "date_parse", "boolean_to_string")
+
+Only include mappings where you're confident (>0.6). Example:
+{{"account": [{{"source_field": "partner_name", "target_field": "name", "confidence": 0.95, "transform": null}}]}}
+"""
+        
+        try:
+            response = await chat.send_message(UserMessage(text=prompt))
+            
+            # Extract JSON object from response
+            json_match = re.search(r'\{[\s\S]*\}', response)
+            if json_match:
+                by_entity = json.loads(json_match.group())
+                return {
+                    entity_type: self._to_field_mappings(by_entity.get(entity_type.value) or [])
+                    for entity_type in sources
+                }
+        except Exception as e:
+            logger.error(f"AI field mapping error: {e}")
+        
+        return {}
     
     async def _ai_map_fields(
         self,
@@ -181,32 +278,30 @@ Only include mappings where you're confident (>0.6). Example:
         try:
             response = await chat.send_message(UserMessage(text=prompt))
             
-            # Parse JSON from response
-            import json
-            import re
-            
             # Extract JSON array from response
             json_match = re.search(r'\[[\s\S]*\]', response)
             if json_match:
-                mappings_data = json.loads(json_match.group())
-                
-                return [
-                    FieldMapping(
-                        source_field=m["source_field"],
-                        target_field=m["target_field"],
-                        confidence=m.get("confidence", 0.8),
-                        transform=m.get("transform"),
-                        is_ai_suggested=True,
-                        is_confirmed=False
-                    )
-                    for m in mappings_data
-                    if m.get("confidence", 0) > 0.5
-                ]
+                return self._to_field_mappings(json.loads(json_match.group()))
         except Exception as e:
             logger.error(f"AI field mapping error: {e}")
         
         return []
     
+    def _to_field_mappings(self, mappings_data: List[Dict[str, Any]]) -> List[FieldMapping]:
+        """FieldMappings from parsed LLM output (low-confidence ones dropped)"""
+        return [
+            FieldMapping(
+                source_field=m["source_field"],
+                target_field=m["target_field"],
+                confidence=m.get("confidence", 0.8),
+                transform=m.get("transform"),
+                is_ai_suggested=True,
+                is_confirmed=False
+            )
+            for m in mappings_data
+            if m.get("confidence", 0) > 0.5
+        ]
+    
     def _rule_based_mapping(
         self,
         source_fields: Dict[str, Any],
@@ -296,3 +391,14 @@ Only include mappings where you're confident (>0.6). Example:
 def get_canonical_schema(entity_type: EntityType) -> Dict[str, Any]:
     """Get canonical schema for entity type"""
     return CANONICAL_SCHEMAS.get(entity_type, {})
+
+
+@lru_cache(maxsize=1)
+def _llm_chat_class():
+    """LlmChat, imported once (None when emergentintegrations is not installed)"""
+    try:
+        from emergentintegrations.llm.chat import LlmChat
+        return LlmChat
+    except ImportError:
+        logger.warning("emergentintegrations not available")
+        return None
@@ -2,6 +2,9 @@
 from .jwt_handler import (
     hash_password,
     verify_password,
+    hash_password_async,
+    verify_password_async,
+    password_hasher,
     create_access_token,
     decode_token,
     get_current_user_from_token,
@@ -3,7 +3,7 @@ JWT Authentication Handler
 Secure token management for the application
 """
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, Depends, status
@@ -11,24 +11,42 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from core.config import settings
 from models.base import UserRole
+from services.auth.password_hasher import PasswordHasher
 
 # Password hashing - support both bcrypt and sha256_crypt for backward compatibility
 pwd_context = CryptContext(schemes=["bcrypt", "sha256_crypt"], deprecated="auto")
 
+# Hashing runs on a bounded pool so bcrypt never blocks the event loop
+password_hasher = PasswordHasher(pwd_context)
+
 # Security bearer
 security = HTTPBearer()
 
 
 def hash_password(password: str) -> str:
-    """Hash a password for storage"""
+    """Hash a password for storage (blocking - prefer hash_password_async in handlers)"""
     return pwd_context.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
+    """Verify a password against its hash (blocking - prefer verify_password_async in handlers)"""
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def hash_password_async(password: str) -> str:
+    """Hash a password for storage on the hasher pool"""
+    return await password_hasher.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password on the hasher pool.
+    Returns (valid, new_hash); new_hash is set when the stored hash uses a
+    deprecated scheme (sha256_crypt) and should be replaced.
+    """
+    return await password_hasher.verify_and_update(plain_password, hashed_password)
+
+
 def create_access_token(
     user_id: str,
     email: str,
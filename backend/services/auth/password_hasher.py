@@ -0,0 +1,160 @@
+"""
+Password Hasher
+Runs password hashing and verification on a bounded worker pool, off the event loop
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from passlib.context import CryptContext
+
+from services.logging.metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+class HasherBusyError(Exception):
+    """Raised when too many hash operations are already waiting"""
+    pass
+
+
+class PasswordHasher:
+    """
+    Bounded pool for CPU-bound password hashing.
+    
+    bcrypt takes ~200-300ms per call; run inline it blocks every other
+    request on the worker. Here each call runs on a small thread pool
+    (bcrypt releases the GIL), at most max_workers at a time. At most
+    max_pending calls may wait for a slot - beyond that callers get
+    HasherBusyError instead of an ever-growing queue.
+    
+    Queue time (waiting for a slot) and run time are recorded separately.
+    """
+    
+    def __init__(
+        self,
+        context: CryptContext,
+        max_workers: int = 4,
+        max_pending: int = 64
+    ):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._stats = {"completed": 0, "rejected": 0, "rehashed": 0}
+        self.queue_time = LatencyHistogram()
+        self.run_time = LatencyHistogram()
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="password-hasher"
+            )
+        return self._executor
+    
+    async def hash(self, password: str) -> str:
+        """Hash a password with the current default scheme"""
+        return await self._submit(self.context.hash, password)
+    
+    async def verify(self, password: str, hashed: str) -> bool:
+        """Verify a password against its hash"""
+        return await self._submit(self.context.verify, password, hashed)
+    
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and, if its hash uses a deprecated scheme
+        (e.g. sha256_crypt), return a replacement hash in the current scheme.
+        """
+        valid, new_hash = await self._submit(self._verify_and_update, password, hashed)
+        if valid and new_hash:
+            self._stats["rehashed"] += 1
+        return valid, new_hash
+    
+    def _verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Runs on the pool; a failed rehash never fails the verification"""
+        if not self.context.verify(password, hashed):
+            return False, None
+        if not self.context.needs_update(hashed):
+            return True, None
+        
+        try:
+            return True, self.context.hash(password)
+        except Exception as e:
+            logger.warning(f"Password rehash failed, keeping legacy hash: {e}")
+            return True, None
+    
+    async def _submit(self, fn: Callable, *args) -> Any:
+        if self._pending >= self.max_pending:
+            self._stats["rejected"] += 1
+            raise HasherBusyError("Too many password operations in progress")
+        
+        self._pending += 1
+        submitted = time.monotonic()
+        
+        def run():
+            started = time.monotonic()
+            try:
+                return fn(*args)
+            finally:
+                self.run_time.observe((time.monotonic() - started) * 1000)
+                self.queue_time.observe((started - submitted) * 1000)
+        
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, run)
+        finally:
+            self._pending -= 1
+            self._stats["completed"] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._pending,
+            "queue_ms": {
+                "count": self.queue_time.count,
+                "p50": self.queue_time.quantile(0.5),
+                "p95": self.queue_time.quantile(0.95),
+                "p99": self.queue_time.quantile(0.99),
+            },
+            "run_ms": {
+                "count": self.run_time.count,
+                "p50": self.run_time.quantile(0.5),
+                "p95": self.run_time.quantile(0.95),
+            },
+        }
+    
+    def render_prometheus(self) -> str:
+        lines = []
+        for name, histogram, help_text in (
+            ("password_hash_queue_seconds", self.queue_time, "Time password operations waited for a hasher thread"),
+            ("password_hash_run_seconds", self.run_time, "Time spent hashing or verifying passwords"),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{le="{bound / 1000:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum {histogram.sum / 1000:.6f}")
+            lines.append(f"{name}_count {histogram.count}")
+        
+        lines += [
+            "# HELP password_hash_rejected_total Password operations rejected because the queue was full",
+            "# TYPE password_hash_rejected_total counter",
+            f"password_hash_rejected_total {self._stats['rejected']}",
+            "# HELP password_hash_in_flight Password operations running or waiting",
+            "# TYPE password_hash_in_flight gauge",
+            f"password_hash_in_flight {self._pending}",
+        ]
+        return "\n".join(lines) + "\n"
+    
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -14,6 +14,8 @@ from models.base import (
     EntityType, IntegrationType, DataLakeZone
 )
 from core.database import Database
+from services.field_mapper import serving_mapped_fields
+from services.rbac.record_access import serving_access_fields
 
 logger = logging.getLogger(__name__)
 
@@ -218,13 +220,19 @@ class DataLakeManager:
                 {"$set": {
                     "data": serving_data,
                     "canonical_refs": canonical_refs,
-                    "last_aggregated": record.last_aggregated
+                    "last_aggregated": record.last_aggregated,
+                    **serving_access_fields(entity_type.value, serving_data),
+                    **serving_mapped_fields(entity_type.value, serving_data),
                 }}
             )
             record.serving_id = existing["serving_id"]
             logger.info(f"Updated serving record: {entity_type.value}/{serving_id}")
         else:
-            await self.serving_collection.insert_one(record.model_dump())
+            await self.serving_collection.insert_one({
+                **record.model_dump(),
+                **serving_access_fields(entity_type.value, serving_data),
+                **serving_mapped_fields(entity_type.value, serving_data),
+            })
             logger.info(f"Inserted serving record: {entity_type.value}/{serving_id}")
         
         return record
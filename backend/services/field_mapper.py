@@ -6,9 +6,28 @@ Normalizes Many2One, Many2Many, and other field types
 from typing import Optional, Dict, Any, List
 import logging
 
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
 logger = logging.getLogger(__name__)
 
 
+# Bump when the mapping or stage rules change; older serving documents are re-derived
+MAPPER_VERSION = 1
+
+# Entity types whose serving records carry a precomputed mapped form
+MAPPED_ENTITIES = ("opportunity", "account", "invoice")
+
+# Odoo stage-name fragments and the pipeline stage they map to (first match wins)
+STAGE_KEYWORDS = (
+    ("won", "closed_won"),
+    ("lost", "closed_lost"),
+    ("negot", "negotiation"),
+    ("propos", "proposal"),
+    ("discov", "discovery"),
+    ("qualif", "qualification"),
+)
+
+
 # Known Many2One fields in Odoo that return [id, "name"] format
 MANY2ONE_FIELDS = {
     "partner_id", "user_id", "stage_id", "country_id", "state_id", 
@@ -247,6 +266,32 @@ class UniversalFieldMapper:
             "source": "odoo",
         }
     
+    def map_invoice(self, odoo_record: Dict[str, Any]) -> Dict[str, Any]:
+        """Map Odoo account.move record to canonical invoice format"""
+        # Extract salesperson (invoice_user_id, or a plain name from the connector)
+        salesperson = odoo_record.get("invoice_user_id") or odoo_record.get("user_id")
+        salesperson_name = salesperson if isinstance(salesperson, str) else self.extract_many2one_name(salesperson)
+        
+        # Extract account (partner_id), falling back to flattened names
+        partner = self.extract_many2one(odoo_record.get("partner_id"))
+        partner_name = odoo_record.get("customer_name") or odoo_record.get("partner_name", "")
+        
+        return {
+            "id": odoo_record.get("id"),
+            "invoice_number": odoo_record.get("invoice_number", odoo_record.get("name", "")),
+            "customer_name": partner["name"] or partner_name,
+            "account_id": partner["id"],
+            "salesperson": salesperson_name,
+            "total_amount": float(odoo_record.get("total_amount", odoo_record.get("amount_total", 0)) or 0),
+            "amount_due": float(odoo_record.get("amount_due", odoo_record.get("amount_residual", 0)) or 0),
+            "amount_paid": float(odoo_record.get("amount_paid", 0) or 0),
+            "payment_status": odoo_record.get("payment_status", odoo_record.get("payment_state", "pending")),
+            "invoice_date": odoo_record.get("invoice_date"),
+            "due_date": odoo_record.get("due_date"),
+            "currency": odoo_record.get("currency", "USD"),
+            "source": "odoo",
+        }
+    
     def map_activity(self, odoo_record: Dict[str, Any]) -> Dict[str, Any]:
         """Map Odoo mail.activity record"""
         # Extract assignee
@@ -278,3 +323,89 @@ def get_field_mapper() -> UniversalFieldMapper:
     if _mapper_instance is None:
         _mapper_instance = UniversalFieldMapper()
     return _mapper_instance
+
+
+def normalize_stage(stage_name: Any) -> str:
+    """Internal pipeline stage for an Odoo stage name"""
+    stage_name_lower = stage_name.lower() if isinstance(stage_name, str) else ""
+    for keyword, stage in STAGE_KEYWORDS:
+        if keyword in stage_name_lower:
+            return stage
+    return "lead"
+
+
+def map_serving_record(entity_type: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Canonical form of a serving record's data (None for unmapped entity types)"""
+    mapper = get_field_mapper()
+    
+    if entity_type == "opportunity":
+        mapped = mapper.map_opportunity(data)
+        mapped["stage"] = normalize_stage(mapped["stage_name"])
+        mapped["salesperson_name"] = mapper.clean_odoo_value(data.get("salesperson_name"))
+        return mapped
+    if entity_type == "account":
+        return mapper.map_account(data)
+    if entity_type == "invoice":
+        return mapper.map_invoice(data)
+    return None
+
+
+def serving_mapped_fields(entity_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields to $set on a data_lake_serving document whenever its data is written"""
+    if entity_type not in MAPPED_ENTITIES:
+        return {}
+    return {
+        "mapped": map_serving_record(entity_type, data or {}),
+        "mapped_version": MAPPER_VERSION,
+    }
+
+
+def mapped_record(entity_type: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The stored mapped form of a serving document, or a freshly mapped one
+    for documents written before MAPPER_VERSION (until re-derived).
+    """
+    if doc.get("mapped_version") == MAPPER_VERSION and doc.get("mapped"):
+        return doc["mapped"]
+    return map_serving_record(entity_type, doc.get("data") or {}) or {}
+
+
+async def rederive_mapped_fields(db: AsyncIOMotorDatabase, batch_size: int = 500) -> int:
+    """
+    Re-map serving documents whose mapped form is missing or from an older
+    MAPPER_VERSION. Runs in the background at startup; never raises.
+    """
+    from pymongo import UpdateOne
+    
+    collection = db.data_lake_serving
+    updated = 0
+    ops = []
+    
+    try:
+        cursor = collection.find(
+            {
+                "entity_type": {"$in": list(MAPPED_ENTITIES)},
+                "mapped_version": {"$ne": MAPPER_VERSION},
+            },
+            {"_id": 1, "entity_type": 1, "data": 1}
+        )
+        async for doc in cursor:
+            ops.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": serving_mapped_fields(doc["entity_type"], doc.get("data") or {})}
+            ))
+            if len(ops) >= batch_size:
+                await collection.bulk_write(ops, ordered=False)
+                updated += len(ops)
+                ops = []
+        
+        if ops:
+            await collection.bulk_write(ops, ordered=False)
+            updated += len(ops)
+    except Exception as e:
+        logger.error(f"Re-deriving mapped serving records failed after {updated}: {e}")
+        return updated
+    
+    if updated:
+        logger.info(f"Re-derived mapped form (v{MAPPER_VERSION}) for {updated} serving records")
+    return updated
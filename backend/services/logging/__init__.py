@@ -2,5 +2,7 @@
 Logging Services Package
 """
 from .system_logger import SystemLogger, system_logger
+from .log_shipper import LogShipper, log_shipper
+from .metrics import RequestMetrics, request_metrics
 
-__all__ = ['SystemLogger', 'system_logger']
+__all__ = ['SystemLogger', 'system_logger', 'LogShipper', 'log_shipper', 'RequestMetrics', 'request_metrics']
@@ -0,0 +1,201 @@
+"""
+Log Shipper - Buffered, Asynchronous Log Writes
+Moves log inserts off the request path into batched background writes
+"""
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from collections import deque
+from datetime import datetime, timezone
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LogShipper:
+    """
+    In-memory ring buffer of log documents drained by a background task.
+    
+    - enqueue() never awaits I/O: requests only pay for a deque append
+    - The drain task flushes with insert_many when flush_size documents
+      are buffered or every flush_interval seconds, whichever comes first
+    - When Mongo is slower than the request rate the buffer fills up and
+      the oldest documents are dropped (counted in stats) instead of
+      blocking requests or growing memory without bound
+    - Before start() (or after stop()) documents are buffered and written
+      by the next flush
+    """
+    
+    def __init__(
+        self,
+        max_buffer: int = 10000,
+        flush_size: int = 500,
+        flush_interval: float = 2.0,
+        write_timeout: float = 10.0,
+        db=None
+    ):
+        self.max_buffer = max_buffer
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.write_timeout = write_timeout
+        self._db = db
+        self._buffer: Deque[Tuple[str, Dict[str, Any]]] = deque(maxlen=max_buffer)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "flushes": 0,
+            "last_flush_ms": None,
+            "last_error": None,
+        }
+    
+    @property
+    def db(self):
+        if self._db is None:
+            from core.database import Database
+            self._db = Database.get_db()
+        return self._db
+    
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    def enqueue(self, collection: str, doc: Dict[str, Any]) -> None:
+        """Buffer a document for the given collection (drops the oldest when full)"""
+        if len(self._buffer) == self.max_buffer:
+            self._stats["dropped"] += 1
+        self._buffer.append((collection, doc))
+        self._stats["enqueued"] += 1
+        
+        if self._wakeup is not None and len(self._buffer) >= self.flush_size:
+            self._wakeup.set()
+    
+    async def start(self, ttl_days: Optional[int] = None) -> None:
+        """Start the drain task; optionally (re)create the api_call_logs TTL index"""
+        if self.is_running:
+            return
+        
+        try:
+            await self.ensure_indexes(ttl_days)
+        except Exception as e:
+            logger.warning(f"Could not ensure api_call_logs indexes: {e}")
+        
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._drain_loop())
+        logger.info(
+            f"Log shipper started (flush every {self.flush_interval}s or {self.flush_size} docs, "
+            f"buffer {self.max_buffer})"
+        )
+    
+    async def stop(self) -> None:
+        """Stop the drain task and write whatever is still buffered"""
+        if self._task:
+            # Let an in-flight insert finish rather than cancel it (its docs
+            # are already off the buffer)
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._wakeup = None
+        
+        while self._buffer:
+            if not await self.flush():
+                break
+        logger.info(f"Log shipper stopped: {self.get_stats()}")
+    
+    async def ensure_indexes(self, ttl_days: Optional[int] = None) -> None:
+        """Indexes for the admin log views, plus TTL expiry of API call logs"""
+        collection = self.db.api_call_logs
+        
+        if ttl_days:
+            expire_seconds = ttl_days * 86400
+            try:
+                await collection.create_index(
+                    "timestamp",
+                    expireAfterSeconds=expire_seconds,
+                    name="timestamp_ttl"
+                )
+            except Exception:
+                # Index exists with another expiry - update it in place
+                await self.db.command(
+                    "collMod",
+                    "api_call_logs",
+                    index={"name": "timestamp_ttl", "expireAfterSeconds": expire_seconds}
+                )
+        
+        await collection.create_index([("session_id", 1), ("timestamp", 1)])
+        await collection.create_index([("is_error", 1), ("timestamp", -1)])
+    
+    async def flush(self) -> int:
+        """Write up to flush_size buffered documents; returns the number written"""
+        if not self._buffer:
+            return 0
+        
+        batch: List[Tuple[str, Dict[str, Any]]] = []
+        while self._buffer and len(batch) < self.flush_size:
+            batch.append(self._buffer.popleft())
+        
+        by_collection: Dict[str, List[Dict[str, Any]]] = {}
+        for collection, doc in batch:
+            by_collection.setdefault(collection, []).append(doc)
+        
+        started = time.monotonic()
+        written = 0
+        
+        for collection, docs in by_collection.items():
+            try:
+                await asyncio.wait_for(
+                    self.db[collection].insert_many(docs, ordered=False),
+                    timeout=self.write_timeout
+                )
+                written += len(docs)
+            except Exception as e:
+                # Logging must never take the app down - count and move on
+                self._stats["failed"] += len(docs)
+                self._stats["last_error"] = f"{type(e).__name__}: {e}"
+                logger.warning(f"Log shipper dropped {len(docs)} {collection} docs: {e}")
+        
+        self._stats["written"] += written
+        self._stats["flushes"] += 1
+        self._stats["last_flush_ms"] = round((time.monotonic() - started) * 1000, 1)
+        return written
+    
+    async def _drain_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            
+            try:
+                # Drain everything that accumulated, one insert_many per flush_size docs
+                while self._buffer:
+                    await self.flush()
+                    if len(self._buffer) < self.flush_size:
+                        break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Log shipper flush failed: {e}")
+            
+            if self._closing:
+                return
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "buffered": len(self._buffer),
+            "max_buffer": self.max_buffer,
+            "running": self.is_running,
+            "as_of": datetime.now(timezone.utc).isoformat(),
+        }
+
+
+# Global log shipper instance
+log_shipper = LogShipper()
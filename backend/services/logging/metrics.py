@@ -0,0 +1,226 @@
+"""
+Request Metrics - In-Process Latency Histograms
+Per-route latency, status and DB-call aggregates, exported in Prometheus text format
+"""
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timezone
+import time
+
+# Latency bucket upper bounds in milliseconds (Prometheus "le" labels are in seconds)
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Per-minute request/error totals kept for windowed stats (7 days)
+WINDOW_MINUTES = 7 * 24 * 60
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram; quantiles are interpolated within a bucket"""
+    
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+    
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    # Beyond the last bound there is nothing to interpolate against
+                    return float(self.buckets[-1])
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return float(self.buckets[-1])
+
+
+class RouteStats:
+    """Aggregates for one method + route template"""
+    
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.status_counts: Dict[int, int] = {}
+        self.db_calls = 0
+        self.db_time_ms = 0.0
+    
+    @property
+    def errors(self) -> int:
+        return sum(count for status, count in self.status_counts.items() if status >= 400)
+
+
+class RequestMetrics:
+    """
+    Process-wide request metrics, fed by the error handler middleware.
+    
+    Routes are keyed by their template (e.g. /api/sales/accounts/{account_id})
+    so path parameters don't explode the label space. Values are per
+    process: with several workers each one reports its own.
+    """
+    
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._routes: Dict[Tuple[str, str], RouteStats] = {}
+        # [minute epoch, requests, errors]
+        self._minutes: Deque[List[int]] = deque(maxlen=WINDOW_MINUTES)
+    
+    def observe_request(
+        self,
+        method: str,
+        route: Optional[str],
+        status_code: int,
+        duration_ms: float,
+        db_calls: int = 0,
+        db_time_ms: float = 0.0
+    ) -> None:
+        key = (method, route or UNMATCHED_ROUTE)
+        stats = self._routes.get(key)
+        if stats is None:
+            stats = self._routes[key] = RouteStats()
+        
+        stats.latency.observe(duration_ms)
+        stats.status_counts[status_code] = stats.status_counts.get(status_code, 0) + 1
+        stats.db_calls += db_calls
+        stats.db_time_ms += db_time_ms
+        
+        minute = int(time.time() // 60)
+        if not self._minutes or self._minutes[-1][0] != minute:
+            self._minutes.append([minute, 0, 0])
+        self._minutes[-1][1] += 1
+        if status_code >= 400:
+            self._minutes[-1][2] += 1
+    
+    def totals_since(self, since: datetime) -> Dict[str, Any]:
+        """Request and error totals since a point in time (bounded by process start)"""
+        since_minute = int(since.timestamp() // 60)
+        requests = errors = 0
+        for minute, minute_requests, minute_errors in reversed(self._minutes):
+            if minute < since_minute:
+                break
+            requests += minute_requests
+            errors += minute_errors
+        
+        return {
+            "total": requests,
+            "failed": errors,
+            "success": requests - errors,
+            "success_rate": ((requests - errors) / requests * 100) if requests else 100,
+            "collected_since": max(since, self.started_at).isoformat(),
+        }
+    
+    def route_summary(self, route_filter: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-route count, error count, average and p50/p95/p99 latency (ms)"""
+        summary = []
+        for (method, route), stats in self._routes.items():
+            if route_filter and route_filter.lower() not in route.lower():
+                continue
+            
+            count = stats.latency.count
+            summary.append({
+                "method": method,
+                "route": route,
+                "count": count,
+                "errors": stats.errors,
+                "status_counts": {str(k): v for k, v in sorted(stats.status_counts.items())},
+                "avg_ms": round(stats.latency.sum / count, 1) if count else None,
+                **{
+                    f"p{int(q * 100)}_ms": _round(stats.latency.quantile(q))
+                    for q in QUANTILES
+                },
+                "db_calls": stats.db_calls,
+                "db_calls_per_request": round(stats.db_calls / count, 2) if count else None,
+                "db_time_ms": round(stats.db_time_ms, 1),
+            })
+        
+        summary.sort(key=lambda r: r["count"], reverse=True)
+        return summary
+    
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route template",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), stats in sorted(self._routes.items()):
+            labels = _labels(method=method, route=route)
+            cumulative = 0
+            for bound, bucket_count in zip(stats.latency.buckets, stats.latency.counts):
+                cumulative += bucket_count
+                lines.append(
+                    f'http_request_duration_seconds_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}'
+                )
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.latency.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {stats.latency.sum / 1000:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {stats.latency.count}")
+        
+        lines += [
+            "# HELP http_request_duration_quantile_seconds Estimated latency quantiles by route template",
+            "# TYPE http_request_duration_quantile_seconds gauge",
+        ]
+        for (method, route), stats in sorted(self._routes.items()):
+            for q in QUANTILES:
+                value = stats.latency.quantile(q)
+                if value is not None:
+                    labels = _labels(method=method, route=route, quantile=f"{q:g}")
+                    lines.append(f"http_request_duration_quantile_seconds{{{labels}}} {value / 1000:.6f}")
+        
+        lines += [
+            "# HELP http_requests_total Requests by route template and status code",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route), stats in sorted(self._routes.items()):
+            for status_code, count in sorted(stats.status_counts.items()):
+                labels = _labels(method=method, route=route, status=str(status_code))
+                lines.append(f"http_requests_total{{{labels}}} {count}")
+        
+        lines += [
+            "# HELP http_request_db_calls_total Database commands issued while serving requests",
+            "# TYPE http_request_db_calls_total counter",
+        ]
+        for (method, route), stats in sorted(self._routes.items()):
+            lines.append(f"http_request_db_calls_total{{{_labels(method=method, route=route)}}} {stats.db_calls}")
+        
+        lines += [
+            "# HELP http_request_db_seconds_total Time spent in database commands while serving requests",
+            "# TYPE http_request_db_seconds_total counter",
+        ]
+        for (method, route), stats in sorted(self._routes.items()):
+            lines.append(
+                f"http_request_db_seconds_total{{{_labels(method=method, route=route)}}} {stats.db_time_ms / 1000:.6f}"
+            )
+        
+        return "\n".join(lines) + "\n"
+    
+    def reset(self) -> None:
+        self.__init__()
+
+
+def _labels(**labels: str) -> str:
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels.items()
+    )
+    return ",".join(f'{k}="{v}"' for k, v in escaped)
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+# Global request metrics instance
+request_metrics = RequestMetrics()
@@ -10,6 +10,7 @@ import logging
 import json
 
 from core.database import Database
+from .log_shipper import log_shipper
 
 logger = logging.getLogger(__name__)
 
@@ -133,6 +134,7 @@ class SystemLogger:
     ):
         """
         Log API call for monitoring and debugging.
+        Buffered by the log shipper - no database I/O on the request path.
         
         Args:
             method: HTTP method
@@ -145,7 +147,7 @@ class SystemLogger:
             response_body: Response payload (sanitized)
             error: Error message if failed
         """
-        await self.db.api_call_logs.insert_one({
+        log_shipper.enqueue("api_call_logs", {
             "id": str(uuid.uuid4()),
             "method": method,
             "endpoint": endpoint,
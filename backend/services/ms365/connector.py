@@ -2,15 +2,31 @@
 Microsoft 365 Connector
 Handles Microsoft Graph API calls for data synchronization
 """
+import asyncio
 import logging
 import aiohttp
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
 GRAPH_API_BASE = "https://graph.microsoft.com/v1.0"
 
+# Throttled (429) or briefly unavailable (503) requests are retried after Retry-After
+THROTTLE_STATUSES = {429, 503}
+MAX_THROTTLE_RETRIES = 3
+
+
+MAIL_SELECT = "id,subject,from,toRecipients,ccRecipients,receivedDateTime,sentDateTime,bodyPreview,hasAttachments,importance,isRead,webLink"
+
+
+class TokenExpiredError(Exception):
+    """The user's Microsoft access token was rejected (401)"""
+
+
+class DeltaLinkExpired(Exception):
+    """Graph no longer has the sync state behind a delta link (410) - start a full sync"""
+
 
 class MS365Connector:
     """
@@ -34,23 +50,57 @@ class MS365Connector:
         if self._session:
             await self._session.close()
     
-    async def _make_request(self, endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
-        """Make a GET request to Microsoft Graph API"""
-        url = f"{GRAPH_API_BASE}{endpoint}"
+    async def _make_request(
+        self,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """Make a GET request to Microsoft Graph API (endpoint path or full nextLink/deltaLink URL)"""
+        url = endpoint if endpoint.startswith("https://") else f"{GRAPH_API_BASE}{endpoint}"
         
-        try:
-            async with self._session.get(url, params=params) as response:
-                if response.status == 401:
-                    raise Exception("Microsoft access token expired or invalid")
-                elif response.status == 403:
-                    raise Exception("Insufficient permissions for this operation")
-                elif response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"Graph API error ({response.status}): {error_text}")
-                
-                return await response.json()
-        except aiohttp.ClientError as e:
-            raise Exception(f"Network error calling Graph API: {str(e)}")
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            try:
+                async with self._session.get(url, params=params, headers=headers) as response:
+                    if response.status in THROTTLE_STATUSES and attempt < MAX_THROTTLE_RETRIES:
+                        retry_after = response.headers.get("Retry-After", "")
+                        await asyncio.sleep(float(retry_after) if retry_after.isdigit() else 2 ** attempt)
+                        continue
+                    if response.status == 401:
+                        raise TokenExpiredError("Microsoft access token expired or invalid")
+                    elif response.status == 403:
+                        raise Exception("Insufficient permissions for this operation")
+                    elif response.status == 410:
+                        raise DeltaLinkExpired("Graph delta sync state expired")
+                    elif response.status != 200:
+                        error_text = await response.text()
+                        raise Exception(f"Graph API error ({response.status}): {error_text}")
+                    
+                    return await response.json()
+            except aiohttp.ClientError as e:
+                raise Exception(f"Network error calling Graph API: {str(e)}")
+    
+    async def delta_pages(
+        self,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        delta_link: Optional[str] = None,
+        page_size: int = 100
+    ) -> AsyncIterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """
+        Pages of a Graph delta query as (items, delta_link), following
+        @odata.nextLink. The new delta link comes with the last page only.
+        Starts from delta_link when given (changes since that sync).
+        Removed items carry an "@removed" key and their id.
+        """
+        url, query = (delta_link, None) if delta_link else (endpoint, params)
+        headers = {"Prefer": f"odata.maxpagesize={page_size}"}
+        
+        while url:
+            result = await self._make_request(url, query, headers=headers)
+            next_link = result.get("@odata.nextLink")
+            yield result.get("value", []), None if next_link else result.get("@odata.deltaLink")
+            url, query = next_link, None
     
     async def get_user_profile(self) -> Dict[str, Any]:
         """Get current user's profile"""
@@ -128,28 +178,13 @@ class MS365Connector:
                 "$top": top,
                 "$skip": skip,
                 "$orderby": "receivedDateTime desc",
-                "$select": "id,subject,from,toRecipients,ccRecipients,receivedDateTime,sentDateTime,bodyPreview,hasAttachments,importance,isRead,webLink"
+                "$select": MAIL_SELECT
             }
             
             result = await self._make_request("/me/messages", params)
             
             for msg in result.get("value", []):
-                email_record = {
-                    "source_id": msg.get("id"),
-                    "subject": msg.get("subject", ""),
-                    "from_email": msg.get("from", {}).get("emailAddress", {}).get("address", ""),
-                    "from_name": msg.get("from", {}).get("emailAddress", {}).get("name", ""),
-                    "to_recipients": [r.get("emailAddress", {}).get("address", "") for r in msg.get("toRecipients", [])],
-                    "cc_recipients": [r.get("emailAddress", {}).get("address", "") for r in msg.get("ccRecipients", [])],
-                    "received_at": msg.get("receivedDateTime"),
-                    "sent_at": msg.get("sentDateTime"),
-                    "body_preview": msg.get("bodyPreview", ""),
-                    "has_attachments": msg.get("hasAttachments", False),
-                    "importance": msg.get("importance", "normal"),
-                    "is_read": msg.get("isRead", False),
-                    "web_link": msg.get("webLink", "")
-                }
-                emails.append(email_record)
+                emails.append(self._map_email(msg))
             
             logger.info(f"Fetched {len(emails)} emails from MS365")
             return emails
@@ -176,31 +211,7 @@ class MS365Connector:
             result = await self._make_request("/me/events", params)
             
             for event in result.get("value", []):
-                event_record = {
-                    "source_id": event.get("id"),
-                    "subject": event.get("subject", ""),
-                    "organizer_email": event.get("organizer", {}).get("emailAddress", {}).get("address", ""),
-                    "organizer_name": event.get("organizer", {}).get("emailAddress", {}).get("name", ""),
-                    "attendees": [
-                        {
-                            "email": a.get("emailAddress", {}).get("address", ""),
-                            "name": a.get("emailAddress", {}).get("name", ""),
-                            "response": a.get("status", {}).get("response", "")
-                        }
-                        for a in event.get("attendees", [])
-                    ],
-                    "start_time": event.get("start", {}).get("dateTime"),
-                    "start_timezone": event.get("start", {}).get("timeZone"),
-                    "end_time": event.get("end", {}).get("dateTime"),
-                    "end_timezone": event.get("end", {}).get("timeZone"),
-                    "location": event.get("location", {}).get("displayName", ""),
-                    "body_preview": event.get("bodyPreview", ""),
-                    "is_all_day": event.get("isAllDay", False),
-                    "is_cancelled": event.get("isCancelled", False),
-                    "web_link": event.get("webLink", ""),
-                    "online_meeting_url": event.get("onlineMeetingUrl", "")
-                }
-                events.append(event_record)
+                events.append(self._map_event(event))
             
             logger.info(f"Fetched {len(events)} calendar events from MS365")
             return events
@@ -288,3 +299,48 @@ class MS365Connector:
         except Exception as e:
             logger.error(f"Error fetching files: {e}")
             raise
+    
+    @staticmethod
+    def _map_email(msg: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "source_id": msg.get("id"),
+            "subject": msg.get("subject", ""),
+            "from_email": (msg.get("from") or {}).get("emailAddress", {}).get("address", ""),
+            "from_name": (msg.get("from") or {}).get("emailAddress", {}).get("name", ""),
+            "to_recipients": [r.get("emailAddress", {}).get("address", "") for r in msg.get("toRecipients") or []],
+            "cc_recipients": [r.get("emailAddress", {}).get("address", "") for r in msg.get("ccRecipients") or []],
+            "received_at": msg.get("receivedDateTime"),
+            "sent_at": msg.get("sentDateTime"),
+            "body_preview": msg.get("bodyPreview", ""),
+            "has_attachments": msg.get("hasAttachments", False),
+            "importance": msg.get("importance", "normal"),
+            "is_read": msg.get("isRead", False),
+            "web_link": msg.get("webLink", "")
+        }
+    
+    @staticmethod
+    def _map_event(event: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "source_id": event.get("id"),
+            "subject": event.get("subject", ""),
+            "organizer_email": (event.get("organizer") or {}).get("emailAddress", {}).get("address", ""),
+            "organizer_name": (event.get("organizer") or {}).get("emailAddress", {}).get("name", ""),
+            "attendees": [
+                {
+                    "email": a.get("emailAddress", {}).get("address", ""),
+                    "name": a.get("emailAddress", {}).get("name", ""),
+                    "response": a.get("status", {}).get("response", "")
+                }
+                for a in event.get("attendees") or []
+            ],
+            "start_time": (event.get("start") or {}).get("dateTime"),
+            "start_timezone": (event.get("start") or {}).get("timeZone"),
+            "end_time": (event.get("end") or {}).get("dateTime"),
+            "end_timezone": (event.get("end") or {}).get("timeZone"),
+            "location": (event.get("location") or {}).get("displayName", ""),
+            "body_preview": event.get("bodyPreview", ""),
+            "is_all_day": event.get("isAllDay", False),
+            "is_cancelled": event.get("isCancelled", False),
+            "web_link": event.get("webLink", ""),
+            "online_meeting_url": event.get("onlineMeetingUrl", "")
+        }
@@ -0,0 +1,289 @@
+"""
+Microsoft 365 Delta Sync
+Incremental mailbox and calendar sync into user_emails / user_calendar
+using Graph delta queries, with one stored delta link per user and kind
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import uuid
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DeleteOne, UpdateOne
+
+from core.config import settings
+from services.ms365.connector import MAIL_SELECT, DeltaLinkExpired, MS365Connector, TokenExpiredError
+
+logger = logging.getLogger(__name__)
+
+STATE_COLLECTION = "ms365_delta_state"
+
+MAIL = "mail"
+CALENDAR = "calendar"
+
+# Cache collection and Graph item ID field per kind
+KINDS = {
+    MAIL: ("user_emails", "ms_email_id"),
+    CALENDAR: ("user_calendar", "ms_event_id"),
+}
+
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _graph_time(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def email_record(email: Dict[str, Any]) -> Dict[str, Any]:
+    """Cached user_emails fields of a mapped Graph message"""
+    return {
+        "subject": email.get("subject", ""),
+        "from_email": email.get("from_email", ""),
+        "from_name": email.get("from_name", ""),
+        "to_recipients": email.get("to_recipients", []),
+        "received_at": email.get("received_at"),
+        "body_preview": email.get("body_preview", ""),
+        "has_attachments": email.get("has_attachments", False),
+        "is_read": email.get("is_read", False),
+        "importance": email.get("importance", "normal"),
+        "web_link": email.get("web_link", ""),
+    }
+
+
+def event_record(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Cached user_calendar fields of a mapped Graph event"""
+    return {
+        "subject": event.get("subject", ""),
+        "organizer_email": event.get("organizer_email", ""),
+        "organizer_name": event.get("organizer_name", ""),
+        "attendees": event.get("attendees", []),
+        "start_time": event.get("start_time"),
+        "end_time": event.get("end_time"),
+        "location": event.get("location", ""),
+        "body_preview": event.get("body_preview", ""),
+        "is_all_day": event.get("is_all_day", False),
+        "is_cancelled": event.get("is_cancelled", False),
+        "web_link": event.get("web_link", ""),
+        "online_meeting_url": event.get("online_meeting_url", ""),
+    }
+
+
+class MailboxDeltaSync:
+    """
+    Graph delta sync of each connected user's inbox and calendar.
+    
+    - The first sync (or one after Graph expires the sync state) reads the
+      whole window - inbox mail from the last MS365_MAIL_SYNC_DAYS, calendar
+      from MS365_CALENDAR_PAST_DAYS back to MS365_CALENDAR_FUTURE_DAYS ahead -
+      and prunes cached items it did not see
+    - Later syncs replay only changes since the stored delta link
+    - Each page is applied with one ordered bulk_write (upserts and deletes)
+    - The calendar window is fixed when a delta sync starts, so it is
+      re-based every MS365_CALENDAR_WINDOW_ROLL_DAYS with a full sync
+    """
+    
+    # Users with a sync in progress in this process
+    _in_progress: Set[str] = set()
+    
+    connector_class = MS365Connector
+    
+    def __init__(self, db: AsyncIOMotorDatabase, concurrency: Optional[int] = None, page_size: Optional[int] = None):
+        self.db = db
+        self.state = db[STATE_COLLECTION]
+        self.concurrency = concurrency or settings.MS365_SYNC_CONCURRENCY
+        self.page_size = page_size or settings.MS365_DELTA_PAGE_SIZE
+    
+    async def ensure_indexes(self) -> None:
+        await self.state.create_index([("user_id", 1), ("kind", 1)], unique=True)
+        for collection_name, id_field in KINDS.values():
+            await self._ensure_unique_item_index(self.db[collection_name], id_field)
+        await self.db.user_emails.create_index([("owner_user_id", 1), ("received_at", -1)])
+        await self.db.user_calendar.create_index([("owner_user_id", 1), ("start_time", 1)])
+    
+    async def _ensure_unique_item_index(self, collection, id_field: str) -> None:
+        """
+        One cached row per user and Graph item: drop duplicates left by the
+        old fetch-and-insert routes (keeping the latest synced row), then
+        replace the earlier non-unique index with a unique one.
+        """
+        removed = 0
+        duplicates = collection.aggregate([
+            {"$sort": {"synced_at": -1, "_id": -1}},
+            {"$group": {
+                "_id": {"owner": "$owner_user_id", "item": {"$ifNull": [f"${id_field}", None]}},
+                "ids": {"$push": "$_id"},
+                "count": {"$sum": 1},
+            }},
+            {"$match": {"count": {"$gt": 1}}},
+        ], allowDiskUse=True)
+        async for group in duplicates:
+            result = await collection.delete_many({"_id": {"$in": group["ids"][1:]}})
+            removed += result.deleted_count
+        if removed:
+            logger.info(f"Removed {removed} duplicate {collection.name} rows")
+        
+        name = f"owner_user_id_1_{id_field}_1"
+        existing = (await collection.index_information()).get(name)
+        if existing and not existing.get("unique"):
+            await collection.drop_index(name)
+        await collection.create_index([("owner_user_id", 1), (id_field, 1)], unique=True, name=name)
+    
+    @classmethod
+    def is_syncing(cls, user_id: str) -> bool:
+        return user_id in cls._in_progress
+    
+    async def get_state(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """Last sync time and stats per kind (no delta links)"""
+        states = {}
+        async for doc in self.state.find({"user_id": user_id}, {"_id": 0, "delta_link": 0}):
+            states[doc["kind"]] = doc
+        return states
+    
+    async def sync_user(
+        self,
+        user_id: str,
+        access_token: str,
+        kinds: Iterable[str] = (MAIL, CALENDAR),
+        full: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Sync one user's mail and/or calendar; returns per-kind stats (empty
+        if a sync for this user is already running). An expired token is
+        cleared from the user, as the personal routes do, and re-raised.
+        """
+        if user_id in self._in_progress:
+            return {}
+        self._in_progress.add(user_id)
+        
+        try:
+            results = {}
+            async with self.connector_class(access_token) as connector:
+                for kind in kinds:
+                    results[kind] = await self._sync_kind(connector, user_id, kind, full)
+            return results
+        except TokenExpiredError:
+            await self.db.users.update_one({"id": user_id}, {"$unset": {"ms_access_token": ""}})
+            raise
+        finally:
+            self._in_progress.discard(user_id)
+    
+    def _delta_request(self, kind: str, now: datetime) -> tuple:
+        if kind == MAIL:
+            since = now - timedelta(days=settings.MS365_MAIL_SYNC_DAYS)
+            return "/me/mailFolders/inbox/messages/delta", {
+                "$select": MAIL_SELECT,
+                "$filter": f"receivedDateTime ge {_graph_time(since)}",
+            }
+        start = now - timedelta(days=settings.MS365_CALENDAR_PAST_DAYS)
+        end = now + timedelta(days=settings.MS365_CALENDAR_FUTURE_DAYS)
+        return "/me/calendarView/delta", {"startDateTime": _graph_time(start), "endDateTime": _graph_time(end)}
+    
+    async def _sync_kind(self, connector: MS365Connector, user_id: str, kind: str, full: bool) -> Dict[str, Any]:
+        started = datetime.now(timezone.utc)
+        state = await self.state.find_one({"user_id": user_id, "kind": kind}) or {}
+        delta_link = None if full else state.get("delta_link")
+        
+        if kind == CALENDAR and delta_link:
+            rebased = state.get("window_rebased_at")
+            if not rebased or started - _utc(rebased) > timedelta(days=settings.MS365_CALENDAR_WINDOW_ROLL_DAYS):
+                delta_link = None
+        
+        endpoint, params = self._delta_request(kind, started)
+        stats = {"upserted": 0, "deleted": 0, "pages": 0, "full": delta_link is None}
+        
+        try:
+            new_link = await self._consume(connector.delta_pages(endpoint, params, delta_link, self.page_size), user_id, kind, stats)
+        except DeltaLinkExpired:
+            logger.info(f"MS365 {kind} delta state expired for user {user_id}, running a full sync")
+            stats.update(upserted=0, deleted=0, pages=0, full=True)
+            new_link = await self._consume(connector.delta_pages(endpoint, params, None, self.page_size), user_id, kind, stats)
+        
+        update: Dict[str, Any] = {"delta_link": new_link, "last_sync_at": datetime.now(timezone.utc)}
+        if stats["full"]:
+            # Anything not seen by a full pass is gone (or outside the window)
+            collection, _ = KINDS[kind]
+            result = await self.db[collection].delete_many({"owner_user_id": user_id, "synced_at": {"$lt": started}})
+            stats["deleted"] += result.deleted_count
+            update["window_rebased_at"] = started
+        
+        update["last_stats"] = stats
+        await self.state.update_one({"user_id": user_id, "kind": kind}, {"$set": update}, upsert=True)
+        return stats
+    
+    async def _consume(self, pages, user_id: str, kind: str, stats: Dict[str, Any]) -> Optional[str]:
+        """Apply every page; returns the final delta link"""
+        new_link = None
+        async for items, delta_link in pages:
+            upserted, deleted = await self._apply(user_id, kind, items)
+            stats["upserted"] += upserted
+            stats["deleted"] += deleted
+            stats["pages"] += 1
+            new_link = delta_link or new_link
+        return new_link
+    
+    async def _apply(self, user_id: str, kind: str, items: List[Dict[str, Any]]) -> tuple:
+        collection, id_field = KINDS[kind]
+        now = datetime.now(timezone.utc)
+        ops = []
+        upserted = deleted = 0
+        
+        for item in items:
+            if not item.get("id"):
+                continue
+            key = {"owner_user_id": user_id, id_field: item["id"]}
+            if "@removed" in item:
+                ops.append(DeleteOne(key))
+                deleted += 1
+                continue
+            
+            if kind == MAIL:
+                record = email_record(MS365Connector._map_email(item))
+            else:
+                record = event_record(MS365Connector._map_event(item))
+            ops.append(UpdateOne(
+                key,
+                {
+                    "$set": {**record, **key, "synced_at": now},
+                    "$setOnInsert": {"id": str(uuid.uuid4())},
+                },
+                upsert=True
+            ))
+            upserted += 1
+        
+        if ops:
+            # Ordered: an item changed and then removed within a page ends up removed
+            await self.db[collection].bulk_write(ops, ordered=True)
+        return upserted, deleted
+    
+    async def sync_all(self) -> Dict[str, Any]:
+        """Delta-sync every connected user, at most `concurrency` at a time"""
+        users = await self.db.users.find(
+            {"ms_access_token": {"$exists": True, "$ne": ""}},
+            {"_id": 0, "id": 1, "ms_access_token": 1}
+        ).to_list(None)
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        totals = {"users": len(users), "synced": 0, "expired": 0, "failed": 0, "upserted": 0, "deleted": 0}
+        
+        async def sync_one(user: Dict[str, Any]) -> None:
+            async with semaphore:
+                try:
+                    results = await self.sync_user(user["id"], user["ms_access_token"])
+                except TokenExpiredError:
+                    totals["expired"] += 1
+                    return
+                except Exception as e:
+                    totals["failed"] += 1
+                    logger.warning(f"MS365 delta sync failed for user {user['id']}: {e}")
+                    return
+                totals["synced"] += 1
+                for stats in results.values():
+                    totals["upserted"] += stats["upserted"]
+                    totals["deleted"] += stats["deleted"]
+        
+        await asyncio.gather(*(sync_one(user) for user in users))
+        logger.info(f"MS365 delta sync: {totals}")
+        return totals
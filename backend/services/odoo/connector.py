@@ -2,18 +2,20 @@
 Odoo REST API Connector
 Supports Odoo 16+ with REST/JSON-RPC API
 """
-import httpx
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+from integrations.odoo.transport import OdooTransport, normalize_url
+
 logger = logging.getLogger(__name__)
 
 
 class OdooConnector:
     """
     Odoo REST API Connector for v16+
-    Uses JSON-RPC for authenticated API calls
+    Uses JSON-RPC for authenticated API calls, over the shared pooled
+    OdooTransport (no new TLS handshake or login per `async with`)
     """
     
     def __init__(
@@ -24,83 +26,34 @@ class OdooConnector:
         api_key: str
     ):
         # Normalize URL - extract base URL without paths like /odoo, /web, etc.
-        self.url = self._normalize_url(url)
+        self.url = normalize_url(url)
         self.database = database
         self.username = username
         self.api_key = api_key
         self.uid: Optional[int] = None
-        self._client: Optional[httpx.AsyncClient] = None
-    
-    def _normalize_url(self, url: str) -> str:
-        """
-        Normalize Odoo URL to base URL.
-        Handles: https://example.odoo.com/odoo -> https://example.odoo.com
-        """
-        url = url.rstrip('/')
-        # Remove common Odoo path suffixes
-        suffixes_to_remove = ['/odoo', '/web', '/jsonrpc', '/xmlrpc']
-        for suffix in suffixes_to_remove:
-            if url.lower().endswith(suffix):
-                url = url[:-len(suffix)]
-        return url
+        self._transport: Optional[OdooTransport] = None
     
     async def __aenter__(self):
         """Async context manager entry"""
-        self._client = httpx.AsyncClient(timeout=30.0)
+        self._transport = OdooTransport.get(self.url, self.database, self.username, self.api_key)
         await self.authenticate()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit"""
-        if self._client:
-            await self._client.aclose()
+        """Async context manager exit - the pooled transport stays open for the next caller"""
+        self._transport = None
     
     async def authenticate(self) -> bool:
         """
         Authenticate with Odoo and get user ID.
-        Uses JSON-RPC authentication endpoint.
+        The uid is cached on the shared transport, so this only hits the
+        network for the first connector with these credentials.
         """
         try:
-            endpoint = f"{self.url}/jsonrpc"
-            logger.info(f"Attempting Odoo authentication at: {endpoint}")
-            
-            payload = {
-                "jsonrpc": "2.0",
-                "method": "call",
-                "params": {
-                    "service": "common",
-                    "method": "authenticate",
-                    "args": [self.database, self.username, self.api_key, {}]
-                },
-                "id": 1
-            }
-            
-            response = await self._client.post(endpoint, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get("result"):
-                self.uid = result["result"]
-                logger.info(f"Odoo authentication successful. UID: {self.uid}")
-                return True
-            elif result.get("error"):
-                error_data = result.get("error", {})
-                error_msg = error_data.get("data", {}).get("message") or error_data.get("message", "Unknown error")
-                logger.error(f"Odoo authentication failed: {error_msg}")
-                raise Exception(f"Authentication failed: {error_msg}")
-            else:
-                # UID is False means invalid credentials
-                logger.error("Odoo authentication failed: Invalid credentials")
-                raise Exception("Invalid credentials - please check username and API key")
-                
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Odoo HTTP error: {e}")
-            raise Exception(f"HTTP error {e.response.status_code}: Check if URL is correct")
-        except httpx.ConnectError as e:
-            logger.error(f"Odoo connection error: {e}")
-            raise Exception("Cannot connect to Odoo server. Check the URL.")
+            self.uid = await self._transport.authenticate()
+            return True
         except Exception as e:
-            logger.error(f"Odoo authentication error: {e}")
+            logger.error(f"Odoo authentication error at {self.url}/jsonrpc: {e}")
             raise
     
     async def execute(
@@ -116,42 +69,7 @@ class OdooConnector:
         if not self.uid:
             raise RuntimeError("Not authenticated. Call authenticate() first.")
         
-        args = args or []
-        kwargs = kwargs or {}
-        
-        endpoint = f"{self.url}/jsonrpc"
-        payload = {
-            "jsonrpc": "2.0",
-            "method": "call",
-            "params": {
-                "service": "object",
-                "method": "execute_kw",
-                "args": [
-                    self.database,
-                    self.uid,
-                    self.api_key,
-                    model,
-                    method,
-                    args,
-                    kwargs
-                ]
-            },
-            "id": 2
-        }
-        
-        response = await self._client.post(endpoint, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        
-        if "error" in result:
-            error_data = result["error"]
-            error_msg = error_data.get("message", "Unknown error")
-            error_data_detail = error_data.get("data", {})
-            debug_info = error_data_detail.get("debug", "")
-            logger.error(f"Odoo API error details - Message: {error_msg}, Debug: {debug_info[:500] if debug_info else 'N/A'}")
-            raise Exception(f"Odoo API error: {error_msg}")
-        
-        return result.get("result")
+        return await self._transport.execute_kw(model, method, args or [], kwargs or {})
     
     async def search_read(
         self,
@@ -392,23 +310,7 @@ class OdooConnector:
     async def test_connection(self) -> Dict[str, Any]:
         """Test connection and return server info"""
         try:
-            endpoint = f"{self.url}/jsonrpc"
-            payload = {
-                "jsonrpc": "2.0",
-                "method": "call",
-                "params": {
-                    "service": "common",
-                    "method": "version",
-                    "args": []
-                },
-                "id": 0
-            }
-            
-            response = await self._client.post(endpoint, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            
-            version_info = result.get("result", {})
+            version_info = await self._transport.version()
             
             return {
                 "connected": True,
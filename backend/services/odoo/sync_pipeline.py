@@ -12,6 +12,8 @@ from typing import Dict, List, Any, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from integrations.odoo.connector import OdooConnector
+from services.field_mapper import serving_mapped_fields
+from services.rbac.record_access import serving_access_fields
 
 logger = logging.getLogger(__name__)
 
@@ -419,7 +421,9 @@ class OdooSyncPipelineService:
                         "source": "odoo",
                         "last_aggregated": datetime.now(timezone.utc).isoformat(),
                         "data": acc,
-                        "is_active": True  # Mark as active
+                        "is_active": True,  # Mark as active
+                        **serving_access_fields("account", acc),
+                        **serving_mapped_fields("account", acc),
                     }
                     await self.db.data_lake_serving.update_one(
                         {"serving_id": serving_doc["serving_id"]},
@@ -463,7 +467,9 @@ class OdooSyncPipelineService:
                         "source": "odoo",
                         "last_aggregated": datetime.now(timezone.utc).isoformat(),
                         "data": opp,
-                        "is_active": True  # Mark as active
+                        "is_active": True,  # Mark as active
+                        **serving_access_fields("opportunity", opp),
+                        **serving_mapped_fields("opportunity", opp),
                     }
                     await self.db.data_lake_serving.update_one(
                         {"serving_id": serving_doc["serving_id"]},
@@ -507,7 +513,8 @@ class OdooSyncPipelineService:
                         "source": "odoo",
                         "last_aggregated": datetime.now(timezone.utc).isoformat(),
                         "data": inv,
-                        "is_active": True  # Mark as active
+                        "is_active": True,  # Mark as active
+                        **serving_mapped_fields("invoice", inv),
                     }
                     await self.db.data_lake_serving.update_one(
                         {"serving_id": serving_doc["serving_id"]},
@@ -620,6 +627,18 @@ class OdooSyncPipelineService:
                 errors.append(error_msg)
                 logger.error(error_msg)
             
+            # Per-account pipeline, invoice and activity rollups
+            from data_lake.account_rollup import refresh_account_rollups
+            await refresh_account_rollups(self.db)
+            
+            # Revenue/pipeline snapshot for goal progress
+            from services.reporting.goal_progress import refresh_goal_progress
+            await refresh_goal_progress(self.db)
+            
+            # Global search entries for the synced entities
+            from services.search.index import SEARCHABLE_ENTITIES, refresh_search_index
+            await refresh_search_index(self.db, SEARCHABLE_ENTITIES)
+            
             # Update integration status
             status = "success" if not errors else "partial"
             error_message = "; ".join(errors) if errors else None
@@ -0,0 +1,327 @@
+"""
+Record Access Index
+Odoo salesperson/team/manager visibility for data_lake_serving records,
+evaluated as a single indexed $in filter instead of per-record Python checks
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+
+# Entity types whose serving records carry access keys
+ACCESS_CONTROLLED_ENTITIES = ("opportunity", "account")
+
+# Bump when record_access_keys changes; older documents are re-derived
+ACCESS_KEYS_VERSION = 1
+
+# Key granted to every user (accounts without an assigned salesperson)
+PUBLIC_KEY = "*"
+
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _raw_id_key(value: Any) -> Optional[str]:
+    """
+    Key with Python equality semantics (manager checks use set membership
+    on the raw salesperson_id): numbers compare by value, strings by text.
+    """
+    if isinstance(value, (bool, int, float)):
+        if isinstance(value, float) and not value.is_integer():
+            return f"raw:n:{value!r}"
+        return f"raw:n:{int(value)}"
+    if isinstance(value, str):
+        return f"raw:s:{value}"
+    return None
+
+
+def _lower(value: Any) -> str:
+    return value.lower() if isinstance(value, str) else ""
+
+
+def record_access_keys(entity_type: str, data: Dict[str, Any]) -> List[str]:
+    """
+    Access keys of a serving record's data. A user sees the record when
+    one of these keys is in their AccessContext.access_keys().
+    """
+    salesperson_name_raw = data.get("salesperson_name")
+    
+    # Accounts without a salesperson are visible to everyone
+    if entity_type == "account" and not salesperson_name_raw:
+        return [PUBLIC_KEY]
+    
+    keys = []
+    salesperson_name = _lower(salesperson_name_raw).strip()
+    salesperson_id = data.get("salesperson_id")
+    team_id = data.get("team_id")
+    
+    if salesperson_id:
+        salesperson_int = _as_int(salesperson_id)
+        if salesperson_int is not None:
+            keys.append(f"sp:{salesperson_int}")
+        raw_key = _raw_id_key(salesperson_id)
+        if raw_key:
+            keys.append(raw_key)
+    
+    if salesperson_name:
+        keys.append(f"name:{salesperson_name}")
+    
+    if team_id:
+        team_int = _as_int(team_id)
+        if team_int is not None:
+            keys.append(f"team:{team_int}")
+    
+    salesperson_email = data.get("salesperson_email")
+    record_email = (_lower(salesperson_email) if salesperson_email else salesperson_name).strip()
+    if record_email:
+        keys.append(f"email:{record_email}")
+    
+    return keys
+
+
+def serving_access_fields(entity_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields to $set on a data_lake_serving document whenever its data is written"""
+    if entity_type not in ACCESS_CONTROLLED_ENTITIES:
+        return {}
+    return {
+        "access_keys": record_access_keys(entity_type, data or {}),
+        "access_keys_version": ACCESS_KEYS_VERSION,
+    }
+
+
+class AccessContext:
+    """
+    Visibility of the current user over Odoo-assigned records.
+    
+    Access granted if:
+    1. User is super admin
+    2. User is the assigned salesperson (by ID, name, or email)
+    3. User is on the same team
+    4. User is the MANAGER of the assigned salesperson (users.manager_odoo_id)
+    """
+    
+    def __init__(
+        self,
+        user_doc: Optional[Dict[str, Any]],
+        user_email: str,
+        subordinates: Optional[List[Dict[str, Any]]] = None
+    ):
+        user_doc = user_doc or {}
+        self.is_super_admin = user_doc.get("is_super_admin", False)
+        self.user_email = user_email
+        self.odoo_salesperson_name = (user_doc.get("odoo_salesperson_name") or "").lower()
+        self.odoo_user_id = user_doc.get("odoo_user_id")
+        self.odoo_employee_id = user_doc.get("odoo_employee_id")
+        self.odoo_team_id = user_doc.get("odoo_team_id")
+        
+        # People this user manages
+        self.subordinate_user_ids: Set[Any] = set()
+        self.subordinate_salesperson_names: Set[str] = set()
+        for sub in subordinates or []:
+            if sub.get("odoo_user_id"):
+                self.subordinate_user_ids.add(sub["odoo_user_id"])
+            if sub.get("odoo_salesperson_name"):
+                self.subordinate_salesperson_names.add(sub["odoo_salesperson_name"].lower())
+            if sub.get("email"):
+                self.subordinate_salesperson_names.add(sub["email"].lower())
+    
+    @classmethod
+    async def load(cls, db: AsyncIOMotorDatabase, user_id: str, user_email: str) -> "AccessContext":
+        """Load the user and their direct reports"""
+        user_doc = await db.users.find_one({"id": user_id})
+        
+        subordinates = []
+        odoo_employee_id = user_doc.get("odoo_employee_id") if user_doc else None
+        if odoo_employee_id:
+            subordinates = await db.users.find(
+                {"manager_odoo_id": odoo_employee_id},
+                {"odoo_user_id": 1, "odoo_employee_id": 1, "odoo_salesperson_name": 1, "email": 1}
+            ).to_list(100)
+            logger.info(f"User {user_email} (emp_id={odoo_employee_id}) manages {len(subordinates)} subordinates")
+        
+        return cls(user_doc, user_email, subordinates)
+    
+    def can_access(self, record_data: Dict[str, Any]) -> bool:
+        """
+        Reference per-record check. Used for documents written before the
+        access index existed; access_keys() must agree with it.
+        
+        CRITICAL: Uses strict matching to prevent cross-user data leaks.
+        """
+        if self.is_super_admin:
+            return True
+        
+        salesperson_name = (record_data.get("salesperson_name") or "").lower().strip()
+        salesperson_id = record_data.get("salesperson_id")
+        record_team_id = record_data.get("team_id")
+        
+        # STRICT matching by salesperson ID (most reliable)
+        if self.odoo_user_id and salesperson_id:
+            try:
+                if int(self.odoo_user_id) == int(salesperson_id):
+                    return True
+            except (ValueError, TypeError):
+                pass
+        
+        # STRICT matching by salesperson name (exact, case-insensitive)
+        if self.odoo_salesperson_name and salesperson_name and self.odoo_salesperson_name == salesperson_name:
+            return True
+        
+        # STRICT matching by team
+        if self.odoo_team_id and record_team_id:
+            try:
+                if int(self.odoo_team_id) == int(record_team_id):
+                    return True
+            except (ValueError, TypeError):
+                pass
+        
+        # Fallback: Check if user's email is the salesperson's email
+        record_email = (record_data.get("salesperson_email") or salesperson_name or "").lower().strip()
+        if self.user_email and record_email and self.user_email == record_email:
+            return True
+        
+        # MANAGER HIERARCHY - the salesperson is one of this user's direct reports
+        if salesperson_id and salesperson_id in self.subordinate_user_ids:
+            return True
+        
+        if salesperson_name:
+            if salesperson_name in self.subordinate_salesperson_names:
+                return True
+            
+            # Partial names (e.g. "john") of a subordinate's name or email
+            if any(salesperson_name in sub_name for sub_name in self.subordinate_salesperson_names):
+                return True
+        
+        return False
+    
+    def access_keys(self, known_salesperson_names: Iterable[str] = ()) -> Set[str]:
+        """
+        Keys this user may see, matching record_access_keys().
+        
+        The partial-name manager rule can't be expressed as an exact key on
+        the user side, so it is resolved against the distinct salesperson
+        names present in the index (known_salesperson_names).
+        """
+        keys = {PUBLIC_KEY}
+        
+        if self.odoo_user_id:
+            user_int = _as_int(self.odoo_user_id)
+            if user_int is not None:
+                keys.add(f"sp:{user_int}")
+        
+        if self.odoo_salesperson_name:
+            keys.add(f"name:{self.odoo_salesperson_name}")
+        
+        if self.odoo_team_id:
+            team_int = _as_int(self.odoo_team_id)
+            if team_int is not None:
+                keys.add(f"team:{team_int}")
+        
+        if self.user_email:
+            keys.add(f"email:{self.user_email}")
+        
+        for sub_user_id in self.subordinate_user_ids:
+            raw_key = _raw_id_key(sub_user_id)
+            if raw_key:
+                keys.add(raw_key)
+        
+        for sub_name in self.subordinate_salesperson_names:
+            keys.add(f"name:{sub_name}")
+        
+        if self.subordinate_salesperson_names:
+            for name in known_salesperson_names:
+                if any(name in sub_name for sub_name in self.subordinate_salesperson_names):
+                    keys.add(f"name:{name}")
+        
+        return keys
+    
+    async def mongo_filter(
+        self,
+        db: AsyncIOMotorDatabase,
+        entity_types: Iterable[str] = ACCESS_CONTROLLED_ENTITIES
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Filter for data_lake_serving selecting the records this user may see
+        (None for super admins). Serving writers set access keys and
+        ensure_access_index() backfills stale ones at startup, so this stays
+        a single indexed $in; documents still carrying keys from an older
+        ACCESS_KEYS_VERSION should be re-checked with is_indexed() / can_access().
+        """
+        keys = await self.visible_keys(db, entity_types)
+        if keys is None:
+            return None
+        
+        return {"access_keys": {"$in": keys}}
+    
+    async def visible_keys(
+        self,
+        db: AsyncIOMotorDatabase,
+        entity_types: Iterable[str] = ACCESS_CONTROLLED_ENTITIES
+    ) -> Optional[List[str]]:
+        """Sorted access_keys() with manager name matches resolved (None for super admins)"""
+        if self.is_super_admin:
+            return None
+        
+        known_names: List[str] = []
+        if self.subordinate_salesperson_names:
+            indexed_keys = await db.data_lake_serving.distinct(
+                "access_keys",
+                {"entity_type": {"$in": list(entity_types)}}
+            )
+            known_names = [key[5:] for key in indexed_keys if key.startswith("name:")]
+        
+        return sorted(self.access_keys(known_names))
+
+
+def is_indexed(doc: Dict[str, Any]) -> bool:
+    """True when the serving document's access keys are current"""
+    return doc.get("access_keys_version") == ACCESS_KEYS_VERSION
+
+
+async def ensure_access_index(db: AsyncIOMotorDatabase, batch_size: int = 500) -> int:
+    """
+    Derive access keys for serving documents that lack current ones,
+    then index them. Returns the number of documents updated.
+    """
+    from pymongo import UpdateOne
+    
+    collection = db.data_lake_serving
+    updated = 0
+    ops = []
+    
+    cursor = collection.find(
+        {
+            "entity_type": {"$in": list(ACCESS_CONTROLLED_ENTITIES)},
+            "access_keys_version": {"$ne": ACCESS_KEYS_VERSION},
+        },
+        {"_id": 1, "entity_type": 1, "data": 1}
+    )
+    async for doc in cursor:
+        ops.append(UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": serving_access_fields(doc["entity_type"], doc.get("data") or {})}
+        ))
+        if len(ops) >= batch_size:
+            await collection.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    
+    if ops:
+        await collection.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    
+    await collection.create_index(
+        [("entity_type", 1), ("access_keys", 1)],
+        name="entitytype_accesskeys"
+    )
+    
+    if updated:
+        logger.info(f"Derived access keys for {updated} serving records")
+    return updated
@@ -0,0 +1,8 @@
+"""
+Reporting Services Package
+"""
+from .actuals import SalespersonActuals
+from .goal_progress import GoalProgressEngine, refresh_goal_progress
+from .target_progress import TargetProgressEngine
+
+__all__ = ['SalespersonActuals', 'GoalProgressEngine', 'TargetProgressEngine', 'refresh_goal_progress']
@@ -0,0 +1,110 @@
+"""
+Salesperson Actuals
+Won revenue, pipeline, deals and activities per Odoo salesperson,
+computed in one $group over data_lake_serving
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+
+# Odoo stage IDs treated as won regardless of the stage name
+WON_STAGE_IDS = [4, "won"]
+
+METRICS = ("won_revenue", "won_deals", "pipeline_value", "deals", "activities")
+
+
+def _first(expr: Any) -> Dict[str, Any]:
+    """ID of a many2one value ([id, name] or a plain id)"""
+    return {"$cond": [{"$isArray": [expr]}, {"$arrayElemAt": [expr, 0]}, expr]}
+
+
+def _string(expr: Any) -> Dict[str, Any]:
+    """Odoo False/None as an empty string"""
+    return {"$cond": [{"$eq": [{"$type": expr}, "string"]}, expr, ""]}
+
+
+def actuals_pipeline() -> List[Dict[str, Any]]:
+    """
+    One row per (salesperson ID, lower-cased salesperson name): opportunities
+    by salesperson_id/salesperson_name, activities by user_id/user_name.
+    """
+    is_opp = {"$eq": ["$entity_type", "opportunity"]}
+    return [
+        {"$match": {"entity_type": {"$in": ["opportunity", "activity"]}, "is_active": {"$ne": False}}},
+        {"$project": {
+            "_id": 0,
+            "is_opp": is_opp,
+            "sp_id": {"$cond": [is_opp, _first("$data.salesperson_id"), _first("$data.user_id")]},
+            "sp_name": {"$toLower": {"$cond": [is_opp, _string("$data.salesperson_name"), _string("$data.user_name")]}},
+            "stage": {"$toLower": _string("$data.stage_name")},
+            "stage_id": _first("$data.stage_id"),
+            "value": {"$convert": {
+                "input": {"$ifNull": ["$data.amount", "$data.expected_revenue"]},
+                "to": "double",
+                "onError": 0.0,
+                "onNull": 0.0,
+            }},
+        }},
+        {"$addFields": {
+            "is_won": {"$and": ["$is_opp", {"$or": [
+                {"$regexMatch": {"input": "$stage", "regex": "won"}},
+                {"$in": ["$stage_id", WON_STAGE_IDS]},
+            ]}]},
+            "is_lost": {"$regexMatch": {"input": "$stage", "regex": "lost"}},
+        }},
+        {"$group": {
+            "_id": {"id": "$sp_id", "name": "$sp_name"},
+            "won_revenue": {"$sum": {"$cond": ["$is_won", "$value", 0]}},
+            "won_deals": {"$sum": {"$cond": ["$is_won", 1, 0]}},
+            "pipeline_value": {"$sum": {"$cond": [
+                {"$and": ["$is_opp", {"$not": ["$is_won"]}, {"$not": ["$is_lost"]}]}, "$value", 0
+            ]}},
+            "deals": {"$sum": {"$cond": ["$is_opp", 1, 0]}},
+            "activities": {"$sum": {"$cond": ["$is_opp", 0, 1]}},
+        }},
+    ]
+
+
+class SalespersonActuals:
+    """
+    Aggregated actuals looked up per user: by Odoo user ID when the user has
+    one, otherwise by exact (case-insensitive) salesperson name.
+    """
+    
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        self.by_id: Dict[Any, Dict[str, float]] = {}
+        self.by_name: Dict[str, Dict[str, float]] = {}
+        self.totals = dict.fromkeys(METRICS, 0)
+        
+        for row in rows:
+            key = row.get("_id") or {}
+            for metric in METRICS:
+                self.totals[metric] += row.get(metric, 0)
+            
+            sp_id = key.get("id")
+            if isinstance(sp_id, (int, float, str)) and not isinstance(sp_id, bool):
+                self._add(self.by_id.setdefault(sp_id, dict.fromkeys(METRICS, 0)), row)
+            if key.get("name"):
+                self._add(self.by_name.setdefault(key["name"], dict.fromkeys(METRICS, 0)), row)
+    
+    @staticmethod
+    def _add(bucket: Dict[str, float], row: Dict[str, Any]) -> None:
+        for metric in METRICS:
+            bucket[metric] += row.get(metric, 0)
+    
+    @classmethod
+    async def load(cls, db: AsyncIOMotorDatabase) -> "SalespersonActuals":
+        rows = await db.data_lake_serving.aggregate(actuals_pipeline()).to_list(None)
+        return cls(rows)
+    
+    def for_user(self, user: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """Actuals of a users document, None when it has no Odoo mapping"""
+        odoo_user_id = user.get("odoo_user_id")
+        if odoo_user_id:
+            return self.by_id.get(odoo_user_id, dict.fromkeys(METRICS, 0))
+        
+        salesperson_name = (user.get("odoo_salesperson_name") or "").lower()
+        if salesperson_name:
+            return self.by_name.get(salesperson_name, dict.fromkeys(METRICS, 0))
+        return None
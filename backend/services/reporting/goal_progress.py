@@ -0,0 +1,164 @@
+"""
+Goal Progress Engine
+Revenue and pipeline snapshots computed once per sync cycle, bulk-applied to
+auto-tracked revenue goals, with precomputed summary counters
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from services.reporting.actuals import SalespersonActuals
+from services.reporting.target_progress import progress_status
+
+logger = logging.getLogger(__name__)
+
+
+GOAL_PROGRESS_COLLECTION = "goal_progress"
+
+# progress_source of goals whose current_value is maintained from Odoo data
+AUTO_SOURCE = "odoo"
+MANUAL_SOURCE = "manual"
+
+# Share of open pipeline counted when nothing has been won yet
+PIPELINE_CLOSE_RATE = 0.3
+
+
+def revenue_progress(actual: Dict[str, float]) -> float:
+    """Won revenue, or an estimate from the open pipeline before the first win"""
+    if actual["won_revenue"] > 0:
+        return actual["won_revenue"]
+    return actual["pipeline_value"] * PIPELINE_CLOSE_RATE
+
+
+def auto_progress_value(
+    goal: Dict[str, Any],
+    actuals: SalespersonActuals,
+    users_by_id: Dict[str, Dict[str, Any]]
+) -> Optional[float]:
+    """
+    Current value of a revenue goal from the snapshot: the assignee's own
+    numbers when they are mapped to Odoo, org totals otherwise. None for
+    goals that are not auto-tracked (other types, or manually set progress).
+    """
+    if goal.get("goal_type") != "revenue":
+        return None
+    if goal.get("progress_source") != AUTO_SOURCE and goal.get("current_value", 0) != 0:
+        return None
+    
+    actual = None
+    if goal.get("assignee_type") == "user" and goal.get("assignee_id") in users_by_id:
+        actual = actuals.for_user(users_by_id[goal["assignee_id"]])
+    return revenue_progress(actual or actuals.totals)
+
+
+def goal_counters(goals: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summary counters served by /goals/summary/stats"""
+    counters = {
+        "total_goals": len(goals),
+        "overall_progress": 0,
+        "achieved": 0,
+        "on_track": 0,
+        "at_risk": 0,
+        "behind": 0,
+    }
+    
+    total_progress = 0
+    for goal in goals:
+        target = goal.get("target_value", 0)
+        pct = (goal.get("current_value", 0) / target * 100) if target > 0 else 0
+        total_progress += pct
+        counters[progress_status(pct)] += 1
+    
+    if goals:
+        counters["overall_progress"] = round(total_progress / len(goals), 1)
+    return counters
+
+
+class GoalProgressEngine:
+    """
+    Keeps goal progress in the goal_progress collection:
+    - "snapshot": org and per-assignee revenue/pipeline from one actuals aggregation
+    - "summary": counters over active goals, recounted on every goal write
+    """
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db[GOAL_PROGRESS_COLLECTION]
+    
+    async def _active_goals(self) -> List[Dict[str, Any]]:
+        return await self.db.goals.find({"is_active": {"$ne": False}}, {"_id": 0}).to_list(None)
+    
+    async def refresh(self) -> Dict[str, int]:
+        """Take a new snapshot and apply it to auto-tracked goals in one bulk write"""
+        actuals, goals = await asyncio.gather(SalespersonActuals.load(self.db), self._active_goals())
+        
+        assignee_ids = {
+            goal["assignee_id"] for goal in goals
+            if goal.get("assignee_type") == "user" and goal.get("assignee_id")
+        }
+        users = await self.db.users.find(
+            {"id": {"$in": list(assignee_ids)}},
+            {"_id": 0, "id": 1, "odoo_user_id": 1, "odoo_salesperson_name": 1}
+        ).to_list(None)
+        users_by_id = {user["id"]: user for user in users}
+        
+        now = datetime.now(timezone.utc)
+        ops = []
+        for goal in goals:
+            value = auto_progress_value(goal, actuals, users_by_id)
+            if value is None or (value == goal.get("current_value") and goal.get("progress_source") == AUTO_SOURCE):
+                continue
+            ops.append(UpdateOne(
+                {"id": goal["id"]},
+                {"$set": {"current_value": value, "progress_source": AUTO_SOURCE, "progress_synced_at": now}}
+            ))
+            goal["current_value"] = value
+        
+        if ops:
+            await self.db.goals.bulk_write(ops, ordered=False)
+        
+        user_actuals = {}
+        for user_id, user in users_by_id.items():
+            actual = actuals.for_user(user)
+            if actual is not None:
+                user_actuals[user_id] = actual
+        
+        await self.collection.replace_one(
+            {"_id": "snapshot"},
+            {"org": actuals.totals, "users": user_actuals, "computed_at": now},
+            upsert=True
+        )
+        await self._store_counters(goals)
+        return {"goals": len(goals), "updated": len(ops)}
+    
+    async def recount(self) -> None:
+        """Recompute the summary counters after goals were created or changed"""
+        await self._store_counters(await self._active_goals())
+    
+    async def _store_counters(self, goals: List[Dict[str, Any]]) -> None:
+        await self.collection.replace_one(
+            {"_id": "summary"},
+            {**goal_counters(goals), "computed_at": datetime.now(timezone.utc)},
+            upsert=True
+        )
+    
+    async def summary(self) -> Dict[str, Any]:
+        summary = await self.collection.find_one({"_id": "summary"}, {"_id": 0, "computed_at": 0})
+        if summary is None:
+            # First request after deploy - take the initial snapshot
+            await self.refresh()
+            summary = await self.collection.find_one({"_id": "summary"}, {"_id": 0, "computed_at": 0})
+        return summary
+
+
+async def refresh_goal_progress(db: AsyncIOMotorDatabase) -> None:
+    """Post-sync hook: snapshot revenue and update goals, never failing the sync itself"""
+    try:
+        result = await GoalProgressEngine(db).refresh()
+        logger.info(f"Goal progress: {result['updated']} of {result['goals']} goals updated")
+    except Exception as e:
+        logger.error(f"Goal progress refresh failed: {e}")
@@ -0,0 +1,206 @@
+"""
+Target Progress Report
+Per-salesperson progress against role targets, joined in memory from one
+actuals aggregation, with a short-lived snapshot per period/role filter
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import time
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from core.config import settings
+from services.reporting.actuals import SalespersonActuals
+
+# Overall progress weights
+WEIGHTS = {"revenue": 0.5, "deals": 0.3, "activities": 0.2}
+
+
+def _pct(actual: float, target: float) -> float:
+    return round((actual / target * 100), 1) if target > 0 else 0
+
+
+def progress_status(overall_progress: float) -> str:
+    if overall_progress >= 100:
+        return "achieved"
+    if overall_progress >= 70:
+        return "on_track"
+    if overall_progress >= 40:
+        return "at_risk"
+    return "behind"
+
+
+def build_target_report(
+    users: List[Dict[str, Any]],
+    role_targets: List[Dict[str, Any]],
+    roles: List[Dict[str, Any]],
+    actuals: SalespersonActuals,
+    now: datetime,
+    period_type: Optional[str] = None,
+    role_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Join users to their role target and aggregated actuals"""
+    role_target_map = {t["role_id"]: t for t in role_targets}
+    role_map = {r["id"]: r for r in roles}
+    
+    user_progress = []
+    team_totals = {
+        "target_revenue": 0,
+        "actual_revenue": 0,
+        "target_deals": 0,
+        "actual_deals": 0,
+        "target_activities": 0,
+        "actual_activities": 0,
+    }
+    
+    for user in users:
+        user_role_id = user.get("role_id")
+        if not user_role_id or user_role_id not in role_target_map:
+            continue
+        
+        actual = actuals.for_user(user)
+        if actual is None:
+            continue  # Skip users without Odoo mapping
+        
+        target = role_target_map[user_role_id]
+        role = role_map.get(user_role_id, {})
+        
+        actual_revenue = actual["won_revenue"]
+        actual_deals = actual["deals"]
+        actual_activities = actual["activities"]
+        
+        target_revenue = target.get("target_revenue", 0)
+        target_deals = target.get("target_deals", 0)
+        target_activities = target.get("target_activities", 0)
+        
+        progress = {
+            "revenue": _pct(actual_revenue, target_revenue),
+            "deals": _pct(actual_deals, target_deals),
+            "activities": _pct(actual_activities, target_activities),
+        }
+        progress["overall"] = round(sum(progress[k] * w for k, w in WEIGHTS.items()), 1)
+        
+        user_progress.append({
+            "user_id": user["id"],
+            "user_name": user.get("name", "Unknown"),
+            "user_email": user.get("email"),
+            "role_id": user_role_id,
+            "role_name": role.get("name", "Unknown"),
+            "target": {
+                "revenue": target_revenue,
+                "deals": target_deals,
+                "activities": target_activities,
+                "period_type": target.get("period_type"),
+                "period_start": target.get("period_start"),
+                "period_end": target.get("period_end"),
+            },
+            "actual": {
+                "revenue": actual_revenue,
+                "deals": actual_deals,
+                "activities": actual_activities,
+            },
+            "progress": progress,
+            "variance": {
+                "revenue": actual_revenue - target_revenue,
+                "deals": actual_deals - target_deals,
+                "activities": actual_activities - target_activities,
+            },
+            "status": progress_status(progress["overall"]),
+        })
+        
+        team_totals["target_revenue"] += target_revenue
+        team_totals["actual_revenue"] += actual_revenue
+        team_totals["target_deals"] += target_deals
+        team_totals["actual_deals"] += actual_deals
+        team_totals["target_activities"] += target_activities
+        team_totals["actual_activities"] += actual_activities
+    
+    team_progress = {
+        "revenue": _pct(team_totals["actual_revenue"], team_totals["target_revenue"]),
+        "deals": _pct(team_totals["actual_deals"], team_totals["target_deals"]),
+        "activities": _pct(team_totals["actual_activities"], team_totals["target_activities"]),
+    }
+    
+    # Sort users by overall progress (descending)
+    user_progress.sort(key=lambda x: x["progress"]["overall"], reverse=True)
+    
+    statuses = [u["status"] for u in user_progress]
+    return {
+        "generated_at": now.isoformat(),
+        "period_filter": period_type,
+        "role_filter": role_id,
+        "summary": {
+            "total_salespeople": len(user_progress),
+            "achieved": statuses.count("achieved"),
+            "on_track": statuses.count("on_track"),
+            "at_risk": statuses.count("at_risk"),
+            "behind": statuses.count("behind"),
+        },
+        "team_totals": team_totals,
+        "team_progress": team_progress,
+        "individual_progress": user_progress,
+    }
+
+
+class TargetProgressEngine:
+    """
+    Builds the target progress report with a fixed number of queries
+    (targets, roles, actuals aggregation, users) regardless of team size.
+    
+    Reports are kept for settings.TARGET_REPORT_CACHE_SECONDS per
+    (period_type, role_id); 0 disables the snapshot.
+    """
+    
+    _snapshots: Dict[Tuple[Optional[str], Optional[str]], Tuple[float, Dict[str, Any]]] = {}
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+    
+    async def report(
+        self,
+        period_type: Optional[str] = None,
+        role_id: Optional[str] = None,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        key = (period_type, role_id)
+        ttl = settings.TARGET_REPORT_CACHE_SECONDS
+        
+        snapshot = self._snapshots.get(key)
+        if snapshot and not refresh and time.monotonic() - snapshot[0] < ttl:
+            return snapshot[1]
+        
+        report = await self.build(period_type, role_id)
+        if ttl > 0:
+            self._snapshots[key] = (time.monotonic(), report)
+        return report
+    
+    async def build(self, period_type: Optional[str] = None, role_id: Optional[str] = None) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        
+        # Get active role targets
+        target_query: Dict[str, Any] = {"period_end": {"$gte": now}}
+        if period_type:
+            target_query["period_type"] = period_type
+        if role_id:
+            target_query["role_id"] = role_id
+        
+        role_targets, roles, actuals = await asyncio.gather(
+            self.db.role_targets.find(target_query, {"_id": 0}).to_list(100),
+            self.db.roles.find({}, {"_id": 0}).to_list(100),
+            SalespersonActuals.load(self.db),
+        )
+        
+        # Sales users (users with roles that have targets)
+        users_query: Dict[str, Any] = {"is_active": True}
+        role_ids_with_targets = [t["role_id"] for t in role_targets]
+        if role_ids_with_targets:
+            users_query["role_id"] = {"$in": role_ids_with_targets}
+        
+        users = await self.db.users.find(users_query, {"_id": 0, "password_hash": 0}).to_list(500)
+        
+        return build_target_report(users, role_targets, roles, actuals, now, period_type, role_id)
+    
+    @classmethod
+    def invalidate(cls) -> None:
+        cls._snapshots.clear()
@@ -0,0 +1,6 @@
+"""
+Search Services Package
+"""
+from .index import SearchIndexer, refresh_crm_entry, refresh_search_index, refresh_serving_entries
+
+__all__ = ['SearchIndexer', 'refresh_crm_entry', 'refresh_search_index', 'refresh_serving_entries']
@@ -0,0 +1,389 @@
+"""
+Search Index
+Edge n-gram index over serving (Odoo) and CRM records for ranked, access-filtered global search
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+import re
+import time
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DeleteOne, ReplaceOne
+from pymongo.errors import ExecutionTimeout
+
+from services.rbac.record_access import record_access_keys
+
+logger = logging.getLogger(__name__)
+
+
+SEARCH_COLLECTION = "search_index"
+
+SEARCHABLE_ENTITIES = ("account", "opportunity", "contact", "activity")
+
+# Legacy CRM collections indexed alongside the serving zone
+CRM_COLLECTIONS = {
+    "account": "accounts",
+    "opportunity": "opportunities",
+    "activity": "activities",
+}
+
+# Everyone but account managers sees all CRM records
+CRM_KEY = "crm"
+
+MIN_GRAM = 2
+MAX_GRAM = 15
+
+# Candidates fetched per query before ranking
+MAX_CANDIDATES = 200
+
+TYPE_BOOST = {"account": 4, "opportunity": 3, "contact": 2, "activity": 1}
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: Any) -> List[str]:
+    if not isinstance(text, str):
+        return []
+    return _WORD.findall(text.lower())
+
+
+def edge_grams(*texts: Any) -> List[str]:
+    """Prefixes (MIN_GRAM..MAX_GRAM chars) of every word, for typeahead matching"""
+    grams: Set[str] = set()
+    for text in texts:
+        for word in tokenize(text):
+            for n in range(MIN_GRAM, min(len(word), MAX_GRAM) + 1):
+                grams.add(word[:n])
+    return sorted(grams)
+
+
+def _text(value: Any) -> str:
+    """Odoo False/None and many2one [id, name] values as display text"""
+    if isinstance(value, (list, tuple)):
+        value = value[1] if len(value) > 1 else ""
+    if value is False or value is None:
+        return ""
+    return str(value)
+
+
+def build_entry(entity_type: str, source: str, doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Search entry for a serving document (source "odoo") or a CRM document
+    (source "crm"); None when the record has nothing to search on.
+    """
+    if source == "odoo":
+        data = doc.get("data") or {}
+        entity_id = _text(data.get("id")) or _text(doc.get("serving_id"))
+        key = f"odoo:{entity_type}:{doc['_id']}"
+        updated_at = doc.get("updated_at") or doc.get("last_aggregated")
+    else:
+        data = doc
+        entity_id = _text(doc.get("id"))
+        key = f"crm:{entity_type}:{entity_id}"
+        updated_at = doc.get("updated_at") or doc.get("created_at")
+    
+    if entity_type == "account":
+        title = _text(data.get("name"))
+        subtitle = " · ".join(filter(None, [_text(data.get("city")), _text(data.get("industry"))]))
+        keywords = [data.get("email"), data.get("website"), data.get("industry"), data.get("city"), data.get("country_name")]
+    elif entity_type == "opportunity":
+        title = _text(data.get("name"))
+        partner = _text(data.get("partner_name")) or _text(data.get("account_name"))
+        stage = _text(data.get("stage_name")) or _text(data.get("stage"))
+        subtitle = " · ".join(filter(None, [partner, stage]))
+        keywords = [partner, stage, data.get("salesperson_name"), data.get("contact_name")]
+    elif entity_type == "contact":
+        title = _text(data.get("name"))
+        subtitle = _text(data.get("account_name")) or _text(data.get("job_title"))
+        keywords = [data.get("email"), data.get("job_title"), data.get("account_name")]
+    else:
+        title = _text(data.get("summary")) or _text(data.get("title")) or _text(data.get("activity_type"))
+        subtitle = _text(data.get("res_name"))
+        keywords = [data.get("res_name"), data.get("activity_type"), data.get("user_name")]
+    
+    if not title.strip() or not entity_id:
+        return None
+    
+    return {
+        "key": key,
+        "entity_type": entity_type,
+        "source": source,
+        "entity_id": entity_id,
+        "title": title.strip(),
+        "title_key": " ".join(title.lower().split()),
+        "subtitle": subtitle,
+        "grams": edge_grams(title, *(_text(k) for k in keywords)),
+        "title_grams": edge_grams(title),
+        "access_keys": entry_access_keys(entity_type, source, data),
+        "updated_at": updated_at,
+    }
+
+
+def entry_access_keys(entity_type: str, source: str, data: Dict[str, Any]) -> List[str]:
+    """
+    Odoo records: the dashboard visibility keys (services.rbac.record_access).
+    Contacts follow the account rule (unassigned = everyone), activities the
+    opportunity rule for their assigned user. CRM records: CRM_KEY plus
+    their owners, matching the previous role-based search filter.
+    """
+    if source == "odoo":
+        if entity_type == "activity":
+            data = {"salesperson_id": data.get("user_id"), "salesperson_name": data.get("user_name")}
+        return record_access_keys("account" if entity_type == "contact" else entity_type, data)
+    
+    owners = {
+        "account": ["assigned_am_id"],
+        "opportunity": ["owner_id"],
+        "activity": ["created_by_id", "assigned_to_id"],
+    }[entity_type]
+    return [CRM_KEY] + [f"user:{data[field]}" for field in owners if data.get(field)]
+
+
+def score_entry(entry: Dict[str, Any], query: str, words: List[str]) -> float:
+    """Title matches outrank keyword-only matches; accounts outrank activities"""
+    title = entry["title"].lower()
+    score = 0.0
+    if title == query:
+        score += 100
+    elif title.startswith(query):
+        score += 50
+    elif query in title:
+        score += 20
+    
+    title_words = tokenize(title)
+    for word in words:
+        if word in title_words:
+            score += 10
+        elif any(t.startswith(word) for t in title_words):
+            score += 6
+        else:
+            score += 1  # Matched a keyword field only
+    
+    return score + TYPE_BOOST.get(entry["entity_type"], 0)
+
+
+class SearchIndexer:
+    """
+    Maintains the search_index collection and answers queries against it.
+    
+    Every searchable record has one entry holding its display fields, the
+    edge n-grams of its title and keyword fields (multikey-indexed) and its
+    access keys. A query must match a gram for each of its words; title
+    matches are fetched first so they are never cut by the candidate
+    limit, then the candidates are ranked in Python.
+    """
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db[SEARCH_COLLECTION]
+    
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index("key", unique=True)
+        await self.collection.create_index("grams")
+        await self.collection.create_index("title_key")
+        await self.collection.create_index("title_grams")
+        await self.collection.create_index([("entity_type", 1), ("indexed_at", 1)])
+    
+    # ===================== INDEXING =====================
+    
+    async def reindex(self, entity_type: str) -> int:
+        """Re-index every active serving and CRM record of one entity type"""
+        if entity_type not in SEARCHABLE_ENTITIES:
+            return 0
+        
+        indexed_at = datetime.now(timezone.utc)
+        ops = []
+        
+        async for doc in self.db.data_lake_serving.find(
+            {"entity_type": entity_type, "is_active": {"$ne": False}}
+        ):
+            entry = build_entry(entity_type, "odoo", doc)
+            if entry:
+                ops.append(ReplaceOne({"key": entry["key"]}, {**entry, "indexed_at": indexed_at}, upsert=True))
+        
+        crm_collection = CRM_COLLECTIONS.get(entity_type)
+        if crm_collection:
+            async for doc in self.db[crm_collection].find({}, {"_id": 0}):
+                entry = build_entry(entity_type, "crm", doc)
+                if entry:
+                    ops.append(ReplaceOne({"key": entry["key"]}, {**entry, "indexed_at": indexed_at}, upsert=True))
+        
+        await self._write(ops)
+        
+        # Entries not rewritten by this (or a later) pass are deleted or inactive records
+        await self.collection.delete_many({"entity_type": entity_type, "indexed_at": {"$lt": indexed_at}})
+        return len(ops)
+    
+    async def index_serving(self, entity_type: str, serving_ids: Iterable[str]) -> int:
+        """Index (or drop) specific serving records, e.g. after a sync or webhook"""
+        if entity_type not in SEARCHABLE_ENTITIES:
+            return 0
+        
+        indexed_at = datetime.now(timezone.utc)
+        ops = []
+        async for doc in self.db.data_lake_serving.find(
+            {"entity_type": entity_type, "serving_id": {"$in": list(serving_ids)}}
+        ):
+            entry = build_entry(entity_type, "odoo", doc) if doc.get("is_active") is not False else None
+            if entry:
+                ops.append(ReplaceOne({"key": entry["key"]}, {**entry, "indexed_at": indexed_at}, upsert=True))
+            else:
+                ops.append(DeleteOne({"key": f"odoo:{entity_type}:{doc['_id']}"}))
+        
+        await self._write(ops)
+        return len(ops)
+    
+    async def index_crm(self, entity_type: str, entity_ids: Iterable[str]) -> int:
+        """Index (or drop) specific CRM records, e.g. after an edit in the app"""
+        crm_collection = CRM_COLLECTIONS.get(entity_type)
+        if not crm_collection:
+            return 0
+        
+        indexed_at = datetime.now(timezone.utc)
+        remaining = {str(entity_id) for entity_id in entity_ids}
+        ops = []
+        async for doc in self.db[crm_collection].find({"id": {"$in": sorted(remaining)}}, {"_id": 0}):
+            remaining.discard(str(doc["id"]))
+            entry = build_entry(entity_type, "crm", doc)
+            if entry:
+                ops.append(ReplaceOne({"key": entry["key"]}, {**entry, "indexed_at": indexed_at}, upsert=True))
+            else:
+                ops.append(DeleteOne({"key": f"crm:{entity_type}:{doc['id']}"}))
+        
+        # Removed records
+        ops += [DeleteOne({"key": f"crm:{entity_type}:{entity_id}"}) for entity_id in sorted(remaining)]
+        
+        await self._write(ops)
+        return len(ops)
+    
+    async def rebuild(self) -> Dict[str, int]:
+        return {entity_type: await self.reindex(entity_type) for entity_type in SEARCHABLE_ENTITIES}
+    
+    async def _write(self, ops: List[Any]) -> None:
+        for start in range(0, len(ops), 500):
+            await self.collection.bulk_write(ops[start:start + 500], ordered=False)
+    
+    # ===================== QUERIES =====================
+    
+    async def search(
+        self,
+        query: str,
+        access_keys: Optional[Set[str]],
+        entity_types: Optional[List[str]] = None,
+        limit: int = 20,
+        timeout_ms: int = 250
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Ranked entries visible through access_keys (None = everything).
+        Returns (results, timed_out); a query running past timeout_ms is
+        cut off by the server instead of holding the request.
+        """
+        query = " ".join(query.lower().split())
+        words = [w[:MAX_GRAM] for w in tokenize(query) if len(w) >= MIN_GRAM]
+        if not words:
+            return [], False
+        
+        # Longest word first: $all uses the first element for the index scan
+        filter_: Dict[str, Any] = {"grams": {"$all": sorted(set(words), key=len, reverse=True)}}
+        if entity_types:
+            filter_["entity_type"] = {"$in": entity_types}
+        if access_keys is not None:
+            filter_["access_keys"] = {"$in": sorted(access_keys)}
+        
+        try:
+            candidates = await self._find(filter_, query, timeout_ms)
+            if not candidates and await self.collection.find_one({}, {"_id": 1}) is None:
+                # First search after deploy - build the index once
+                logger.info(f"Search index empty, building: {await self.rebuild()}")
+                candidates = await self._find(filter_, query, timeout_ms)
+        except ExecutionTimeout:
+            logger.warning(f"Search timed out after {timeout_ms}ms: {query!r}")
+            return [], True
+        
+        for entry in candidates:
+            entry["score"] = score_entry(entry, query, words)
+        candidates.sort(key=lambda e: (e["score"], _timestamp(e.get("updated_at"))), reverse=True)
+        return candidates[:limit], False
+    
+    async def _find(self, filter_: Dict[str, Any], query: str, timeout_ms: int) -> List[Dict[str, Any]]:
+        """
+        Up to MAX_CANDIDATES matches, best title matches first: titles that
+        start with the query (in title order, so an exact title leads), then
+        titles matching every query word, then keyword-only matches. Each
+        tier only fills the slots the previous ones left, and all of them
+        share the timeout.
+        """
+        projection = {"_id": 0, "grams": 0, "title_grams": 0, "title_key": 0, "access_keys": 0, "indexed_at": 0}
+        tiers = [
+            ({"title_key": {"$regex": f"^{re.escape(query)}"}}, "title_key"),
+            ({"title_grams": filter_["grams"]}, None),
+            ({}, None),
+        ]
+        deadline = time.monotonic() + timeout_ms / 1000
+        candidates: List[Dict[str, Any]] = []
+        
+        for extra, sort_field in tiers:
+            remaining = MAX_CANDIDATES - len(candidates)
+            if remaining <= 0:
+                break
+            
+            tier_filter = {**filter_, **extra}
+            if candidates:
+                tier_filter["key"] = {"$nin": [entry["key"] for entry in candidates]}
+            cursor = self.collection.find(tier_filter, projection)
+            if sort_field:
+                cursor = cursor.sort(sort_field, 1)
+            budget_ms = max(1, int((deadline - time.monotonic()) * 1000))
+            candidates += await cursor.limit(remaining).max_time_ms(budget_ms).to_list(remaining)
+        
+        return candidates
+    
+    async def known_salesperson_names(self) -> List[str]:
+        """Salesperson names present in the index (for partial-name manager matches)"""
+        keys = await self.collection.distinct("access_keys")
+        return [key[5:] for key in keys if key.startswith("name:")]
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=value.tzinfo or timezone.utc).timestamp()
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return 0.0
+    return 0.0
+
+
+async def refresh_search_index(db: AsyncIOMotorDatabase, entity_types: Iterable[str]) -> None:
+    """Post-sync hook for full syncs that don't track changes: re-index whole entity types"""
+    indexer = SearchIndexer(db)
+    for entity_type in entity_types:
+        if entity_type not in SEARCHABLE_ENTITIES:
+            continue
+        try:
+            started = time.monotonic()
+            count = await indexer.reindex(entity_type)
+            logger.info(f"Search index: {count} {entity_type} entries in {(time.monotonic() - started) * 1000:.0f}ms")
+        except Exception as e:
+            logger.error(f"Search index refresh failed for {entity_type}: {e}")
+
+
+async def refresh_serving_entries(db: AsyncIOMotorDatabase, entity_type: str, serving_ids: Iterable[str]) -> None:
+    """Post-write hook: re-index changed serving records, never failing the sync itself"""
+    serving_ids = list(serving_ids)
+    if not serving_ids:
+        return
+    try:
+        await SearchIndexer(db).index_serving(entity_type, serving_ids)
+    except Exception as e:
+        logger.error(f"Search indexing failed for {len(serving_ids)} {entity_type} records: {e}")
+
+
+async def refresh_crm_entry(db: AsyncIOMotorDatabase, entity_type: str, entity_id: str) -> None:
+    """Post-write hook for CRM routes: never fails the request over the search index"""
+    try:
+        await SearchIndexer(db).index_crm(entity_type, [entity_id])
+    except Exception as e:
+        logger.error(f"Search indexing failed for {entity_type} {entity_id}: {e}")
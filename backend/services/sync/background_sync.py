@@ -8,14 +8,19 @@ Features: Retry logic with exponential backoff, health monitoring, alerts
 import asyncio
 import logging
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncGenerator, List, Optional, Set
 import uuid
 
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
 from core.database import Database
 from core.config import settings
+from services.field_mapper import serving_mapped_fields
+from services.rbac.record_access import serving_access_fields
+from services.search.index import refresh_serving_entries
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +30,8 @@ INITIAL_RETRY_DELAY_SECONDS = 30
 MAX_RETRY_DELAY_SECONDS = 300
 HEALTH_CHECK_FAILURE_THRESHOLD = 3
 CRITICAL_FAILURE_THRESHOLD = 6
+RETENTION_INTERVAL_HOURS = 24
+UPSERT_BATCH_SIZE = 1000
 
 
 class OdooReconciler:
@@ -55,92 +62,219 @@ class OdooReconciler:
             logger.info(f"No {entity_type} records to reconcile")
             return stats
         
-        # Get IDs from Odoo - store both original and string versions
-        odoo_ids = set()
-        for rec in odoo_records:
-            odoo_id = rec.get(id_field)
-            if odoo_id:
-                odoo_ids.add(str(odoo_id))
+        logger.info(f"Reconciling {len(odoo_records)} {entity_type} records")
+        odoo_ids = await self._upsert_records(entity_type, odoo_records, id_field, stats)
+        
+        await self._soft_delete_missing(entity_type, odoo_ids, stats)
+        
+        return stats
+    
+    async def reconcile_stream(
+        self,
+        entity_type: str,
+        chunks: AsyncGenerator[List[Dict], None],
+        id_field: str = "id"
+    ) -> Dict[str, int]:
+        """
+        Reconcile an export that arrives in chunks, in any order (see
+        OdooConnector.export_entity). Records are upserted chunk by chunk;
+        soft-deletes run once the whole export is in.
+        """
+        stats = {"inserted": 0, "updated": 0, "soft_deleted": 0, "errors": 0}
+        odoo_ids: Set[str] = set()
+        
+        try:
+            async for chunk in chunks:
+                odoo_ids |= await self._upsert_records(entity_type, chunk, id_field, stats)
+        finally:
+            # A failed upsert must not leave the export's range reads running
+            await chunks.aclose()
         
-        logger.info(f"Reconciling {len(odoo_records)} {entity_type} records (IDs: {len(odoo_ids)} unique)")
+        if not odoo_ids:
+            logger.info(f"No {entity_type} records to reconcile")
+            return stats
         
-        # Process each Odoo record
+        logger.info(f"Reconciled {len(odoo_ids)} {entity_type} records from parallel export")
+        await self._soft_delete_missing(entity_type, odoo_ids, stats)
+        return stats
+    
+    async def apply_changes(
+        self,
+        entity_type: str,
+        records: List[Dict],
+        deleted_ids: Optional[List[Any]] = None,
+        delete_reason: str = "removed_from_odoo"
+    ) -> Dict[str, int]:
+        """
+        Apply a partial change set (e.g. a webhook batch): upsert the given
+        records and soft-delete the given IDs, leaving all other records alone.
+        """
+        stats = {"inserted": 0, "updated": 0, "soft_deleted": 0, "errors": 0}
+        
+        if records:
+            await self._upsert_records(entity_type, records, "id", stats)
+        
+        if deleted_ids:
+            stats["soft_deleted"] = await self._soft_delete(
+                entity_type, {"$in": [str(i) for i in deleted_ids]}, delete_reason
+            )
+        
+        return stats
+    
+    async def _upsert_records(
+        self,
+        entity_type: str,
+        odoo_records: List[Dict],
+        id_field: str,
+        stats: Dict[str, int]
+    ) -> Set[str]:
+        """
+        Insert or update serving records with one lookup and one unordered
+        bulk_write per UPSERT_BATCH_SIZE records; returns the (string) Odoo
+        IDs seen. Global search is re-indexed for the records that changed.
+        """
+        odoo_ids = set()
+        
+        # Last occurrence wins if an ID appears twice
+        by_id: Dict[str, Dict] = {}
         for rec in odoo_records:
             odoo_id = rec.get(id_field)
             if not odoo_id:
                 stats["errors"] += 1
                 continue
-                
+            by_id[str(odoo_id)] = rec
+        odoo_ids.update(by_id)
+        
+        items = list(by_id.items())
+        for start in range(0, len(items), UPSERT_BATCH_SIZE):
+            await self._upsert_batch(entity_type, items[start:start + UPSERT_BATCH_SIZE], id_field, stats)
+        
+        return odoo_ids
+    
+    async def _upsert_batch(
+        self,
+        entity_type: str,
+        items: List[tuple],
+        id_field: str,
+        stats: Dict[str, int]
+    ) -> None:
+        # Existing records - match multiple ID formats (numeric Odoo IDs and legacy strings)
+        id_strs = [odoo_id_str for odoo_id_str, _ in items]
+        raw_ids = [rec.get(id_field) for _, rec in items]
+        existing: Dict[str, Dict] = {}
+        async for doc in self.db.data_lake_serving.find(
+            {
+                "entity_type": entity_type,
+                "$or": [
+                    {"data.id": {"$in": raw_ids + id_strs}},
+                    {"serving_id": {"$in": id_strs}}
+                ]
+            },
+            {"_id": 1, "serving_id": 1, "data": 1, "is_active": 1}
+        ):
+            for key in (doc.get("serving_id"), (doc.get("data") or {}).get("id")):
+                if key is not None:
+                    existing.setdefault(str(key), doc)
+        
+        now = datetime.now(timezone.utc)
+        ops, kinds = [], []
+        changed: Dict[int, str] = {}  # op index -> serving_id of records whose data changed
+        for odoo_id_str, rec in items:
             try:
-                # Check if exists in our DB - try multiple ID formats
-                odoo_id_str = str(odoo_id)
-                existing = await self.db.data_lake_serving.find_one({
-                    "entity_type": entity_type,
-                    "$or": [
-                        {"data.id": odoo_id},
-                        {"data.id": odoo_id_str},
-                        {"serving_id": odoo_id_str}
-                    ]
-                })
-                
-                now = datetime.now(timezone.utc)
-                
-                if existing:
-                    # Update existing record
-                    await self.db.data_lake_serving.update_one(
-                        {"_id": existing["_id"]},
-                        {"$set": {
-                            "data": rec,
-                            "is_active": True,
-                            "serving_id": odoo_id_str,  # Normalize serving_id
-                            "last_aggregated": now,
-                            "updated_at": now,
-                        }}
-                    )
-                    stats["updated"] += 1
-                else:
-                    # Insert new record
-                    await self.db.data_lake_serving.insert_one({
-                        "entity_type": entity_type,
-                        "serving_id": odoo_id_str,
+                derived = {
+                    **serving_access_fields(entity_type, rec),
+                    **serving_mapped_fields(entity_type, rec),
+                }
+            except Exception as e:
+                logger.error(f"Error reconciling {entity_type} {odoo_id_str}: {e}")
+                stats["errors"] += 1
+                continue
+            
+            current = existing.get(odoo_id_str)
+            if current is None or current.get("is_active") is False or current.get("data") != rec:
+                changed[len(ops)] = odoo_id_str
+            
+            if current is not None:
+                ops.append(UpdateOne(
+                    {"_id": current["_id"]},
+                    {"$set": {
                         "data": rec,
                         "is_active": True,
-                        "source": "odoo",
+                        "serving_id": odoo_id_str,  # Normalize serving_id
                         "last_aggregated": now,
-                        "created_at": now,
                         "updated_at": now,
-                    })
-                    stats["inserted"] += 1
-                    
-            except Exception as e:
-                logger.error(f"Error reconciling {entity_type} {odoo_id}: {e}")
-                stats["errors"] += 1
+                        **derived,
+                    }}
+                ))
+                kinds.append("updated")
+            else:
+                ops.append(InsertOne({
+                    "entity_type": entity_type,
+                    "serving_id": odoo_id_str,
+                    "data": rec,
+                    "is_active": True,
+                    "source": "odoo",
+                    "last_aggregated": now,
+                    "created_at": now,
+                    "updated_at": now,
+                    **derived,
+                }))
+                kinds.append("inserted")
+        
+        if not ops:
+            return
         
-        # Soft-delete records no longer in Odoo
-        # Only delete records that were synced from Odoo (source=odoo)
+        failed = set()
+        try:
+            await self.db.data_lake_serving.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed.add(error["index"])
+                logger.error(f"Error reconciling {entity_type} record: {error.get('errmsg')}")
+        except PyMongoError as e:
+            logger.error(f"Error reconciling {len(ops)} {entity_type} records: {e}")
+            failed = set(range(len(ops)))
+        
+        for index, kind in enumerate(kinds):
+            stats["errors" if index in failed else kind] += 1
+    
+        # Keep global search in step with the serving zone
+        await refresh_serving_entries(
+            self.db, entity_type, [serving_id for index, serving_id in changed.items() if index not in failed]
+        )
+    
+    async def _soft_delete_missing(self, entity_type: str, odoo_ids: Set[str], stats: Dict[str, int]) -> None:
+        # Soft-delete records no longer in Odoo (in our DB but not in Odoo)
         if odoo_ids:
-            odoo_id_strs = list(odoo_ids)
-            
-            # Find records to soft-delete (in our DB but not in Odoo)
-            result = await self.db.data_lake_serving.update_many(
-                {
-                    "entity_type": entity_type,
-                    "source": "odoo",  # Only delete Odoo-synced records
-                    "serving_id": {"$nin": odoo_id_strs},
-                    "is_active": {"$ne": False},  # Only update records not already deleted
-                },
-                {"$set": {
-                    "is_active": False,
-                    "deleted_at": datetime.now(timezone.utc),
-                    "delete_reason": "removed_from_odoo"
-                }}
+            stats["soft_deleted"] = await self._soft_delete(
+                entity_type, {"$nin": list(odoo_ids)}, "removed_from_odoo"
             )
-            stats["soft_deleted"] = result.modified_count
             
             if stats["soft_deleted"] > 0:
                 logger.info(f"Soft-deleted {stats['soft_deleted']} {entity_type} records no longer in Odoo")
-        
-        return stats
+    
+    async def _soft_delete(self, entity_type: str, serving_id_filter: Dict[str, Any], reason: str) -> int:
+        """Soft-delete matching Odoo records and drop their search entries; returns the count"""
+        query = {
+            "entity_type": entity_type,
+            "source": "odoo",  # Only delete Odoo-synced records
+            "serving_id": serving_id_filter,
+            "is_active": {"$ne": False},  # Only update records not already deleted
+        }
+        serving_ids = await self.db.data_lake_serving.distinct("serving_id", query)
+        if not serving_ids:
+            return 0
+        
+        result = await self.db.data_lake_serving.update_many(
+            {**query, "serving_id": {"$in": serving_ids}},
+            {"$set": {
+                "is_active": False,
+                "deleted_at": datetime.now(timezone.utc),
+                "delete_reason": reason
+            }}
+        )
+        await refresh_serving_entries(self.db, entity_type, serving_ids)
+        return result.modified_count
 
 
 class BackgroundSyncService:
@@ -182,6 +316,26 @@ class BackgroundSyncService:
             max_instances=1,  # Prevent overlapping syncs
         )
         
+        # Prune and compact superseded raw versions once a day
+        self._scheduler.add_job(
+            self._run_retention,
+            IntervalTrigger(hours=RETENTION_INTERVAL_HOURS),
+            id="raw_zone_retention",
+            name="Raw Zone Retention",
+            replace_existing=True,
+            max_instances=1,
+        )
+        
+        # Incremental MS365 mailbox/calendar sync for connected users
+        self._scheduler.add_job(
+            self._run_ms365_delta_sync,
+            IntervalTrigger(minutes=settings.MS365_SYNC_INTERVAL_MINUTES),
+            id="ms365_delta_sync",
+            name="MS365 Delta Sync",
+            replace_existing=True,
+            max_instances=1,
+        )
+        
         self._scheduler.start()
         self._is_running = True
         logger.info(f"Background sync service started with {interval_minutes} minute interval")
@@ -283,20 +437,19 @@ class BackgroundSyncService:
             try:
                 # Sync Accounts (res.partner)
                 logger.info("Syncing accounts...")
-                accounts = await connector.fetch_accounts()
-                stats["accounts"] = await reconciler.reconcile_entity("account", accounts)
+                stats["accounts"] = await reconciler.reconcile_stream("account", connector.export_entity("account"))
                 logger.info(f"Accounts: {stats['accounts']}")
                 
                 # Sync Opportunities (crm.lead)
                 logger.info("Syncing opportunities...")
-                opportunities = await connector.fetch_opportunities()
-                stats["opportunities"] = await reconciler.reconcile_entity("opportunity", opportunities)
+                stats["opportunities"] = await reconciler.reconcile_stream(
+                    "opportunity", connector.export_entity("opportunity")
+                )
                 logger.info(f"Opportunities: {stats['opportunities']}")
                 
                 # Sync Invoices (account.move)
                 logger.info("Syncing invoices...")
-                invoices = await connector.fetch_invoices()
-                stats["invoices"] = await reconciler.reconcile_entity("invoice", invoices)
+                stats["invoices"] = await reconciler.reconcile_stream("invoice", connector.export_entity("invoice"))
                 logger.info(f"Invoices: {stats['invoices']}")
                 
                 # Sync Users/Employees (hr.employee)
@@ -329,6 +482,18 @@ class BackgroundSyncService:
             finally:
                 await connector.disconnect()
             
+            # Per-account pipeline, invoice and activity rollups
+            from data_lake.account_rollup import refresh_account_rollups
+            await refresh_account_rollups(db)
+            
+            # Revenue/pipeline snapshot for goal progress
+            from services.reporting.goal_progress import refresh_goal_progress
+            await refresh_goal_progress(db)
+            
+            # Typed ClickHouse facts for dashboard analytics (when configured)
+            from microservices.analytics_engine import mirror_serving_records
+            await mirror_serving_records(db)
+            
             # Calculate totals
             total_inserted = sum(s["inserted"] for s in stats.values())
             total_updated = sum(s["updated"] for s in stats.values())
@@ -405,6 +570,28 @@ class BackgroundSyncService:
                 "error": str(e),
             }
     
+    async def _run_retention(self) -> Dict[str, Any]:
+        """Apply raw zone retention policies (called by scheduler)"""
+        from data_lake.retention import RetentionManager
+        
+        try:
+            report = await RetentionManager(Database.get_db()).run(triggered_by="scheduled")
+            return {"success": True, "totals": report["totals"]}
+        except Exception as e:
+            logger.error(f"Raw zone retention failed: {e}")
+            return {"success": False, "error": str(e)}
+    
+    async def _run_ms365_delta_sync(self) -> Dict[str, Any]:
+        """Delta-sync mail and calendar for all connected users (called by scheduler)"""
+        from services.ms365.delta_sync import MailboxDeltaSync
+        
+        try:
+            totals = await MailboxDeltaSync(Database.get_db()).sync_all()
+            return {"success": True, "totals": totals}
+        except Exception as e:
+            logger.error(f"MS365 delta sync failed: {e}")
+            return {"success": False, "error": str(e)}
+    
     async def _sync_entity_with_retry(
         self,
         entity_name: str,
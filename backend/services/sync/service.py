@@ -11,6 +11,7 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from services.odoo.connector import OdooConnector
 from services.ms365.connector import MS365Connector
 from services.data_lake.manager import DataLakeManager
+from services.mapping_compiler import CompiledMapping, compile_mapping_doc
 from models.base import (
     EntityType, IntegrationType, SyncStatus, SyncJob
 )
@@ -28,11 +29,12 @@ class SyncService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.data_lake = DataLakeManager(db)
-        self._field_mappings_cache: Dict[str, Dict[str, Any]] = {}
+        self._field_mappings_cache: Dict[str, CompiledMapping] = {}
     
-    async def _load_field_mappings(self, integration_type: str, entity_type: EntityType) -> Optional[List[Dict[str, Any]]]:
+    async def _load_field_mappings(self, integration_type: str, entity_type: EntityType) -> Optional[CompiledMapping]:
         """
-        Load custom field mappings from database for a specific entity type.
+        Load custom field mappings for a specific entity type, compiled
+        (once per mapping version) into a CompiledMapping.
         Returns None if no custom mappings exist.
         """
         cache_key = f"{integration_type}:{entity_type.value}"
@@ -47,9 +49,10 @@ class SyncService:
         }, {"_id": 0})
         
         if mapping and mapping.get("mappings"):
-            self._field_mappings_cache[cache_key] = mapping["mappings"]
-            logger.info(f"Loaded {len(mapping['mappings'])} custom mappings for {entity_type.value}")
-            return mapping["mappings"]
+            compiled = compile_mapping_doc(mapping)
+            self._field_mappings_cache[cache_key] = compiled
+            logger.info(f"Loaded {len(compiled)} custom mappings for {entity_type.value}")
+            return compiled
         
         return None
     
@@ -98,6 +101,18 @@ class SyncService:
                             "failed": 0
                         }
             
+            # Per-account pipeline, invoice and activity rollups
+            from data_lake.account_rollup import refresh_account_rollups
+            await refresh_account_rollups(self.db)
+            
+            # Revenue/pipeline snapshot for goal progress
+            from services.reporting.goal_progress import refresh_goal_progress
+            await refresh_goal_progress(self.db)
+            
+            # Global search entries for the synced entities
+            from services.search.index import refresh_search_index
+            await refresh_search_index(self.db, [entity_type.value for entity_type in entity_types])
+            
             return results
             
         except Exception as e:
@@ -413,7 +428,10 @@ class SyncService:
                 
                 result["total"] += len(records)
                 
-                for record in records:
+                # Custom mappings are applied to the whole page in one compiled call
+                mapped_page = custom_mappings.map_batch(records) if custom_mappings else None
+                
+                for index, record in enumerate(records):
                     try:
                         source_id = str(record.get("id"))
                         logger.info(f"Processing record {source_id} for entity {entity_type.value}")
@@ -429,8 +447,8 @@ class SyncService:
                         logger.info(f"Raw ingestion complete for {source_id}")
                         
                         # Transform using custom mappings or default normalization
-                        if custom_mappings:
-                            normalized = self._apply_custom_mappings(record, custom_mappings)
+                        if mapped_page is not None:
+                            normalized = mapped_page[index]
                         else:
                             normalized = self._normalize_odoo_record(record, entity_type)
                         
@@ -565,66 +583,6 @@ class SyncService:
         
         return record
     
-    def _apply_custom_mappings(
-        self,
-        record: Dict[str, Any],
-        mappings: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
-        """
-        Apply custom field mappings to transform a source record to canonical schema.
-        
-        Each mapping has:
-        - source_field: The field name in the source record (Odoo)
-        - target_field: The field name in the canonical schema
-        - transform: Optional transformation function name
-        """
-        result = {}
-        
-        for mapping in mappings:
-            source_field = mapping.get("source_field")
-            target_field = mapping.get("target_field")
-            transform = mapping.get("transform")
-            
-            if not source_field or not target_field:
-                continue
-            
-            # Get the source value
-            source_value = record.get(source_field)
-            
-            # Apply transformation if specified
-            if transform == "extract_id":
-                source_value = self._extract_id(source_value)
-            elif transform == "extract_name":
-                source_value = self._extract_name(source_value)
-            elif transform == "to_string":
-                source_value = str(source_value) if source_value is not None else ""
-            elif transform == "to_float":
-                try:
-                    source_value = float(source_value) if source_value else 0.0
-                except (ValueError, TypeError):
-                    source_value = 0.0
-            elif transform == "to_int":
-                try:
-                    source_value = int(source_value) if source_value else 0
-                except (ValueError, TypeError):
-                    source_value = 0
-            elif transform == "boolean":
-                source_value = bool(source_value)
-            
-            # Handle None/empty values
-            if source_value is None:
-                source_value = ""
-            
-            result[target_field] = source_value
-        
-        # Always include tracking dates if available
-        if "create_date" in record:
-            result["created_date"] = record["create_date"]
-        if "write_date" in record:
-            result["modified_date"] = record["write_date"]
-        
-        return result
-    
     def _extract_id(self, field) -> Optional[str]:
         """Extract ID from Odoo many2one field"""
         if isinstance(field, (list, tuple)) and len(field) >= 1:
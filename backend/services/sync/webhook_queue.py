@@ -0,0 +1,229 @@
+"""
+Webhook Queue - Micro-Batched Odoo Webhook Ingestion
+Coalesces webhook record IDs per model over a short window and applies
+them with one Odoo read per model and bulk serving-zone writes
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+import asyncio
+import logging
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+
+class WebhookQueue:
+    """
+    Pending webhook changes keyed by Odoo model and record ID.
+    
+    - enqueue() never awaits I/O; the first change after a flush schedules
+      the next one window_seconds later (or right away once max_ids are
+      pending), so a bulk edit of 500 leads becomes one batch
+    - The same ID seen twice in a window is fetched once; the latest action
+      wins (a write after an unlink re-reads the record, and vice versa)
+    - create/write IDs are read from Odoo in one search_read per model over
+      the shared transport; unlink IDs become batched soft-deletes
+    - A batch that fails goes back to the queue and is retried with
+      exponential backoff; records are only counted as failed once they
+      failed max_attempts times
+    """
+    
+    def __init__(
+        self,
+        window_seconds: Optional[float] = None,
+        max_ids: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+        db=None
+    ):
+        self.window_seconds = window_seconds if window_seconds is not None else settings.WEBHOOK_BATCH_WINDOW_SECONDS
+        self.max_ids = max_ids or settings.WEBHOOK_BATCH_MAX_IDS
+        self.max_attempts = max_attempts or settings.WEBHOOK_BATCH_MAX_ATTEMPTS
+        self.retry_delay = retry_delay if retry_delay is not None else settings.WEBHOOK_RETRY_DELAY_SECONDS
+        self._db = db
+        self._pending: Dict[str, Dict[int, str]] = {}
+        self._attempts: Dict[Tuple[str, int], int] = {}
+        self._failures = 0
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._stats = {
+            "received": 0,
+            "coalesced": 0,
+            "batches": 0,
+            "fetched": 0,
+            "soft_deleted": 0,
+            "retried": 0,
+            "failed": 0,
+            "last_error": None,
+        }
+    
+    @property
+    def db(self):
+        if self._db is None:
+            from core.database import Database
+            self._db = Database.get_db()
+        return self._db
+    
+    @property
+    def models(self) -> List[str]:
+        from integrations.odoo.connector import OdooConnector
+        return list(OdooConnector.WEBHOOK_ENTITIES)
+    
+    @property
+    def pending_count(self) -> int:
+        return sum(len(ids) for ids in self._pending.values())
+    
+    def enqueue(self, model: str, action: str, record_ids: List[int]) -> int:
+        """Queue a webhook's records; returns how many were not already pending"""
+        pending = self._pending.setdefault(model, {})
+        kind = DELETE if action == "unlink" else UPSERT
+        
+        added = 0
+        for record_id in record_ids:
+            if record_id not in pending:
+                added += 1
+            pending[record_id] = kind
+        
+        self._stats["received"] += len(record_ids)
+        self._stats["coalesced"] += len(record_ids) - added
+        
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_after(self.window_seconds))
+        elif self.pending_count >= self.max_ids:
+            self._task = asyncio.create_task(self._flush_after(0))
+        return added
+    
+    async def stop(self) -> None:
+        """Apply whatever is still pending (called on shutdown)"""
+        await self.flush()
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+    
+    async def _flush_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        next_delay = self.window_seconds
+        try:
+            await self.flush()
+            self._failures = 0
+        except Exception as e:
+            self._failures += 1
+            next_delay = self.retry_delay * 2 ** (self._failures - 1)
+            logger.error(f"Webhook batch failed, retrying in {next_delay:g}s: {e}")
+        
+        # Requeued records, or webhooks that arrived while this batch was being applied
+        if self._pending and self._task is asyncio.current_task():
+            self._task = asyncio.create_task(self._flush_after(next_delay))
+    
+    async def flush(self) -> Dict[str, Any]:
+        """Apply the pending changes; returns per-entity reconcile stats"""
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            if not any(batch.values()):
+                return {}
+            
+            try:
+                results = await self._apply(batch)
+            except Exception as e:
+                self._stats["last_error"] = f"{type(e).__name__}: {e}"
+                self._requeue(batch)
+                raise
+            
+            for model, actions in batch.items():
+                for record_id in actions:
+                    self._attempts.pop((model, record_id), None)
+            self._stats["batches"] += 1
+            return results
+    
+    def _requeue(self, batch: Dict[str, Dict[int, str]]) -> None:
+        """
+        Put a failed batch back without overwriting newer actions queued for
+        the same records meanwhile; records out of attempts are dropped
+        """
+        for model, actions in batch.items():
+            pending = self._pending.setdefault(model, {})
+            for record_id, kind in actions.items():
+                key = (model, record_id)
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts >= self.max_attempts and record_id not in pending:
+                    self._attempts.pop(key, None)
+                    self._stats["failed"] += 1
+                    logger.warning(f"Giving up on webhook {model} #{record_id} after {attempts} attempts")
+                    continue
+                
+                self._attempts[key] = attempts
+                if record_id not in pending:
+                    pending[record_id] = kind
+                    self._stats["retried"] += 1
+    
+    async def _apply(self, batch: Dict[str, Dict[int, str]]) -> Dict[str, Any]:
+        from integrations.odoo.connector import OdooConnector
+        from services.sync.background_sync import OdooReconciler
+        
+        db = self.db
+        intg = await db.integrations.find_one({"integration_type": "odoo"})
+        if not intg or not intg.get("config"):
+            logger.error("Odoo not configured, cannot process webhooks")
+            self._stats["failed"] += sum(len(ids) for ids in batch.values())
+            return {}
+        
+        connector = OdooConnector(intg["config"])
+        reconciler = OdooReconciler(db)
+        results: Dict[str, Any] = {}
+        touched: Dict[str, List[str]] = {}
+        
+        try:
+            for model, actions in batch.items():
+                upsert_ids = [i for i, kind in actions.items() if kind == UPSERT]
+                delete_ids = [i for i, kind in actions.items() if kind == DELETE]
+                
+                changes = await connector.read_changes(model, upsert_ids) if upsert_ids else {}
+                self._stats["fetched"] += sum(len(records) for records in changes.values())
+                
+                for entity_type in OdooConnector.WEBHOOK_ENTITIES[model]:
+                    records = changes.get(entity_type, [])
+                    returned = {r["id"] for r in records}
+                    # Read but not returned for this type: deleted, archived or re-typed
+                    gone = [i for i in upsert_ids if i not in returned]
+                    
+                    stats = await reconciler.apply_changes(entity_type, records, gone)
+                    if delete_ids:
+                        unlinked = await reconciler.apply_changes(
+                            entity_type, [], delete_ids, delete_reason="unlinked_in_odoo"
+                        )
+                        stats["soft_deleted"] += unlinked["soft_deleted"]
+                    
+                    self._stats["soft_deleted"] += stats["soft_deleted"]
+                    results[entity_type] = stats
+                    touched.setdefault(entity_type, []).extend(str(i) for i in actions)
+        finally:
+            await connector.disconnect()
+        
+        logger.info(f"Applied webhook batch: {results}")
+        
+        # One rollup update per batch, limited to the partners it touched
+        from data_lake.account_rollup import refresh_account_rollups
+        await refresh_account_rollups(db, touched)
+        
+        await db.integrations.update_one(
+            {"integration_type": "odoo"},
+            {"$set": {"last_sync": datetime.now(timezone.utc)}}
+        )
+        return results
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "pending": self.pending_count,
+            "window_seconds": self.window_seconds,
+            "max_ids": self.max_ids,
+            "max_attempts": self.max_attempts,
+        }
+
+
+# Global webhook queue instance
+webhook_queue = WebhookQueue()
@@ -212,6 +212,10 @@ class BaseNormalizer(INormalizer):
         """Resolve foreign key references. Override for specific logic."""
         return entity
     
+    async def resolve_references_batch(self, entities: List[BaseEntity]) -> List[BaseEntity]:
+        """Resolve references for a chunk. Override to batch the lookups."""
+        return [await self.resolve_references(entity) for entity in entities]
+    
     def _normalize_phone(self, phone: str) -> str:
         """Normalize phone number format"""
         # Remove common formatting characters
@@ -256,27 +260,38 @@ class BaseLoader(ILoader):
         if hasattr(entity, 'owner_id') and entity.owner_id:
             await self.data_lake.serving.refresh_user_stats(entity.owner_id)
     
-    async def bulk_load_raw(self, records: List[RawRecord]) -> int:
-        """Bulk load to raw zone"""
-        if not records:
-            return 0
+    async def bulk_load_raw(self, records: List[RawRecord]) -> Dict[str, Any]:
+        """
+        Bulk load to raw zone with idempotent upserts.
+        
+        Returns:
+            Summed counts: inserted, changed, duplicate, failed, failed_source_ids
+        """
+        totals: Dict[str, Any] = {
+            "inserted": 0,
+            "changed": 0,
+            "duplicate": 0,
+            "failed": 0,
+            "failed_source_ids": [],
+        }
         
-        # Group by source/entity type
-        first = records[0]
-        source = IntegrationSource(first.source)
-        entity_type = self._get_entity_type(first)
+        # Group by source/entity type (each maps to its own raw collection)
+        groups: Dict[tuple, List[RawRecord]] = {}
+        for record in records:
+            key = (record.source, self._get_entity_type(record), record.sync_batch_id)
+            groups.setdefault(key, []).append(record)
         
-        record_dicts = [
-            {"source_id": r.source_id, "data": r.raw_data}
-            for r in records
-        ]
+        for (source, entity_type, batch_id), group in groups.items():
+            stats = await self.data_lake.raw.bulk_store(
+                source=IntegrationSource(source),
+                entity_type=entity_type,
+                records=[{"source_id": r.source_id, "data": r.raw_data} for r in group],
+                batch_id=batch_id
+            )
+            for key, value in stats.items():
+                totals[key] += value
         
-        return await self.data_lake.raw.bulk_store(
-            source=source,
-            entity_type=entity_type,
-            records=record_dicts,
-            batch_id=first.sync_batch_id
-        )
+        return totals
     
     def _get_entity_type(self, record: RawRecord) -> EntityType:
         """Determine entity type from raw record. Override if needed."""
@@ -17,7 +17,7 @@ from core.interfaces import (
     ILoader,
     ILogger,
 )
-from core.base import SyncBatch, BaseEntity
+from core.base import SyncBatch, BaseEntity, RawRecord
 from core.enums import SyncStatus, SyncMode, EntityType, IntegrationSource
 from core.exceptions import SyncError, ValidationError
 
@@ -48,7 +48,8 @@ class SyncPipeline(ISyncPipeline):
         sync_logger: ILogger,
         batch_size: int = 100,
         max_retries: int = 3,
-        retry_delay: float = 1.0
+        retry_delay: float = 1.0,
+        data_lake=None
     ):
         self._connector = connector
         self._mapper = mapper
@@ -57,6 +58,9 @@ class SyncPipeline(ISyncPipeline):
         self._loader = loader
         self._logger = sync_logger
         
+        # Raw zone access for replay (BaseLoader already carries one)
+        self._data_lake = data_lake or getattr(loader, "data_lake", None)
+        
         self.batch_size = batch_size
         self.max_retries = max_retries
         self.retry_delay = retry_delay
@@ -114,7 +118,7 @@ class SyncPipeline(ISyncPipeline):
                 if history:
                     since = history[0].get("timestamp")
             
-            # Process records in batches
+            # Process records in chunks so lookups can be batched
             records_buffer = []
             
             async for source_record in self._connector.fetch_records(
@@ -122,48 +126,14 @@ class SyncPipeline(ISyncPipeline):
                 since=since,
                 batch_size=self.batch_size
             ):
-                try:
-                    # Process single record
-                    result = await self._process_record(source_record, batch.id, entity_type)
-                    
-                    batch.records_processed += 1
-                    
-                    if result["status"] == "created":
-                        batch.records_created += 1
-                    elif result["status"] == "updated":
-                        batch.records_updated += 1
-                    elif result["status"] == "skipped":
-                        pass
-                    else:
-                        batch.records_failed += 1
-                        errors.append(result.get("error", {}))
-                    
-                    # Log progress
-                    await self._logger.log_record_processed(
-                        batch.id,
-                        result["source_id"],
-                        result["status"],
-                        result.get("error_message")
-                    )
-                    
-                except Exception as e:
-                    batch.records_processed += 1
-                    batch.records_failed += 1
-                    error_info = {
-                        "source_id": source_record.get("id"),
-                        "error": str(e),
-                        "type": type(e).__name__
-                    }
-                    errors.append(error_info)
-                    
-                    await self._logger.log_record_processed(
-                        batch.id,
-                        source_record.get("id"),
-                        "error",
-                        str(e)
-                    )
-                    
-                    logger.error(f"Error processing record {source_record.get('id')}: {e}")
+                records_buffer.append(source_record)
+                
+                if len(records_buffer) >= self.batch_size:
+                    await self._process_chunk(records_buffer, batch, errors)
+                    records_buffer = []
+            
+            if records_buffer:
+                await self._process_chunk(records_buffer, batch, errors)
             
             # Determine final status
             if batch.records_failed == 0:
@@ -195,6 +165,142 @@ class SyncPipeline(ISyncPipeline):
         
         return batch
     
+    async def _process_chunk(
+        self,
+        source_records: List[Dict[str, Any]],
+        batch: SyncBatch,
+        errors: List[Dict[str, Any]]
+    ) -> None:
+        """Process a chunk of source records and tally the results on the batch"""
+        results = await self._process_records(source_records, batch)
+        
+        for result in results:
+            batch.records_processed += 1
+            
+            if result["status"] == "created":
+                batch.records_created += 1
+            elif result["status"] == "updated":
+                batch.records_updated += 1
+            elif result["status"] == "skipped":
+                pass
+            else:
+                batch.records_failed += 1
+                errors.append(result.get("error", {}))
+            
+            if result["status"] == "error":
+                logger.error(f"Error processing record {result['source_id']}: {result['error_message']}")
+            
+            # Log progress
+            await self._logger.log_record_processed(
+                batch.id,
+                result["source_id"],
+                result["status"],
+                result.get("error_message")
+            )
+    
+    async def _process_records(
+        self,
+        source_records: List[Dict[str, Any]],
+        batch: SyncBatch
+    ) -> List[Dict[str, Any]]:
+        """
+        Process a chunk of records through the pipeline.
+        
+        Records are transformed one by one, then references for the whole
+        chunk are resolved in bulk and the raw zone is written with a single
+        idempotent bulk upsert before canonical loading.
+        
+        Returns:
+            One result dict per record, in order
+        """
+        results = []
+        raw_records = []
+        
+        for source_record in source_records:
+            source_id = source_record.get("id")
+            try:
+                raw_record = self._mapper.map_to_raw(source_record, batch.id)
+                result = await self._transform_raw(raw_record, source_id, resolve=False)
+            except Exception as e:
+                raw_record = None
+                result = self._error_result(source_id, e)
+            
+            raw_records.append(raw_record)
+            results.append(result)
+        
+        # Resolve references for the whole chunk at once
+        pending = [result for result in results if "entity" in result]
+        if pending:
+            try:
+                resolved = await self._normalizer.resolve_references_batch(
+                    [result["entity"] for result in pending]
+                )
+                for result, entity in zip(pending, resolved):
+                    result["entity"] = entity
+            except Exception as e:
+                for result in pending:
+                    result.update(self._error_result(result["source_id"], e))
+                    del result["entity"]
+        
+        # Load raw zone for the whole chunk in one bulk write
+        to_load = [
+            (raw_record, result) for raw_record, result in zip(raw_records, results)
+            if "entity" in result
+        ]
+        if to_load:
+            try:
+                raw_stats = await self._loader.bulk_load_raw([raw for raw, _ in to_load])
+                self._add_raw_stats(batch, raw_stats)
+                
+                failed_ids = set(raw_stats.get("failed_source_ids", []))
+                for raw_record, result in to_load:
+                    if str(raw_record.source_id) in failed_ids:
+                        result.pop("entity")
+                        result.update(self._error_result(
+                            result["source_id"],
+                            SyncError(self.source_name, batch.entity_type, "Raw zone write failed", batch.id)
+                        ))
+            except Exception as e:
+                for _, result in to_load:
+                    result.pop("entity")
+                    result.update(self._error_result(result["source_id"], e))
+        
+        # Load canonical and serving zones
+        for result in results:
+            if "entity" not in result:
+                continue
+            
+            entity = result.pop("entity")
+            try:
+                result["canonical_id"] = await self._loader.load_canonical(entity)
+                await self._loader.load_serving(entity)
+            except Exception as e:
+                result.update(self._error_result(result["source_id"], e))
+        
+        return results
+    
+    def _add_raw_stats(self, batch: SyncBatch, raw_stats: Dict[str, Any]) -> None:
+        """Accumulate per-chunk raw zone write counts on the batch"""
+        totals = batch.metadata.setdefault(
+            "raw_zone",
+            {"inserted": 0, "changed": 0, "duplicate": 0, "failed": 0}
+        )
+        for key in totals:
+            totals[key] += raw_stats.get(key, 0)
+    
+    def _error_result(self, source_id: Any, error: Exception) -> Dict[str, Any]:
+        """Result dict for a record that raised during processing"""
+        return {
+            "source_id": source_id,
+            "status": "error",
+            "error_message": str(error),
+            "error": {
+                "source_id": source_id,
+                "error": str(error),
+                "type": type(error).__name__
+            }
+        }
+    
     async def _process_record(
         self,
         source_record: Dict[str, Any],
@@ -207,12 +313,48 @@ class SyncPipeline(ISyncPipeline):
         Returns:
             Dict with status and details
         """
-        source_id = source_record.get("id")
-        
         # Step 1: Map to raw format
         raw_record = self._mapper.map_to_raw(source_record, batch_id)
         
-        # Step 2: Validate raw
+        # Steps 2-7: Validate, map, normalize, dedupe, resolve
+        result = await self._transform_raw(raw_record, source_record.get("id"))
+        if "entity" not in result:
+            return result
+        
+        entity = result.pop("entity")
+        
+        # Step 8: Load to raw zone
+        await self._loader.load_raw(raw_record)
+        
+        # Step 9: Load to canonical zone
+        canonical_id = await self._loader.load_canonical(entity)
+        
+        # Step 10: Update serving zone
+        await self._loader.load_serving(entity)
+        
+        result["canonical_id"] = canonical_id
+        return result
+    
+    async def _transform_raw(
+        self,
+        raw_record: RawRecord,
+        source_id: Any,
+        resolve: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Run a raw record through validation, mapping and normalization.
+        
+        Shared by live syncs and replays. Nothing is written to the data lake.
+        
+        Args:
+            raw_record: Raw record to transform
+            source_id: Source ID used in the result
+            resolve: Resolve references here (False when batching per chunk)
+        
+        Returns:
+            Dict with status and, on success, the resolved "entity"
+        """
+        # Validate raw
         raw_errors = self._validator.validate_raw(raw_record)
         if raw_errors:
             return {
@@ -222,7 +364,7 @@ class SyncPipeline(ISyncPipeline):
                 "error": {"stage": "raw_validation", "errors": raw_errors}
             }
         
-        # Step 3: Map to canonical entity
+        # Map to canonical entity
         try:
             entity = self._mapper.map_to_canonical(raw_record)
         except Exception as e:
@@ -233,7 +375,7 @@ class SyncPipeline(ISyncPipeline):
                 "error": {"stage": "canonical_mapping", "errors": [str(e)]}
             }
         
-        # Step 4: Validate canonical
+        # Validate canonical
         canonical_errors = self._validator.validate_canonical(entity)
         if canonical_errors:
             return {
@@ -243,42 +385,99 @@ class SyncPipeline(ISyncPipeline):
                 "error": {"stage": "canonical_validation", "errors": canonical_errors}
             }
         
-        # Step 5: Normalize
+        # Normalize
         entity = await self._normalizer.normalize(entity)
         
-        # Step 6: Check for duplicates
+        # Check for duplicates
         existing = await self._normalizer.deduplicate(entity)
         is_update = existing is not None
         
         if is_update:
             entity = existing  # Use merged entity
         
-        # Step 7: Resolve references
-        entity = await self._normalizer.resolve_references(entity)
-        
-        # Step 8: Load to raw zone
-        await self._loader.load_raw(raw_record)
-        
-        # Step 9: Load to canonical zone
-        canonical_id = await self._loader.load_canonical(entity)
-        
-        # Step 10: Update serving zone
-        await self._loader.load_serving(entity)
+        # Resolve references (skipped when the caller resolves a whole chunk)
+        if resolve:
+            entity = await self._normalizer.resolve_references(entity)
         
         return {
             "source_id": source_id,
-            "canonical_id": canonical_id,
+            "entity": entity,
             "status": "updated" if is_update else "created"
         }
     
-    async def replay(self, batch_id: str) -> SyncBatch:
+    async def replay(
+        self,
+        batch_id: str,
+        entity_type: Optional[str] = None,
+        dry_run: bool = False,
+        diff: bool = False,
+        chunk_size: Optional[int] = None
+    ) -> SyncBatch:
         """
-        Replay a previous sync batch.
+        Replay a previous sync batch from the raw zone.
         Useful for reprocessing after fixes or migrations.
+        
+        No source API calls are made - records are streamed from the raw zone
+        and re-run through map, validate, normalize and load.
+        
+        Args:
+            batch_id: Sync batch to replay
+            entity_type: Entity type of the batch (looked up if omitted)
+            dry_run: Transform records without writing to the data lake
+            diff: Include field-level diffs against the canonical zone
+            chunk_size: Records per chunk (defaults to pipeline batch size)
+            
+        Returns:
+            SyncBatch with results; throughput and diffs are in metadata
         """
-        # This would fetch raw records from the batch and reprocess
-        # Implementation depends on specific requirements
-        raise NotImplementedError("Replay not yet implemented")
+        return await self._replay_engine().replay_batch(
+            batch_id,
+            entity_type=entity_type,
+            dry_run=dry_run,
+            diff=diff,
+            chunk_size=chunk_size or self.batch_size
+        )
+    
+    async def replay_range(
+        self,
+        entity_type: str,
+        since: datetime,
+        until: Optional[datetime] = None,
+        dry_run: bool = False,
+        diff: bool = False,
+        chunk_size: Optional[int] = None
+    ) -> SyncBatch:
+        """
+        Replay every raw record ingested in a time window.
+        
+        Args:
+            entity_type: Entity type to replay
+            since: Start of the ingestion window (inclusive)
+            until: End of the ingestion window (exclusive), defaults to now
+            dry_run: Transform records without writing to the data lake
+            diff: Include field-level diffs against the canonical zone
+            chunk_size: Records per chunk (defaults to pipeline batch size)
+        """
+        return await self._replay_engine().replay_range(
+            entity_type,
+            since=since,
+            until=until,
+            dry_run=dry_run,
+            diff=diff,
+            chunk_size=chunk_size or self.batch_size
+        )
+    
+    def _replay_engine(self):
+        """Build a replay engine bound to this pipeline"""
+        from .replay import ReplayEngine
+        
+        if self._data_lake is None:
+            raise SyncError(
+                self.source_name,
+                "replay",
+                "Replay requires a data lake (pass data_lake or use a BaseLoader)"
+            )
+        return ReplayEngine(self, self._data_lake)
     
     async def sync_single(
         self,
@@ -0,0 +1,108 @@
+"""
+Batched Reference Resolution
+Resolves source-system foreign keys to canonical IDs for whole chunks of entities.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Type
+from motor.motor_asyncio import AsyncIOMotorDatabase
+import logging
+
+from core.base import BaseEntity, SourceReference
+from core.enums import IntegrationSource
+
+
+logger = logging.getLogger(__name__)
+
+
+# entity class -> [(entity field, target canonical collection)]
+ReferenceFields = Dict[Type[BaseEntity], List[Tuple[str, str]]]
+
+
+class ReferenceResolver:
+    """
+    Resolves source IDs (e.g. Odoo partner_id, Salesforce AccountId) to canonical IDs.
+    
+    Instead of one lookup per foreign key per record, callers prefetch a
+    chunk: every foreign key is collected up front and resolved with a
+    single `$in` query on the indexed `_source_keys` per target collection.
+    
+    Hits are memoized until clear() is called (end of the sync batch).
+    Misses are only remembered until the next prefetch, since the target
+    may be created by a later chunk.
+    """
+    
+    # Keep $in lists at a size Mongo handles comfortably
+    MAX_IN_SIZE = 1000
+    
+    def __init__(self, db: AsyncIOMotorDatabase, source: IntegrationSource):
+        self.db = db
+        self.source = source
+        self._hits: Dict[str, Dict[str, str]] = {}
+        self._misses: Dict[str, Set[str]] = {}
+        self.queries = 0
+    
+    def collect(
+        self,
+        entities: Iterable[BaseEntity],
+        reference_fields: ReferenceFields,
+        is_source_ref: Callable[[str], bool]
+    ) -> Dict[str, Set[str]]:
+        """Collect every unresolved foreign key in a chunk, grouped by target collection"""
+        refs: Dict[str, Set[str]] = {}
+        
+        for entity in entities:
+            for field, collection in reference_fields.get(type(entity), []):
+                value = getattr(entity, field, None)
+                if value and is_source_ref(value):
+                    refs.setdefault(collection, set()).add(value)
+        
+        return refs
+    
+    async def prefetch(self, refs: Dict[str, Set[str]]) -> None:
+        """Resolve all given source IDs with one query per target collection"""
+        for collection, source_ids in refs.items():
+            hits = self._hits.setdefault(collection, {})
+            pending = [sid for sid in source_ids if sid not in hits]
+            
+            # Misses from earlier chunks are re-checked
+            misses = self._misses.setdefault(collection, set())
+            misses.difference_update(pending)
+            
+            for start in range(0, len(pending), self.MAX_IN_SIZE):
+                id_slice = pending[start:start + self.MAX_IN_SIZE]
+                keys = {
+                    SourceReference.make_key(self.source.value, sid): sid for sid in id_slice
+                }
+                
+                cursor = self.db[collection].find(
+                    {"_source_keys": {"$in": list(keys)}},
+                    {"_id": 0, "id": 1, "_source_keys": 1}
+                )
+                self.queries += 1
+                
+                async for doc in cursor:
+                    for key in doc.get("_source_keys", []):
+                        if key in keys:
+                            hits[keys[key]] = doc["id"]
+                
+                misses.update(sid for sid in id_slice if sid not in hits)
+    
+    async def resolve(self, collection: str, source_id: str) -> Optional[str]:
+        """
+        Resolve a single source ID.
+        Served from the memo after prefetch; falls back to a point query otherwise.
+        """
+        hits = self._hits.setdefault(collection, {})
+        if source_id in hits:
+            return hits[source_id]
+        
+        if source_id in self._misses.get(collection, set()):
+            return None
+        
+        await self.prefetch({collection: {source_id}})
+        return hits.get(source_id)
+    
+    def clear(self) -> None:
+        """Forget all memoized references (call at the end of a sync batch)"""
+        self._hits.clear()
+        self._misses.clear()
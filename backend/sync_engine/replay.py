@@ -0,0 +1,316 @@
+"""
+Replay Engine
+Re-runs stored raw records through the pipeline without calling the source.
+
+Raw Zone → Mapper → Validator → Normalizer → Loader
+"""
+
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+import logging
+import time
+
+from core.base import SyncBatch, RawRecord
+from core.enums import SyncStatus, SyncMode, EntityType, IntegrationSource
+from core.exceptions import SyncError
+
+if TYPE_CHECKING:
+    from data_lake import DataLakeManager
+    from .pipeline import SyncPipeline
+
+
+logger = logging.getLogger(__name__)
+
+
+# Fields that change on every write and say nothing about the mapped data
+DIFF_IGNORED_FIELDS = {
+    "id", "_sources", "_version", "created_at", "updated_at", "created_by", "updated_by",
+}
+
+
+class ReplayEngine:
+    """
+    Replays raw zone records through a SyncPipeline.
+    
+    Records are streamed from the raw zone in chunks and re-run through
+    map → validate → normalize → load. Supports:
+    - Replay by sync batch or by ingestion time range
+    - Dry-run (transform only, nothing written)
+    - Field-level diffs against the current canonical zone
+    - Throughput reporting
+    """
+    
+    def __init__(
+        self,
+        pipeline: "SyncPipeline",
+        data_lake: "DataLakeManager",
+        max_diffs: int = 100
+    ):
+        self.pipeline = pipeline
+        self.data_lake = data_lake
+        self.max_diffs = max_diffs
+    
+    @staticmethod
+    async def find_batch_entity_type(db, batch_id: str) -> Optional[str]:
+        """
+        Look up the entity type of a sync batch.
+        
+        Pipeline runs are recorded in sync_logs, batches created through
+        the data lake manager in sync_batches - check both.
+        """
+        log = await db["sync_logs"].find_one(
+            {"batch_id": batch_id, "event": "sync_started"},
+            {"_id": 0, "entity_type": 1}
+        )
+        if log:
+            return log.get("entity_type")
+        
+        batch_doc = await db["sync_batches"].find_one(
+            {"id": batch_id},
+            {"_id": 0, "entity_type": 1}
+        )
+        return batch_doc.get("entity_type") if batch_doc else None
+    
+    async def replay_batch(
+        self,
+        batch_id: str,
+        entity_type: Optional[str] = None,
+        dry_run: bool = False,
+        diff: bool = False,
+        chunk_size: int = 500
+    ) -> SyncBatch:
+        """Replay all raw records of one sync batch"""
+        if not entity_type:
+            entity_type = await self.find_batch_entity_type(self.data_lake.db, batch_id)
+        if not entity_type:
+            raise ValueError(f"Batch not found: {batch_id}")
+        
+        return await self._run(
+            entity_type,
+            selector={"batch_id": batch_id},
+            metadata={"replay_of": batch_id},
+            dry_run=dry_run,
+            diff=diff,
+            chunk_size=chunk_size
+        )
+    
+    async def replay_range(
+        self,
+        entity_type: str,
+        since: datetime,
+        until: Optional[datetime] = None,
+        dry_run: bool = False,
+        diff: bool = False,
+        chunk_size: int = 500
+    ) -> SyncBatch:
+        """Replay all raw records ingested within a time window"""
+        return await self._run(
+            entity_type,
+            selector={"since": since, "until": until},
+            metadata={
+                "replay_since": since.isoformat(),
+                "replay_until": until.isoformat() if until else None,
+            },
+            dry_run=dry_run,
+            diff=diff,
+            chunk_size=chunk_size
+        )
+    
+    async def _run(
+        self,
+        entity_type: str,
+        selector: Dict[str, Any],
+        metadata: Dict[str, Any],
+        dry_run: bool,
+        diff: bool,
+        chunk_size: int
+    ) -> SyncBatch:
+        """Stream, transform and (unless dry-run) load the selected raw records"""
+        source_name = self.pipeline.source_name
+        
+        try:
+            source = IntegrationSource(source_name)
+            raw_entity_type = EntityType(entity_type)
+        except ValueError:
+            raise SyncError(source_name, entity_type, "Entity type has no raw zone collection")
+        
+        batch = SyncBatch(
+            source=source_name,
+            entity_type=entity_type,
+            metadata={
+                "mode": SyncMode.REPLAY.value,
+                "dry_run": dry_run,
+                **metadata
+            }
+        )
+        
+        if not dry_run:
+            await self.pipeline._logger.log_sync_start(batch)
+        
+        diffs: List[Dict[str, Any]] = []
+        changed = 0
+        unchanged = 0
+        chunks = 0
+        started = time.monotonic()
+        
+        async for chunk in self.data_lake.raw.iter_records(
+            source,
+            raw_entity_type,
+            chunk_size=chunk_size,
+            **selector
+        ):
+            chunks += 1
+            
+            results = []
+            
+            for raw_doc in chunk:
+                source_id = raw_doc.get("_source_id")
+                batch.records_processed += 1
+                
+                try:
+                    raw_record = RawRecord(
+                        source=raw_doc["_source"],
+                        source_id=source_id,
+                        raw_data=raw_doc["_raw_data"],
+                        sync_batch_id=batch.id
+                    )
+                    
+                    result = await self.pipeline._transform_raw(raw_record, source_id, resolve=False)
+                except Exception as e:
+                    result = self.pipeline._error_result(source_id, e)
+                
+                if "entity" in result:
+                    results.append(result)
+                else:
+                    batch.records_failed += 1
+                    batch.errors.append(result.get("error", {}))
+            
+            if not results:
+                continue
+            
+            # One batched reference lookup per chunk
+            try:
+                resolved = await self.pipeline._normalizer.resolve_references_batch(
+                    [result["entity"] for result in results]
+                )
+            except Exception as e:
+                batch.records_failed += len(results)
+                batch.errors.append({"error": str(e), "type": type(e).__name__, "chunk": chunks})
+                logger.error(f"Replay failed resolving references for chunk {chunks}: {e}")
+                continue
+            
+            for result, entity in zip(results, resolved):
+                source_id = result["source_id"]
+                
+                try:
+                    if diff:
+                        entity_diff = await self._diff_entity(raw_entity_type, entity, result["status"])
+                        if entity_diff:
+                            changed += 1
+                            if len(diffs) < self.max_diffs:
+                                diffs.append({"source_id": source_id, **entity_diff})
+                        else:
+                            unchanged += 1
+                    
+                    if not dry_run:
+                        await self.pipeline._loader.load_canonical(entity)
+                        await self.pipeline._loader.load_serving(entity)
+                    
+                    if result["status"] == "created":
+                        batch.records_created += 1
+                    else:
+                        batch.records_updated += 1
+                
+                except Exception as e:
+                    batch.records_failed += 1
+                    batch.errors.append({
+                        "source_id": source_id,
+                        "error": str(e),
+                        "type": type(e).__name__
+                    })
+                    logger.error(f"Replay failed for record {source_id}: {e}")
+        
+        elapsed = time.monotonic() - started
+        
+        if batch.records_failed == 0:
+            batch.status = SyncStatus.COMPLETED.value
+        elif batch.records_created + batch.records_updated > 0:
+            batch.status = SyncStatus.PARTIAL.value
+        else:
+            batch.status = SyncStatus.FAILED.value
+        
+        batch.completed_at = datetime.now(timezone.utc)
+        batch.metadata["throughput"] = {
+            "records": batch.records_processed,
+            "chunks": chunks,
+            "elapsed_seconds": round(elapsed, 3),
+            "records_per_second": round(batch.records_processed / elapsed, 1) if elapsed > 0 else None,
+        }
+        if diff:
+            batch.metadata["diff"] = {
+                "changed": changed,
+                "unchanged": unchanged,
+                "truncated": changed > len(diffs),
+                "entries": diffs,
+            }
+        
+        if not dry_run:
+            await self.pipeline._logger.log_sync_complete(batch)
+        
+        logger.info(
+            f"Replay {'(dry run) ' if dry_run else ''}{source_name}/{entity_type}: "
+            f"{batch.records_processed} records in {elapsed:.2f}s, {batch.records_failed} failed"
+        )
+        
+        return batch
+    
+    async def _diff_entity(
+        self,
+        entity_type: EntityType,
+        entity,
+        status: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Compare a replayed entity with its current canonical version.
+        
+        Returns None when nothing would change.
+        """
+        if status == "created":
+            return {"action": "create"}
+        
+        current = await self.data_lake.canonical.get_by_id(entity_type, entity.id)
+        if not current:
+            return {"action": "create"}
+        
+        replayed = entity.to_mongo_dict()
+        changes = {}
+        
+        for field in set(replayed) | set(current):
+            if field in DIFF_IGNORED_FIELDS:
+                continue
+            old = _comparable(current.get(field))
+            new = _comparable(replayed.get(field))
+            if old != new:
+                changes[field] = {"old": old, "new": new}
+        
+        if not changes:
+            return None
+        
+        return {"action": "update", "entity_id": entity.id, "changes": changes}
+
+
+def _comparable(value: Any) -> Any:
+    """Normalize values so Mongo round-trips don't show up as changes"""
+    if isinstance(value, datetime):
+        # Mongo returns naive UTC datetimes
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=(value.microsecond // 1000) * 1000).isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {k: _comparable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_comparable(v) for v in value]
+    return value
@@ -0,0 +1,118 @@
+"""
+Unit Tests for Account Rollups
+"""
+
+import re
+
+from data_lake.account_rollup import _names_pattern, _partner_refs, compute_rollups
+
+
+def serving(entity_type, rows):
+    return [
+        {"_id": f"{entity_type}-{row['id']}", "serving_id": str(row["id"]), "data": row}
+        for row in rows
+    ]
+
+
+def build(**rows):
+    return {r["rollup_id"]: r for r in compute_rollups({k: serving(k, v) for k, v in rows.items()})}
+
+
+class TestAccountMetrics:
+    """Pipeline and won values keyed by partner name"""
+    
+    def test_metrics_by_partner_name(self):
+        rollups = build(
+            account=[{"id": 1, "name": "Acme"}],
+            opportunity=[
+                {"id": 10, "partner_name": "acme ", "expected_revenue": 100, "stage_name": "New"},
+                {"id": 11, "partner_name": "Acme", "expected_revenue": 50, "stage_name": "Won"},
+                {"id": 12, "partner_name": "ACME", "expected_revenue": 70, "stage_name": "Lost"},
+            ],
+        )
+        
+        row = rollups["1"]["row"]
+        assert row["pipeline_value"] == 100
+        assert row["won_value"] == 50
+        assert row["active_opportunities"] == 1
+        assert row["total_opportunities"] == 3
+    
+    def test_partner_without_account_gets_synthetic_rollup(self):
+        rollups = build(
+            account=[{"id": 1, "name": "Acme"}, {"id": 2, "name": False}],
+            opportunity=[{"id": 10, "partner_name": "Globex Corp", "expected_revenue": 5, "stage_name": "New"}],
+        )
+        
+        assert set(rollups) == {"1", "opp_globex_corp"}
+        synthetic = rollups["opp_globex_corp"]
+        assert synthetic["kind"] == "opportunity_derived"
+        assert synthetic["row"]["name"] == "Globex Corp"
+        assert synthetic["row"]["industry"] == "Enterprise"
+        assert synthetic["related"]["opportunity"] == ["opportunity-10"]
+
+
+class TestRelatedEntities:
+    """Related entity IDs for the Account 360 view"""
+    
+    def test_related_by_partner_id_and_name(self):
+        rollups = build(
+            account=[{"id": 1, "name": "Acme"}, {"id": 2, "name": "Acme Industries"}],
+            opportunity=[
+                {"id": 10, "partner_id": 1, "partner_name": "Acme", "expected_revenue": 5},
+                {"id": 11, "partner_name": "Acme Industries", "expected_revenue": 9},
+            ],
+            invoice=[
+                {"id": 20, "partner_id": 1, "amount_total": 100, "amount_residual": 40, "invoice_date": "2026-01-01"},
+                {"id": 21, "partner_name": "Acme, John Doe", "amount_total": 10, "invoice_date": "2026-02-01"},
+            ],
+            activity=[
+                {"id": 30, "res_model": "res.partner", "res_id": 1, "write_date": "2026-03-01"},
+                {"id": 31, "res_model": "crm.lead", "res_id": 1},
+            ],
+            contact=[{"id": 40, "account_id": 1}, {"id": 41, "account_id": 2}],
+        )
+        
+        acme = rollups["1"]
+        assert acme["related"]["opportunity"] == ["opportunity-10"]
+        # Newest invoice first
+        assert acme["related"]["invoice"] == ["invoice-21", "invoice-20"]
+        assert acme["related"]["activity"] == ["activity-30"]
+        assert acme["related"]["contact"] == ["contact-40"]
+        assert acme["invoiced_total"] == 110
+        assert acme["outstanding_total"] == 40
+        assert acme["last_activity_at"] == "2026-03-01"
+        
+        # Unanchored name matching used to relate "Acme Industries" records to Acme and vice versa
+        assert rollups["2"]["related"]["opportunity"] == ["opportunity-11"]
+        assert rollups["2"]["related"]["invoice"] == []
+    
+    def test_lookup_keys(self):
+        rollups = build(account=[{"id": 7, "name": "Initech"}])
+        
+        assert rollups["7"]["lookup_keys"] == ["7", "opp_initech"]
+
+
+class TestIncrementalScope:
+    """Partner references and name filters used by incremental rebuilds"""
+    
+    @staticmethod
+    def matches(pattern, value):
+        return re.search(pattern["$regex"], value, re.IGNORECASE) is not None
+    
+    def test_partner_refs(self):
+        assert _partner_refs("account", {"id": 1, "name": " Acme "}) == (["1"], ["acme"])
+        assert _partner_refs("opportunity", {"partner_id": [3, "Acme"], "partner_name": "Acme, John"}) == (
+            ["3"], ["acme, john", "acme"]
+        )
+        assert _partner_refs("activity", {"res_model": "crm.lead", "res_id": 3}) == ([], [])
+        assert _partner_refs("contact", {"account_id": False}) == ([], [])
+    
+    def test_names_pattern_matches_like_name_key(self):
+        pattern = _names_pattern({"acme", "a.b (uk)"})
+        
+        assert self.matches(pattern, "  ACME ")
+        assert self.matches(pattern, "A.B (UK)")
+        assert not self.matches(pattern, "Acme Industries")
+        assert not self.matches(pattern, "AxB (UK)")
+        assert not self.matches(pattern, "Acme, John")
+        assert self.matches(_names_pattern({"acme"}, company_prefix=True), "Acme, John")
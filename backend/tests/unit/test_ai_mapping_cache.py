@@ -0,0 +1,96 @@
+"""
+Unit Tests for cached AI Mapping Suggestions
+"""
+
+import asyncio
+
+from models.base import EntityType, FieldMapping, IntegrationType
+from services.ai_mapping.cache import SuggestionCache, suggestion_key
+from services.ai_mapping.mapper import AIFieldMapper
+
+PARTNER_FIELDS = {"name": {"type": "char", "string": "Name"}, "email": {"type": "char", "string": "Email"}}
+LEAD_FIELDS = {"expected_revenue": {"type": "monetary", "string": "Expected Revenue"}}
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for the suggestion cache"""
+    
+    def __init__(self):
+        self.docs = {}
+        self.finds = 0
+    
+    def find(self, query, projection=None):
+        self.finds += 1
+        docs = [d for k, d in self.docs.items() if k in query["key"]["$in"]]
+        
+        async def cursor():
+            for doc in docs:
+                yield doc
+        return cursor()
+    
+    async def update_one(self, query, update, upsert=False):
+        self.docs[query["key"]] = update["$set"]
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+class CountingMapper(AIFieldMapper):
+    """Mapper whose 'LLM' records each batched prompt"""
+    
+    def __init__(self, db):
+        super().__init__(api_key="test", model="test-model", db=db)
+        self.prompts = []
+    
+    async def _ai_map_batch(self, sources):
+        self.prompts.append(sorted(e.value for e in sources))
+        await asyncio.sleep(0.01)
+        return {
+            entity_type: [FieldMapping(source_field=f, target_field="name", confidence=0.9, is_ai_suggested=True)
+                          for f in fields]
+            for entity_type, fields in sources.items()
+        }
+
+
+def test_key_depends_on_field_set_and_schema():
+    reordered = dict(reversed(list(PARTNER_FIELDS.items())))
+    key = suggestion_key(PARTNER_FIELDS, "account", {"name": {}}, "m")
+    
+    assert key == suggestion_key(reordered, "account", {"name": {}}, "m")
+    assert key != suggestion_key(PARTNER_FIELDS, "contact", {"name": {}}, "m")
+    assert key != suggestion_key(PARTNER_FIELDS, "account", {"name": {}, "email": {}}, "m")
+
+
+def test_unseen_types_share_one_prompt_and_repeats_are_cached():
+    async def run():
+        SuggestionCache.clear()
+        db = FakeDB()
+        mapper = CountingMapper(db)
+        sources = {EntityType.ACCOUNT: PARTNER_FIELDS, EntityType.OPPORTUNITY: LEAD_FIELDS}
+        
+        first = await mapper.auto_map_many(sources, IntegrationType.ODOO)
+        again = await CountingMapper(db).auto_map_many(sources, IntegrationType.ODOO)
+        return mapper, first, again, db
+    
+    mapper, first, again, db = asyncio.run(run())
+    assert mapper.prompts == [["account", "opportunity"]]
+    assert again == first
+    assert len(db["ai_mapping_suggestions"].docs) == 2
+    assert db["ai_mapping_suggestions"].finds == 1
+
+
+def test_concurrent_requests_share_one_call():
+    async def run():
+        SuggestionCache.clear()
+        mapper = CountingMapper(FakeDB())
+        results = await asyncio.gather(*(
+            mapper.auto_map_fields(LEAD_FIELDS, EntityType.OPPORTUNITY, IntegrationType.ODOO) for _ in range(5)
+        ))
+        return mapper, results
+    
+    mapper, results = asyncio.run(run())
+    assert mapper.prompts == [["opportunity"]]
+    assert all(r == results[0] and r[0].is_ai_suggested for r in results)
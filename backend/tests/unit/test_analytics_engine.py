@@ -0,0 +1,229 @@
+"""
+Unit Tests for the Dashboard Analytics Engine
+"""
+
+import asyncio
+from datetime import date, datetime
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from core.config import settings
+from microservices.analytics_engine import (
+    MIRROR_SAFETY_MARGIN, AnalyticsEngine, ClickHouseAnalytics, MongoAnalytics, fact_row, period_start
+)
+from microservices.clickhouse_client import ClickHouseClient
+from microservices.data_lake_service import DataLakeService
+from models.rbac import UserWithRole
+from routes.microservices import require_company_analytics
+
+
+def opportunity(id_, stage_name, revenue, probability, salesperson):
+    return {
+        "entity_type": "opportunity",
+        "serving_id": str(id_),
+        "data": {
+            "id": id_, "name": f"Deal {id_}", "stage_name": stage_name, "expected_revenue": revenue,
+            "probability": probability, "salesperson_id": salesperson[0], "salesperson_name": salesperson[1],
+        },
+        "updated_at": datetime(2024, 5, 1, 12, 0, 0),
+    }
+
+
+def invoice(id_, invoice_date, total, due, move_type="out_invoice", state="posted"):
+    return {
+        "entity_type": "invoice",
+        "serving_id": str(id_),
+        "data": {
+            "id": id_, "name": f"INV/{id_}", "invoice_date": invoice_date, "amount_total": total,
+            "amount_due": due, "move_type": move_type, "state": state,
+        },
+    }
+
+
+def activity(id_, user, state, due):
+    return {
+        "entity_type": "activity",
+        "serving_id": str(id_),
+        "data": {"id": id_, "user_id": user[0], "user_name": user[1], "state": state, "due_date": due},
+    }
+
+
+JANE, BOB = (5, "Jane"), (6, "Bob")
+
+DOCS = [
+    opportunity(1, "Proposition", 1000, 50, JANE),
+    opportunity(2, "Proposition", 500, 20, BOB),
+    opportunity(3, "Won", 2000, 100, JANE),
+    {**opportunity(4, "Qualified", 9999, 10, JANE), "is_active": False},
+    invoice(10, "2024-01-15", 100, 0),
+    invoice(11, "2024-03-31", 300, 100),
+    invoice(12, "2024-04-02", 50, 50),
+    invoice(13, "2024-02-01", 40, 0, move_type="out_refund"),
+    invoice(14, "2024-02-01", 700, 700, state="draft"),
+    activity(20, JANE, "overdue", "2024-05-01"),
+    activity(21, JANE, "planned", "2024-06-01"),
+    activity(22, BOB, "done", "2024-05-03"),
+]
+
+
+class FakeServing:
+    """data_lake_serving find() by entity type and is_active only"""
+    
+    def __init__(self, docs):
+        self.docs = docs
+    
+    def find(self, query, projection=None):
+        docs = [
+            d for d in self.docs
+            if d["entity_type"] == query["entity_type"]
+            and ("is_active" not in query or d.get("is_active") is not False)
+        ]
+        
+        async def cursor():
+            for doc in docs:
+                yield doc
+        return cursor()
+    
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+
+class FakeDB:
+    def __init__(self, docs):
+        self.data_lake_serving = FakeServing(docs)
+
+
+def test_fact_rows_are_typed():
+    row = fact_row("opportunity", DOCS[0])
+    assert row["stage"] == "proposal" and row["value"] == 1000.0 and row["salesperson_id"] == 5
+    assert "sp:5" in row["access_keys"]
+    assert row["updated_at"] == "2024-05-01 12:00:00.000"
+    assert fact_row("opportunity", DOCS[3])["is_active"] == 0
+    assert fact_row("invoice", invoice(1, False, 10, 0))["invoice_date"] is None
+
+
+def test_period_start():
+    assert period_start(date(2024, 5, 16), "week") == date(2024, 5, 13)
+    assert period_start(date(2024, 5, 16), "quarter") == date(2024, 4, 1)
+    assert period_start(date(2024, 12, 31), "year") == date(2024, 1, 1)
+
+
+def test_mongo_pipeline_by_stage_respects_access():
+    engine = MongoAnalytics(FakeDB(DOCS))
+    everyone = asyncio.run(engine.pipeline_by_stage())
+    assert everyone == [
+        {"stage": "closed_won", "count": 1, "value": 2000.0, "weighted_value": 2000.0},
+        {"stage": "proposal", "count": 2, "value": 1500.0, "weighted_value": 600.0},
+    ]
+    bob = asyncio.run(engine.pipeline_by_stage(access_keys=["*", "sp:6"]))
+    assert bob == [{"stage": "proposal", "count": 1, "value": 500.0, "weighted_value": 100.0}]
+
+
+def test_mongo_revenue_by_period_nets_refunds():
+    engine = MongoAnalytics(FakeDB(DOCS))
+    rows = asyncio.run(engine.revenue_by_period("quarter"))
+    assert rows == [
+        {"period": "2024-01-01", "invoices": 3, "revenue": 360.0, "collected": 260.0},
+        {"period": "2024-04-01", "invoices": 1, "revenue": 50.0, "collected": 0.0},
+    ]
+    rows = asyncio.run(engine.revenue_by_period("month", start=date(2024, 3, 1), end=date(2024, 3, 31)))
+    assert rows == [{"period": "2024-03-01", "invoices": 1, "revenue": 300.0, "collected": 200.0}]
+
+
+def test_mongo_activity_by_rep():
+    rows = asyncio.run(MongoAnalytics(FakeDB(DOCS)).activity_by_rep(end=date(2024, 5, 31)))
+    assert rows == [
+        {"user_id": 5, "user_name": "Jane", "activities": 1, "open": 1, "overdue": 1},
+        {"user_id": 6, "user_name": "Bob", "activities": 1, "open": 0, "overdue": 0},
+    ]
+
+
+def test_clickhouse_binds_access_keys_as_parameters():
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"data": [
+            {"stage": "proposal", "count": "2", "value": 1500, "weighted_value": 600}
+        ]})
+    
+    async def run():
+        client = ClickHouseClient("http://clickhouse", "db", transport=httpx.MockTransport(handler))
+        rows = await ClickHouseAnalytics(client).pipeline_by_stage(access_keys=["sp:5", "name:o'brien"])
+        await client.close()
+        return rows
+    
+    rows = asyncio.run(run())
+    assert rows == [{"stage": "proposal", "count": 2, "value": 1500.0, "weighted_value": 600.0}]
+    params = requests[0].url.params
+    assert "hasAny(access_keys, {keys:Array(String)})" in params["query"]
+    assert "o'brien" not in params["query"]
+    assert params["param_keys"] == "['sp:5','name:o\\'brien']"
+
+
+def test_engine_falls_back_to_mongo_when_clickhouse_fails(monkeypatch):
+    transport = httpx.MockTransport(lambda request: httpx.Response(500, text="Code: 60"))
+    monkeypatch.setattr(settings, "ANALYTICS_BACKEND", "clickhouse")
+    
+    async def run():
+        client = ClickHouseClient("http://clickhouse", "db", transport=transport)
+        monkeypatch.setattr(DataLakeService, "_instance", DataLakeService(client))
+        result = await AnalyticsEngine(FakeDB(DOCS)).query("activity_by_rep")
+        await client.close()
+        return result
+    
+    result = asyncio.run(run())
+    assert result["backend"] == "mongo"
+    assert [r["user_id"] for r in result["rows"]] == [5, 6]
+
+
+def test_auto_backend_uses_mongo_for_small_tenants(monkeypatch):
+    monkeypatch.setattr(settings, "ANALYTICS_BACKEND", "auto")
+    monkeypatch.setattr(DataLakeService, "_instance", object())
+    assert asyncio.run(AnalyticsEngine(FakeDB(DOCS)).clickhouse()) is None
+
+
+def test_mirror_resends_a_safety_margin_below_the_watermark():
+    queries = []
+    
+    class Serving:
+        def find(self, query, projection=None):
+            queries.append(query)
+            return self
+        
+        def batch_size(self, size):
+            return self
+        
+        def __aiter__(self):
+            return self
+        
+        async def __anext__(self):
+            raise StopAsyncIteration
+    
+    class DB:
+        data_lake_serving = Serving()
+    
+    def handler(request):
+        return httpx.Response(200, json={"data": [{"n": "3", "watermark": "2024-05-01 12:00:00.000"}]})
+    
+    async def run():
+        client = ClickHouseClient("http://clickhouse", "db", transport=httpx.MockTransport(handler))
+        await ClickHouseAnalytics(client).mirror(DB())
+        await client.close()
+    
+    asyncio.run(run())
+    since = datetime(2024, 5, 1, 12, 0, 0) - MIRROR_SAFETY_MARGIN
+    assert queries[0]["$or"] == [{"updated_at": {"$gte": since}}, {"deleted_at": {"$gte": since}}]
+
+
+def test_company_analytics_require_full_data_scope():
+    def token(**fields):
+        return {"id": "u1", "user": UserWithRole(id="u1", email="u1@acme.com", name="U1", **fields)}
+    
+    assert asyncio.run(require_company_analytics(token(data_scope="all")))["id"] == "u1"
+    assert asyncio.run(require_company_analytics(token(is_super_admin=True)))["id"] == "u1"
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(require_company_analytics(token(data_scope="own")))
+    assert exc.value.status_code == 403
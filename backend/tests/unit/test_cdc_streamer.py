@@ -0,0 +1,140 @@
+"""
+Unit Tests for the Mongo -> ClickHouse CDC Streamer
+"""
+
+import asyncio
+import gzip
+import json
+from datetime import datetime
+
+import httpx
+from bson.timestamp import Timestamp
+
+from microservices.cdc_streamer import CHANGES_TABLE, CDCStreamer, change_rows
+from microservices.clickhouse_client import ClickHouseClient
+
+
+def change(n, operation="insert", doc=None):
+    event = {
+        "_id": {"_data": f"{n:04d}"},
+        "operationType": operation,
+        "clusterTime": Timestamp(1700000000 + n, 1),
+        "documentKey": {"_id": f"doc{n}"},
+    }
+    if operation != "delete":
+        event["fullDocument"] = doc or {"_id": f"doc{n}", "entity_type": "account", "n": n}
+    return event
+
+
+class FakeStream:
+    """Change stream over a shared list, resuming after a token"""
+    
+    def __init__(self, changes, resume_after):
+        self.changes = changes
+        self.position = 0
+        if resume_after:
+            self.position = next(i for i, c in enumerate(changes) if c["_id"] == resume_after) + 1
+        self.alive = True
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *args):
+        self.alive = False
+    
+    async def try_next(self):
+        if self.position < len(self.changes):
+            self.position += 1
+            return self.changes[self.position - 1]
+        await asyncio.sleep(0.01)
+        return None
+
+
+class FakeSource:
+    def __init__(self, changes):
+        self.changes = changes
+        self.resumed_from = []
+    
+    def watch(self, resume_after=None, **kwargs):
+        self.resumed_from.append(resume_after)
+        return FakeStream(self.changes, resume_after)
+
+
+class FakeCheckpoints:
+    def __init__(self):
+        self.docs = {}
+    
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+    
+    async def update_one(self, query, update, upsert=False):
+        self.docs[query["_id"]] = update["$set"]
+    
+    async def delete_one(self, query):
+        self.docs.pop(query["_id"], None)
+
+
+class FakeDB(dict):
+    def __init__(self, sources):
+        super().__init__(sources)
+        self["cdc_checkpoints"] = FakeCheckpoints()
+
+
+def test_change_rows_route_serving_facts_and_deletes():
+    opp = {"_id": "x", "entity_type": "opportunity", "serving_id": "7", "data": {"id": 7, "stage_name": "Won"},
+           "updated_at": datetime(2024, 1, 1)}
+    rows = change_rows("data_lake_serving", [
+        change(1, "update", opp),
+        change(2, "delete"),
+        {**change(3, "update"), "fullDocument": None},
+    ])
+    
+    assert [(r["doc_id"], r["operation"], r["is_deleted"]) for r in rows[CHANGES_TABLE]] == [
+        ("doc1", "update", 0), ("doc2", "delete", 1)
+    ]
+    assert rows[CHANGES_TABLE][0]["version"] == ((1700000001 << 32) | 1)
+    assert json.loads(rows[CHANGES_TABLE][0]["payload"])["serving_id"] == "7"
+    assert rows["opportunity_facts"][0]["stage"] == "closed_won"
+
+
+def test_streams_in_batches_and_replays_unsaved_batch_after_failure():
+    inserts = []
+    attempts = {"n": 0}
+    
+    def handler(request):
+        attempts["n"] += 1
+        if attempts["n"] == 2:
+            return httpx.Response(500, text="Code: 241. Memory limit exceeded")
+        rows = [json.loads(line) for line in gzip.decompress(request.content).decode().splitlines()]
+        inserts.append(rows)
+        return httpx.Response(200)
+    
+    source = FakeSource([change(n) for n in range(1, 8)])
+    db = FakeDB({"events": source})
+    
+    async def run():
+        client = ClickHouseClient("http://clickhouse", "db", transport=httpx.MockTransport(handler))
+        streamer = CDCStreamer(batch_size=3, flush_interval=0.05)
+        streamer.RETRY_DELAY = 0.01
+        await streamer.start(db, client, sources=["events"])
+        for _ in range(200):
+            checkpoint = db["cdc_checkpoints"].docs.get("events")
+            if checkpoint and checkpoint["resume_token"] == {"_data": "0007"}:
+                break
+            await asyncio.sleep(0.01)
+        stats = streamer.get_stats()
+        await streamer.stop()
+        await client.close()
+        return stats
+    
+    stats = asyncio.run(run())
+    
+    # Batch 2 failed before its checkpoint and was re-read from batch 1's token
+    assert source.resumed_from == [None, {"_data": "0003"}]
+    versions = [row["version"] for rows in inserts for row in rows]
+    assert len(versions) == 7 and len(set(versions)) == 7
+    
+    events = stats["sources"]["events"]
+    assert events["changes"] == 7 and events["restarts"] == 1
+    assert events["lag_seconds"] is not None
+    assert db["cdc_checkpoints"].docs["events"]["version"] == ((1700000007 << 32) | 1)
@@ -0,0 +1,146 @@
+"""
+Unit Tests for the async ClickHouse Client (against a local stub server)
+"""
+
+import asyncio
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+
+from microservices.clickhouse_client import ClickHouseClient, InsertBuffer
+from microservices.data_lake_service import DataLakeService
+from microservices.migrations import MIGRATIONS, MIGRATIONS_TABLE, apply_migrations
+
+
+class StubClickHouse(BaseHTTPRequestHandler):
+    """Records inserts (gunzipped JSONEachRow), answers SELECTs with FORMAT JSON"""
+    
+    protocol_version = "HTTP/1.1"
+    inserts = []
+    connections = set()
+    delay = 0.0
+    
+    def do_POST(self):
+        query = parse_qs(urlparse(self.path).query)["query"][0]
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.connections.add(self.client_address)
+        time.sleep(self.delay)
+        
+        if query.startswith("INSERT"):
+            assert self.headers["Content-Encoding"] == "gzip"
+            rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+            self.inserts.append((query.split()[2], rows))
+            payload = b""
+        else:
+            payload = json.dumps({"data": [{"x": 1}]}).encode()
+        
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubClickHouse.inserts = []
+    StubClickHouse.connections = set()
+    StubClickHouse.delay = 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubClickHouse)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_buffer_batches_rows_and_acknowledges(stub_server):
+    async def run():
+        client = ClickHouseClient(stub_server, "db")
+        client.buffer = InsertBuffer(client, flush_rows=100, flush_interval=0.05)
+        acks = await client.buffer.insert_many("raw_events", ({"n": i} for i in range(250)))
+        await asyncio.gather(*acks)
+        rows = await client.query_json("SELECT 1")
+        stats = client.buffer.get_stats()
+        await client.close()
+        return rows, stats
+    
+    rows, stats = asyncio.run(run())
+    assert [len(batch) for _, batch in StubClickHouse.inserts] == [100, 100, 50]
+    assert [r["n"] for _, batch in StubClickHouse.inserts for r in batch] == list(range(250))
+    assert rows == [{"x": 1}]
+    assert stats["rows_written"] == 250 and stats["flushes"] == 3 and stats["buffered"] == 0
+    # Keep-alive pool: all requests over one connection
+    assert len(StubClickHouse.connections) == 1
+
+
+def test_backpressure_and_flush_on_close(stub_server):
+    async def run():
+        StubClickHouse.delay = 0.02
+        client = ClickHouseClient(stub_server, "db")
+        client.buffer = InsertBuffer(client, flush_rows=10, flush_interval=5, max_buffered=20)
+        for i in range(65):
+            await client.buffer.insert("serving_views", {"n": i})
+        stats = client.buffer.get_stats()
+        await client.close()
+        return stats
+    
+    stats = asyncio.run(run())
+    assert stats["backpressure_waits"] > 0
+    assert sum(len(batch) for _, batch in StubClickHouse.inserts) == 65
+
+
+def test_failed_insert_fails_its_acks():
+    async def run():
+        transport = httpx.MockTransport(lambda request: httpx.Response(500, text="Code: 60. Unknown table"))
+        client = ClickHouseClient("http://clickhouse", "db", transport=transport)
+        client.buffer = InsertBuffer(client, flush_rows=2, flush_interval=5)
+        acks = await client.buffer.insert_many("missing", [{"n": 1}, {"n": 2}])
+        results = await asyncio.gather(*acks, return_exceptions=True)
+        stats = client.buffer.get_stats()
+        await client.close()
+        return results, stats
+    
+    results, stats = asyncio.run(run())
+    assert all(isinstance(r, httpx.HTTPStatusError) for r in results)
+    assert stats["rows_failed"] == 2 and stats["buffered"] == 0
+    assert stats["last_error"].startswith("HTTPStatusError")
+
+
+def test_migrations_run_once_and_ingest_sends_no_ddl():
+    queries = []
+    recorded = []
+    
+    def handler(request):
+        query = request.url.params["query"]
+        queries.append(query.split()[0])
+        if query.startswith(f"INSERT INTO {MIGRATIONS_TABLE}"):
+            recorded.extend(json.loads(line)["version"] for line in gzip.decompress(request.content).decode().splitlines())
+        if "FORMAT JSON" in query and "JSONEachRow" not in query:
+            return httpx.Response(200, json={"data": [{"version": v} for v in recorded]})
+        return httpx.Response(200)
+    
+    async def run():
+        client = ClickHouseClient("http://clickhouse", "db", transport=httpx.MockTransport(handler))
+        first = await apply_migrations(client)
+        again = await apply_migrations(client)
+        
+        queries.clear()
+        service = DataLakeService(client)
+        ack = await service.ingest_raw("odoo", "account", "1", {"name": "Acme"})
+        await client.buffer.flush()
+        await ack
+        await client.close()
+        return first, again
+    
+    first, again = asyncio.run(run())
+    assert first == [version for version, _, _ in MIGRATIONS]
+    assert again == []
+    assert queries == ["INSERT"]
@@ -46,6 +46,17 @@ class TestBaseEntity:
         
         assert "_id" not in doc
         assert "id" in doc
+    
+    def test_to_mongo_dict_source_keys(self):
+        """Test flattened source keys are maintained on write"""
+        entity = BaseEntity()
+        assert "_source_keys" not in entity.to_mongo_dict()
+        
+        entity.add_source("odoo", "123", "crm.lead")
+        entity.sources.append(SourceReference(source="salesforce", source_id="006xx"))
+        doc = entity.to_mongo_dict()
+        
+        assert doc["_source_keys"] == ["odoo:123", "salesforce:006xx"]
 
 
 class TestRawRecord:
@@ -0,0 +1,123 @@
+"""
+Unit Tests for Mongo command attribution and query budgets
+"""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from core import db_monitor
+from core.db_monitor import DBCommandListener, QueryBudget, RequestDBStats, current_request_db_stats
+
+
+def started(command_name, command, request_id, connection_id=("localhost", 27017)):
+    return SimpleNamespace(
+        command_name=command_name,
+        command={command_name: command.pop("_target", None), **command},
+        request_id=request_id,
+        connection_id=connection_id,
+    )
+
+
+def finished(command_name, request_id, duration_ms, connection_id=("localhost", 27017)):
+    return SimpleNamespace(
+        command_name=command_name,
+        request_id=request_id,
+        connection_id=connection_id,
+        duration_micros=int(duration_ms * 1000),
+    )
+
+
+class TestDBCommandListener:
+    """Tests for per-request and process-wide attribution"""
+    
+    def test_commands_are_attributed_to_the_issuing_request(self):
+        listener = DBCommandListener()
+        
+        async def request(name, request_id):
+            stats = RequestDBStats()
+            current_request_db_stats.set(stats)
+            listener.started(started("find", {"_target": name}, request_id))
+            await asyncio.sleep(0)
+            # Completion may be reported from another context (driver thread)
+            return stats
+        
+        async def run():
+            first, second = await asyncio.gather(request("accounts", 1), request("invoices", 2))
+            listener.succeeded(finished("find", 2, 4.0))
+            listener.succeeded(finished("find", 1, 2.0))
+            return first, second
+        
+        first, second = asyncio.run(run())
+        
+        assert (first.calls, first.time_ms) == (1, 2.0)
+        assert (second.calls, second.time_ms) == (1, 4.0)
+        assert first.top_operations() == [{"collection": "accounts", "operation": "find", "calls": 1, "time_ms": 2.0}]
+    
+    def test_totals_cover_requests_and_background_work(self):
+        listener = DBCommandListener()
+        
+        listener.started(started("aggregate", {"_target": "opportunities"}, 1))
+        listener.failed(finished("aggregate", 1, 10.0))
+        listener.started(started("getMore", {"_target": 123, "collection": "opportunities"}, 2))
+        listener.succeeded(finished("getMore", 2, 1.0))
+        listener.started(started("listCollections", {"_target": 1}, 3))
+        listener.succeeded(finished("listCollections", 3, 0.5))
+        
+        totals = {(t["collection"], t["operation"]): t["calls"] for t in listener.get_totals()}
+        assert totals == {
+            ("opportunities", "aggregate"): 1,
+            ("opportunities", "getMore"): 1,
+            ("<db>", "listCollections"): 1,
+        }
+        assert 'mongodb_commands_total{collection="opportunities",operation="aggregate"} 1' in listener.render_prometheus()
+    
+    def test_driver_housekeeping_is_ignored(self):
+        listener = DBCommandListener()
+        stats = RequestDBStats()
+        token = current_request_db_stats.set(stats)
+        try:
+            listener.started(started("hello", {"_target": 1}, 1))
+            listener.succeeded(finished("hello", 1, 1.0))
+        finally:
+            current_request_db_stats.reset(token)
+        
+        assert stats.calls == 0 and listener.get_totals() == []
+
+
+class TestQueryBudget:
+    """Tests for budget limits and rate-limited warnings"""
+    
+    @staticmethod
+    def stats_with(calls):
+        stats = RequestDBStats()
+        for _ in range(calls):
+            stats.record("accounts", "find", 1.0)
+        return stats
+    
+    def test_route_budgets_override_the_default(self):
+        budget = QueryBudget(5, {"/api/dashboard": 20})
+        
+        assert budget.check("GET", "/api/accounts", self.stats_with(5))
+        assert not budget.check("GET", "/api/accounts", self.stats_with(6))
+        assert budget.check("GET", "/api/dashboard", self.stats_with(20))
+    
+    def test_zero_budget_disables_the_check(self):
+        assert QueryBudget(0).check("GET", "/api/accounts", self.stats_with(1000))
+    
+    def test_warnings_are_rate_limited_per_route(self, caplog, monkeypatch):
+        budget = QueryBudget(1)
+        now = [1000.0]
+        monkeypatch.setattr(db_monitor.time, "monotonic", lambda: now[0])
+        
+        with caplog.at_level(logging.WARNING, logger="core.db_monitor"):
+            budget.check("GET", "/api/accounts", self.stats_with(3))
+            budget.check("GET", "/api/accounts", self.stats_with(3))
+            budget.check("GET", "/api/invoices", self.stats_with(3))
+            now[0] += db_monitor.BUDGET_WARNING_INTERVAL
+            budget.check("GET", "/api/accounts", self.stats_with(3))
+        
+        messages = [r.getMessage() for r in caplog.records]
+        assert len(messages) == 3
+        assert "GET /api/accounts issued 3 Mongo commands (budget 1" in messages[0]
+        assert "'collection': 'accounts'" in messages[0]
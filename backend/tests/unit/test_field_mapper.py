@@ -0,0 +1,84 @@
+"""
+Unit Tests for the Precomputed Mapped Form
+"""
+
+from services.field_mapper import (
+    MAPPER_VERSION,
+    mapped_record,
+    normalize_stage,
+    serving_mapped_fields,
+)
+
+
+class TestStageNormalization:
+    """Odoo stage names to pipeline stages"""
+    
+    def test_keywords(self):
+        assert normalize_stage("Won") == "closed_won"
+        assert normalize_stage("Closed Lost") == "closed_lost"
+        assert normalize_stage("Negotiation") == "negotiation"
+        assert normalize_stage("Proposition") == "proposal"
+        assert normalize_stage("Qualified") == "qualification"
+        assert normalize_stage("New") == "lead"
+        assert normalize_stage(False) == "lead"
+
+
+class TestMappedFields:
+    """Mapped form stored next to the serving data"""
+    
+    def test_opportunity(self):
+        data = {
+            "id": 10,
+            "name": "Acme renewal",
+            "partner_id": [1, "Acme"],
+            "stage_id": [3, "Proposition"],
+            "expected_revenue": "1500",
+            "salesperson_name": "Jane",
+            "date_deadline": False,
+        }
+        
+        fields = serving_mapped_fields("opportunity", data)
+        mapped = fields["mapped"]
+        
+        assert fields["mapped_version"] == MAPPER_VERSION
+        assert mapped["account_id"] == 1
+        assert mapped["account_name"] == "Acme"
+        assert mapped["stage_name"] == "Proposition"
+        assert mapped["stage"] == "proposal"
+        assert mapped["value"] == 1500.0
+        assert mapped["salesperson_name"] == "Jane"
+        assert mapped["close_date"] == ""
+    
+    def test_invoice(self):
+        mapped = serving_mapped_fields("invoice", {
+            "id": 20,
+            "name": "INV/001",
+            "partner_id": [1, "Acme"],
+            "invoice_user_id": [5, "Jane"],
+            "amount_total": 100,
+            "amount_residual": 40,
+            "payment_state": "not_paid",
+        })["mapped"]
+        
+        assert mapped["invoice_number"] == "INV/001"
+        assert mapped["customer_name"] == "Acme"
+        assert mapped["account_id"] == 1
+        assert mapped["salesperson"] == "Jane"
+        assert mapped["amount_due"] == 40.0
+        assert mapped["payment_status"] == "not_paid"
+    
+    def test_unmapped_entity_types(self):
+        assert serving_mapped_fields("activity", {"id": 1}) == {}
+
+
+class TestMappedRecord:
+    """Stored mapped forms are used only when current"""
+    
+    def test_current_version_is_used(self):
+        doc = {"data": {"id": 1, "name": "Raw"}, "mapped": {"name": "Stored"}, "mapped_version": MAPPER_VERSION}
+        assert mapped_record("opportunity", doc)["name"] == "Stored"
+    
+    def test_stale_version_is_remapped(self):
+        doc = {"data": {"id": 1, "name": "Raw"}, "mapped": {"name": "Stored"}, "mapped_version": MAPPER_VERSION - 1}
+        assert mapped_record("opportunity", doc)["name"] == "Raw"
+        assert mapped_record("opportunity", {"data": {"id": 1, "stage_name": "Won"}})["stage"] == "closed_won"
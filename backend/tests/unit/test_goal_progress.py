@@ -0,0 +1,147 @@
+"""
+Unit Tests for the Goal Progress Engine
+"""
+
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from core.database import Database
+from routes import goals as goal_routes
+from services.reporting.actuals import SalespersonActuals
+from services.reporting.goal_progress import AUTO_SOURCE, MANUAL_SOURCE, auto_progress_value, goal_counters
+
+
+ACTUALS = SalespersonActuals([
+    {"_id": {"id": 5, "name": "jane"}, "won_revenue": 400, "pipeline_value": 100},
+    {"_id": {"id": 6, "name": "bob"}, "won_revenue": 0, "pipeline_value": 1000},
+])
+
+USERS = {
+    "u1": {"id": "u1", "odoo_user_id": 5},
+    "u2": {"id": "u2", "odoo_user_id": 6},
+    "u3": {"id": "u3"},
+}
+
+
+def revenue_goal(**fields):
+    return {"goal_type": "revenue", "assignee_type": "user", "current_value": 0, **fields}
+
+
+class TestAutoProgress:
+    """Revenue goal values taken from the snapshot"""
+    
+    def test_assignee_actuals(self):
+        assert auto_progress_value(revenue_goal(assignee_id="u1"), ACTUALS, USERS) == 400
+        # Nothing won yet - 30% of the open pipeline
+        assert auto_progress_value(revenue_goal(assignee_id="u2"), ACTUALS, USERS) == 300
+    
+    def test_org_totals_for_unmapped_assignees(self):
+        assert auto_progress_value(revenue_goal(assignee_id="u3"), ACTUALS, USERS) == 400
+        assert auto_progress_value(revenue_goal(assignee_type="role", assignee_id="ae"), ACTUALS, USERS) == 400
+    
+    def test_manual_progress_is_kept(self):
+        assert auto_progress_value(revenue_goal(assignee_id="u1", current_value=50), ACTUALS, USERS) is None
+        assert auto_progress_value(
+            revenue_goal(assignee_id="u1", current_value=50, progress_source=MANUAL_SOURCE), ACTUALS, USERS
+        ) is None
+        assert auto_progress_value(
+            revenue_goal(assignee_id="u1", current_value=50, progress_source=AUTO_SOURCE), ACTUALS, USERS
+        ) == 400
+    
+    def test_other_goal_types(self):
+        assert auto_progress_value({"goal_type": "leads", "current_value": 0}, ACTUALS, USERS) is None
+
+
+class TestCounters:
+    """Summary counters"""
+    
+    def test_counters(self):
+        goals = [
+            {"target_value": 100, "current_value": 120},
+            {"target_value": 100, "current_value": 75},
+            {"target_value": 100, "current_value": 10},
+            {"target_value": 0, "current_value": 10},
+        ]
+        
+        assert goal_counters(goals) == {
+            "total_goals": 4,
+            "overall_progress": 51.2,
+            "achieved": 1,
+            "on_track": 1,
+            "at_risk": 0,
+            "behind": 2,
+        }
+        assert goal_counters([])["total_goals"] == 0
+
+
+class FakeGoals:
+    def __init__(self, docs):
+        self.docs = docs
+    
+    async def find_one(self, query):
+        return next((d for d in self.docs if d["id"] == query["id"]), None)
+    
+    async def update_one(self, query, update):
+        (await self.find_one(query)).update(update["$set"])
+    
+    def find(self, query, projection=None):
+        docs = list(self.docs)
+        
+        class Cursor:
+            async def to_list(self, length):
+                return docs
+        return Cursor()
+
+
+class FakeProgress:
+    async def replace_one(self, query, doc, upsert=False):
+        pass
+
+
+class FakeDB:
+    def __init__(self, goals):
+        self.goals = FakeGoals(goals)
+    
+    def __getitem__(self, name):
+        return FakeProgress()
+
+
+def put_goal(db, monkeypatch, payload):
+    monkeypatch.setattr(Database, "get_db", classmethod(lambda cls: db))
+    app = FastAPI()
+    app.include_router(goal_routes.router, prefix="/api")
+    app.dependency_overrides[goal_routes.require_approved_user] = lambda: {"id": "u1"}
+    
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.put("/api/goals/g1", json=payload)
+    return asyncio.run(run())
+
+
+class TestUpdateGoalRoute:
+    """Manual progress is only recorded when the value was edited"""
+    
+    @staticmethod
+    def auto_goal():
+        return revenue_goal(id="g1", name="Q3", assignee_id="u1", current_value=400.0, progress_source=AUTO_SOURCE)
+    
+    def test_resent_current_value_keeps_auto_tracking(self, monkeypatch):
+        db = FakeDB([self.auto_goal()])
+        
+        response = put_goal(db, monkeypatch, {"name": "Q3 revenue", "current_value": 400.0, "target_value": 1000})
+        
+        assert response.status_code == 200
+        goal = db.goals.docs[0]
+        assert goal["name"] == "Q3 revenue" and goal["progress_source"] == AUTO_SOURCE
+    
+    def test_edited_current_value_switches_to_manual(self, monkeypatch):
+        db = FakeDB([self.auto_goal()])
+        
+        response = put_goal(db, monkeypatch, {"name": "Q3", "current_value": 450.0})
+        
+        assert response.status_code == 200
+        goal = db.goals.docs[0]
+        assert goal["current_value"] == 450.0 and goal["progress_source"] == MANUAL_SOURCE
@@ -0,0 +1,136 @@
+"""
+Unit Tests for the buffered log shipper
+"""
+
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from middleware.error_handler import error_handler_middleware
+from services.logging.log_shipper import LogShipper
+
+
+class FakeCollection:
+    def __init__(self, delay=0.0, fail=False):
+        self.docs = []
+        self.batches = 0
+        self.delay = delay
+        self.fail = fail
+    
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("mongo down")
+        self.batches += 1
+        self.docs.extend(docs)
+    
+    async def create_index(self, *args, **kwargs):
+        return None
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+    
+    def __getattr__(self, name):
+        return self[name]
+
+
+def test_flushes_when_flush_size_is_reached():
+    db = FakeDB()
+    shipper = LogShipper(flush_size=5, flush_interval=30.0, db=db)
+    
+    async def run():
+        await shipper.start()
+        for i in range(5):
+            shipper.enqueue("api_call_logs", {"n": i})
+        await asyncio.sleep(0.05)
+        written = list(db.api_call_logs.docs)
+        await shipper.stop()
+        return written
+    
+    assert [d["n"] for d in asyncio.run(run())] == [0, 1, 2, 3, 4]
+    assert db.api_call_logs.batches == 1
+
+
+def test_flushes_on_interval_below_flush_size():
+    db = FakeDB()
+    shipper = LogShipper(flush_size=100, flush_interval=0.05, db=db)
+    
+    async def run():
+        await shipper.start()
+        shipper.enqueue("api_call_logs", {"n": 1})
+        shipper.enqueue("system_errors", {"n": 2})
+        await asyncio.sleep(0.01)
+        before = len(db.api_call_logs.docs)
+        await asyncio.sleep(0.15)
+        after = (len(db.api_call_logs.docs), len(db.system_errors.docs))
+        await shipper.stop()
+        return before, after
+    
+    assert asyncio.run(run()) == (0, (1, 1))
+
+
+def test_drops_oldest_when_buffer_is_full():
+    db = FakeDB()
+    shipper = LogShipper(max_buffer=3, flush_size=10, db=db)
+    
+    for i in range(5):
+        shipper.enqueue("api_call_logs", {"n": i})
+    asyncio.run(shipper.flush())
+    
+    assert [d["n"] for d in db.api_call_logs.docs] == [2, 3, 4]
+    stats = shipper.get_stats()
+    assert stats["enqueued"] == 5 and stats["dropped"] == 2 and stats["written"] == 3
+
+
+def test_stop_writes_everything_including_in_flight_batch():
+    db = FakeDB()
+    db["api_call_logs"] = FakeCollection(delay=0.05)
+    shipper = LogShipper(flush_size=10, flush_interval=30.0, db=db)
+    
+    async def run():
+        await shipper.start()
+        for i in range(25):
+            shipper.enqueue("api_call_logs", {"n": i})
+        await asyncio.sleep(0.01)  # first batch is being written
+        await shipper.stop()
+    
+    asyncio.run(run())
+    
+    assert sorted(d["n"] for d in db.api_call_logs.docs) == list(range(25))
+    assert not shipper.is_running and shipper.get_stats()["buffered"] == 0
+
+
+def test_failed_writes_are_counted_not_raised():
+    db = FakeDB()
+    db["api_call_logs"] = FakeCollection(fail=True)
+    shipper = LogShipper(db=db)
+    
+    shipper.enqueue("api_call_logs", {"n": 1})
+    written = asyncio.run(shipper.flush())
+    
+    stats = shipper.get_stats()
+    assert written == 0 and stats["failed"] == 1 and "mongo down" in stats["last_error"]
+
+
+def test_unhandled_errors_do_not_leak_exception_text():
+    app = FastAPI()
+    app.middleware("http")(error_handler_middleware)
+    
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("secret connection string")
+    
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/boom")
+    
+    response = asyncio.run(run())
+    
+    assert response.status_code == 500
+    assert "secret" not in response.text
+    assert response.json()["detail"] == "Internal server error"
@@ -0,0 +1,41 @@
+"""
+Unit Tests for the Mapping Compiler
+"""
+
+from services.mapping_compiler import CompiledMapping, compile_mapping_doc, interpret_mappings
+
+MAPPINGS = [
+    {"source_field": "name", "target_field": "name"},
+    {"source_field": "user_id", "target_field": "owner_id", "transform": "extract_id"},
+    {"source_field": "user_id", "target_field": "owner_name", "transform": "extract_name"},
+    {"source_field": "expected_revenue", "target_field": "value", "transform": "to_float"},
+    {"source_field": "priority", "target_field": "priority", "transform": "to_int"},
+    {"source_field": "active", "target_field": "active", "transform": "boolean"},
+    {"source_field": "ref", "target_field": "ref", "transform": "to_string"},
+    {"source_field": "tag", "target_field": "tag", "transform": "unknown"},
+    {"source_field": "name", "target_field": "title'\n"},
+    {"source_field": "", "target_field": "skipped"},
+]
+
+RECORDS = [
+    {"name": "Deal", "user_id": [5, "Ann"], "expected_revenue": "12.5", "priority": "3", "active": 1,
+     "ref": 7, "tag": None, "create_date": "2026-01-01", "write_date": "2026-02-01"},
+    {"name": None, "user_id": False, "expected_revenue": "n/a", "priority": "x", "active": False},
+    {},
+]
+
+
+def test_compiled_matches_interpreter():
+    compiled = CompiledMapping(MAPPINGS, version=1)
+    
+    for record in RECORDS:
+        assert compiled(record) == interpret_mappings(record, MAPPINGS)
+    assert compiled.map_batch(RECORDS) == [interpret_mappings(r, MAPPINGS) for r in RECORDS]
+    assert compiled(RECORDS[0])["title'\n"] == "Deal"
+
+
+def test_plans_are_cached_by_version():
+    doc = {"id": "m1", "integration_type": "odoo", "entity_type": "opportunity", "mappings": MAPPINGS, "version": 1}
+    
+    assert compile_mapping_doc(doc) is compile_mapping_doc(dict(doc))
+    assert compile_mapping_doc({**doc, "version": 2}) is not compile_mapping_doc(doc)
@@ -0,0 +1,281 @@
+"""
+Unit Tests for MS365 mailbox/calendar delta sync
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from services.ms365.connector import DeltaLinkExpired, TokenExpiredError
+from services.ms365.delta_sync import CALENDAR, MAIL, MailboxDeltaSync
+
+
+class Result:
+    def __init__(self, deleted_count=0):
+        self.deleted_count = deleted_count
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for the delta sync"""
+    
+    def __init__(self):
+        self.docs = []
+        self.bulk_writes = 0
+    
+    def _match(self, doc, query):
+        for field, cond in query.items():
+            if isinstance(cond, dict):
+                if "$lt" in cond and not doc.get(field) < cond["$lt"]:
+                    return False
+                if "$exists" in cond and (field in doc) != cond["$exists"]:
+                    return False
+                if "$ne" in cond and doc.get(field) == cond["$ne"]:
+                    return False
+            elif doc.get(field) != cond:
+                return False
+        return True
+    
+    async def find_one(self, query):
+        return next((d for d in self.docs if self._match(d, query)), None)
+    
+    def find(self, query, projection=None):
+        docs = [d for d in self.docs if self._match(d, query)]
+
+        class Cursor:
+            async def to_list(self, length):
+                return docs
+        return Cursor()
+    
+    async def update_one(self, query, update, upsert=False):
+        doc = await self.find_one(query)
+        if doc is None:
+            if not upsert:
+                return
+            doc = dict(query, **update.get("$setOnInsert", {}))
+            self.docs.append(doc)
+        doc.update(update.get("$set", {}))
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+    
+    async def delete_many(self, query):
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not self._match(d, query)]
+        return Result(before - len(self.docs))
+    
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_writes += 1
+        for op in ops:
+            if hasattr(op, "_doc"):
+                await self.update_one(op._filter, op._doc, upsert=True)
+            else:
+                self.docs = [d for d in self.docs if not self._match(d, op._filter)]
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+    
+    def __getattr__(self, name):
+        return self[name]
+
+
+class ScriptedConnector:
+    """Connector whose delta_pages replays scripted Graph pages per start link"""
+    
+    scripts = {}
+    calls = []
+    active = 0
+    peak = 0
+    
+    def __init__(self, access_token):
+        self.access_token = access_token
+    
+    async def __aenter__(self):
+        cls = ScriptedConnector
+        cls.active += 1
+        cls.peak = max(cls.peak, cls.active)
+        return self
+    
+    async def __aexit__(self, *exc):
+        ScriptedConnector.active -= 1
+    
+    async def delta_pages(self, endpoint, params=None, delta_link=None, page_size=100):
+        ScriptedConnector.calls.append((self.access_token, endpoint, delta_link))
+        await asyncio.sleep(0.01)
+        script = self.scripts.get((endpoint, delta_link), [([], "link-empty")])
+        if isinstance(script, Exception):
+            raise script
+        for items, link in script:
+            yield items, link
+
+
+class IndexedCollection(FakeCollection):
+    """Adds the aggregate and index calls used by ensure_indexes"""
+    
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.indexes = {}
+    
+    def aggregate(self, pipeline, allowDiskUse=False):
+        id_field = pipeline[1]["$group"]["_id"]["item"]["$ifNull"][0][1:]
+        groups = {}
+        for doc in sorted(self.docs, key=lambda d: d.get("synced_at") or datetime.min, reverse=True):
+            groups.setdefault((doc.get("owner_user_id"), doc.get(id_field)), []).append(doc["_id"])
+        
+        async def gen():
+            for ids in groups.values():
+                if len(ids) > 1:
+                    yield {"ids": ids, "count": len(ids)}
+        return gen()
+    
+    async def delete_many(self, query):
+        if "_id" in query:
+            before = len(self.docs)
+            self.docs = [d for d in self.docs if d["_id"] not in query["_id"]["$in"]]
+            return Result(before - len(self.docs))
+        return await super().delete_many(query)
+    
+    async def index_information(self):
+        return dict(self.indexes)
+    
+    async def drop_index(self, name):
+        del self.indexes[name]
+    
+    async def create_index(self, keys, unique=False, name=None):
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        if name in self.indexes and self.indexes[name].get("unique") != unique:
+            raise ValueError("index exists with different options")
+        self.indexes[name] = {"key": keys, "unique": unique}
+        return name
+
+
+def make_sync(db, scripts, **kwargs):
+    ScriptedConnector.scripts = scripts
+    ScriptedConnector.calls = []
+    ScriptedConnector.peak = 0
+    syncer = MailboxDeltaSync(db, **kwargs)
+    syncer.connector_class = ScriptedConnector
+    return syncer
+
+
+MAIL_DELTA = "/me/mailFolders/inbox/messages/delta"
+CALENDAR_DELTA = "/me/calendarView/delta"
+
+
+def test_first_sync_follows_pages_and_stores_delta_link():
+    db = FakeDB()
+    syncer = make_sync(db, {
+        (MAIL_DELTA, None): [
+            ([{"id": "m1", "subject": "Hello"}, {"id": "m2", "subject": "Quote"}], None),
+            ([{"id": "m3", "subject": "PO"}], "link-1"),
+        ],
+    })
+    
+    stats = asyncio.run(syncer.sync_user("u1", "token", kinds=(MAIL,)))
+    
+    assert stats[MAIL]["upserted"] == 3 and stats[MAIL]["pages"] == 2 and stats[MAIL]["full"]
+    assert {d["ms_email_id"] for d in db.user_emails.docs} == {"m1", "m2", "m3"}
+    assert all(d["owner_user_id"] == "u1" and d["id"] for d in db.user_emails.docs)
+    assert db.user_emails.bulk_writes == 2
+    assert db.ms365_delta_state.docs[0]["delta_link"] == "link-1"
+
+
+def test_incremental_sync_applies_changes_and_removals():
+    db = FakeDB()
+    syncer = make_sync(db, {
+        (MAIL_DELTA, None): [([{"id": "m1", "subject": "Hello"}, {"id": "m2", "subject": "Quote"}], "link-1")],
+        (MAIL_DELTA, "link-1"): [
+            ([{"id": "m1", "subject": "Hello (edited)"}, {"id": "m2", "@removed": {"reason": "deleted"}}], "link-2"),
+        ],
+    })
+    asyncio.run(syncer.sync_user("u1", "token", kinds=(MAIL,)))
+    first_id = db.user_emails.docs[0]["id"]
+    
+    stats = asyncio.run(syncer.sync_user("u1", "token", kinds=(MAIL,)))
+    
+    assert ScriptedConnector.calls[-1] == ("token", MAIL_DELTA, "link-1")
+    assert stats[MAIL] == {"upserted": 1, "deleted": 1, "pages": 1, "full": False}
+    assert [(d["ms_email_id"], d["subject"], d["id"]) for d in db.user_emails.docs] == [("m1", "Hello (edited)", first_id)]
+    assert db.ms365_delta_state.docs[0]["delta_link"] == "link-2"
+
+
+def test_expired_delta_link_runs_full_sync_and_prunes_unseen():
+    db = FakeDB()
+    syncer = make_sync(db, {
+        (MAIL_DELTA, None): [([{"id": "m1"}, {"id": "m2"}], "link-1")],
+    })
+    asyncio.run(syncer.sync_user("u1", "token", kinds=(MAIL,)))
+    
+    ScriptedConnector.scripts = {
+        (MAIL_DELTA, "link-1"): DeltaLinkExpired("gone"),
+        (MAIL_DELTA, None): [([{"id": "m2"}], "link-2")],
+    }
+    stats = asyncio.run(syncer.sync_user("u1", "token", kinds=(MAIL,)))
+    
+    assert stats[MAIL]["full"] and stats[MAIL]["deleted"] == 1
+    assert [d["ms_email_id"] for d in db.user_emails.docs] == ["m2"]
+    assert db.ms365_delta_state.docs[0]["delta_link"] == "link-2"
+
+
+def test_calendar_and_mail_keep_separate_delta_links():
+    db = FakeDB()
+    syncer = make_sync(db, {
+        (MAIL_DELTA, None): [([{"id": "m1"}], "mail-link")],
+        (CALENDAR_DELTA, None): [([{"id": "e1", "subject": "Review"}], "cal-link")],
+    })
+    
+    asyncio.run(syncer.sync_user("u1", "token"))
+    
+    links = {d["kind"]: d["delta_link"] for d in db.ms365_delta_state.docs}
+    assert links == {MAIL: "mail-link", CALENDAR: "cal-link"}
+    assert db.user_calendar.docs[0]["ms_event_id"] == "e1"
+
+
+def test_expired_token_is_cleared():
+    db = FakeDB()
+    db.users.docs.append({"id": "u1", "ms_access_token": "old"})
+    syncer = make_sync(db, {(MAIL_DELTA, None): TokenExpiredError("expired")})
+    
+    with pytest.raises(TokenExpiredError):
+        asyncio.run(syncer.sync_user("u1", "old", kinds=(MAIL,)))
+    assert "ms_access_token" not in db.users.docs[0]
+    assert not MailboxDeltaSync.is_syncing("u1")
+
+
+def test_sync_all_bounds_concurrency():
+    db = FakeDB()
+    for i in range(6):
+        db.users.docs.append({"id": f"u{i}", "ms_access_token": f"t{i}"})
+    db.users.docs.append({"id": "offline", "ms_access_token": ""})
+    syncer = make_sync(db, {}, concurrency=2)
+    
+    totals = asyncio.run(syncer.sync_all())
+    
+    assert totals["users"] == 6 and totals["synced"] == 6
+    assert ScriptedConnector.peak == 2
+    assert {call[0] for call in ScriptedConnector.calls} == {f"t{i}" for i in range(6)}
+
+
+def test_ensure_indexes_dedupes_cached_items_and_makes_keys_unique():
+    db = FakeDB()
+    for name in ("ms365_delta_state", "user_calendar"):
+        db[name] = IndexedCollection(name)
+    emails = db["user_emails"] = IndexedCollection("user_emails")
+    emails.indexes["owner_user_id_1_ms_email_id_1"] = {"key": [("owner_user_id", 1), ("ms_email_id", 1)]}
+    emails.docs = [
+        {"_id": 1, "owner_user_id": "u1", "ms_email_id": "m1", "subject": "old", "synced_at": datetime(2025, 1, 1)},
+        {"_id": 2, "owner_user_id": "u1", "ms_email_id": "m1", "subject": "new", "synced_at": datetime(2025, 2, 1)},
+        {"_id": 3, "owner_user_id": "u1", "ms_email_id": "m1", "subject": "legacy"},
+        {"_id": 4, "owner_user_id": "u2", "ms_email_id": "m1", "subject": "other user"},
+    ]
+    syncer = MailboxDeltaSync(db)
+    
+    asyncio.run(syncer.ensure_indexes())
+    asyncio.run(syncer.ensure_indexes())
+    
+    assert sorted(d["subject"] for d in emails.docs) == ["new", "other user"]
+    assert emails.indexes["owner_user_id_1_ms_email_id_1"]["unique"]
+    assert db.user_calendar.indexes["owner_user_id_1_ms_event_id_1"]["unique"]
@@ -0,0 +1,217 @@
+"""
+Unit Tests for the shared Odoo Transport
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from integrations.odoo.transport import OdooRPCError, OdooTransport, id_ranges, normalize_url
+from services.odoo.connector import OdooConnector
+from services.sync import background_sync
+from services.sync.background_sync import OdooReconciler
+
+
+class FakeOdoo:
+    """JSON-RPC endpoint recording calls; optional leading 429 responses"""
+    
+    def __init__(self, throttle: int = 0, ids=()):
+        self.ids = list(ids)
+        self.calls = []
+        self.throttle = throttle
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        if self.throttle:
+            self.throttle -= 1
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        
+        params = json.loads(request.content)["params"]
+        self.calls.append((params["service"], params["method"]))
+        
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        model, method, args = (params["args"][3:6] + [None] * 3)[:3]
+        # Later ID ranges answer faster, so export chunks complete out of order
+        bounds = [c[2] for c in (args or [[]])[0] if isinstance(c, list) and c[0] == "id"]
+        await asyncio.sleep(0.05 - min(bounds) / 1000 if bounds else 0.01)
+        self.in_flight -= 1
+        
+        if params["method"] == "authenticate":
+            return httpx.Response(200, json={"result": 7})
+        if method == "search":
+            return httpx.Response(200, json={"result": self.ids})
+        if bounds:
+            return httpx.Response(200, json={"result": [{"id": i} for i in self.ids if bounds[0] <= i <= bounds[1]]})
+        if model == "broken.model":
+            return httpx.Response(200, json={"error": {"message": "Odoo Server Error", "data": {"message": "Invalid field"}}})
+        return httpx.Response(200, json={"result": [{"id": 1, "model": model, "method": method}]})
+
+
+def make_transport(server: FakeOdoo, **kwargs) -> OdooTransport:
+    return OdooTransport("https://acme.odoo.com/odoo", "db", "bot", "key", transport=httpx.MockTransport(server), **kwargs)
+
+
+def test_normalize_url():
+    assert normalize_url("https://acme.odoo.com/odoo/") == "https://acme.odoo.com"
+    assert normalize_url("https://acme.odoo.com/xmlrpc/2") == "https://acme.odoo.com"
+
+
+def test_connectors_share_login():
+    async def run():
+        server = FakeOdoo()
+        transport = make_transport(server)
+        OdooTransport._instances[("https://acme.odoo.com", "db", "bot", "key")] = transport
+        try:
+            for _ in range(3):
+                async with OdooConnector("https://acme.odoo.com", "db", "bot", "key") as connector:
+                    assert connector.uid == 7
+                    await connector.search_read("crm.lead", limit=5)
+        finally:
+            await OdooTransport.close_all()
+        return server
+    
+    server = asyncio.run(run())
+    assert server.calls.count(("common", "authenticate")) == 1
+    assert server.calls.count(("object", "execute_kw")) == 3
+
+
+def test_concurrency_is_bounded():
+    async def run():
+        server = FakeOdoo()
+        transport = make_transport(server, max_concurrency=2)
+        await asyncio.gather(*(transport.read("res.partner", [i]) for i in range(6)))
+        await transport.close()
+        return server
+    
+    assert asyncio.run(run()).max_in_flight == 2
+
+
+def test_throttling_is_retried_and_paced():
+    async def run():
+        server = FakeOdoo(throttle=1)
+        transport = make_transport(server)
+        records = await transport.search_count("crm.lead")
+        await transport.close()
+        return transport, records
+    
+    transport, records = asyncio.run(run())
+    assert records[0]["method"] == "search_count"
+    assert transport.stats["throttled"] == 1
+    assert transport.pacer.interval > 0
+
+
+def test_rpc_errors():
+    async def run():
+        transport = make_transport(FakeOdoo())
+        try:
+            await transport.search_read("broken.model")
+        finally:
+            await transport.close()
+    
+    with pytest.raises(OdooRPCError, match="Odoo API error: Invalid field"):
+        asyncio.run(run())
+
+
+def test_id_ranges():
+    assert id_ranges([9, 1, 4, 7, 2], 2) == [(1, 2), (4, 7), (9, 9)]
+    assert id_ranges([], 500) == []
+
+
+def test_export_covers_id_space_in_parallel():
+    async def run():
+        server = FakeOdoo(ids=range(1, 24))
+        transport = make_transport(server, max_concurrency=3)
+        chunks = [chunk async for chunk in transport.export("res.partner", [("active", "=", True)], chunk_size=5)]
+        await transport.close()
+        return server, chunks
+    
+    server, chunks = asyncio.run(run())
+    ids = [rec["id"] for chunk in chunks for rec in chunk]
+    assert sorted(ids) == list(range(1, 24))
+    assert len(chunks) == 5 and ids != sorted(ids)
+    assert server.max_in_flight == 3
+
+
+def test_reconcile_stream_closes_export_on_failure():
+    closed = []
+    
+    async def export():
+        try:
+            yield [{"id": 1}]
+            yield [{"id": 2}]
+        finally:
+            closed.append(True)
+    
+    async def failing_upsert(entity_type, records, id_field, stats):
+        raise RuntimeError("mongo down")
+    
+    reconciler = OdooReconciler(db=None)
+    reconciler._upsert_records = failing_upsert
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(reconciler.reconcile_stream("account", export()))
+    assert closed == [True]
+
+
+class FakeServing:
+    """data_lake_serving keyed by serving_id"""
+    
+    def __init__(self, docs):
+        self.docs = {doc["serving_id"]: doc for doc in docs}
+    
+    def find(self, query, projection):
+        ids = query["$or"][1]["serving_id"]["$in"]
+        
+        async def gen():
+            for serving_id in ids:
+                if serving_id in self.docs:
+                    yield {**self.docs[serving_id], "_id": serving_id}
+        return gen()
+    
+    async def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            doc = op._doc.get("$set", op._doc)
+            self.docs[doc["serving_id"]] = {**self.docs.get(doc["serving_id"], {}), **doc}
+    
+    async def distinct(self, field, query):
+        return [
+            serving_id for serving_id, doc in self.docs.items()
+            if serving_id not in query["serving_id"]["$nin"] and doc.get("is_active") is not False
+        ]
+    
+    async def update_many(self, query, update):
+        for serving_id in query["serving_id"]["$in"]:
+            self.docs[serving_id].update(update["$set"])
+        return SimpleNamespace(modified_count=len(query["serving_id"]["$in"]))
+
+
+def test_reconcile_indexes_only_changed_records(monkeypatch):
+    indexed = []
+    
+    async def record(db, entity_type, serving_ids):
+        indexed.append(sorted(serving_ids))
+    
+    monkeypatch.setattr(background_sync, "refresh_serving_entries", record)
+    serving = FakeServing([
+        {"serving_id": "1", "data": {"id": 1, "name": "Acme"}, "is_active": True},
+        {"serving_id": "2", "data": {"id": 2, "name": "Globex"}, "is_active": True},
+        {"serving_id": "3", "data": {"id": 3, "name": "Initech"}, "is_active": True},
+        {"serving_id": "5", "data": {"id": 5, "name": "Hooli"}, "is_active": False},
+    ])
+    reconciler = OdooReconciler(SimpleNamespace(data_lake_serving=serving))
+    
+    stats = asyncio.run(reconciler.reconcile_entity("account", [
+        {"id": 1, "name": "Acme"},
+        {"id": 2, "name": "Globex Inc"},
+        {"id": 4, "name": "Umbrella"},
+        {"id": 5, "name": "Hooli"},
+    ]))
+    
+    # Unchanged Acme is skipped; edited, new and reactivated records are indexed, then the removed one
+    assert indexed == [["2", "4", "5"], ["3"]]
+    assert (stats["inserted"], stats["updated"], stats["soft_deleted"]) == (1, 3, 1)
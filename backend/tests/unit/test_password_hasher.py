@@ -0,0 +1,133 @@
+"""
+Unit Tests for the bounded password hasher and login rehashing
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from passlib.context import CryptContext
+
+from core.database import Database
+from routes import auth
+from services.auth.jwt_handler import password_hasher
+from services.auth.password_hasher import HasherBusyError, PasswordHasher
+
+# Same shape as the app context (current scheme first, sha256_crypt as the
+# legacy one) with cheap rounds to keep the tests fast
+CONTEXT = CryptContext(
+    schemes=["pbkdf2_sha256", "sha256_crypt"],
+    deprecated="auto",
+    pbkdf2_sha256__rounds=1000,
+    sha256_crypt__rounds=1000,
+)
+
+
+class FakeUsers:
+    def __init__(self, docs):
+        self.docs = docs
+        self.updates = []
+    
+    async def find_one(self, query, projection=None):
+        return next((d for d in self.docs if all(d.get(k) == v for k, v in query.items())), None)
+    
+    async def update_one(self, query, update):
+        self.updates.append((query, update))
+        doc = await self.find_one(query)
+        doc.update(update["$set"])
+
+
+class FakeDB:
+    def __init__(self, users):
+        self.users = FakeUsers(users)
+
+
+def legacy_user(**overrides):
+    now = datetime.now(timezone.utc)
+    return {
+        "id": "u1",
+        "email": "rep@example.com",
+        "name": "Rep",
+        "role": "account_manager",
+        "password_hash": CONTEXT.handler("sha256_crypt").hash("s3cret", rounds=1000),
+        "created_at": now,
+        **overrides,
+    }
+
+
+@pytest.fixture
+def login(monkeypatch):
+    """Posts to /api/auth/login against a fake users collection"""
+    monkeypatch.setattr(password_hasher, "context", CONTEXT)
+    
+    def post(db, password="s3cret"):
+        monkeypatch.setattr(Database, "get_db", classmethod(lambda cls: db))
+        app = FastAPI()
+        app.include_router(auth.router, prefix="/api")
+        
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/api/auth/login", json={"email": "rep@example.com", "password": password})
+        return asyncio.run(run())
+    return post
+
+
+def test_rejects_callers_beyond_max_pending():
+    hasher = PasswordHasher(CONTEXT, max_workers=1, max_pending=1)
+    hashed = CONTEXT.hash("s3cret")
+    
+    async def run():
+        return await asyncio.gather(
+            hasher.verify("s3cret", hashed),
+            hasher.verify("s3cret", hashed),
+            return_exceptions=True,
+        )
+    
+    first, second = asyncio.run(run())
+    hasher.shutdown()
+    
+    assert first is True
+    assert isinstance(second, HasherBusyError)
+    assert hasher.get_stats()["rejected"] == 1 and hasher.get_stats()["in_flight"] == 0
+
+
+def test_verify_and_update_rehashes_legacy_hashes_only():
+    hasher = PasswordHasher(CONTEXT)
+    legacy = legacy_user()["password_hash"]
+    
+    valid, new_hash = asyncio.run(hasher.verify_and_update("s3cret", legacy))
+    assert valid and new_hash.startswith("$pbkdf2-sha256$")
+    assert asyncio.run(hasher.verify_and_update("s3cret", new_hash)) == (True, None)
+    assert asyncio.run(hasher.verify_and_update("wrong", legacy)) == (False, None)
+    hasher.shutdown()
+
+
+def test_login_upgrades_legacy_hash(login):
+    db = FakeDB([legacy_user()])
+    
+    response = login(db)
+    
+    assert response.status_code == 200 and response.json()["access_token"]
+    stored = db.users.docs[0]["password_hash"]
+    assert stored.startswith("$pbkdf2-sha256$") and CONTEXT.verify("s3cret", stored)
+
+
+def test_disabled_account_is_rejected_before_rehash(login):
+    db = FakeDB([legacy_user(is_active=False)])
+    
+    response = login(db)
+    
+    assert response.status_code == 401 and response.json()["detail"] == "Account is disabled"
+    assert db.users.updates == []
+
+
+def test_login_returns_503_with_retry_after_when_hasher_is_busy(login, monkeypatch):
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    
+    response = login(FakeDB([legacy_user()]))
+    
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
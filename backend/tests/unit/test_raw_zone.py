@@ -0,0 +1,164 @@
+"""
+Unit Tests for raw zone bulk ingestion and batch replay
+"""
+
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+from core.enums import EntityType, IntegrationSource
+from data_lake.raw_zone import RawZoneHandler
+
+ODOO = IntegrationSource.ODOO
+ACCOUNT = EntityType.ACCOUNT
+
+
+def matches(doc, query):
+    for field, cond in query.items():
+        value = doc.get(field)
+        if isinstance(cond, dict):
+            if "$in" in cond and value not in cond["$in"]:
+                return False
+            if "$gte" in cond and not value >= cond["$gte"]:
+                return False
+            if "$lt" in cond and not value < cond["$lt"]:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+    
+    def sort(self, field, direction=1):
+        self.docs.sort(key=lambda d: d[field], reverse=direction < 0)
+        return self
+    
+    def batch_size(self, size):
+        return self
+    
+    def __aiter__(self):
+        async def gen():
+            for doc in self.docs:
+                yield doc
+        return gen()
+
+
+class FakeCollection:
+    """In-memory collection with unique keys for upserts"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.docs = []
+        self.fail_next_writes = 0
+    
+    def find(self, query, projection=None):
+        return Cursor([dict(d) for d in self.docs if matches(d, query)])
+    
+    def _upsert(self, query, update):
+        doc = next((d for d in self.docs if matches(d, query)), None)
+        if doc is None:
+            doc = {**query, **update.get("$setOnInsert", {})}
+            self.docs.append(doc)
+        doc.update(update.get("$set", {}))
+        return doc
+    
+    async def find_one_and_update(self, query, update, upsert=False, projection=None, return_document=None):
+        return dict(self._upsert(query, update))
+    
+    async def update_one(self, query, update, upsert=False):
+        self._upsert(query, update)
+    
+    async def bulk_write(self, ops, ordered=True):
+        if self.fail_next_writes:
+            self.fail_next_writes -= 1
+            raise BulkWriteError({"writeErrors": [{"index": 0, "code": 2, "errmsg": "boom"}]})
+        for op in ops:
+            self._upsert(op._filter, op._doc)
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection(name)
+        return self[name]
+
+
+def records(*pairs):
+    return [{"source_id": sid, "data": {"id": sid, "name": name}} for sid, name in pairs]
+
+
+def test_bulk_store_counts_inserted_changed_and_duplicates():
+    db = FakeDB()
+    raw = RawZoneHandler(db)
+    
+    first = asyncio.run(raw.bulk_store(ODOO, ACCOUNT, records((1, "Acme"), (2, "Globex"), (1, "Acme")), "b1"))
+    second = asyncio.run(raw.bulk_store(ODOO, ACCOUNT, records((1, "Acme"), (2, "Globex Inc"), (3, "Initech")), "b2"))
+    
+    assert (first["inserted"], first["changed"], first["duplicate"], first["failed"]) == (2, 0, 1, 0)
+    assert (second["inserted"], second["changed"], second["duplicate"], second["failed"]) == (1, 1, 1, 0)
+    # Unchanged payloads are stored once and keep their first batch
+    assert len(db["raw_odoo_partners"].docs) == 4
+    acme = [d for d in db["raw_odoo_partners"].docs if d["_source_id"] == "1"]
+    assert len(acme) == 1 and acme[0]["_sync_batch_id"] == "b1"
+
+
+def test_replaying_an_intermediate_batch_includes_unchanged_records():
+    db = FakeDB()
+    raw = RawZoneHandler(db)
+    for batch_id, batch in (
+        ("b1", records((1, "Acme"), (2, "Globex"))),
+        ("b2", records((1, "Acme"), (2, "Globex Inc"))),
+        ("b3", records((1, "Acme"), (2, "Globex Inc"), (3, "Initech"))),
+    ):
+        asyncio.run(raw.bulk_store(ODOO, ACCOUNT, batch, batch_id))
+    
+    def names(batch_id):
+        docs = asyncio.run(raw.get_by_batch(ODOO, ACCOUNT, batch_id))
+        return sorted(d["_raw_data"]["name"] for d in docs)
+    
+    assert names("b1") == ["Acme", "Globex"]
+    assert names("b2") == ["Acme", "Globex Inc"]
+    assert names("b3") == ["Acme", "Globex Inc", "Initech"]
+    
+    async def chunks():
+        return [len(chunk) async for chunk in raw.iter_records(ODOO, ACCOUNT, batch_id="b3", chunk_size=2)]
+    assert asyncio.run(chunks()) == [2, 1]
+
+
+def test_single_store_records_batch_membership():
+    db = FakeDB()
+    raw = RawZoneHandler(db)
+    
+    first_id = asyncio.run(raw.store(ODOO, ACCOUNT, 1, {"name": "Acme"}, "b1"))
+    second_id = asyncio.run(raw.store(ODOO, ACCOUNT, 1, {"name": "Acme"}, "b2"))
+    
+    assert first_id == second_id
+    assert [d["_raw_id"] for d in asyncio.run(raw.get_by_batch(ODOO, ACCOUNT, "b2"))] == [first_id]
+
+
+def test_batches_without_membership_fall_back_to_sync_batch_id():
+    db = FakeDB()
+    db["raw_odoo_partners"].docs.append({
+        "_source": "odoo", "_source_id": "9", "_sync_batch_id": "legacy",
+        "_ingested_at": 1, "_raw_data": {"name": "Old"},
+    })
+    raw = RawZoneHandler(db)
+    
+    docs = asyncio.run(raw.get_by_batch(ODOO, ACCOUNT, "legacy"))
+    
+    assert [d["_raw_data"]["name"] for d in docs] == ["Old"]
+
+
+def test_failed_writes_are_retried_then_reported():
+    db = FakeDB()
+    raw = RawZoneHandler(db)
+    db["raw_odoo_partners"].fail_next_writes = 1
+    
+    stats = asyncio.run(raw.bulk_store(ODOO, ACCOUNT, records((1, "Acme")), "b1", retry_delay=0))
+    assert stats["inserted"] == 1 and stats["failed"] == 0
+    
+    db["raw_batch_members"].fail_next_writes = 5
+    stats = asyncio.run(raw.bulk_store(ODOO, ACCOUNT, records((2, "Globex")), "b2", max_retries=2, retry_delay=0))
+    assert stats["failed"] == 1 and stats["failed_source_ids"] == ["2"]
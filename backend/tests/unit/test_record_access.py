@@ -0,0 +1,132 @@
+"""
+Unit Tests for the Record Access Index
+Access keys must grant exactly what the per-record check grants
+"""
+
+import asyncio
+import random
+
+from services.rbac.record_access import (
+    ACCESS_KEYS_VERSION,
+    PUBLIC_KEY,
+    AccessContext,
+    record_access_keys,
+    serving_access_fields,
+)
+
+
+NAMES = ["John Smith", "john", "JOHN SMITH ", " Jane Doe", "jane doe", "smith", "Ana", "an", "", None]
+EMAILS = ["john@acme.com", "JANE@acme.com", "ana@acme.com", "john", "", None]
+IDS = [1, 2, 3, "1", "2", " 3", "x", 1.0, 2.5, True, 0, "", None]
+
+
+def index_grants(context: AccessContext, entity_type: str, record: dict, known_names) -> bool:
+    """What the $in filter returns for one record"""
+    if context.is_super_admin:
+        return True
+    keys = set(record_access_keys(entity_type, record))
+    return bool(keys & context.access_keys(known_names))
+
+
+def closure_grants(context: AccessContext, entity_type: str, record: dict) -> bool:
+    """What /dashboard/real granted before the index"""
+    if entity_type == "account" and not record.get("salesperson_name"):
+        return True
+    return context.can_access(record)
+
+
+def random_record(rng: random.Random) -> dict:
+    record = {}
+    for field, choices in (
+        ("salesperson_id", IDS),
+        ("salesperson_name", NAMES + EMAILS),
+        ("salesperson_email", EMAILS),
+        ("team_id", IDS),
+    ):
+        if rng.random() < 0.8:
+            record[field] = rng.choice(choices)
+    return record
+
+
+def random_context(rng: random.Random) -> AccessContext:
+    user_doc = {
+        "odoo_user_id": rng.choice(IDS),
+        "odoo_salesperson_name": rng.choice(NAMES),
+        "odoo_team_id": rng.choice(IDS),
+        "odoo_employee_id": rng.choice([None, 10]),
+    }
+    subordinates = [
+        {
+            "odoo_user_id": rng.choice(IDS),
+            "odoo_salesperson_name": rng.choice(NAMES),
+            "email": rng.choice(EMAILS),
+        }
+        for _ in range(rng.randint(0, 3))
+    ]
+    user_email = (rng.choice(EMAILS) or "").lower()
+    return AccessContext(user_doc, user_email, subordinates)
+
+
+class TestAccessParity:
+    """The index must agree with the reference check record by record"""
+    
+    def test_randomized_parity(self):
+        rng = random.Random(1234)
+        records = [(rng.choice(["opportunity", "account"]), random_record(rng)) for _ in range(300)]
+        known_names = {
+            key[5:]
+            for entity_type, record in records
+            for key in record_access_keys(entity_type, record)
+            if key.startswith("name:")
+        }
+        
+        for _ in range(300):
+            context = random_context(rng)
+            for entity_type, record in records:
+                assert index_grants(context, entity_type, record, known_names) == \
+                    closure_grants(context, entity_type, record), (entity_type, record, vars(context))
+    
+    def test_manager_sees_direct_report_by_id(self):
+        context = AccessContext({"odoo_user_id": 1, "odoo_employee_id": 10}, "boss@acme.com", [{"odoo_user_id": 7}])
+        
+        assert index_grants(context, "opportunity", {"salesperson_id": 7}, [])
+        assert not index_grants(context, "opportunity", {"salesperson_id": 8}, [])
+        # Manager matching uses plain equality: "7" is not 7
+        assert not index_grants(context, "opportunity", {"salesperson_id": "7"}, [])
+        assert not context.can_access({"salesperson_id": "7"})
+    
+    def test_manager_partial_name_resolved_from_known_names(self):
+        context = AccessContext({}, "boss@acme.com", [{"odoo_salesperson_name": "John Smith"}])
+        record = {"salesperson_name": "John"}
+        
+        assert context.can_access(record)
+        assert index_grants(context, "opportunity", record, ["john"])
+        assert not index_grants(context, "opportunity", record, [])
+    
+    def test_account_without_salesperson_is_public(self):
+        assert record_access_keys("account", {"name": "Acme"}) == [PUBLIC_KEY]
+        assert record_access_keys("opportunity", {"name": "Deal"}) == []
+        assert PUBLIC_KEY in AccessContext({}, "").access_keys()
+    
+    def test_serving_access_fields(self):
+        fields = serving_access_fields("opportunity", {"salesperson_id": 5, "team_id": "3"})
+        
+        assert fields["access_keys_version"] == ACCESS_KEYS_VERSION
+        assert set(fields["access_keys"]) == {"sp:5", "raw:n:5", "team:3"}
+        assert serving_access_fields("invoice", {"salesperson_id": 5}) == {}
+
+
+class TestMongoFilter:
+    """Tests for the generated filter"""
+    
+    def test_super_admin_has_no_filter(self):
+        context = AccessContext({"is_super_admin": True}, "admin@acme.com")
+        
+        assert asyncio.run(context.mongo_filter(db=None)) is None
+    
+    def test_filter_is_a_single_indexed_in(self):
+        context = AccessContext({"odoo_user_id": 4}, "rep@acme.com")
+        access_filter = asyncio.run(context.mongo_filter(db=None))
+        
+        assert list(access_filter) == ["access_keys"]
+        assert "sp:4" in access_filter["access_keys"]["$in"]
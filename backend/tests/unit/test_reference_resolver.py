@@ -0,0 +1,112 @@
+"""
+Unit Tests for batched reference resolution
+"""
+
+import asyncio
+
+from core.enums import IntegrationSource
+from data_lake.models import CanonicalOpportunity
+from integrations.odoo.normalizer import OdooNormalizer
+from sync_engine.reference_resolver import ReferenceResolver
+
+
+class FakeCollection:
+    """Canonical collection answering {"_source_keys": {"$in": [...]}} lookups"""
+    
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+    
+    def find(self, query, projection=None):
+        keys = set(query["_source_keys"]["$in"])
+        self.queries.append(keys)
+        docs = [d for d in self.docs if keys & set(d["_source_keys"])]
+        
+        async def cursor():
+            for doc in docs:
+                yield doc
+        return cursor()
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection([])
+        return self[name]
+
+
+def make_db():
+    db = FakeDB()
+    db["canonical_accounts"] = FakeCollection([
+        {"id": "acc-1", "_source_keys": ["odoo:1"]},
+        {"id": "acc-2", "_source_keys": ["odoo:2", "salesforce:0015"]},
+    ])
+    db["canonical_users"] = FakeCollection([{"id": "user-7", "_source_keys": ["odoo:7"]}])
+    return db
+
+
+def test_prefetch_uses_one_in_query_per_collection():
+    db = make_db()
+    resolver = ReferenceResolver(db, IntegrationSource.ODOO)
+    
+    asyncio.run(resolver.prefetch({
+        "canonical_accounts": {"1", "2", "3"},
+        "canonical_users": {"7"},
+    }))
+    
+    assert resolver.queries == 2
+    assert db["canonical_accounts"].queries == [{"odoo:1", "odoo:2", "odoo:3"}]
+    assert asyncio.run(resolver.resolve("canonical_accounts", "2")) == "acc-2"
+    assert asyncio.run(resolver.resolve("canonical_users", "7")) == "user-7"
+    assert resolver.queries == 2
+
+
+def test_prefetch_splits_large_in_lists():
+    db = make_db()
+    resolver = ReferenceResolver(db, IntegrationSource.ODOO)
+    resolver.MAX_IN_SIZE = 2
+    
+    asyncio.run(resolver.prefetch({"canonical_accounts": {"1", "2", "3", "4", "5"}}))
+    
+    assert resolver.queries == 3
+    assert sorted(len(keys) for keys in db["canonical_accounts"].queries) == [1, 2, 2]
+
+
+def test_hits_and_misses_are_memoized():
+    db = make_db()
+    resolver = ReferenceResolver(db, IntegrationSource.ODOO)
+    
+    async def run():
+        await resolver.prefetch({"canonical_accounts": {"1", "9"}})
+        return [
+            await resolver.resolve("canonical_accounts", "1"),
+            await resolver.resolve("canonical_accounts", "9"),
+            await resolver.resolve("canonical_accounts", "9"),
+        ]
+    
+    assert asyncio.run(run()) == ["acc-1", None, None]
+    assert resolver.queries == 1
+    
+    # A miss is re-checked by the next prefetch (the target may exist by then)
+    db["canonical_accounts"].docs.append({"id": "acc-9", "_source_keys": ["odoo:9"]})
+    asyncio.run(resolver.prefetch({"canonical_accounts": {"1", "9"}}))
+    assert db["canonical_accounts"].queries[-1] == {"odoo:9"}
+    assert asyncio.run(resolver.resolve("canonical_accounts", "9")) == "acc-9"
+    
+    resolver.clear()
+    asyncio.run(resolver.resolve("canonical_accounts", "1"))
+    assert resolver.queries == 3
+
+
+def test_normalizer_resolves_a_chunk_with_batched_lookups():
+    db = make_db()
+    normalizer = OdooNormalizer(db)
+    opportunities = [
+        CanonicalOpportunity(name=f"Deal {i}", account_id=str(1 + i % 2), owner_id="7")
+        for i in range(10)
+    ]
+    
+    resolved = asyncio.run(normalizer.resolve_references_batch(opportunities))
+    
+    assert {opp.account_id for opp in resolved} == {"acc-1", "acc-2"}
+    assert {opp.owner_id for opp in resolved} == {"user-7"}
+    assert len(db["canonical_accounts"].queries) == 1 and len(db["canonical_users"].queries) == 1
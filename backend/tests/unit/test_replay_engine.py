@@ -0,0 +1,174 @@
+"""
+Unit Tests for replaying raw zone records
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from core.enums import SyncStatus
+from sync_engine.pipeline import SyncPipeline
+from sync_engine.replay import ReplayEngine
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class Entity:
+    def __init__(self, source_id, name):
+        self.id = f"canon-{source_id}"
+        self.name = name
+    
+    def to_mongo_dict(self):
+        return {"id": self.id, "name": self.name, "updated_at": datetime.now(timezone.utc)}
+
+
+class FakeRaw:
+    """Raw zone holding (batch_id, ingested_at, source_id, payload) rows"""
+    
+    def __init__(self, rows):
+        self.rows = rows
+        self.selectors = []
+    
+    async def iter_records(self, source, entity_type, batch_id=None, since=None, until=None, chunk_size=500):
+        self.selectors.append({"batch_id": batch_id, "since": since, "until": until})
+        docs = [
+            {"_source": source.value, "_source_id": sid, "_raw_data": payload, "_ingested_at": at}
+            for bid, at, sid, payload in sorted(self.rows, key=lambda row: row[1])
+            if (not batch_id or bid == batch_id)
+            and (not since or at >= since)
+            and (not until or at < until)
+        ]
+        for i in range(0, len(docs), chunk_size):
+            yield docs[i:i + chunk_size]
+
+
+class FakeCanonical:
+    def __init__(self, docs):
+        self.docs = docs
+    
+    async def get_by_id(self, entity_type, entity_id):
+        return self.docs.get(entity_id)
+
+
+class FakeDataLake:
+    def __init__(self, rows, canonical=None):
+        self.db = None
+        self.raw = FakeRaw(rows)
+        self.canonical = FakeCanonical(canonical or {})
+
+
+class Recorder:
+    """Loader, logger and normalizer of the fake pipeline"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    async def load_canonical(self, entity):
+        self.calls.append(("canonical", entity.id))
+    
+    async def load_serving(self, entity):
+        self.calls.append(("serving", entity.id))
+    
+    async def log_sync_start(self, batch):
+        self.calls.append(("log_start", batch.id))
+    
+    async def log_sync_complete(self, batch):
+        self.calls.append(("log_complete", batch.id))
+    
+    async def resolve_references_batch(self, entities):
+        return entities
+
+
+class FakePipeline:
+    source_name = "odoo"
+    _error_result = SyncPipeline._error_result
+    
+    def __init__(self, existing=()):
+        self.existing = set(existing)
+        self._loader = self._logger = self._normalizer = Recorder()
+    
+    async def _transform_raw(self, raw_record, source_id, resolve=True):
+        if "name" not in raw_record.raw_data:
+            raise ValueError("name missing")
+        entity = Entity(source_id, raw_record.raw_data["name"])
+        status = "updated" if source_id in self.existing else "created"
+        return {"source_id": source_id, "entity": entity, "status": status}
+
+
+ROWS = [
+    ("b1", T0, "1", {"name": "Acme"}),
+    ("b1", T0 + timedelta(hours=1), "2", {"name": "Globex"}),
+    ("b2", T0 + timedelta(hours=2), "3", {"name": "Initech"}),
+    ("b2", T0 + timedelta(hours=3), "4", {}),
+]
+
+
+def test_dry_run_transforms_without_writing():
+    pipeline = FakePipeline()
+    engine = ReplayEngine(pipeline, FakeDataLake(ROWS))
+    
+    batch = asyncio.run(engine.replay_batch("b1", entity_type="account", dry_run=True))
+    
+    assert pipeline._loader.calls == []
+    assert batch.records_processed == 2 and batch.records_created == 2
+    assert batch.status == SyncStatus.COMPLETED.value
+    assert batch.metadata["dry_run"] and batch.metadata["replay_of"] == "b1"
+
+
+def test_replay_loads_records_and_counts_failures():
+    pipeline = FakePipeline()
+    engine = ReplayEngine(pipeline, FakeDataLake(ROWS))
+    
+    batch = asyncio.run(engine.replay_batch("b2", entity_type="account", chunk_size=1))
+    
+    assert ("canonical", "canon-3") in pipeline._loader.calls
+    assert ("serving", "canon-3") in pipeline._loader.calls
+    assert pipeline._loader.calls[0][0] == "log_start" and pipeline._loader.calls[-1][0] == "log_complete"
+    assert batch.records_failed == 1 and batch.errors[0]["source_id"] == "4"
+    assert batch.status == SyncStatus.PARTIAL.value
+    assert batch.metadata["throughput"]["chunks"] == 2
+
+
+def test_diff_reports_changed_created_and_unchanged_records():
+    canonical = {
+        "canon-1": {"id": "canon-1", "name": "Acme Corp", "updated_at": T0},
+        "canon-2": {"id": "canon-2", "name": "Globex", "updated_at": T0},
+    }
+    pipeline = FakePipeline(existing={"1", "2"})
+    engine = ReplayEngine(pipeline, FakeDataLake(ROWS, canonical))
+    
+    batch = asyncio.run(engine.replay_range("account", since=T0, dry_run=True, diff=True))
+    
+    diff = batch.metadata["diff"]
+    assert diff["changed"] == 2 and diff["unchanged"] == 1 and not diff["truncated"]
+    entries = {entry["source_id"]: entry for entry in diff["entries"]}
+    assert entries["1"] == {
+        "source_id": "1",
+        "action": "update",
+        "entity_id": "canon-1",
+        "changes": {"name": {"old": "Acme Corp", "new": "Acme"}},
+    }
+    assert entries["3"]["action"] == "create"
+    assert "2" not in entries
+
+
+def test_diff_entries_are_capped():
+    engine = ReplayEngine(FakePipeline(), FakeDataLake(ROWS), max_diffs=1)
+    
+    batch = asyncio.run(engine.replay_range("account", since=T0, dry_run=True, diff=True))
+    
+    assert batch.metadata["diff"]["changed"] == 3
+    assert len(batch.metadata["diff"]["entries"]) == 1 and batch.metadata["diff"]["truncated"]
+
+
+def test_range_replay_selects_by_ingestion_time():
+    pipeline = FakePipeline()
+    data_lake = FakeDataLake(ROWS)
+    engine = ReplayEngine(pipeline, data_lake)
+    since, until = T0 + timedelta(minutes=30), T0 + timedelta(hours=3)
+    
+    batch = asyncio.run(engine.replay_range("account", since=since, until=until))
+    
+    assert data_lake.raw.selectors == [{"batch_id": None, "since": since, "until": until}]
+    assert [c[1] for c in pipeline._loader.calls if c[0] == "canonical"] == ["canon-2", "canon-3"]
+    assert batch.metadata["replay_since"] == since.isoformat()
+    assert batch.metadata["replay_until"] == until.isoformat()
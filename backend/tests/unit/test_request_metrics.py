@@ -0,0 +1,74 @@
+"""
+Unit Tests for in-process request metrics
+"""
+
+import pytest
+
+from services.logging.metrics import LATENCY_BUCKETS_MS, LatencyHistogram, RequestMetrics
+
+
+class TestLatencyHistogram:
+    """Tests for bucket counts and interpolated quantiles"""
+    
+    def test_empty_histogram_has_no_quantiles(self):
+        assert LatencyHistogram().quantile(0.5) is None
+    
+    def test_quantiles_interpolate_within_a_bucket(self):
+        histogram = LatencyHistogram()
+        for _ in range(4):
+            histogram.observe(3)  # (2.5, 5] bucket
+        for _ in range(6):
+            histogram.observe(20)  # (10, 25] bucket
+        
+        assert histogram.quantile(0.2) == pytest.approx(3.75)
+        assert histogram.quantile(0.5) == pytest.approx(12.5)
+        assert histogram.quantile(1.0) == pytest.approx(25)
+        assert histogram.count == 10 and histogram.sum == 132
+    
+    def test_bucket_bounds_are_inclusive(self):
+        histogram = LatencyHistogram()
+        histogram.observe(5)
+        
+        assert histogram.counts[LATENCY_BUCKETS_MS.index(5)] == 1
+    
+    def test_values_beyond_the_last_bucket_report_the_last_bound(self):
+        histogram = LatencyHistogram()
+        histogram.observe(60000)
+        
+        assert histogram.counts[-1] == 1
+        assert histogram.quantile(0.99) == LATENCY_BUCKETS_MS[-1]
+
+
+class TestPrometheusExport:
+    """Tests for the text exposition format"""
+    
+    def test_renders_cumulative_buckets_counters_and_quantiles(self):
+        metrics = RequestMetrics()
+        metrics.observe_request("GET", "/api/items/{item_id}", 200, 3, db_calls=2, db_time_ms=1.5)
+        metrics.observe_request("GET", "/api/items/{item_id}", 500, 20, db_calls=1)
+        
+        lines = metrics.render_prometheus().splitlines()
+        labels = 'method="GET",route="/api/items/{item_id}"'
+        
+        assert f'http_request_duration_seconds_bucket{{{labels},le="0.0025"}} 0' in lines
+        assert f'http_request_duration_seconds_bucket{{{labels},le="0.005"}} 1' in lines
+        assert f'http_request_duration_seconds_bucket{{{labels},le="0.025"}} 2' in lines
+        assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+        assert f"http_request_duration_seconds_sum{{{labels}}} 0.023000" in lines
+        assert f"http_request_duration_seconds_count{{{labels}}} 2" in lines
+        assert f'http_requests_total{{{labels},status="200"}} 1' in lines
+        assert f'http_requests_total{{{labels},status="500"}} 1' in lines
+        assert f"http_request_db_calls_total{{{labels}}} 3" in lines
+        assert f"http_request_db_seconds_total{{{labels}}} 0.001500" in lines
+        assert any(line.startswith(f'http_request_duration_quantile_seconds{{{labels},quantile="0.95"}}') for line in lines)
+        assert "# TYPE http_request_duration_seconds histogram" in lines
+    
+    def test_unmatched_routes_and_label_values_are_escaped(self):
+        metrics = RequestMetrics()
+        metrics.observe_request("GET", None, 404, 1)
+        metrics.observe_request("POST", '/api/x"y', 200, 1)
+        
+        text = metrics.render_prometheus()
+        
+        assert 'route="<unmatched>"' in text
+        assert 'route="/api/x\\"y"' in text
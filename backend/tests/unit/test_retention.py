@@ -0,0 +1,74 @@
+"""
+Unit Tests for Raw Zone Retention
+"""
+
+import json
+import zlib
+from datetime import datetime, timedelta
+
+import pytest
+
+from data_lake.retention import (
+    DEFAULT_POLICY,
+    RetentionManager,
+    RetentionPolicy,
+    compress_versions,
+    expand_versions,
+)
+
+
+class TestArchiveCodec:
+    """Tests for compressed delta archives"""
+    
+    def test_round_trip(self):
+        """Archived versions expand back to the original payloads"""
+        versions = [
+            {"_id": 1, "id": "a", "raw_data": {"name": "Acme", "stage": "new", "value": 10}},
+            {"_id": 2, "id": "b", "raw_data": {"name": "Acme", "stage": "won", "value": 10}},
+            {"_id": 3, "id": "c", "raw_data": {"name": "Acme Ltd", "stage": "won"}},
+        ]
+        
+        archive = compress_versions(versions, "raw_data")
+        expanded = expand_versions(archive, "raw_data")
+        
+        assert [v["raw_data"] for v in expanded] == [v["raw_data"] for v in versions]
+        assert [v["id"] for v in expanded] == ["a", "b", "c"]
+        assert "_id" not in expanded[0]
+    
+    def test_round_trip_keeps_metadata_types(self):
+        """Datetimes in version metadata come back as datetimes"""
+        seen = datetime(2025, 3, 1, 12, 30, 15, 250000)
+        versions = [
+            {"_id": 1, "_last_seen_at": seen, "_raw_data": {"name": "Acme"}},
+            {"_id": 2, "_last_seen_at": seen + timedelta(days=1), "_raw_data": {"name": "Acme Ltd"}},
+        ]
+        
+        expanded = expand_versions(compress_versions(versions, "_raw_data"), "_raw_data")
+        
+        assert [v["_last_seen_at"] for v in expanded] == [seen, seen + timedelta(days=1)]
+    
+    def test_reads_legacy_json_archives(self):
+        """Archives written with the plain JSON codec still expand"""
+        blob = json.dumps({"base": {"name": "Acme"}, "deltas": [], "meta": [{"id": "a"}]})
+        archive = {"codec": "zlib+json-delta/1", "payload": zlib.compress(blob.encode())}
+        
+        assert expand_versions(archive, "raw_data") == [{"id": "a", "raw_data": {"name": "Acme"}}]
+
+
+class TestPolicyResolution:
+    """Tests for policy matching"""
+    
+    def test_most_specific_policy_wins(self):
+        """Exact source/entity beats source wildcard beats the default"""
+        policies = [
+            RetentionPolicy(source="odoo", keep_days=14),
+            RetentionPolicy(source="odoo", entity_type="opportunity", keep_days=90),
+        ]
+        
+        assert RetentionManager.resolve_policy(policies, "odoo", ["opportunity"]).keep_days == 90
+        assert RetentionManager.resolve_policy(policies, "odoo", ["user"]).keep_days == 14
+        assert RetentionManager.resolve_policy(policies, "ms365", ["user"]) is DEFAULT_POLICY
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
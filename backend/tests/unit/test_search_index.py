@@ -0,0 +1,216 @@
+"""
+Unit Tests for the Search Index
+"""
+
+import asyncio
+import re
+
+from pymongo import ReplaceOne
+
+from core.database import Database
+from routes import sales
+from services.search import index
+from services.search.index import CRM_KEY, SearchIndexer, build_entry, edge_grams, score_entry, tokenize
+
+
+def matches(doc, query):
+    for field, cond in query.items():
+        value = doc.get(field)
+        if "$all" in cond and not set(cond["$all"]) <= set(value or []):
+            return False
+        if "$in" in cond and not set(cond["$in"]) & set(value if isinstance(value, list) else [value]):
+            return False
+        if "$nin" in cond and value in cond["$nin"]:
+            return False
+        if "$regex" in cond and not re.search(cond["$regex"], value or ""):
+            return False
+    return True
+
+
+class Cursor:
+    def __init__(self, docs, projection):
+        self.docs = docs
+        self.projection = projection
+    
+    def sort(self, field, direction):
+        self.docs.sort(key=lambda d: d[field], reverse=direction < 0)
+        return self
+    
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+    
+    def max_time_ms(self, ms):
+        return self
+    
+    async def to_list(self, length):
+        return [{k: v for k, v in d.items() if k not in self.projection} for d in self.docs[:length]]
+
+    def __aiter__(self):
+        async def gen():
+            for doc in await self.to_list(len(self.docs)):
+                yield doc
+        return gen()
+
+    
+class FakeCollection:
+    """Collection in insertion (natural) order; search entries are replaced by key"""
+    
+    def __init__(self, docs=None):
+        self.docs = docs if docs is not None else []
+    
+    def find(self, query, projection=None):
+        return Cursor([d for d in self.docs if matches(d, query)], projection or {})
+    
+    async def find_one(self, query, projection=None):
+        return next(iter(self.find(query, projection).docs), None)
+    
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+    
+    async def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            self.docs = [d for d in self.docs if d["key"] != op._filter["key"]]
+            if isinstance(op, ReplaceOne):
+                self.docs.append(op._doc)
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+    
+    def __getattr__(self, name):
+        return self[name]
+
+
+def indexer_with(entries):
+    indexer = SearchIndexer({index.SEARCH_COLLECTION: None})
+    indexer.collection = FakeCollection(entries)
+    return indexer
+
+
+def titles(indexer, query):
+    results, _ = asyncio.run(indexer.search(query, access_keys={CRM_KEY}))
+    return [r["title"] for r in results]
+
+
+class TestEntries:
+    """Tests for index entries"""
+    
+    def test_edge_grams(self):
+        assert edge_grams("Acme Co", None, False) == ["ac", "acm", "acme", "co"]
+        assert len(max(edge_grams("x" * 40), key=len)) == 15
+    
+    def test_serving_entry(self):
+        doc = {
+            "_id": "abc",
+            "serving_id": "10",
+            "data": {
+                "id": 10,
+                "name": "Acme renewal",
+                "partner_name": "Acme Industries",
+                "stage_name": "Proposition",
+                "salesperson_id": 5,
+            },
+        }
+        
+        entry = build_entry("opportunity", "odoo", doc)
+        
+        assert entry["key"] == "odoo:opportunity:abc"
+        assert entry["entity_id"] == "10"
+        assert entry["subtitle"] == "Acme Industries · Proposition"
+        assert {"ren", "indus", "prop"} <= set(entry["grams"])
+        assert "sp:5" in entry["access_keys"]
+    
+    def test_access_keys(self):
+        contact = build_entry("contact", "odoo", {"_id": 1, "data": {"id": 2, "name": "Jane"}})
+        activity = build_entry("activity", "odoo", {"_id": 3, "data": {"id": 4, "summary": "Call", "user_id": 7}})
+        crm = build_entry("activity", "crm", {"id": "a1", "title": "Demo", "created_by_id": "u1", "assigned_to_id": "u2"})
+        
+        # Unassigned contacts are visible to everyone, activities to their assignee
+        assert contact["access_keys"] == ["*"]
+        assert "sp:7" in activity["access_keys"]
+        assert crm["access_keys"] == [CRM_KEY, "user:u1", "user:u2"]
+    
+    def test_untitled_records_are_skipped(self):
+        assert build_entry("account", "odoo", {"_id": 1, "data": {"id": 2, "name": False}}) is None
+
+
+class TestRanking:
+    """Tests for result ordering"""
+    
+    def test_title_matches_outrank_keyword_matches(self):
+        query = "acme"
+        words = tokenize(query)
+        entries = [
+            {"title": "Other deal", "entity_type": "opportunity"},
+            {"title": "Acme", "entity_type": "activity"},
+            {"title": "Acme Industries", "entity_type": "account"},
+            {"title": "Call with Acme", "entity_type": "activity"},
+        ]
+        
+        ranked = sorted(entries, key=lambda e: score_entry(e, query, words), reverse=True)
+        
+        assert [e["title"] for e in ranked] == ["Acme", "Acme Industries", "Call with Acme", "Other deal"]
+    
+    def test_title_matches_survive_the_candidate_limit(self, monkeypatch):
+        monkeypatch.setattr(index, "MAX_CANDIDATES", 3)
+        entries = [
+            build_entry("activity", "crm", {"id": f"a{i}", "title": f"Follow-up {i}", "activity_type": "Acme call"})
+            for i in range(5)
+        ] + [
+            build_entry("opportunity", "crm", {"id": "o1", "name": "Renewal with Acme"}),
+            build_entry("account", "crm", {"id": "c2", "name": "Acme Industries"}),
+            build_entry("account", "crm", {"id": "c1", "name": "Acme"}),
+        ]
+        
+        results, timed_out = asyncio.run(indexer_with(entries).search("ACME", access_keys=None))
+        
+        assert not timed_out
+        assert [r["title"] for r in results] == ["Acme", "Acme Industries", "Renewal with Acme"]
+        assert "title_grams" not in results[0] and "title_key" not in results[0]
+    
+    def test_remaining_slots_are_filled_with_keyword_matches(self, monkeypatch):
+        monkeypatch.setattr(index, "MAX_CANDIDATES", 3)
+        entries = [
+            build_entry("activity", "crm", {"id": "a1", "title": "Follow-up", "activity_type": "Acme call"}),
+            build_entry("account", "crm", {"id": "c1", "name": "Acme"}),
+        ]
+        
+        results, _ = asyncio.run(indexer_with(entries).search("acme", access_keys={CRM_KEY}))
+        
+        assert [r["title"] for r in results] == ["Acme", "Follow-up"]
+
+
+
+class TestCrmIndexing:
+    """CRM records are indexed as they are written, not only after an Odoo sync"""
+    
+    def test_created_account_is_searchable(self, monkeypatch):
+        db = FakeDB()
+        # An unrelated entry, so search doesn't fall back to building the whole index
+        db[index.SEARCH_COLLECTION].docs.append(build_entry("account", "crm", {"id": "c0", "name": "Globex"}))
+        monkeypatch.setattr(Database, "get_db", classmethod(lambda cls: db))
+        
+        account = asyncio.run(sales.create_account(
+            sales.AccountCreate(name="Initech Labs", industry="Software"),
+            token_data={"id": "u1", "name": "Jane"}
+        ))
+        
+        results, _ = asyncio.run(SearchIndexer(db).search("initech", access_keys={"user:u1"}))
+        assert [(r["entity_id"], r["subtitle"]) for r in results] == [(account["id"], "Software")]
+    
+    def test_entries_follow_edits_and_removals(self):
+        db = FakeDB()
+        db.opportunities.docs.append({"id": "o1", "name": "Acme renewal", "stage": "proposal"})
+        indexer = SearchIndexer(db)
+        
+        asyncio.run(indexer.index_crm("opportunity", ["o1"]))
+        db.opportunities.docs[0]["name"] = "Acme expansion"
+        asyncio.run(indexer.index_crm("opportunity", ["o1"]))
+        assert titles(indexer, "acme") == ["Acme expansion"]
+        
+        db.opportunities.docs.clear()
+        asyncio.run(indexer.index_crm("opportunity", ["o1"]))
+        assert db[index.SEARCH_COLLECTION].docs == []
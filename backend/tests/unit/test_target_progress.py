@@ -0,0 +1,68 @@
+"""
+Unit Tests for the Target Progress Report
+"""
+
+from datetime import datetime, timezone
+
+from services.reporting.actuals import SalespersonActuals
+from services.reporting.target_progress import build_target_report
+
+
+def row(sp_id, name, **metrics):
+    return {"_id": {"id": sp_id, "name": name}, **metrics}
+
+
+ACTUALS = SalespersonActuals([
+    row(5, "jane", won_revenue=600, won_deals=2, deals=8, activities=10),
+    row(5, "", deals=2),
+    row(None, "bob", won_revenue=50, deals=1),
+    row(None, "", deals=4, activities=3),
+])
+
+
+class TestSalespersonActuals:
+    """Lookup of aggregated rows per user"""
+    
+    def test_by_odoo_user_id(self):
+        actual = ACTUALS.for_user({"odoo_user_id": 5, "odoo_salesperson_name": "Bob"})
+        assert actual["won_revenue"] == 600
+        assert actual["deals"] == 10
+    
+    def test_by_salesperson_name(self):
+        actual = ACTUALS.for_user({"odoo_salesperson_name": "BOB"})
+        assert actual["won_revenue"] == 50
+        assert actual["activities"] == 0
+    
+    def test_unmapped_users(self):
+        assert ACTUALS.for_user({"name": "No Odoo"}) is None
+        assert ACTUALS.for_user({"odoo_user_id": 99})["deals"] == 0
+    
+    def test_totals(self):
+        assert ACTUALS.totals["deals"] == 15
+        assert ACTUALS.totals["activities"] == 13
+
+
+class TestBuildReport:
+    """Join of users, role targets and actuals"""
+    
+    def test_report(self):
+        now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        users = [
+            {"id": "u1", "name": "Jane", "role_id": "ae", "odoo_user_id": 5},
+            {"id": "u2", "name": "Bob", "role_id": "ae", "odoo_salesperson_name": "bob"},
+            {"id": "u3", "name": "Unmapped", "role_id": "ae"},
+            {"id": "u4", "name": "Other role", "role_id": "sdr", "odoo_user_id": 5},
+        ]
+        targets = [{"role_id": "ae", "target_revenue": 1000, "target_deals": 10, "target_activities": 10}]
+        
+        report = build_target_report(users, targets, [{"id": "ae", "name": "AE"}], ACTUALS, now)
+        
+        jane, bob = report["individual_progress"]
+        assert jane["user_id"] == "u1"
+        assert jane["progress"] == {"revenue": 60.0, "deals": 100.0, "activities": 100.0, "overall": 80.0}
+        assert jane["status"] == "on_track"
+        assert jane["role_name"] == "AE"
+        assert bob["status"] == "behind"
+        assert report["summary"]["total_salespeople"] == 2
+        assert report["team_totals"]["actual_revenue"] == 650
+        assert report["team_progress"]["revenue"] == 32.5
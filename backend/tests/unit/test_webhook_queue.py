@@ -0,0 +1,134 @@
+"""
+Unit Tests for the Webhook Queue
+"""
+
+import asyncio
+
+import pytest
+
+from integrations.odoo.connector import OdooConnector, _matches_domain
+from services.sync.webhook_queue import DELETE, UPSERT, WebhookQueue
+
+
+class RecordingQueue(WebhookQueue):
+    """Queue whose batches are recorded instead of applied"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(db=object(), **kwargs)
+        self.batches = []
+    
+    async def _apply(self, batch):
+        self.batches.append(batch)
+        return {}
+
+
+def test_window_coalesces_duplicates():
+    async def run():
+        queue = RecordingQueue(window_seconds=0.05)
+        for _ in range(3):
+            queue.enqueue("crm.lead", "write", [1, 2, 3])
+        queue.enqueue("crm.lead", "unlink", [3])
+        queue.enqueue("res.partner", "create", [9])
+        await asyncio.sleep(0.1)
+        return queue
+    
+    queue = asyncio.run(run())
+    assert queue.batches == [{"crm.lead": {1: UPSERT, 2: UPSERT, 3: DELETE}, "res.partner": {9: UPSERT}}]
+    assert queue.get_stats()["coalesced"] == 7
+    assert queue.pending_count == 0
+
+
+def test_full_queue_flushes_early():
+    async def run():
+        queue = RecordingQueue(window_seconds=10, max_ids=3)
+        queue.enqueue("crm.lead", "write", [1])
+        queue.enqueue("crm.lead", "write", [2, 3])
+        await asyncio.sleep(0.01)
+        queue.enqueue("crm.lead", "write", [4])
+        await queue.stop()
+        return queue
+    
+    assert asyncio.run(run()).batches == [{"crm.lead": {1: UPSERT, 2: UPSERT, 3: UPSERT}}, {"crm.lead": {4: UPSERT}}]
+
+
+class Integrations:
+    async def find_one(self, query):
+        return {"integration_type": "odoo", "config": {"url": "http://odoo.test"}}
+
+
+class FakeDB:
+    integrations = Integrations()
+
+
+def test_failed_read_requeues_without_overwriting_newer_actions(monkeypatch):
+    queue = WebhookQueue(window_seconds=10, max_attempts=3, db=FakeDB())
+    
+    async def read_changes(connector, model, ids):
+        # An unlink for record 1 arrives while the batch is in flight
+        queue.enqueue("crm.lead", "unlink", [1])
+        raise ConnectionError("odoo unreachable")
+    monkeypatch.setattr(OdooConnector, "read_changes", read_changes)
+    
+    async def run():
+        queue.enqueue("crm.lead", "write", [1, 2])
+        with pytest.raises(ConnectionError):
+            await queue.flush()
+        queue._task.cancel()
+    
+    asyncio.run(run())
+    stats = queue.get_stats()
+    assert queue._pending == {"crm.lead": {1: DELETE, 2: UPSERT}}
+    assert stats["failed"] == 0 and stats["retried"] == 1
+    assert stats["last_error"] == "ConnectionError: odoo unreachable"
+
+
+def test_records_count_as_failed_after_max_attempts(monkeypatch):
+    queue = WebhookQueue(window_seconds=10, max_attempts=2, db=FakeDB())
+    
+    async def read_changes(connector, model, ids):
+        raise ConnectionError("odoo unreachable")
+    monkeypatch.setattr(OdooConnector, "read_changes", read_changes)
+    
+    async def run():
+        queue.enqueue("crm.lead", "write", [1, 2])
+        queue._task.cancel()
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await queue.flush()
+    
+    asyncio.run(run())
+    assert queue.pending_count == 0
+    assert queue.get_stats()["failed"] == 2 and queue.get_stats()["retried"] == 2
+
+
+def test_failed_batches_are_retried_with_backoff():
+    class FlakyQueue(RecordingQueue):
+        async def _apply(self, batch):
+            if not self.batches:
+                self.batches.append(None)
+                raise ConnectionError("odoo unreachable")
+            return await super()._apply(batch)
+    
+    async def run():
+        queue = FlakyQueue(window_seconds=0.01, retry_delay=0.05)
+        queue.enqueue("crm.lead", "write", [1])
+        await asyncio.sleep(0.03)
+        assert queue.batches == [None]
+        await asyncio.sleep(0.05)
+        return queue
+    
+    queue = asyncio.run(run())
+    assert queue.batches == [None, {"crm.lead": {1: UPSERT}}]
+    assert queue.get_stats()["failed"] == 0
+
+
+def test_partner_split_by_export_domain():
+    connector = OdooConnector({})
+    _, account_domain, _ = connector._export_spec("account")
+    _, contact_domain, _ = connector._export_spec("contact")
+    company = {"id": 1, "is_company": True, "active": True, "parent_id": False}
+    person = {"id": 2, "is_company": False, "active": True, "parent_id": [1, "Acme"]}
+    
+    assert _matches_domain(company, account_domain) and not _matches_domain(company, contact_domain)
+    assert _matches_domain(person, contact_domain) and not _matches_domain(person, account_domain)
+    assert _matches_domain({"move_type": "out_refund"}, connector._export_spec("invoice")[1])